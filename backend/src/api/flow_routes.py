@@ -30,6 +30,7 @@ class FlowCreateRequest(BaseModel):
     nodes: list = []
     edges: list = []
     variables: dict = {}
+    settings: dict = {}
 
 
 class FlowUpdateRequest(BaseModel):
@@ -39,6 +40,7 @@ class FlowUpdateRequest(BaseModel):
     nodes: list = None
     edges: list = None
     variables: dict = None
+    settings: dict = None
 
 
 @flow_router.get("")
@@ -164,10 +166,21 @@ async def update_flow(flow_id: str, request: Dict[str, Any]):
     if not flow:
         raise HTTPException(status_code=404, detail="Flow not found or update failed")
     
+    flow_data = flow.model_dump()
+    
+    # 运行中的流程在下一轮开始前切换到新版本
+    message = "Flow updated successfully"
+    try:
+        from engine.flow_runner import get_flow_runner
+        if get_flow_runner().update_flow(flow_data):
+            message = "Flow updated successfully, will be applied to the running flow at next loop"
+    except Exception as e:
+        logger.error(f"流程热更新失败: {e}")
+    
     return {
         "status": "ok",
-        "message": "Flow updated successfully",
-        "data": flow.model_dump()
+        "message": message,
+        "data": flow_data
     }
 
 
@@ -195,13 +208,19 @@ async def validate_flow(flow_id: str):
     
     is_valid, errors = flow_service.validate_flow(flow)
     
+    data = {
+        "is_valid": is_valid,
+        "errors": errors
+    }
+    if is_valid:
+        # 编译报告：执行时会被裁剪 / 融合的节点
+        from engine.graph_compiler import compile_flow
+        data["optimization"] = compile_flow(flow.model_dump()).get_report()
+    
     return {
         "status": "ok" if is_valid else "error",
         "message": "Flow is valid" if is_valid else "Flow validation failed",
-        "data": {
-            "is_valid": is_valid,
-            "errors": errors
-        }
+        "data": data
     }
 
 
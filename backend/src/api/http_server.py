@@ -2,6 +2,7 @@
 
 基于 FastAPI 提供 REST API 接口，用于流程管理、配置管理等。
 """
+import asyncio
 import uuid
 from datetime import datetime
 from typing import Dict, List, Any, Optional
@@ -63,6 +64,12 @@ class HTTPAPIServer:
         # 注册路由
         self._register_routes()
         
+        # SSE 订阅者在服务器事件循环中，绑定后其他线程的消息投递到该循环
+        @self.app.on_event("startup")
+        async def bind_sse_loop():
+            from api.sse_service import get_sse_manager
+            get_sse_manager().bind_loop(asyncio.get_running_loop())
+        
         logger.info("HTTP API 服务器已初始化")
     
     def _register_routes(self) -> None:
@@ -92,6 +99,14 @@ class HTTPAPIServer:
         except Exception as e:
             logger.warning(f"注册 SSE 路由失败: {e}")
         
+        # 注册运行时状态路由
+        try:
+            from api.runtime_routes import runtime_router
+            self.app.include_router(runtime_router)
+            logger.info("运行时状态路由已注册")
+        except Exception as e:
+            logger.warning(f"注册运行时状态路由失败: {e}")
+        
         # ========== 健康检查 ==========
         
         @self.app.get("/health", tags=["System"])
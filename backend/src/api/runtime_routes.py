@@ -0,0 +1,216 @@
+"""运行时状态 API 路由
+
+提供流程执行引擎运行时信息（线程池、工作进程、分段追踪等）的查询端点。
+"""
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+
+# 创建路由器
+runtime_router = APIRouter(prefix="/api/runtime", tags=["Runtime"])
+
+
+@runtime_router.get("/executors")
+async def get_executor_stats():
+    """获取节点执行线程池状态"""
+    try:
+        from engine.executor_pool import get_executor_pools
+        stats = get_executor_pools().get_stats()
+        
+        return {
+            "status": "ok",
+            "message": "Executor stats retrieved successfully",
+            "data": stats
+        }
+    except Exception as e:
+        logger.error(f"获取线程池状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/workers")
+async def get_worker_stats():
+    """获取流程工作进程状态（process 运行模式）"""
+    try:
+        from engine.flow_runner import get_flow_runner
+        stats = get_flow_runner().get_worker_stats()
+        
+        return {
+            "status": "ok",
+            "message": "Worker stats retrieved successfully",
+            "data": stats
+        }
+    except Exception as e:
+        logger.error(f"获取工作进程状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/result-cache")
+async def get_result_cache_stats():
+    """获取节点结果缓存状态（含各节点命中率）"""
+    try:
+        from engine.result_cache import get_result_cache
+        stats = get_result_cache().get_stats()
+        
+        return {
+            "status": "ok",
+            "message": "Result cache stats retrieved successfully",
+            "data": stats
+        }
+    except Exception as e:
+        logger.error(f"获取结果缓存状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/rec-cache")
+async def get_rec_cache_stats():
+    """获取文本识别结果缓存状态（按识别模型）"""
+    try:
+        from ocr.rec_cache import get_rec_cache_stats
+        stats = get_rec_cache_stats()
+        
+        return {
+            "status": "ok",
+            "message": "Recognition cache stats retrieved successfully",
+            "data": stats
+        }
+    except Exception as e:
+        logger.error(f"获取识别结果缓存状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/models")
+async def get_model_stats():
+    """获取已加载的模型（引用计数、空闲状态、估算内存）"""
+    try:
+        from engine.flow_runner import get_flow_runner
+        stats = get_flow_runner().get_model_stats()
+        
+        return {
+            "status": "ok",
+            "message": "Model stats retrieved successfully",
+            "data": stats
+        }
+    except Exception as e:
+        logger.error(f"获取模型状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.delete("/models/idle")
+async def clear_idle_models():
+    """卸载所有空闲模型（仅当前进程）"""
+    try:
+        from engine.model_registry import get_model_registry
+        count = get_model_registry().clear_idle()
+        
+        return {
+            "status": "ok",
+            "message": f"Unloaded {count} idle models",
+            "data": {"unloaded": count}
+        }
+    except Exception as e:
+        logger.error(f"卸载空闲模型失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/batcher")
+async def get_batcher_stats():
+    """获取推理批处理状态（各模型的批大小、排队时间）"""
+    try:
+        from engine.inference_batcher import get_inference_batcher
+        stats = get_inference_batcher().get_stats()
+        
+        return {
+            "status": "ok",
+            "message": "Batcher stats retrieved successfully",
+            "data": stats
+        }
+    except Exception as e:
+        logger.error(f"获取推理批处理状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/kvm-queues")
+async def get_kvm_queue_stats():
+    """获取 KVM 输入仲裁队列状态（排队数、当前持有者、排队时间）"""
+    try:
+        from engine.flow_runner import get_flow_runner
+        stats = get_flow_runner().get_kvm_queue_stats()
+        
+        return {
+            "status": "ok",
+            "message": "KVM queue stats retrieved successfully",
+            "data": stats
+        }
+    except Exception as e:
+        logger.error(f"获取 KVM 仲裁队列状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/flows/{flow_id}/trace")
+async def get_flow_trace(flow_id: str):
+    """导出流程最近 N 轮循环的分段追踪（Chrome trace-event JSON）
+    
+    返回内容可直接在 chrome://tracing 或 Perfetto 中打开。
+    """
+    try:
+        from engine.flow_runner import get_flow_runner
+        return get_flow_runner().get_flow_trace(flow_id)
+    except Exception as e:
+        logger.error(f"导出流程追踪失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/flows/{flow_id}/history")
+async def get_flow_history(
+    flow_id: str,
+    window: float = Query(3600.0, description="统计窗口（秒，截止到 end），start 指定时忽略"),
+    start: Optional[float] = Query(None, description="窗口开始时间（Unix 时间戳）"),
+    end: Optional[float] = Query(None, description="窗口结束时间（Unix 时间戳），默认当前"),
+    node_id: Optional[str] = Query(None, description="只查询指定节点，循环耗时为 __loop__")
+):
+    """查询流程执行历史：时间窗口内各节点的耗时分位数和失败率"""
+    try:
+        from monitoring.history_store import get_history_store
+        
+        end_ts = end if end is not None else time.time()
+        start_ts = start if start is not None else end_ts - window
+        store = get_history_store()
+        # SQLite 查询为同步调用，放到线程池执行，避免阻塞事件循环
+        nodes = await run_in_threadpool(store.query_node_stats, flow_id, start_ts, end_ts, node_id)
+        recent_errors = await run_in_threadpool(store.get_recent_errors, flow_id)
+        
+        return {
+            "status": "ok",
+            "message": "Flow history retrieved successfully",
+            "data": {
+                "flow_id": flow_id,
+                "start": start_ts,
+                "end": end_ts,
+                "nodes": nodes,
+                "recent_errors": recent_errors
+            }
+        }
+    except Exception as e:
+        logger.error(f"查询流程执行历史失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@runtime_router.get("/history")
+async def get_history_stats():
+    """获取执行历史存储状态"""
+    try:
+        from monitoring.history_store import get_history_store
+        stats = await run_in_threadpool(get_history_store().get_stats)
+        
+        return {
+            "status": "ok",
+            "message": "History store stats retrieved successfully",
+            "data": stats
+        }
+    except Exception as e:
+        logger.error(f"获取执行历史存储状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -6,7 +6,7 @@
 import asyncio
 import json
 import time
-from typing import Dict, Set, Any, Optional
+from typing import Dict, Set, Any, Optional, Callable
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime
@@ -18,6 +18,7 @@ class SSEMessageType(str, Enum):
     NODE_START = "node_start"           # 节点开始执行
     NODE_COMPLETE = "node_complete"     # 节点执行完成
     NODE_ERROR = "node_error"           # 节点执行错误
+    NODE_TIMEOUT = "node_timeout"       # 节点超时 / 超出循环预算被跳过
     LOOP_START = "loop_start"           # 循环开始
     LOOP_COMPLETE = "loop_complete"     # 循环完成
     FLOW_START = "flow_start"           # 流程启动
@@ -72,9 +73,34 @@ class SSEManager:
         # 全局订阅者（接收所有流程的消息）
         self._global_subscribers: Set[asyncio.Queue] = set()
         self._lock = asyncio.Lock()
+        # 消息转发钩子（工作进程中将消息转发到 API 进程）
+        self._sink: Optional[Callable[[SSEMessage], None]] = None
+        # 订阅者所在的事件循环（API 服务器主循环）
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         logger.info("SSE 管理器初始化完成")
     
+    def set_sink(self, sink: Optional[Callable[[SSEMessage], None]]) -> None:
+        """设置消息转发钩子
+        
+        设置后 broadcast_sync 不再本地广播，而是交给钩子处理。
+        
+        Args:
+            sink: 消息处理函数，None 表示恢复本地广播
+        """
+        self._sink = sink
+    
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """绑定订阅者所在的事件循环
+        
+        API 服务器启动时调用。绑定后 broadcast_sync 从任意线程调用都会把消息
+        投递到该循环，而不是调用线程自己的（或临时创建的）事件循环。
+        
+        Args:
+            loop: API 服务器的事件循环
+        """
+        self._loop = loop
+    
     async def subscribe(self, flow_id: Optional[str] = None) -> asyncio.Queue:
         """订阅流程事件
         
@@ -84,6 +110,8 @@ class SSEManager:
         Returns:
             消息队列
         """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
         queue: asyncio.Queue = asyncio.Queue(maxsize=100)
         
         async with self._lock:
@@ -150,6 +178,25 @@ class SSEManager:
         Args:
             message: SSE 消息
         """
+        if self._sink is not None:
+            try:
+                self._sink(message)
+            except Exception as e:
+                logger.debug(f"SSE 消息转发失败: {e}")
+            return
+        
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                loop.create_task(self.broadcast(message))
+            else:
+                asyncio.run_coroutine_threadsafe(self.broadcast(message), loop)
+            return
+        
         try:
             loop = asyncio.get_event_loop()
             if loop.is_running():
@@ -242,6 +289,35 @@ def send_node_error(flow_id: str, node_id: str, node_label: str,
     manager.broadcast_sync(message)
 
 
+def send_node_timeout(flow_id: str, node_id: str, node_label: str, node_type: str,
+                      timeout_ms: float, reason: str, skipped: bool) -> None:
+    """发送节点超时消息
+    
+    Args:
+        flow_id: 流程 ID
+        node_id: 节点 ID
+        node_label: 节点标签
+        node_type: 节点类型
+        timeout_ms: 生效的超时时间（毫秒）
+        reason: 超时原因: node（节点超时）/ budget（超出循环预算）/ busy（资源繁忙，本轮跳过）
+        skipped: 是否作为可选节点被跳过（否则流程因超时失败）
+    """
+    manager = get_sse_manager()
+    message = SSEMessage(
+        type=SSEMessageType.NODE_TIMEOUT,
+        flow_id=flow_id,
+        data={
+            "node_id": node_id,
+            "node_label": node_label,
+            "node_type": node_type,
+            "timeout_ms": timeout_ms,
+            "reason": reason,
+            "skipped": skipped
+        }
+    )
+    manager.broadcast_sync(message)
+
+
 def send_loop_start(flow_id: str, loop_count: int) -> None:
     """发送循环开始消息"""
     manager = get_sse_manager()
@@ -253,16 +329,21 @@ def send_loop_start(flow_id: str, loop_count: int) -> None:
     manager.broadcast_sync(message)
 
 
-def send_loop_complete(flow_id: str, loop_count: int, duration_ms: float) -> None:
+def send_loop_complete(flow_id: str, loop_count: int, duration_ms: float,
+                       extra_data: Optional[Dict[str, Any]] = None) -> None:
     """发送循环完成消息"""
     manager = get_sse_manager()
+    data = {
+        "loop_count": loop_count,
+        "duration_ms": duration_ms
+    }
+    if extra_data:
+        data.update(extra_data)
+    
     message = SSEMessage(
         type=SSEMessageType.LOOP_COMPLETE,
         flow_id=flow_id,
-        data={
-            "loop_count": loop_count,
-            "duration_ms": duration_ms
-        }
+        data=data
     )
     manager.broadcast_sync(message)
 
@@ -292,6 +373,20 @@ def send_flow_stop(flow_id: str, flow_name: str, loop_count: int) -> None:
     manager.broadcast_sync(message)
 
 
+def send_flow_status(flow_id: str, status: str, data: Optional[Dict] = None) -> None:
+    """发送流程状态更新消息"""
+    manager = get_sse_manager()
+    message = SSEMessage(
+        type=SSEMessageType.FLOW_STATUS,
+        flow_id=flow_id,
+        data={
+            "status": status,
+            **(data or {})
+        }
+    )
+    manager.broadcast_sync(message)
+
+
 def send_flow_error(flow_id: str, flow_name: str, error: str, error_node: Optional[str] = None) -> None:
     """发送流程错误消息"""
     manager = get_sse_manager()
@@ -10,6 +10,8 @@ from pathlib import Path
 import numpy as np
 from loguru import logger
 
+from monitoring.tracer import traced
+
 # 尝试导入Sophon YOLO检测器
 try:
     from detection.yolo_sophon import SophonYOLODetector
@@ -129,6 +131,7 @@ class YOLODetector:
         logger.success("YOLO 检测器初始化成功(模拟模式)")
         return True
     
+    @traced("yolo.detect", "yolo")
     def detect(
         self,
         frame: np.ndarray,
@@ -234,6 +237,36 @@ class YOLODetector:
             self.stats['errors'] += 1
             return []
     
+    @traced("yolo.detect_batch", "yolo")
+    def detect_batch(
+        self,
+        frames: List[np.ndarray],
+        conf_thresholds: Optional[List[Optional[float]]] = None,
+        iou_thresholds: Optional[List[Optional[float]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """批量检测多张图像
+        
+        当前 BModel 以 batch=1 编译，逐张推理；批内请求在一次模型锁内
+        连续执行，省去各请求分别排队的开销。
+        
+        Args:
+            frames: 输入图像列表
+            conf_thresholds: 每张图像的置信度阈值(可选)
+            iou_thresholds: 每张图像的 IOU 阈值(可选)
+            
+        Returns:
+            每张图像的检测结果列表,格式同 detect()
+        """
+        if conf_thresholds is None:
+            conf_thresholds = [None] * len(frames)
+        if iou_thresholds is None:
+            iou_thresholds = [None] * len(frames)
+        
+        return [
+            self.detect(frame, conf, iou)
+            for frame, conf, iou in zip(frames, conf_thresholds, iou_thresholds)
+        ]
+    
     def reload_model(self, new_model_path: str) -> bool:
         """热更新模型
         
@@ -7,6 +7,8 @@ import numpy as np
 from typing import List, Dict, Any, Optional
 from loguru import logger
 
+from monitoring.tracer import traced
+
 try:
     import sophon.sail as sail
     SAIL_AVAILABLE = True
@@ -250,6 +252,7 @@ class SophonYOLODetector:
             self.stats['errors'] += 1
             return []
     
+    @traced("yolo.preprocess", "yolo")
     def _preprocess(self, frame: np.ndarray):
         """预处理图像
         
@@ -340,6 +343,7 @@ class SophonYOLODetector:
         
         return resized_img_rgb, ratio, txy
     
+    @traced("yolo.inference", "yolo")
     def _inference(self, bmimg):
         """执行推理
         
@@ -364,6 +368,7 @@ class SophonYOLODetector:
         
         return outputs_dict
     
+    @traced("yolo.postprocess", "yolo")
     def _postprocess(self, outputs_dict, ratio, txy, img_shape):
         """后处理推理结果
         
@@ -0,0 +1,404 @@
+"""离线流程基准测试
+
+使用录制的视频文件或图片目录替代 KVM/RTSP 数据源，动作节点只记录意图
+（点击位置、按键）而不真正发送，等待节点只记录等待时长而不真正休眠，
+在没有 KVM 设备的情况下测量流程自身的性能。
+
+用法（在 backend/src 目录下）:
+    python -m engine.bench <flow_id 或 flow.json> --frames <视频文件或图片目录> [--loops 200]
+
+输出 JSON 报告：各节点 p50/p95/p99 耗时、循环吞吐、峰值 RSS、内存分配，
+便于跨提交对比。
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 添加 src 路径
+src_path = str(Path(__file__).parent.parent)
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+import numpy as np
+from loguru import logger
+
+from nodes.base import BaseNode, NodeConfig
+from nodes.action import MouseActionNode, KeyboardActionNode, WaitNode
+
+
+class FrameReplay:
+    """录制帧回放源（帧预先全部加载到内存，解码耗时不计入测量）"""
+
+    def __init__(self, source: str, max_frames: int = 300):
+        """加载录制帧
+
+        Args:
+            source: 视频文件路径或图片目录
+            max_frames: 最多加载的帧数
+        """
+        import cv2
+
+        self.source = source
+        self.frames: List[np.ndarray] = []
+        path = Path(source)
+
+        if path.is_dir():
+            image_files = sorted(
+                p for p in path.iterdir()
+                if p.suffix.lower() in ('.png', '.jpg', '.jpeg', '.bmp')
+            )
+            for image_file in image_files[:max_frames]:
+                frame = cv2.imread(str(image_file))
+                if frame is not None:
+                    self.frames.append(frame)
+        else:
+            cap = cv2.VideoCapture(str(path))
+            while len(self.frames) < max_frames:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                self.frames.append(frame)
+            cap.release()
+
+        if not self.frames:
+            raise ValueError(f"未能从 {source} 加载任何帧")
+
+        self._index = 0
+
+    def next_frame(self) -> np.ndarray:
+        """按顺序循环返回下一帧"""
+        frame = self.frames[self._index % len(self.frames)]
+        self._index += 1
+        return frame
+
+
+class ReplaySourceNode(BaseNode):
+    """回放数据源节点（替代 kvm_source / rtsp_source）"""
+
+    replay: Optional[FrameReplay] = None
+
+    @classmethod
+    def get_config(cls) -> NodeConfig:
+        return NodeConfig(
+            type="replay_source",
+            label="录制帧回放",
+            category="source",
+            icon="VideoCamera",
+            color="#5470C6",
+            description="基准测试使用的录制帧数据源"
+        )
+
+    def execute(self, context: Any, properties: Dict[str, Any]) -> Any:
+        """将下一帧写入上下文"""
+        context.current_frame = self.replay.next_frame()
+        context.current_timestamp = time.time()
+        return True
+
+
+class ActionRecorder:
+    """动作记录器
+
+    实现 KVMManager 的发送接口，只记录动作意图，不发送到设备。
+    """
+
+    def __init__(self):
+        self.actions: List[Dict[str, Any]] = []
+        self.loop_count = 0
+
+    def _record(self, action: str, **data) -> bool:
+        self.actions.append({'loop': self.loop_count, 'action': action, **data})
+        return True
+
+    def send_mouse_click(self, ip, port, channel, x, y, button="left", *args, **kwargs) -> bool:
+        return self._record('click', x=x, y=y, button=button)
+
+    def send_mouse_double_click(self, ip, port, channel, x, y, button="left", *args, **kwargs) -> bool:
+        return self._record('double_click', x=x, y=y, button=button)
+
+    def send_mouse_move(self, ip, port, channel, x, y, *args, **kwargs) -> bool:
+        return self._record('move', x=x, y=y)
+
+    def send_mouse_drag(self, ip, port, channel, start_x, start_y, end_x, end_y,
+                        button="left", *args, **kwargs) -> bool:
+        return self._record('drag', start_x=start_x, start_y=start_y, end_x=end_x, end_y=end_y,
+                            button=button)
+
+    def send_key_input(self, ip, port, channel, text, *args, **kwargs) -> bool:
+        return self._record('key_input', text=text)
+
+    def send_key_press(self, ip, port, channel, key, *args, **kwargs) -> bool:
+        return self._record('key_press', key=key)
+
+    def send_hotkey(self, ip, port, channel, hotkey, *args, **kwargs) -> bool:
+        return self._record('hotkey', hotkey=hotkey)
+
+    def action_sequence(self, ip, port, channel, *args, **kwargs):
+        # 单流程回放无需输入仲裁
+        return nullcontext()
+
+
+class RecordingMouseActionNode(MouseActionNode):
+    """只记录意图的鼠标动作节点（保留原有的位置解析逻辑）"""
+
+    recorder: Optional[ActionRecorder] = None
+
+    def _get_kvm_manager(self, context: Any) -> Any:
+        return self.recorder
+
+
+class RecordingKeyboardActionNode(KeyboardActionNode):
+    """只记录意图的键盘动作节点"""
+
+    recorder: Optional[ActionRecorder] = None
+
+    def _get_kvm_manager(self, context: Any) -> Any:
+        return self.recorder
+
+
+class DryRunWaitNode(WaitNode):
+    """只记录等待时长、不休眠的等待节点（回放测量不应被固定等待主导）"""
+
+    recorder: Optional[ActionRecorder] = None
+
+    def execute(self, context: Any, properties: Dict[str, Any]) -> Any:
+        try:
+            duration_ms = int(properties.get('duration_ms', 500))
+        except (TypeError, ValueError):
+            return False
+        if self.recorder is not None:
+            self.recorder._record('wait', duration_ms=duration_ms)
+        return True
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """计算耗时分位数（毫秒）"""
+    if not values:
+        return {'count': 0}
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        'count': int(arr.size),
+        'mean': round(float(arr.mean()), 3),
+        'p50': round(float(np.percentile(arr, 50)), 3),
+        'p95': round(float(np.percentile(arr, 95)), 3),
+        'p99': round(float(np.percentile(arr, 99)), 3),
+        'max': round(float(arr.max()), 3)
+    }
+
+
+def _peak_rss_mb() -> float:
+    """进程峰值 RSS（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _git_revision() -> Optional[str]:
+    """当前 git 提交（用于跨提交对比）"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=src_path, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def load_flow(flow_ref: str, flows_dir: str = "flows") -> Dict[str, Any]:
+    """加载流程 JSON（文件路径或 flows 目录下的流程 ID）"""
+    path = Path(flow_ref)
+    if not path.exists():
+        path = Path(flows_dir) / f"{flow_ref}.json"
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FlowBenchmark:
+    """离线流程基准测试"""
+
+    SOURCE_TYPES = ('kvm_source', 'rtsp_source')
+
+    def __init__(self, flow_data: Dict[str, Any], replay: FrameReplay, optimize: bool = True,
+                 pipelined: bool = False):
+        from engine.flow_runner import FlowRunContext
+        from engine.graph_executor import AsyncGraphExecutor
+        from engine.graph_compiler import compile_flow
+        from engine.pipeline import PipelinedExecutor
+
+        # 与运行时一致，执行编译后的流程图
+        self.compiled = compile_flow(flow_data, enabled=optimize)
+        self.flow_data = self.compiled.flow
+        self.replay = replay
+        self.recorder = ActionRecorder()
+
+        ReplaySourceNode.replay = replay
+        RecordingMouseActionNode.recorder = self.recorder
+        RecordingKeyboardActionNode.recorder = self.recorder
+        DryRunWaitNode.recorder = self.recorder
+
+        overrides = {source_type: ReplaySourceNode for source_type in self.SOURCE_TYPES}
+        overrides['mouse_action'] = RecordingMouseActionNode
+        overrides['keyboard_action'] = RecordingKeyboardActionNode
+        overrides['wait'] = DryRunWaitNode
+
+        self.context = FlowRunContext(
+            flow_id=flow_data.get('id', 'bench'),
+            flow_name=flow_data.get('name', 'bench'),
+            start_time=time.time()
+        )
+        # 动作节点需要 KVM 配置，基准测试中仅作占位
+        self.context.kvm_config = {'ip': 'bench', 'port': 0, 'channel': 0}
+        executor_class = PipelinedExecutor if pipelined else AsyncGraphExecutor
+        self.executor = executor_class(self.context, node_overrides=overrides)
+
+        self.node_labels = {
+            node['id']: (node.get('label') or node.get('type', ''), node.get('type', ''))
+            for node in flow_data.get('nodes', [])
+        }
+
+    async def _run_loop(self) -> Dict[str, Any]:
+        """执行一轮并返回耗时"""
+        self.context.loop_count += 1
+        self.recorder.loop_count = self.context.loop_count
+        start = time.perf_counter()
+        success, error = await self.executor.execute_once_with_error(self.flow_data)
+        return {
+            'duration_ms': (time.perf_counter() - start) * 1000,
+            'success': success,
+            'error': error,
+            'nodes': dict(self.executor.node_durations)
+        }
+
+    async def run(self, loops: int, warmup: int, alloc_loops: int) -> Dict[str, Any]:
+        """执行基准测试
+
+        Args:
+            loops: 计时循环次数
+            warmup: 预热循环次数（模型初始化等，不计入统计）
+            alloc_loops: 内存分配统计循环次数（tracemalloc 开销较大，单独执行）
+        """
+        for _ in range(warmup):
+            await self._run_loop()
+
+        loop_times: List[float] = []
+        node_times: Dict[str, List[float]] = {}
+        failures: Dict[str, int] = {}
+
+        actions_before = len(self.recorder.actions)
+        bench_start = time.perf_counter()
+        for _ in range(loops):
+            result = await self._run_loop()
+            loop_times.append(result['duration_ms'])
+            for node_id, duration in result['nodes'].items():
+                node_times.setdefault(node_id, []).append(duration)
+            if not result['success']:
+                key = result['error'] or 'unknown'
+                failures[key] = failures.get(key, 0) + 1
+        total_time = time.perf_counter() - bench_start
+        recorded_actions = self.recorder.actions[actions_before:]
+
+        allocations = None
+        if alloc_loops > 0:
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            for _ in range(alloc_loops):
+                await self._run_loop()
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            stats = after.compare_to(before, 'filename')
+            allocations = {
+                'loops': alloc_loops,
+                'peak_traced_bytes': peak,
+                'net_bytes_per_loop': sum(s.size_diff for s in stats) / alloc_loops,
+                'net_blocks_per_loop': sum(s.count_diff for s in stats) / alloc_loops
+            }
+
+        nodes = {}
+        for node_id, durations in node_times.items():
+            label, node_type = self.node_labels.get(node_id, (node_id, ''))
+            nodes[node_id] = {'label': label, 'type': node_type, **_percentiles(durations)}
+
+        return {
+            'flow_id': self.flow_data.get('id'),
+            'flow_name': self.flow_data.get('name'),
+            'frames_source': self.replay.source,
+            'frame_count': len(self.replay.frames),
+            'loops': loops,
+            'warmup': warmup,
+            'total_time_s': round(total_time, 3),
+            'loops_per_sec': round(loops / total_time, 3) if total_time > 0 else 0.0,
+            'loop_ms': _percentiles(loop_times),
+            'nodes': nodes,
+            'optimization': self.compiled.get_report(),
+            'pipeline': self.executor.get_stats() if hasattr(self.executor, 'get_stats') else None,
+            'failures': failures,
+            'actions': {
+                'count': len(recorded_actions),
+                # 等待节点未真正休眠，此处为被跳过的等待总时长
+                'skipped_wait_ms': sum(a.get('duration_ms', 0) for a in recorded_actions
+                                       if a['action'] == 'wait'),
+                'samples': recorded_actions[:20]
+            },
+            'peak_rss_mb': round(_peak_rss_mb(), 1),
+            'allocations': allocations,
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="离线流程基准测试（录制帧回放）")
+    parser.add_argument('flow', help="流程 JSON 文件路径或 flows 目录下的流程 ID")
+    parser.add_argument('--frames', required=True, help="视频文件或图片目录")
+    parser.add_argument('--flows-dir', default="flows", help="流程目录（按 ID 加载时使用）")
+    parser.add_argument('--loops', type=int, default=200, help="计时循环次数")
+    parser.add_argument('--warmup', type=int, default=5, help="预热循环次数")
+    parser.add_argument('--alloc-loops', type=int, default=20, help="内存分配统计循环次数，0 表示跳过")
+    parser.add_argument('--max-frames', type=int, default=300, help="最多加载的帧数")
+    parser.add_argument('--no-optimize', action='store_true', help="不编译流程图（对比裁剪前的性能）")
+    parser.add_argument('--pipelined', action='store_true', help="使用流水线循环模式（动作阶段执行时预取感知结果）")
+    parser.add_argument('--output', help="报告输出路径（默认输出到标准输出）")
+    parser.add_argument('--log-level', default="WARNING", help="日志级别")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    # 基准测试不需要推送 SSE，丢弃所有消息避免额外开销
+    from api.sse_service import get_sse_manager
+    get_sse_manager().set_sink(lambda message: None)
+    # 离线测量不写入执行历史
+    from monitoring.history_store import get_history_store
+    get_history_store().enabled = False
+
+    flow_data = load_flow(args.flow, args.flows_dir)
+    replay = FrameReplay(args.frames, args.max_frames)
+
+    bench = FlowBenchmark(flow_data, replay, optimize=not args.no_optimize, pipelined=args.pipelined)
+    report = asyncio.run(bench.run(args.loops, args.warmup, args.alloc_loops))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+        logger.info(f"基准测试报告已保存: {args.output}")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""节点取消令牌
+
+同步节点在线程池中执行，超时后线程无法被强制中断。图执行器为每次节点执行创建一个
+带截止时间的 CancelToken，经 contextvars 传入节点线程；耗时节点在写入流程上下文、
+提交推理、发送键鼠输入和等待之前检查令牌，超时后立即停止，不再产生副作用。
+
+- check_cancelled(): 令牌已取消时抛出 NodeCancelled
+- cancellable_sleep(): 可被取消的等待
+- 当前上下文没有令牌（API 直接调用、离线脚本）时均为空操作
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class NodeCancelled(BaseException):
+    """节点已超时取消
+
+    继承 BaseException，避免被节点内部的 except Exception 当作普通失败处理
+    （写入错误信息、重试等）。
+    """
+    pass
+
+
+class CancelToken:
+    """节点执行取消令牌
+
+    截止时间到达或调用 cancel() 后视为已取消。
+
+    Attributes:
+        deadline: 截止时间（time.monotonic()），None 表示不限制
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        """初始化取消令牌
+
+        Args:
+            timeout: 超时时间（秒），None 表示只能显式取消
+        """
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """取消"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def remaining(self) -> Optional[float]:
+        """距截止时间的剩余秒数，None 表示不限制"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        """已取消时抛出 NodeCancelled"""
+        if self.cancelled:
+            raise NodeCancelled()
+
+    def sleep(self, seconds: float) -> None:
+        """等待指定时间，期间取消则抛出 NodeCancelled"""
+        remaining = self.remaining()
+        if remaining is not None and remaining < seconds:
+            self._event.wait(remaining)
+            raise NodeCancelled()
+        if self._event.wait(seconds):
+            raise NodeCancelled()
+
+
+_current_token: 'contextvars.ContextVar[Optional[CancelToken]]' = contextvars.ContextVar(
+    'node_cancel_token', default=None
+)
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    """获取当前上下文中的取消令牌"""
+    return _current_token.get()
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """设置当前上下文的取消令牌（线程池任务会复制该上下文）"""
+    reset_token = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset_token)
+
+
+def check_cancelled() -> None:
+    """当前节点已超时取消时抛出 NodeCancelled"""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def cancellable_sleep(seconds: float) -> None:
+    """可被当前节点取消令牌中断的等待"""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
@@ -0,0 +1,279 @@
+"""节点执行线程池
+
+按节点类别划分独立的有界线程池，替代共享的默认线程池：
+- inference: YOLO/OCR 等模型推理
+- io: KVM 视频采集、鼠标键盘发送、等待等阻塞 IO
+- cpu: 图像裁剪、预处理、逻辑判断等 CPU 计算
+
+每个池记录排队深度和等待时间，并在推理池饱和时对新循环做准入控制。
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from loguru import logger
+
+from monitoring.metrics import get_metrics_collector
+
+
+# 线程池名称
+POOL_INFERENCE = "inference"
+POOL_IO = "io"
+POOL_CPU = "cpu"
+
+
+class ExecutorPool:
+    """带统计的有界线程池
+
+    包装 ThreadPoolExecutor，统计排队深度、执行中任务数和排队等待时间。
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        """初始化线程池
+
+        Args:
+            name: 线程池名称
+            max_workers: 最大工作线程数
+        """
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self._executor: Optional[ThreadPoolExecutor] = self._create_executor()
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.pending = 0
+        self.active = 0
+        self.total_tasks = 0
+        self.avg_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _create_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"FlowPool-{self.name}"
+        )
+
+    def _wrap(self, func: Callable, *args) -> Callable[[], Any]:
+        """包装任务以统计排队等待和执行状态
+
+        任务在提交时的 contextvars 上下文中执行（传递追踪上下文等）。
+        """
+        submit_time = time.time()
+        ctx = contextvars.copy_context()
+
+        with self._lock:
+            self.pending += 1
+        self._report()
+
+        def runner():
+            wait_time = time.time() - submit_time
+            with self._lock:
+                self.pending -= 1
+                self.active += 1
+                self.total_tasks += 1
+                alpha = 0.1
+                self.avg_wait_time = alpha * wait_time + (1 - alpha) * self.avg_wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+            self._report(wait_time)
+
+            try:
+                return ctx.run(func, *args)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                self._report()
+
+        return runner
+
+    def _report(self, wait_time: Optional[float] = None) -> None:
+        """上报 Prometheus 指标"""
+        try:
+            metrics = get_metrics_collector()
+            metrics.update_executor_pool(self.name, self.pending, self.active)
+            if wait_time is not None:
+                metrics.record_executor_task(self.name, wait_time)
+        except Exception as e:
+            logger.debug(f"上报线程池指标失败: {e}")
+
+    def submit(self, func: Callable, *args) -> Future:
+        """提交同步函数到线程池
+
+        线程池关闭后再次提交（如进程内重新创建 FlowRunner）时重新创建线程池。
+
+        Args:
+            func: 同步函数
+            *args: 函数参数
+
+        Returns:
+            concurrent.futures.Future
+        """
+        runner = self._wrap(func, *args)
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+                logger.info(f"节点执行线程池已重新创建: {self.name}")
+            executor = self._executor
+        future = executor.submit(runner)
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run(self, func: Callable, *args) -> Any:
+        """在线程池中执行同步函数并等待结果
+
+        Args:
+            func: 同步函数
+            *args: 函数参数
+
+        Returns:
+            函数返回值
+        """
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def _on_done(self, future) -> None:
+        """任务结束回调：排队中被取消（如节点超时）的任务不会执行，需修正排队计数"""
+        if future.cancelled():
+            with self._lock:
+                self.pending -= 1
+            self._report()
+
+    def is_saturated(self, queue_depth: int) -> bool:
+        """判断线程池是否饱和
+
+        Args:
+            queue_depth: 排队任务数阈值
+        """
+        return self.active >= self.max_workers and self.pending >= queue_depth
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'max_workers': self.max_workers,
+                'queue_depth': self.pending,
+                'active': self.active,
+                'total_tasks': self.total_tasks,
+                'avg_wait_ms': self.avg_wait_time * 1000,
+                'max_wait_ms': self.max_wait_time * 1000
+            }
+
+    def shutdown(self) -> None:
+        """关闭线程池（不等待执行中的任务），之后的提交会重新创建线程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+class ExecutorPoolManager:
+    """节点执行线程池管理器
+
+    单例模式，按配置创建推理 / IO / CPU 三个线程池。
+    """
+
+    _instance: Optional['ExecutorPoolManager'] = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        """单例模式"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """初始化线程池管理器"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+
+        from utils.config import get_config_manager
+        config = get_config_manager().config.executor
+
+        self.admission_queue_depth = config.admission_queue_depth
+        self.admission_max_wait = config.admission_max_wait
+        self._pools: Dict[str, ExecutorPool] = {
+            POOL_INFERENCE: ExecutorPool(POOL_INFERENCE, config.inference_workers),
+            POOL_IO: ExecutorPool(POOL_IO, config.io_workers),
+            POOL_CPU: ExecutorPool(POOL_CPU, config.cpu_workers),
+        }
+
+        # OpenCV 线程数是进程级设置，只在启动时按配置设置一次
+        if config.opencv_threads > 0:
+            import cv2
+            cv2.setNumThreads(config.opencv_threads)
+            logger.info(f"OpenCV 线程数: {config.opencv_threads}")
+
+        logger.info(
+            f"节点执行线程池初始化完成: inference={config.inference_workers}, "
+            f"io={config.io_workers}, cpu={config.cpu_workers}"
+        )
+
+    def get_pool(self, name: str) -> ExecutorPool:
+        """获取线程池，未知名称回退到 IO 池"""
+        return self._pools.get(name) or self._pools[POOL_IO]
+
+    def pool_for_node(self, node_class: Any) -> ExecutorPool:
+        """根据节点类声明的 executor_pool 选择线程池"""
+        return self.get_pool(getattr(node_class, 'executor_pool', POOL_IO))
+
+    def is_inference_saturated(self) -> bool:
+        """推理池是否饱和"""
+        return self._pools[POOL_INFERENCE].is_saturated(self.admission_queue_depth)
+
+    async def wait_for_admission(self, should_stop: Optional[Callable[[], bool]] = None) -> float:
+        """准入控制：推理池饱和时延迟启动新一轮循环
+
+        最多等待 admission_max_wait 秒，超时后放行，避免流程饿死。
+
+        Args:
+            should_stop: 返回 True 时立即放行（例如流程已请求停止）
+
+        Returns:
+            实际等待时间（秒）
+        """
+        if not self.is_inference_saturated():
+            return 0.0
+
+        start = time.time()
+        while self.is_inference_saturated():
+            if should_stop and should_stop():
+                break
+            if time.time() - start >= self.admission_max_wait:
+                logger.debug("推理池持续饱和，准入等待超时，放行新循环")
+                break
+            await asyncio.sleep(0.02)
+
+        delay = time.time() - start
+        try:
+            get_metrics_collector().record_admission_delay(delay)
+        except Exception as e:
+            logger.debug(f"上报准入延迟指标失败: {e}")
+        return delay
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取所有线程池统计信息"""
+        return {
+            'pools': {name: pool.get_stats() for name, pool in self._pools.items()},
+            'admission': {
+                'queue_depth': self.admission_queue_depth,
+                'max_wait': self.admission_max_wait,
+                'inference_saturated': self.is_inference_saturated()
+            }
+        }
+
+    def shutdown(self) -> None:
+        """关闭所有线程池（管理器保持可用，之后的提交按需重新创建线程池）"""
+        for pool in self._pools.values():
+            pool.shutdown()
+        logger.info("节点执行线程池已关闭")
+
+
+def get_executor_pools() -> ExecutorPoolManager:
+    """获取节点执行线程池管理器单例"""
+    return ExecutorPoolManager()
@@ -0,0 +1,569 @@
+"""条件表达式引擎
+
+条件节点（condition_type=expression）使用的小型表达式语言。表达式编译一次
+（按源码缓存），得到由闭包组成的求值函数，每次求值不再解析或调用 eval。
+
+语法:
+    字面量      1  2.5  'text'  "text"  true  false  null
+    名称        ocr（OCR 结果）  det / detections（检测结果）  vars（变量）
+                flags  counters  loop（循环次数）  found（OCR 目标是否找到）
+    变量        ${name}（等同于 vars['name']）
+    成员 / 下标  vars.retry  ocr[0].text  vars['重试次数']
+    运算        + - * / %   == != < <= > >=   in   not in
+    逻辑        and / &&   or / ||   not / !
+    函数调用    count(ocr, '确认') > 0 and vars.retry < 3
+
+内置函数:
+    count(items, [pattern], [mode])   匹配的结果数量（OCR 按文本、检测按标签匹配，
+                                      mode: contains / exact / regex，默认 contains）
+    exists(items, [pattern], [mode])  是否存在匹配的结果
+    conf(items, [pattern], [mode])    匹配结果的最高置信度（没有时为 0）
+    text(items)                       OCR 文本按顺序拼接（空格分隔）
+    var(name, [default])              读取变量
+    len(x)  num(x, [default])  int(x)  float(x)  str(x)  abs(x)  min(...)  max(...)
+    round(x, [n])  contains(s, sub)  matches(s, regex)
+
+比较时数字与数字字符串按数字比较；类型不兼容的比较结果为 false。
++ 两侧都是数字或数字字符串时按数字相加（变量节点设置的值为字符串，${retry} + 1
+在 retry 为 '2' 时得到 3），否则有一侧为字符串时拼接（null 视为空字符串）；
+其余算术运算的操作数不是数字时结果为 null，除数为 0 时结果为 null。
+"""
+import math
+import operator
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class ExpressionError(ValueError):
+    """表达式语法错误"""
+
+    def __init__(self, message: str, source: str = "", position: Optional[int] = None):
+        if position is not None:
+            message = f"{message}（位置 {position}）"
+        super().__init__(message)
+        self.source = source
+        self.position = position
+
+
+# 求值函数：接收流程上下文，返回值
+Evaluator = Callable[[Any], Any]
+
+
+# ============ 词法分析 ============
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<number>\d+\.\d*|\.\d+|\d+)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<placeholder>\$\{[^}]*\})
+  | (?P<name>[A-Za-z_一-鿿][A-Za-z0-9_一-鿿]*)
+  | (?P<op>==|!=|<=|>=|&&|\|\||[-+*/%<>!().,\[\]])
+""", re.VERBOSE)
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', "'": "'", '"': '"'}
+
+# 关键字形式的运算符
+_KEYWORD_OPS = {'and': '&&', 'or': '||', 'not': '!', 'in': 'in'}
+
+
+def _unescape(body: str) -> str:
+    return re.sub(r'\\(.)', lambda m: _ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+def _tokenize(source: str) -> List[Tuple[str, Any, int]]:
+    """切分为 (类型, 值, 位置) 列表，类型: number / string / var / name / op / end"""
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        match = _TOKEN_RE.match(source, pos)
+        if match is None:
+            raise ExpressionError(f"无法识别的字符 '{source[pos]}'", source, pos)
+        kind, text = match.lastgroup, match.group()
+        if kind == 'number':
+            tokens.append(('number', float(text) if '.' in text else int(text), pos))
+        elif kind == 'string':
+            tokens.append(('string', _unescape(text[1:-1]), pos))
+        elif kind == 'placeholder':
+            tokens.append(('var', text[2:-1].strip(), pos))
+        elif kind == 'name':
+            if text in _KEYWORD_OPS:
+                tokens.append(('op', _KEYWORD_OPS[text], pos))
+            else:
+                tokens.append(('name', text, pos))
+        elif kind == 'op':
+            tokens.append(('op', text, pos))
+        pos = match.end()
+    tokens.append(('end', None, len(source)))
+    return tokens
+
+
+# ============ 运行时辅助 ============
+
+def _to_number(value: Any) -> Optional[float]:
+    """转换为数字（布尔值、数字、数字字符串），失败返回 None"""
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+        # 'nan' / 'inf' 等按文本处理
+        return number if math.isfinite(number) else None
+    return None
+
+
+def _coerce(left: Any, right: Any) -> Tuple[Any, Any]:
+    """数字与数字字符串比较时统一转换为数字"""
+    if isinstance(left, str) != isinstance(right, str):
+        left_num, right_num = _to_number(left), _to_number(right)
+        if left_num is not None and right_num is not None:
+            return left_num, right_num
+    return left, right
+
+
+def _make_compare(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def compare(left: Any, right: Any) -> bool:
+        left, right = _coerce(left, right)
+        try:
+            return bool(op(left, right))
+        except TypeError:
+            return False
+    return compare
+
+
+def _contains(container: Any, item: Any) -> bool:
+    try:
+        if isinstance(container, str):
+            return str(item) in container
+        return item in container
+    except TypeError:
+        return False
+
+
+_BINARY_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    '==': _make_compare(operator.eq),
+    '!=': _make_compare(operator.ne),
+    '<': _make_compare(operator.lt),
+    '<=': _make_compare(operator.le),
+    '>': _make_compare(operator.gt),
+    '>=': _make_compare(operator.ge),
+    'in': lambda left, right: _contains(right, left),
+    'not in': lambda left, right: not _contains(right, left),
+}
+
+
+def _arith(op: Callable[[Any, Any], Any], name: str) -> Callable[[Any, Any], Any]:
+    def apply(left: Any, right: Any) -> Any:
+        left_num, right_num = _to_number(left), _to_number(right)
+        if left_num is None or right_num is None:
+            # + 只在有一侧不是数字时拼接字符串（与比较一致，数字字符串按数字处理）
+            if name == '+' and (isinstance(left, str) or isinstance(right, str)):
+                return f"{'' if left is None else left}{'' if right is None else right}"
+            return None
+        try:
+            return op(left_num, right_num)
+        except ZeroDivisionError:
+            return None
+    return apply
+
+
+for _name, _op in (('+', operator.add), ('-', operator.sub), ('*', operator.mul),
+                   ('/', operator.truediv), ('%', operator.mod)):
+    _BINARY_OPS[_name] = _arith(_op, _name)
+
+
+@lru_cache(maxsize=256)
+def _compile_regex(pattern: str) -> Optional['re.Pattern']:
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+
+def _item_key(item: Any) -> str:
+    """结果项的匹配文本：OCR 为文本，检测为标签"""
+    if isinstance(item, dict):
+        value = item.get('text')
+        if value is None:
+            value = item.get('label', '')
+        return str(value)
+    return str(item)
+
+
+def _item_matches(item: Any, pattern: Any, mode: str) -> bool:
+    key = _item_key(item)
+    pattern = str(pattern)
+    is_label = isinstance(item, dict) and 'text' not in item
+    if mode == 'exact' or (is_label and mode == 'contains'):
+        return key == pattern
+    if mode == 'regex':
+        regex = _compile_regex(pattern)
+        return bool(regex and regex.search(key))
+    return pattern in key
+
+
+def _matched_items(items: Any, pattern: Any = None, mode: str = 'contains') -> List[Any]:
+    if not items or not isinstance(items, (list, tuple)):
+        return []
+    if pattern is None or pattern == '':
+        return list(items)
+    return [item for item in items if _item_matches(item, pattern, mode)]
+
+
+def _fn_count(items: Any, pattern: Any = None, mode: str = 'contains') -> int:
+    return len(_matched_items(items, pattern, mode))
+
+
+def _fn_exists(items: Any, pattern: Any = None, mode: str = 'contains') -> bool:
+    if not items or not isinstance(items, (list, tuple)):
+        return False
+    if pattern is None or pattern == '':
+        return True
+    return any(_item_matches(item, pattern, mode) for item in items)
+
+
+def _fn_conf(items: Any, pattern: Any = None, mode: str = 'contains') -> float:
+    best = 0.0
+    for item in _matched_items(items, pattern, mode):
+        if isinstance(item, dict):
+            value = _to_number(item.get('confidence'))
+            if value is not None and value > best:
+                best = value
+    return best
+
+
+def _fn_text(items: Any) -> str:
+    if not items or not isinstance(items, (list, tuple)):
+        return ''
+    return ' '.join(_item_key(item) for item in items)
+
+
+def _fn_len(value: Any) -> int:
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+
+
+def _fn_num(value: Any, default: Any = 0) -> Any:
+    number = _to_number(value)
+    return default if number is None else number
+
+
+def _fn_int(value: Any) -> Optional[int]:
+    number = _to_number(value)
+    return None if number is None or math.isnan(number) else int(number)
+
+
+def _fn_matches(value: Any, pattern: Any) -> bool:
+    regex = _compile_regex(str(pattern))
+    return bool(regex and regex.search('' if value is None else str(value)))
+
+
+def _numeric_args(args: Tuple[Any, ...]) -> List[float]:
+    if len(args) == 1 and isinstance(args[0], (list, tuple)):
+        args = tuple(args[0])
+    return [n for n in (_to_number(a) for a in args) if n is not None]
+
+
+# 内置函数: 名称 -> (函数, 最少参数, 最多参数)；var 在编译时单独处理
+_FUNCTIONS: Dict[str, Tuple[Callable[..., Any], int, int]] = {
+    'count': (_fn_count, 1, 3),
+    'exists': (_fn_exists, 1, 3),
+    'conf': (_fn_conf, 1, 3),
+    'text': (_fn_text, 1, 1),
+    'len': (_fn_len, 1, 1),
+    'num': (_fn_num, 1, 2),
+    'int': (_fn_int, 1, 1),
+    'float': (lambda value: _to_number(value), 1, 1),
+    'str': (lambda value: '' if value is None else str(value), 1, 1),
+    'abs': (lambda value: abs(_fn_num(value)), 1, 1),
+    'min': (lambda *args: min(_numeric_args(args), default=None), 1, 16),
+    'max': (lambda *args: max(_numeric_args(args), default=None), 1, 16),
+    'round': (lambda value, n=0: round(_fn_num(value), int(_fn_num(n))), 1, 2),
+    'contains': (lambda value, sub: _contains('' if value is None else str(value), sub), 2, 2),
+    'matches': (_fn_matches, 2, 2),
+}
+
+# 名称 -> (上下文字段, 缺省值)
+_NAMES: Dict[str, Tuple[str, Any]] = {
+    'ocr': ('ocr_results', []),
+    'det': ('detection_results', []),
+    'detections': ('detection_results', []),
+    'vars': ('variables', {}),
+    'flags': ('flags', {}),
+    'counters': ('counters', {}),
+    'loop': ('loop_count', 0),
+    'found': ('ocr_target_found', False),
+}
+
+_CONSTANTS = {'true': True, 'false': False, 'null': None, 'True': True, 'False': False, 'None': None}
+
+
+def _get_member(value: Any, key: Any) -> Any:
+    """成员 / 下标访问（只支持字典和序列，不访问对象属性）"""
+    if isinstance(value, dict):
+        return value.get(key)
+    if isinstance(value, (list, tuple, str)):
+        index = _to_number(key)
+        if index is None or int(index) != index:
+            return None
+        index = int(index)
+        return value[index] if -len(value) <= index < len(value) else None
+    return None
+
+
+# ============ 语法分析（Pratt）============
+
+# 中缀运算符绑定强度
+_BINDING_POWER = {
+    '||': 10,
+    '&&': 20,
+    '==': 40, '!=': 40, '<': 40, '<=': 40, '>': 40, '>=': 40, 'in': 40, 'not in': 40,
+    '+': 50, '-': 50,
+    '*': 60, '/': 60, '%': 60,
+    '.': 80, '[': 80, '(': 80,
+}
+_PREFIX_NOT_POWER = 30
+_PREFIX_NEG_POWER = 70
+
+
+class _Const:
+    """常量求值函数（便于常量折叠）"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __call__(self, ctx: Any) -> Any:
+        return self.value
+
+
+class _Parser:
+    def __init__(self, source: str):
+        self.source = source
+        self.tokens = _tokenize(source)
+        self.index = 0
+        self.fields: Set[str] = set()
+
+    def _peek(self) -> Tuple[str, Any, int]:
+        return self.tokens[self.index]
+
+    def _next(self) -> Tuple[str, Any, int]:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def _expect(self, value: str) -> None:
+        kind, token_value, pos = self._next()
+        if kind != 'op' or token_value != value:
+            found = '结尾' if kind == 'end' else f"'{self.source[pos:pos + 8]}'"
+            raise ExpressionError(f"缺少 '{value}'，遇到 {found}", self.source, pos)
+
+    def _infix_op(self) -> Optional[str]:
+        """当前位置的中缀运算符（处理 not in）"""
+        kind, value, _ = self._peek()
+        if kind != 'op':
+            return None
+        if value == '!':
+            next_kind, next_value, _ = self.tokens[self.index + 1]
+            return 'not in' if next_kind == 'op' and next_value == 'in' else None
+        return value if value in _BINDING_POWER else None
+
+    def parse(self) -> Evaluator:
+        evaluator = self.expression(0)
+        kind, _, pos = self._peek()
+        if kind != 'end':
+            raise ExpressionError(f"多余的内容 '{self.source[pos:pos + 8]}'", self.source, pos)
+        return evaluator
+
+    def expression(self, min_power: int) -> Evaluator:
+        left = self.prefix()
+        while True:
+            op = self._infix_op()
+            if op is None or _BINDING_POWER[op] <= min_power:
+                return left
+            self._next()
+            if op == 'not in':
+                self._next()
+            left = self.infix(op, left)
+
+    def prefix(self) -> Evaluator:
+        kind, value, pos = self._next()
+        if kind in ('number', 'string'):
+            return _Const(value)
+        if kind == 'var':
+            self.fields.add('variables')
+            return lambda ctx, _name=value: (getattr(ctx, 'variables', None) or {}).get(_name)
+        if kind == 'name':
+            return self.name(value, pos)
+        if kind == 'op':
+            if value == '(':
+                inner = self.expression(0)
+                self._expect(')')
+                return inner
+            if value == '!':
+                operand = self.expression(_PREFIX_NOT_POWER)
+                if isinstance(operand, _Const):
+                    return _Const(not operand.value)
+                return lambda ctx: not operand(ctx)
+            if value in ('-', '+'):
+                operand = self.expression(_PREFIX_NEG_POWER)
+                sign = -1 if value == '-' else 1
+                if isinstance(operand, _Const):
+                    number = _to_number(operand.value)
+                    return _Const(None if number is None else sign * number)
+
+                def negate(ctx: Any) -> Any:
+                    number = _to_number(operand(ctx))
+                    return None if number is None else sign * number
+                return negate
+        found = '结尾' if kind == 'end' else f"'{self.source[pos:pos + 8]}'"
+        raise ExpressionError(f"意外的 {found}", self.source, pos)
+
+    def name(self, name: str, pos: int) -> Evaluator:
+        if name in _CONSTANTS:
+            return _Const(_CONSTANTS[name])
+        kind, value, _ = self._peek()
+        if kind == 'op' and value == '(':
+            self._next()
+            return self.call(name, pos)
+        if name in _NAMES:
+            field_name, default = _NAMES[name]
+            self.fields.add(field_name)
+
+            def read(ctx: Any) -> Any:
+                value = getattr(ctx, field_name, default)
+                return default if value is None else value
+            return read
+        raise ExpressionError(f"未知的名称 '{name}'（变量请使用 vars.{name} 或 ${{{name}}}）",
+                              self.source, pos)
+
+    def call(self, name: str, pos: int) -> Evaluator:
+        args: List[Evaluator] = []
+        kind, value, _ = self._peek()
+        if not (kind == 'op' and value == ')'):
+            while True:
+                args.append(self.expression(0))
+                kind, value, _ = self._peek()
+                if kind == 'op' and value == ',':
+                    self._next()
+                    continue
+                break
+        self._expect(')')
+
+        if name == 'var':
+            if not 1 <= len(args) <= 2:
+                raise ExpressionError("var() 需要 1 到 2 个参数", self.source, pos)
+            self.fields.add('variables')
+            key = args[0]
+            default = args[1] if len(args) > 1 else _Const(None)
+
+            def read_var(ctx: Any) -> Any:
+                value = (getattr(ctx, 'variables', None) or {}).get(key(ctx))
+                return default(ctx) if value is None else value
+            return read_var
+
+        if name not in _FUNCTIONS:
+            raise ExpressionError(f"未知的函数 '{name}'", self.source, pos)
+        func, min_args, max_args = _FUNCTIONS[name]
+        if not min_args <= len(args) <= max_args:
+            raise ExpressionError(f"{name}() 需要 {min_args} 到 {max_args} 个参数，实际 {len(args)} 个",
+                                  self.source, pos)
+
+        if len(args) == 1:
+            arg = args[0]
+            return lambda ctx: func(arg(ctx))
+        if len(args) == 2:
+            first, second = args
+            return lambda ctx: func(first(ctx), second(ctx))
+        return lambda ctx: func(*[arg(ctx) for arg in args])
+
+    def infix(self, op: str, left: Evaluator) -> Evaluator:
+        if op == '.':
+            kind, key, pos = self._next()
+            if kind != 'name':
+                raise ExpressionError("'.' 后需要成员名", self.source, pos)
+            if key.startswith('_'):
+                raise ExpressionError(f"不允许访问成员 '{key}'", self.source, pos)
+            return lambda ctx: _get_member(left(ctx), key)
+        if op == '[':
+            index = self.expression(0)
+            self._expect(']')
+            return lambda ctx: _get_member(left(ctx), index(ctx))
+        if op == '(':
+            _, _, pos = self.tokens[self.index - 1]
+            raise ExpressionError("只能调用内置函数", self.source, pos)
+
+        right = self.expression(_BINDING_POWER[op])
+        if op == '&&':
+            return lambda ctx: left(ctx) and right(ctx)
+        if op == '||':
+            return lambda ctx: left(ctx) or right(ctx)
+
+        func = _BINARY_OPS[op]
+        if isinstance(left, _Const) and isinstance(right, _Const):
+            return _Const(func(left.value, right.value))
+        if isinstance(right, _Const):
+            right_value = right.value
+            return lambda ctx: func(left(ctx), right_value)
+        return lambda ctx: func(left(ctx), right(ctx))
+
+
+# ============ 对外接口 ============
+
+class Expression:
+    """编译后的表达式"""
+
+    __slots__ = ('source', 'fields', '_evaluator')
+
+    def __init__(self, source: str, evaluator: Evaluator, fields: Set[str]):
+        self.source = source
+        # 表达式读取的上下文字段（供流程图编译器做活跃性分析）
+        self.fields = frozenset(fields)
+        self._evaluator = evaluator
+
+    def evaluate(self, context: Any) -> Any:
+        """求值，返回表达式的值"""
+        return self._evaluator(context)
+
+    def test(self, context: Any) -> bool:
+        """求值并转换为布尔值（条件节点使用）"""
+        return bool(self._evaluator(context))
+
+    def __repr__(self) -> str:
+        return f"Expression({self.source!r})"
+
+
+@lru_cache(maxsize=512)
+def compile_expression(source: str) -> Expression:
+    """编译表达式（按源码缓存，同一表达式只解析一次）
+
+    Raises:
+        ExpressionError: 语法错误、未知名称或函数
+    """
+    source = source.strip()
+    if not source:
+        raise ExpressionError("表达式为空", source)
+    parser = _Parser(source)
+    evaluator = parser.parse()
+    return Expression(source, evaluator, parser.fields)
+
+
+def validate_expression(source: str) -> Optional[str]:
+    """检查表达式语法，返回错误信息（无错误返回 None）"""
+    try:
+        compile_expression(source)
+    except ExpressionError as e:
+        return str(e)
+    return None
@@ -4,19 +4,26 @@
 流程启动时初始化模型（YOLO/OCR），执行时复用。
 节点执行失败时流程自动停止并记录错误信息。
 支持 SSE 实时消息推送。
+runner.mode 为 process 时，流程分配到多个工作进程执行（见 engine.flow_worker）。
 """
 import asyncio
 import threading
 import time
-from typing import Dict, Any, Optional, List
+import uuid
+from collections import deque
+from typing import Deque, Dict, Any, Optional, List, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from loguru import logger
 
 from engine.context import ExecutionContext
+from engine.executor_pool import get_executor_pools, POOL_IO
+from monitoring.metrics import get_metrics_collector
+from monitoring.tracer import get_tracer, span
+from monitoring.history_store import get_history_store
 from api.sse_service import (
-    send_flow_start, send_flow_stop, send_flow_error,
+    send_flow_start, send_flow_stop, send_flow_error, send_flow_status,
     send_loop_start, send_loop_complete,
     send_node_start, send_node_complete, send_node_error,
     send_debug
@@ -26,6 +33,7 @@ from api.sse_service import (
 class FlowStatus(str, Enum):
     """流程状态"""
     STOPPED = "stopped"
+    WARMING = "warming"
     RUNNING = "running"
     PAUSED = "paused"
     ERROR = "error"
@@ -40,6 +48,8 @@ class FlowRunContext(ExecutionContext):
     # 流程信息
     flow_id: str = ""
     flow_name: str = ""
+    # 本次运行的标识（停止后立即重启时，新旧两次运行的模型引用和统计互不影响）
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
     
     # 运行控制
     stop_requested: bool = False
@@ -54,6 +64,7 @@ class FlowRunContext(ExecutionContext):
     
     # 统计信息
     loop_count: int = 0
+    degraded_loop_count: int = 0
     total_node_executions: int = 0
     last_loop_time: float = 0.0
     start_time: float = 0.0
@@ -63,8 +74,14 @@ class FlowRunContext(ExecutionContext):
     current_node_label: Optional[str] = None
     current_node_type: Optional[str] = None
     
-    # 节点执行历史（保留最近的执行记录）
-    node_execution_log: List[Dict[str, Any]] = field(default_factory=list)
+    # 当前循环的追踪记录（未采样时为 None）
+    trace: Optional[Any] = None
+    
+    # 最近一次鼠标键盘输入结束的时间（time.monotonic）
+    last_input_time: float = 0.0
+    
+    # 节点执行历史（保留最近的执行记录，完整历史见 monitoring.history_store）
+    node_execution_log: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=50))
     
     # 错误信息
     last_error: Optional[str] = None
@@ -79,22 +96,39 @@ class FlowRunContext(ExecutionContext):
         """初始化父类"""
         super().__init__()
     
+    @property
+    def model_owner(self) -> str:
+        """模型注册表中的持有者标识（流程 ID + 运行标识）"""
+        return f"{self.flow_id}:{self.run_id}"
+    
     def log_node_execution(self, node_id: str, node_label: str, node_type: str, 
-                           success: bool, error: Optional[str] = None):
-        """记录节点执行"""
+                           success: bool, error: Optional[str] = None,
+                           start_ts: Optional[float] = None, duration_ms: float = 0.0,
+                           status: Optional[str] = None):
+        """记录节点执行
+        
+        Args:
+            status: 结果: ok / failed / timeout / skipped，默认按 success 推断
+        """
+        status = status or ('ok' if success else 'failed')
         log_entry = {
             'node_id': node_id,
             'node_label': node_label,
             'node_type': node_type,
             'success': success,
+            'status': status,
+            'duration_ms': round(duration_ms, 3),
             'error': error,
             'timestamp': datetime.now().isoformat()
         }
+        # 只保留最近 50 条
         self.node_execution_log.append(log_entry)
         
-        # 只保留最近 50 条
-        if len(self.node_execution_log) > 50:
-            self.node_execution_log.pop(0)
+        get_history_store().record_node(
+            self.flow_id, node_id, node_type, node_label,
+            start_ts if start_ts is not None else time.time(),
+            duration_ms, status, error
+        )
         
         if not success:
             self.last_error = error
@@ -116,6 +150,21 @@ class FlowRunState:
     loop_count: int = 0
     start_time: Optional[datetime] = None
     last_loop_time: Optional[datetime] = None
+    
+    # 热更新：待应用的新版本流程（在下一轮开始前切换）
+    pending_flow: Optional[Dict[str, Any]] = None
+    swap_count: int = 0
+    last_swap_ms: Optional[float] = None
+    last_swap_time: Optional[datetime] = None
+    
+    # 模型加载与预热耗时
+    warmup_ms: Optional[float] = None
+    
+    # 流程图编译（裁剪 / 融合）报告
+    optimization: Optional[Dict[str, Any]] = None
+    
+    # 流水线模式统计（顺序模式为 None）
+    pipeline: Optional[Dict[str, Any]] = None
 
 
 class FlowRunner:
@@ -150,7 +199,19 @@ class FlowRunner:
         self._loop_thread: Optional[threading.Thread] = None
         self._running = False
         
-        logger.info("流程运行管理器初始化完成")
+        # 多进程模式：流程委托给工作进程执行（工作进程内部始终使用线程模式）
+        self._workers = None
+        from utils.config import get_config_manager
+        from engine.flow_worker import FlowWorkerManager, is_worker_process
+        runner_config = get_config_manager().config.runner
+        if runner_config.mode == "process" and not is_worker_process():
+            self._workers = FlowWorkerManager(
+                workers=runner_config.workers,
+                status_interval=runner_config.status_interval,
+                command_timeout=runner_config.command_timeout
+            )
+        
+        logger.info(f"流程运行管理器初始化完成: mode={'process' if self._workers else 'thread'}")
     
     def _ensure_event_loop(self) -> None:
         """确保事件循环运行中"""
@@ -191,6 +252,9 @@ class FlowRunner:
         Returns:
             是否成功启动
         """
+        if self._workers:
+            return self._workers.start_flow(flow_data)
+        
         flow_id = flow_data.get('id')
         flow_name = flow_data.get('name', 'Unknown')
         
@@ -205,7 +269,7 @@ class FlowRunner:
             # 检查是否已在运行（修复竞态条件：检查和添加在同一个锁块中）
             if flow_id in self._flows:
                 state = self._flows[flow_id]
-                if state.status == FlowStatus.RUNNING:
+                if state.status in (FlowStatus.RUNNING, FlowStatus.WARMING):
                     logger.warning(f"流程已在运行中: {flow_name} ({flow_id})")
                     return False
                 # 如果流程已停止/错误，先清理旧状态
@@ -222,10 +286,11 @@ class FlowRunner:
                 start_time=time.time()
             )
             
+            # 模型加载和预热完成前处于 warming 状态
             state = FlowRunState(
                 flow_id=flow_id,
                 flow_name=flow_name,
-                status=FlowStatus.RUNNING,
+                status=FlowStatus.WARMING,
                 context=context,
                 start_time=datetime.now()
             )
@@ -248,13 +313,16 @@ class FlowRunner:
     
     def stop_flow(self, flow_id: str) -> bool:
         """停止流程"""
+        if self._workers:
+            return self._workers.stop_flow(flow_id)
+        
         with self._flows_lock:
             state = self._flows.get(flow_id)
             if not state:
                 logger.warning(f"流程不存在: {flow_id}")
                 return False
             
-            if state.status not in (FlowStatus.RUNNING, FlowStatus.PAUSED):
+            if state.status not in (FlowStatus.RUNNING, FlowStatus.PAUSED, FlowStatus.WARMING):
                 logger.warning(f"流程未在运行: {flow_id}")
                 return False
             
@@ -271,8 +339,36 @@ class FlowRunner:
         logger.info(f"流程已请求停止: {flow_id}")
         return True
     
+    def update_flow(self, flow_data: Dict[str, Any]) -> bool:
+        """热更新运行中的流程
+        
+        新版本在下一轮循环开始前切换，保留 KVM 连接和配置未变化的模型，
+        只加载新增或配置变化的模型。连续多次更新时只应用最新版本。
+        
+        Args:
+            flow_data: 新版本流程数据
+            
+        Returns:
+            是否已安排热更新（流程未在运行时返回 False）
+        """
+        if self._workers:
+            return self._workers.update_flow(flow_data)
+        
+        flow_id = flow_data.get('id')
+        with self._flows_lock:
+            state = self._flows.get(flow_id)
+            if not state or state.status not in (FlowStatus.RUNNING, FlowStatus.PAUSED, FlowStatus.WARMING):
+                return False
+            state.pending_flow = flow_data
+        
+        logger.info(f"流程热更新已安排，将在下一轮切换: {flow_data.get('name', 'Unknown')} ({flow_id})")
+        return True
+    
     def pause_flow(self, flow_id: str) -> bool:
         """暂停流程"""
+        if self._workers:
+            return self._workers.pause_flow(flow_id)
+        
         with self._flows_lock:
             state = self._flows.get(flow_id)
             if not state or state.status != FlowStatus.RUNNING:
@@ -287,6 +383,9 @@ class FlowRunner:
     
     def resume_flow(self, flow_id: str) -> bool:
         """恢复流程"""
+        if self._workers:
+            return self._workers.resume_flow(flow_id)
+        
         with self._flows_lock:
             state = self._flows.get(flow_id)
             if not state or state.status != FlowStatus.PAUSED:
@@ -301,6 +400,9 @@ class FlowRunner:
     
     def get_flow_status(self, flow_id: str) -> Optional[Dict[str, Any]]:
         """获取流程状态"""
+        if self._workers:
+            return self._workers.get_flow_status(flow_id)
+        
         with self._flows_lock:
             return self._get_flow_status_unlocked(flow_id)
     
@@ -318,10 +420,18 @@ class FlowRunner:
             'status': state.status.value,
             'loop_count': context.loop_count if context else 0,
             'total_node_executions': context.total_node_executions if context else 0,
+            'degraded_loop_count': context.degraded_loop_count if context else 0,
             'start_time': state.start_time.isoformat() if state.start_time else None,
             'last_loop_time': state.last_loop_time.isoformat() if state.last_loop_time else None,
             'error': state.error,
             'error_node': state.error_node,
+            'swap_count': state.swap_count,
+            'last_swap_ms': state.last_swap_ms,
+            'last_swap_time': state.last_swap_time.isoformat() if state.last_swap_time else None,
+            'swap_pending': state.pending_flow is not None,
+            'warmup_ms': state.warmup_ms,
+            'optimization': state.optimization,
+            'pipeline': state.pipeline,
         }
         
         # 添加当前节点信息
@@ -334,16 +444,19 @@ class FlowRunner:
             result['last_error'] = context.last_error
             result['last_error_node'] = context.last_error_node
             # 最近的节点执行记录
-            result['recent_executions'] = context.node_execution_log[-10:] if context.node_execution_log else []
+            result['recent_executions'] = list(context.node_execution_log)[-10:]
         
         return result
     
     def get_all_running_flows(self) -> List[Dict[str, Any]]:
         """获取所有运行中的流程"""
+        if self._workers:
+            return self._workers.get_all_running_flows()
+        
         result = []
         with self._flows_lock:
             for flow_id, state in self._flows.items():
-                if state.status == FlowStatus.RUNNING:
+                if state.status in (FlowStatus.RUNNING, FlowStatus.WARMING):
                     status = self._get_flow_status_unlocked(flow_id)
                     if status:
                         result.append(status)
@@ -351,6 +464,9 @@ class FlowRunner:
     
     def get_all_flows_status(self) -> List[Dict[str, Any]]:
         """获取所有流程状态"""
+        if self._workers:
+            return self._workers.get_all_flows_status()
+        
         result = []
         with self._flows_lock:
             for flow_id in self._flows:
@@ -361,26 +477,62 @@ class FlowRunner:
     
     async def _run_flow_loop(self, flow_data: Dict[str, Any], state: FlowRunState) -> None:
         """流程循环执行协程"""
-        from engine.graph_executor import AsyncGraphExecutor
-        
         flow_id = state.flow_id
         flow_name = state.flow_name
         context = state.context
+        executor = None
         
         logger.info(f"流程循环开始: {flow_name} ({flow_id})")
         
         try:
+            # 编译流程图：裁剪结果不会被读取的节点，融合裁剪
+            flow_data, state.optimization = self._compile_flow(flow_data, state)
+            
             # 提取 KVM 配置（如果有）
-            self._extract_kvm_config(flow_data, context)
+            kvm_config = self._extract_kvm_config(flow_data)
+            if kvm_config:
+                context.kvm_config = kvm_config
             
-            # 初始化模型（在第一次循环前）
-            await self._init_models(flow_data, context)
+            # 并行加载并预热模型（在第一次循环前，不阻塞事件循环）
+            send_flow_status(flow_id, FlowStatus.WARMING.value)
+            warmup_start = time.perf_counter()
+            models = await self._init_models(flow_data, context)
+            state.warmup_ms = round((time.perf_counter() - warmup_start) * 1000, 1)
+            
+            with self._flows_lock:
+                if state.status == FlowStatus.WARMING:
+                    state.status = FlowStatus.RUNNING
+            if not context.stop_requested:
+                logger.info(f"流程模型就绪: {flow_name} ({flow_id}), {len(models)} 个模型, "
+                            f"耗时 {state.warmup_ms:.0f}ms")
+                send_flow_status(flow_id, FlowStatus.RUNNING.value, {
+                    'warmup_ms': state.warmup_ms,
+                    'models': len(models)
+                })
             
             # 创建执行器
-            executor = AsyncGraphExecutor(context)
+            executor = self._create_executor(flow_data, context)
+            tracer = get_tracer()
             
             # 循环执行
             while not context.stop_requested:
+                # 准入控制：推理池饱和时延迟启动新一轮
+                await get_executor_pools().wait_for_admission(
+                    lambda: context.stop_requested
+                )
+                if context.stop_requested:
+                    break
+                
+                # 热更新：在循环边界切换到新版本
+                if state.pending_flow is not None:
+                    # 先关闭旧执行器，等待进行中的预取感知阶段结束，再切换 KVM 和模型
+                    await self._close_executor(executor)
+                    executor = None
+                    flow_data = await self._swap_flow(flow_data, state)
+                    flow_name = state.flow_name
+                    # 新版本可能切换了循环模式，重新创建执行器（切换失败时按旧版本创建）
+                    executor = self._create_executor(flow_data, context)
+                
                 loop_start = time.time()
                 context.loop_count += 1
                 
@@ -389,15 +541,25 @@ class FlowRunner:
                 # 发送循环开始 SSE 消息
                 send_loop_start(flow_id, context.loop_count)
                 
-                # 执行一轮
-                success, error_msg = await executor.execute_once_with_error(flow_data)
+                # 执行一轮（按采样率记录分段追踪）
+                context.trace = tracer.start_loop(flow_id, context.loop_count)
+                try:
+                    with span(f"loop #{context.loop_count}", "executor", flow_id=flow_id):
+                        success, error_msg = await executor.execute_once_with_error(flow_data)
+                finally:
+                    tracer.end_loop(context.trace)
+                    context.trace = None
                 
                 # 更新统计
+                state.pipeline = executor.get_stats() if hasattr(executor, 'get_stats') else None
                 context.last_loop_time = time.time()
                 state.last_loop_time = datetime.now()
                 state.loop_count = context.loop_count
                 
                 loop_duration = time.time() - loop_start
+                get_history_store().record_loop(
+                    flow_id, loop_start, loop_duration * 1000, success, executor.loop_degraded
+                )
                 
                 # 如果执行失败，停止流程
                 if not success:
@@ -412,8 +574,20 @@ class FlowRunner:
                     logger.error(f"流程 {flow_name} 执行失败: {error_info}")
                     break
                 
+                # 超时 / 跳过可选节点的循环标记为降级
+                loop_extra = None
+                if executor.loop_degraded:
+                    context.degraded_loop_count += 1
+                    get_metrics_collector().record_degraded_loop()
+                    loop_extra = {
+                        'degraded': True,
+                        'timeouts': executor.timeout_events
+                    }
+                    logger.warning(f"流程 {flow_name} 第 {context.loop_count} 轮降级: "
+                                   f"{len(executor.timeout_events)} 个节点超时或被跳过")
+                
                 # 发送循环完成 SSE 消息
-                send_loop_complete(flow_id, context.loop_count, loop_duration * 1000)
+                send_loop_complete(flow_id, context.loop_count, loop_duration * 1000, loop_extra)
                 
                 logger.debug(f"流程 {flow_name} 第 {context.loop_count} 轮完成, 耗时 {loop_duration:.2f}s")
                 
@@ -431,7 +605,8 @@ class FlowRunner:
             state.status = FlowStatus.ERROR
             state.error = str(e)
         finally:
-            # 清理资源
+            # 清理资源（先等待执行器中的节点线程退出，再释放 KVM 和模型）
+            await self._close_executor(executor)
             await self._cleanup_flow(context)
             
             with self._flows_lock:
@@ -439,72 +614,187 @@ class FlowRunner:
                     if self._flows[flow_id].status != FlowStatus.ERROR:
                         self._flows[flow_id].status = FlowStatus.STOPPED
     
-    def _extract_kvm_config(self, flow_data: Dict[str, Any], context: FlowRunContext) -> None:
-        """从流程中提取 KVM 配置"""
+    async def _swap_flow(self, flow_data: Dict[str, Any], state: FlowRunState) -> Dict[str, Any]:
+        """切换到待应用的新版本流程
+
+        调用前须已关闭旧执行器（等待进行中的节点线程退出），切换期间没有节点在运行。
+
+        - 先编译新版本并预加载其模型（注册表中已有的直接复用），任一模型加载失败
+          视为切换失败
+        - 准备完成后一次性提交：KVM 配置变化时释放旧连接（由数据源节点重新连接），
+          替换上下文配置和节点模型缓存，释放不再使用的模型
+        - 切换失败时释放本次新获取的模型引用，上下文和状态保持不变，继续运行旧版本
+        
+        Returns:
+            切换后使用的流程数据
+        """
+        from engine.model_registry import get_model_registry
+        
+        context = state.context
+        registry = get_model_registry()
+        with self._flows_lock:
+            new_flow, state.pending_flow = state.pending_flow, None
+        
+        swap_start = time.perf_counter()
+        old_models = registry.get_owned_models(context.model_owner)
+        try:
+            new_flow, optimization = self._compile_flow(new_flow, state)
+            new_kvm = self._extract_kvm_config(new_flow) or context.kvm_config
+            models = await self._init_models(new_flow, context, strict=True)
+        except Exception as e:
+            registry.release(context.model_owner, keep=old_models)
+            logger.exception(f"流程热更新失败，继续运行旧版本: {state.flow_name}: {e}")
+            send_debug(state.flow_id, f"❌ 热更新失败，继续运行旧版本: {e}")
+            return flow_data
+        
+        # 提交切换
+        old_kvm = context.kvm_config
+        old_key = old_kvm and (old_kvm['ip'], old_kvm['port'], old_kvm['channel'])
+        new_key = new_kvm and (new_kvm['ip'], new_kvm['port'], new_kvm['channel'])
+        if old_key != new_key and old_kvm and getattr(context, '_kvm_initialized', False):
+            try:
+                from kvm.kvm_manager import get_kvm_manager
+                get_kvm_manager().release(*old_key)
+                logger.info(f"流程热更新: KVM 配置已变化，释放旧连接 {old_key}")
+            except Exception as e:
+                logger.error(f"流程热更新: 释放旧 KVM 连接失败 {old_key}: {e}")
+            context._kvm_initialized = False
+        context.kvm_config = new_kvm
+        
+        # 节点按配置缓存模型实例，清空后从注册表重新获取（已预加载，直接命中）
+        context.yolo_detectors.clear()
+        context.ocr_engines.clear()
+        released = registry.release(context.model_owner, keep=models)
+        state.optimization = optimization
+        
+        swap_ms = (time.perf_counter() - swap_start) * 1000
+        state.flow_name = context.flow_name = new_flow.get('name', state.flow_name)
+        state.swap_count += 1
+        state.last_swap_ms = round(swap_ms, 2)
+        state.last_swap_time = datetime.now()
+        get_metrics_collector().record_flow_swap(swap_ms / 1000)
+        
+        logger.info(f"流程热更新完成: {state.flow_name} ({state.flow_id}), 耗时 {swap_ms:.1f}ms, "
+                    f"模型 {len(models)} 个, 释放 {released} 个")
+        send_debug(state.flow_id, f"🔄 流程已热更新（第 {state.swap_count} 次），耗时 {swap_ms:.1f}ms")
+        return new_flow
+    
+    @staticmethod
+    def _create_executor(flow_data: Dict[str, Any], context: FlowRunContext) -> Any:
+        """按循环模式创建执行器（流程 settings.loop_mode 优先，其次全局配置）"""
+        from engine.graph_executor import AsyncGraphExecutor
+        from engine.pipeline import PipelinedExecutor, LOOP_MODE_PIPELINED
+        from utils.config import get_config_manager
+        
+        settings = flow_data.get('settings') or {}
+        loop_mode = settings.get('loop_mode') or get_config_manager().config.runner.loop_mode
+        if loop_mode == LOOP_MODE_PIPELINED:
+            return PipelinedExecutor(context)
+        return AsyncGraphExecutor(context)
+    
+    @staticmethod
+    async def _close_executor(executor: Any) -> None:
+        """取消执行器中进行中的预取（流水线模式）并等待其结束"""
+        if executor is not None and hasattr(executor, 'close'):
+            await executor.close()
+    
+    def _compile_flow(self, flow_data: Dict[str, Any],
+                      state: FlowRunState) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """编译流程图
+        
+        Returns:
+            (实际执行的流程数据, 优化报告)
+        """
+        from engine.graph_compiler import compile_flow
+        
+        compiled = compile_flow(flow_data)
+        if compiled.changed:
+            pruned = ', '.join(p['label'] for p in compiled.pruned)
+            logger.info(f"流程图编译: {state.flow_name}, 节点 {compiled.original_node_count} -> "
+                        f"{len(compiled.flow.get('nodes', []))}, 裁剪 [{pruned}], "
+                        f"融合 {len(compiled.fused)} 处")
+            send_debug(state.flow_id, f"🧹 流程图优化: 裁剪 {len(compiled.pruned)} 个节点, "
+                                      f"融合 {len(compiled.fused)} 处")
+        return compiled.flow, compiled.get_report()
+    
+    @staticmethod
+    def _extract_kvm_config(flow_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """从流程中提取 KVM 配置，没有 KVM 数据源节点时返回 None"""
         nodes = flow_data.get('nodes', [])
         
         for node in nodes:
             if node.get('type') == 'kvm_source':
                 props = node.get('properties', {})
-                context.kvm_config = {
+                kvm_config = {
                     'ip': props.get('ip', ''),
                     'port': int(props.get('port', 5900)),
                     'channel': int(props.get('channel', 0)),
                     'username': props.get('username', 'admin'),
                     'password': props.get('password', 'admin')
                 }
-                logger.debug(f"提取 KVM 配置: {context.kvm_config['ip']}:{context.kvm_config['port']}")
-                break
+                logger.debug(f"提取 KVM 配置: {kvm_config['ip']}:{kvm_config['port']}")
+                return kvm_config
+        return None
     
-    async def _init_models(self, flow_data: Dict[str, Any], context: FlowRunContext) -> None:
-        """初始化模型（YOLO/OCR）"""
-        nodes = flow_data.get('nodes', [])
+    async def _init_models(self, flow_data: Dict[str, Any], context: FlowRunContext,
+                           strict: bool = False) -> List[Any]:
+        """并行预加载并预热模型（YOLO/OCR）
+
+        模型由全局模型注册表按模型标识共享，已加载的模型（包括其他流程
+        正在使用或刚停止的流程留下的空闲模型）直接复用。节点执行时从
+        注册表获取同一实例。加载在 IO 线程池中并发执行，不阻塞事件循环。
+
+        Args:
+            flow_data: 流程数据
+            context: 流程运行上下文
+            strict: 任一模型加载失败时抛出异常（热更新用），否则跳过失败的模型
+
+        Returns:
+            流程使用的模型实例
+
+        Raises:
+            RuntimeError: strict 模式下有模型加载失败
+        """
+        from engine.model_registry import acquire_yolo_detector, acquire_ocr_engine
         
-        for node in nodes:
-            node_type = node.get('type')
-            node_id = node.get('id')
-            props = node.get('properties', {})
-            
-            if node_type == 'yolo_detection':
-                try:
-                    from detection.yolo_detector import YOLODetector
-                    
-                    config_key = f"{node_id}_{props.get('model_path')}_{props.get('backend')}"
-                    
-                    if config_key not in context.yolo_detectors:
-                        detector = YOLODetector(
-                            model_path=props.get('model_path', 'models/yolov8n.bmodel'),
-                            conf_threshold=float(props.get('conf_threshold', 0.25)),
-                            iou_threshold=float(props.get('iou_threshold', 0.45)),
-                            backend=props.get('backend', 'auto'),
-                            dev_id=int(props.get('dev_id', 0))
-                        )
-                        context.yolo_detectors[config_key] = detector
-                        logger.info(f"YOLO 检测器已初始化: {config_key}")
-                except Exception as e:
-                    logger.warning(f"初始化 YOLO 检测器失败: {e}")
-            
-            elif node_type == 'ocr_recognition':
-                try:
-                    from ocr.ocr_engine import OCREngine
-                    
-                    config_key = f"{node_id}_{props.get('backend')}_{props.get('det_model')}"
-                    
-                    if config_key not in context.ocr_engines:
-                        engine = OCREngine(
-                            lang=props.get('lang', ['ch', 'en']),
-                            conf_threshold=float(props.get('conf_threshold', 0.6)),
-                            use_angle_cls=props.get('use_angle_cls', True),
-                            backend=props.get('backend', 'auto'),
-                            det_model=props.get('det_model'),
-                            rec_model=props.get('rec_model'),
-                            cls_model=props.get('cls_model') or None,
-                            dev_id=int(props.get('dev_id', 0))
-                        )
-                        context.ocr_engines[config_key] = engine
-                        logger.info(f"OCR 引擎已初始化: {config_key}")
-                except Exception as e:
-                    logger.warning(f"初始化 OCR 引擎失败: {e}")
+        loaders = {
+            'yolo_detection': acquire_yolo_detector,
+            'ocr_recognition': acquire_ocr_engine
+        }
+        
+        pool = get_executor_pools().get_pool(POOL_IO)
+        tasks = [
+            pool.run(self._load_model, context.model_owner, node.get('type'),
+                     loaders[node.get('type')], node.get('properties', {}))
+            for node in flow_data.get('nodes', [])
+            if node.get('type') in loaders
+        ]
+        if not tasks:
+            return []
+        
+        # 等待所有加载结束（包括失败的），调用方据此释放已获取的引用
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+        models = [model for model in results if model is not None]
+        if strict and len(models) < len(tasks):
+            raise RuntimeError(f"{len(tasks) - len(models)} 个模型加载失败")
+        return models
+    
+    @staticmethod
+    def _load_model(owner: str, node_type: str, loader: Any, props: Dict[str, Any]) -> Optional[Any]:
+        """加载并预热单个模型（在线程池中执行）"""
+        from engine.model_registry import get_model_registry
+        
+        try:
+            model = loader(owner, props)
+        except Exception as e:
+            logger.warning(f"初始化模型失败: {node_type}: {e}")
+            return None
+        
+        get_model_registry().warm_up(model)
+        return model
     
     async def _cleanup_flow(self, context: FlowRunContext) -> None:
         """清理流程资源"""
@@ -521,6 +811,14 @@ class FlowRunner:
             context.yolo_detectors.clear()
             context.ocr_engines.clear()
             
+            # 释放模型引用（空闲模型在预算内保持加载，供重启或其他流程复用）
+            from engine.model_registry import get_model_registry
+            get_model_registry().release(context.model_owner)
+            
+            # 清除本次运行的结果缓存命中率统计
+            from engine.result_cache import get_result_cache
+            get_result_cache().clear(context.flow_id, context.run_id)
+            
             logger.debug(f"流程资源已清理: {context.flow_id}")
             
         except Exception as e:
@@ -530,6 +828,11 @@ class FlowRunner:
         """关闭管理器，停止所有流程"""
         logger.info("正在关闭流程运行管理器...")
         
+        if self._workers:
+            self._workers.shutdown()
+            logger.info("流程运行管理器已关闭")
+            return
+        
         with self._flows_lock:
             for flow_id, state in self._flows.items():
                 if state.context:
@@ -544,9 +847,39 @@ class FlowRunner:
         if self._loop_thread and self._loop_thread.is_alive():
             self._loop_thread.join(timeout=3.0)
         
+        get_executor_pools().shutdown()
+        get_history_store().shutdown()
+        
         logger.info("流程运行管理器已关闭")
 
 
+    def get_flow_trace(self, flow_id: str) -> Dict[str, Any]:
+        """导出流程最近 N 轮的 Chrome trace-event JSON"""
+        if self._workers:
+            return self._workers.get_flow_trace(flow_id)
+        return get_tracer().export_chrome_trace(flow_id)
+    
+    def get_worker_stats(self) -> Dict[str, Any]:
+        """获取工作进程统计信息（线程模式下返回空列表）"""
+        if self._workers:
+            return self._workers.get_stats()
+        return {'mode': 'thread', 'num_workers': 0, 'workers': []}
+    
+    def get_model_stats(self) -> Dict[str, Any]:
+        """获取已加载模型信息（process 模式下按工作进程汇总）"""
+        if self._workers:
+            return self._workers.get_model_stats()
+        from engine.model_registry import get_model_registry
+        return {'mode': 'thread', **get_model_registry().get_stats()}
+    
+    def get_kvm_queue_stats(self) -> Dict[str, Any]:
+        """获取 KVM 输入仲裁队列统计（process 模式下按工作进程汇总）"""
+        if self._workers:
+            return self._workers.get_kvm_queue_stats()
+        from kvm.kvm_manager import get_kvm_manager
+        return {'mode': 'thread', 'queues': get_kvm_manager().get_action_queue_stats()}
+
+
 def get_flow_runner() -> FlowRunner:
     """获取流程运行管理器单例"""
     return FlowRunner()
@@ -0,0 +1,465 @@
+"""多进程流程工作器
+
+process 运行模式下，FlowRunner 将流程分配到多个工作进程执行，
+每个工作进程拥有独立的事件循环、KVM 连接和模型实例，绕开 GIL 限制。
+
+API 进程与工作进程之间通过队列通信：
+- 命令队列（每个工作进程一个）: 启动 / 停止 / 暂停 / 恢复 / 关闭
+- 事件队列（所有工作进程共享）: 命令响应、状态快照、SSE 消息
+"""
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+
+# 工作进程名称前缀（用于识别当前是否在工作进程中）
+WORKER_NAME_PREFIX = "FlowWorker-"
+
+# 允许通过 IPC 调用的 FlowRunner 方法
+_ALLOWED_METHODS = ('start_flow', 'stop_flow', 'pause_flow', 'resume_flow', 'get_flow_trace',
+                    'get_model_stats', 'get_kvm_queue_stats', 'update_flow')
+
+
+def is_worker_process() -> bool:
+    """当前是否运行在流程工作进程中"""
+    return mp.current_process().name.startswith(WORKER_NAME_PREFIX)
+
+
+def _worker_main(worker_id: int, src_path: str, command_queue, event_queue,
+                 status_interval: float) -> None:
+    """工作进程入口
+
+    在进程内以 thread 模式运行 FlowRunner，SSE 消息通过事件队列转发回 API 进程。
+    """
+    if src_path not in sys.path:
+        sys.path.insert(0, src_path)
+
+    from api.sse_service import get_sse_manager
+    from engine.flow_runner import get_flow_runner
+
+    get_sse_manager().set_sink(lambda message: event_queue.put(('sse', worker_id, message)))
+    runner = get_flow_runner()
+
+    logger.info(f"流程工作进程已启动: worker={worker_id}, pid={os.getpid()}")
+
+    last_status_time = 0.0
+    while True:
+        try:
+            command = command_queue.get(timeout=status_interval)
+        except queue.Empty:
+            command = None
+        except (EOFError, OSError):
+            break
+
+        if command is not None:
+            request_id, method, args = command
+
+            if method == 'shutdown':
+                runner.shutdown()
+                event_queue.put(('reply', worker_id, request_id, True))
+                break
+
+            try:
+                if method not in _ALLOWED_METHODS:
+                    raise ValueError(f"不支持的命令: {method}")
+                result = getattr(runner, method)(*args)
+            except Exception as e:
+                logger.error(f"工作进程执行命令失败: {method}: {e}")
+                result = False
+
+            # 先上报状态再响应，保证调用方拿到响应时状态快照已更新
+            event_queue.put(('status', worker_id, runner.get_all_flows_status()))
+            last_status_time = time.time()
+            event_queue.put(('reply', worker_id, request_id, result))
+            continue
+
+        if time.time() - last_status_time >= status_interval:
+            event_queue.put(('status', worker_id, runner.get_all_flows_status()))
+            last_status_time = time.time()
+
+    logger.info(f"流程工作进程已退出: worker={worker_id}")
+
+
+class FlowWorkerHandle:
+    """工作进程句柄（API 进程侧）"""
+
+    def __init__(self, worker_id: int, ctx, event_queue, status_interval: float):
+        self.worker_id = worker_id
+        self.command_queue = ctx.Queue()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(worker_id, str(Path(__file__).parent.parent), self.command_queue,
+                  event_queue, status_interval),
+            name=f"{WORKER_NAME_PREFIX}{worker_id}",
+            daemon=True
+        )
+        self.started_at = time.time()
+        self.process.start()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+
+class FlowWorkerManager:
+    """流程工作进程管理器
+
+    负责工作进程生命周期、流程到进程的分配、控制命令转发，
+    以及将工作进程上报的状态快照和 SSE 消息汇总到 API 进程。
+    """
+
+    def __init__(self, workers: int = 0, status_interval: float = 0.5,
+                 command_timeout: float = 10.0):
+        """初始化工作进程管理器
+
+        Args:
+            workers: 工作进程数，0 表示使用 CPU 核数
+            status_interval: 状态快照上报间隔（秒）
+            command_timeout: 控制命令响应超时（秒）
+        """
+        self.num_workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.status_interval = status_interval
+        self.command_timeout = command_timeout
+
+        self._ctx = mp.get_context('spawn')
+        self._event_queue = None
+        self._workers: Dict[int, FlowWorkerHandle] = {}
+        self._lock = threading.Lock()
+
+        # flow_id -> worker_id
+        self._assignments: Dict[str, int] = {}
+        # flow_id -> 使用的 KVM 标识
+        self._flow_kvm: Dict[str, Optional[str]] = {}
+        # flow_id -> 最近一次状态快照
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+
+        # 命令请求响应
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, Dict[str, Any]] = {}
+
+        self._relay_thread: Optional[threading.Thread] = None
+        self._running = False
+
+        logger.info(f"流程工作进程管理器初始化完成: workers={self.num_workers}")
+
+    def _ensure_started(self) -> None:
+        """按需启动工作进程和事件转发线程"""
+        failed = []
+        with self._lock:
+            if self._event_queue is None:
+                self._event_queue = self._ctx.Queue()
+
+            for worker_id in range(self.num_workers):
+                handle = self._workers.get(worker_id)
+                if handle is None or not handle.is_alive():
+                    if handle is not None:
+                        # 替换前先处理退出进程上的流程（转发线程可能尚未检查到）
+                        failed.extend(self._fail_worker_flows_unlocked(worker_id, handle))
+                    self._workers[worker_id] = FlowWorkerHandle(
+                        worker_id, self._ctx, self._event_queue, self.status_interval
+                    )
+
+            if not self._running:
+                self._running = True
+                self._relay_thread = threading.Thread(
+                    target=self._relay_loop,
+                    daemon=True,
+                    name="FlowWorker-Relay"
+                )
+                self._relay_thread.start()
+
+        self._notify_failed_flows(failed)
+
+    def _relay_loop(self) -> None:
+        """事件转发线程：处理工作进程上报的响应、状态和 SSE 消息"""
+        from api.sse_service import get_sse_manager
+        sse_manager = get_sse_manager()
+        last_health_check = time.time()
+
+        while self._running:
+            try:
+                event = self._event_queue.get(timeout=0.5)
+            except queue.Empty:
+                event = None
+            except (EOFError, OSError):
+                break
+
+            if event is not None:
+                kind, worker_id = event[0], event[1]
+                try:
+                    if kind == 'sse':
+                        sse_manager.broadcast_sync(event[2])
+                    elif kind == 'status':
+                        self._update_snapshots(worker_id, event[2])
+                    elif kind == 'reply':
+                        self._resolve_request(event[2], event[3])
+                except Exception as e:
+                    logger.error(f"处理工作进程事件失败: {kind}: {e}")
+
+            if time.time() - last_health_check >= 1.0:
+                self._check_workers()
+                last_health_check = time.time()
+
+    def _update_snapshots(self, worker_id: int, statuses: List[Dict[str, Any]]) -> None:
+        """更新工作进程上报的流程状态快照"""
+        with self._lock:
+            for status in statuses:
+                flow_id = status.get('flow_id')
+                if self._assignments.get(flow_id) != worker_id:
+                    continue
+                status['worker_id'] = worker_id
+                self._snapshots[flow_id] = status
+
+    def _resolve_request(self, request_id: int, result: Any) -> None:
+        """唤醒等待命令响应的调用方"""
+        with self._lock:
+            pending = self._pending.get(request_id)
+        if pending:
+            pending['result'] = result
+            pending['event'].set()
+
+    def _check_workers(self) -> None:
+        """检查工作进程存活，异常退出时将其流程标记为错误"""
+        failed = []
+        with self._lock:
+            for worker_id, handle in self._workers.items():
+                if not handle.is_alive():
+                    failed.extend(self._fail_worker_flows_unlocked(worker_id, handle))
+        self._notify_failed_flows(failed)
+
+    def _fail_worker_flows_unlocked(self, worker_id: int, handle: FlowWorkerHandle) -> List[Dict[str, Any]]:
+        """将已退出工作进程上的活动流程标记为错误（调用方持有 _lock）
+
+        流程状态此后不会再有该进程上报，不标记则会一直停留在退出前的状态。
+
+        Returns:
+            新标记为错误的流程状态快照
+        """
+        error = f"工作进程异常退出 (exitcode={handle.process.exitcode})"
+        failed = []
+        for flow_id, assigned in self._assignments.items():
+            if assigned != worker_id:
+                continue
+            snapshot = self._snapshots.get(flow_id)
+            if snapshot is None:
+                # 启动后尚未上报过状态
+                snapshot = {'flow_id': flow_id, 'flow_name': '', 'worker_id': worker_id}
+                self._snapshots[flow_id] = snapshot
+            elif snapshot.get('status') not in ('warming', 'running', 'paused'):
+                continue
+            snapshot['status'] = 'error'
+            snapshot['error'] = error
+            failed.append(dict(snapshot))
+            logger.error(f"工作进程 {worker_id} 异常退出，流程 {flow_id} 已标记为错误")
+        return failed
+
+    @staticmethod
+    def _notify_failed_flows(failed: List[Dict[str, Any]]) -> None:
+        """向 SSE 订阅者推送流程错误"""
+        if not failed:
+            return
+        from api.sse_service import send_flow_error
+        for snapshot in failed:
+            try:
+                send_flow_error(snapshot['flow_id'], snapshot.get('flow_name', ''), snapshot['error'])
+            except Exception as e:
+                logger.debug(f"推送流程错误失败: {e}")
+
+    def _call(self, worker_id: int, method: str, *args) -> Any:
+        """向工作进程发送命令并等待响应"""
+        request_id = next(self._request_ids)
+        pending = {'event': threading.Event(), 'result': None}
+
+        with self._lock:
+            handle = self._workers.get(worker_id)
+            if handle is None or not handle.is_alive():
+                logger.warning(f"工作进程不可用: worker={worker_id}")
+                return False
+            self._pending[request_id] = pending
+
+        try:
+            handle.command_queue.put((request_id, method, args))
+            if not pending['event'].wait(self.command_timeout):
+                logger.error(f"工作进程命令超时: worker={worker_id}, {method}")
+                return False
+            return pending['result']
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    @staticmethod
+    def _flow_kvm_key(flow_data: Dict[str, Any]) -> Optional[str]:
+        """流程使用的 KVM 标识（ip:port:channel）"""
+        for node in flow_data.get('nodes', []):
+            if node.get('type') == 'kvm_source':
+                props = node.get('properties', {})
+                return f"{props.get('ip', '')}:{int(props.get('port', 5900))}:{int(props.get('channel', 0))}"
+        return None
+
+    def _select_worker(self, flow_id: str, kvm_key: Optional[str] = None) -> int:
+        """选择工作进程
+
+        已分配过的流程优先回到原进程（复用 KVM 连接和模型）；
+        使用同一 KVM 的流程分配到同一进程，由进程内的输入仲裁队列排队；
+        否则选择活动流程最少的进程。
+        """
+        with self._lock:
+            if flow_id in self._assignments:
+                return self._assignments[flow_id]
+
+            if kvm_key is not None:
+                for fid, worker_id in self._assignments.items():
+                    if self._flow_kvm.get(fid) == kvm_key and worker_id in self._workers:
+                        return worker_id
+
+            load = {worker_id: 0 for worker_id in self._workers}
+            for fid, worker_id in self._assignments.items():
+                snapshot = self._snapshots.get(fid)
+                if snapshot and snapshot.get('status') in ('warming', 'running', 'paused'):
+                    load[worker_id] = load.get(worker_id, 0) + 1
+            return min(load, key=lambda w: (load[w], w))
+
+    def start_flow(self, flow_data: Dict[str, Any]) -> bool:
+        """在工作进程中启动流程"""
+        flow_id = flow_data.get('id')
+        if not flow_id:
+            logger.error("流程数据缺少 id")
+            return False
+
+        self._ensure_started()
+        kvm_key = self._flow_kvm_key(flow_data)
+        worker_id = self._select_worker(flow_id, kvm_key)
+
+        with self._lock:
+            self._assignments[flow_id] = worker_id
+            self._flow_kvm[flow_id] = kvm_key
+
+        result = self._call(worker_id, 'start_flow', flow_data)
+        if result:
+            logger.info(f"流程已分配到工作进程: {flow_data.get('name', 'Unknown')} ({flow_id}) -> worker {worker_id}")
+        return bool(result)
+
+    def update_flow(self, flow_data: Dict[str, Any]) -> bool:
+        """转发流程热更新到流程所在工作进程"""
+        with self._lock:
+            worker_id = self._assignments.get(flow_data.get('id'))
+        if worker_id is None:
+            return False
+        return bool(self._call(worker_id, 'update_flow', flow_data))
+
+    def _call_for_flow(self, flow_id: str, method: str) -> bool:
+        """向流程所在工作进程转发控制命令"""
+        with self._lock:
+            worker_id = self._assignments.get(flow_id)
+        if worker_id is None:
+            logger.warning(f"流程不存在: {flow_id}")
+            return False
+        return bool(self._call(worker_id, method, flow_id))
+
+    def stop_flow(self, flow_id: str) -> bool:
+        return self._call_for_flow(flow_id, 'stop_flow')
+
+    def pause_flow(self, flow_id: str) -> bool:
+        return self._call_for_flow(flow_id, 'pause_flow')
+
+    def resume_flow(self, flow_id: str) -> bool:
+        return self._call_for_flow(flow_id, 'resume_flow')
+
+    def get_flow_trace(self, flow_id: str) -> Dict[str, Any]:
+        """从流程所在工作进程获取追踪记录"""
+        with self._lock:
+            worker_id = self._assignments.get(flow_id)
+        result = self._call(worker_id, 'get_flow_trace', flow_id) if worker_id is not None else None
+        return result or {'traceEvents': [], 'displayTimeUnit': 'ms', 'otherData': {'flow_id': flow_id}}
+
+    def get_model_stats(self) -> Dict[str, Any]:
+        """获取各工作进程已加载的模型"""
+        with self._lock:
+            worker_ids = [wid for wid, handle in self._workers.items() if handle.is_alive()]
+        workers = []
+        for worker_id in worker_ids:
+            stats = self._call(worker_id, 'get_model_stats')
+            if stats:
+                workers.append({'worker_id': worker_id, **stats})
+        return {'mode': 'process', 'workers': workers}
+
+    def get_kvm_queue_stats(self) -> Dict[str, Any]:
+        """获取各工作进程的 KVM 输入仲裁队列统计"""
+        with self._lock:
+            worker_ids = [wid for wid, handle in self._workers.items() if handle.is_alive()]
+        workers = []
+        for worker_id in worker_ids:
+            stats = self._call(worker_id, 'get_kvm_queue_stats')
+            if stats:
+                workers.append({'worker_id': worker_id, 'queues': stats.get('queues', [])})
+        return {'mode': 'process', 'workers': workers}
+
+    def get_flow_status(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        """获取流程状态快照"""
+        with self._lock:
+            snapshot = self._snapshots.get(flow_id)
+            return dict(snapshot) if snapshot else None
+
+    def get_all_flows_status(self) -> List[Dict[str, Any]]:
+        """获取所有流程状态快照"""
+        with self._lock:
+            return [dict(s) for s in self._snapshots.values()]
+
+    def get_all_running_flows(self) -> List[Dict[str, Any]]:
+        """获取所有运行中流程的状态快照"""
+        return [s for s in self.get_all_flows_status() if s.get('status') in ('warming', 'running')]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取工作进程统计信息"""
+        with self._lock:
+            workers = []
+            for worker_id in range(self.num_workers):
+                handle = self._workers.get(worker_id)
+                flows = [fid for fid, wid in self._assignments.items() if wid == worker_id]
+                workers.append({
+                    'worker_id': worker_id,
+                    'pid': handle.process.pid if handle else None,
+                    'alive': handle.is_alive() if handle else False,
+                    'uptime': time.time() - handle.started_at if handle else 0.0,
+                    'flows': flows,
+                    'running_flows': sum(
+                        1 for fid in flows
+                        if self._snapshots.get(fid, {}).get('status') == 'running'
+                    )
+                })
+            return {
+                'mode': 'process',
+                'num_workers': self.num_workers,
+                'workers': workers
+            }
+
+    def shutdown(self) -> None:
+        """关闭所有工作进程"""
+        with self._lock:
+            workers = list(self._workers.values())
+
+        for handle in workers:
+            if handle.is_alive():
+                request_id = next(self._request_ids)
+                try:
+                    handle.command_queue.put((request_id, 'shutdown', ()))
+                except Exception:
+                    pass
+
+        for handle in workers:
+            handle.process.join(timeout=5.0)
+            if handle.is_alive():
+                logger.warning(f"工作进程未能正常退出，强制终止: worker={handle.worker_id}")
+                handle.process.terminate()
+
+        self._running = False
+        if self._relay_thread and self._relay_thread.is_alive():
+            self._relay_thread.join(timeout=2.0)
+
+        logger.info("流程工作进程已全部关闭")
@@ -0,0 +1,468 @@
+"""流程图编译器
+
+在流程执行前对流程图做静态优化，返回优化后的流程数据和优化报告：
+
+- 不可达节点：从起始节点无法到达（包括条件节点未标注 true/false 分支的连线之后）
+  的节点永远不会执行，直接移除
+- 活跃性分析：节点声明写入 / 读取的上下文字段（BaseNode.produces / consumes /
+  get_dataflow），从有副作用的节点（鼠标键盘、等待、变量）反向推导哪些字段会被
+  读取；写入的字段都不会被读取、且本身没有副作用的节点被裁剪，例如后面没有
+  检测条件或按检测位置点击的 YOLO 节点、未启用任何处理的预处理节点
+- 条件节点只在某个分支下游存在需要执行的节点时保留
+- 上下文在循环之间保留，流程起始处读取的字段视为可能由上一轮的任意节点写入
+- 融合：不缩放的预处理后紧跟裁剪时先裁剪再处理（只处理保留区域，边界像素的
+  滤波结果略有差异）；连续的两个裁剪合并为一次裁剪
+
+被裁剪节点的入边与出边直接相连，条件分支属性保留在入边上。
+未声明读写字段的节点按读取全部字段且有副作用处理，不会被裁剪。
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+from nodes import get_node_class
+
+
+# 未声明读取字段的节点视为读取全部字段
+ALL_FIELDS = '*'
+
+CONDITION_TYPE = 'condition'
+CROP_TYPE = 'image_crop'
+PREPROCESSING_TYPE = 'preprocessing'
+
+
+@dataclass
+class CompiledFlow:
+    """编译后的流程"""
+    # 优化后的流程数据（与原流程数据结构相同）
+    flow: Dict[str, Any]
+    # 被裁剪的节点
+    pruned: List[Dict[str, Any]] = field(default_factory=list)
+    # 融合 / 重排的节点
+    fused: List[Dict[str, Any]] = field(default_factory=list)
+    enabled: bool = True
+    original_node_count: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.pruned or self.fused)
+
+    def get_report(self) -> Dict[str, Any]:
+        """优化报告"""
+        return {
+            'enabled': self.enabled,
+            'original_nodes': self.original_node_count,
+            'compiled_nodes': len(self.flow.get('nodes', [])),
+            'pruned': self.pruned,
+            'fused': self.fused
+        }
+
+
+def _node_label(node: Dict[str, Any]) -> str:
+    label = node.get('label') or node.get('name') or node.get('type') or node.get('id')
+    return label if isinstance(label, str) else str(label)
+
+
+def _branch(edge: Dict[str, Any]) -> str:
+    return str((edge.get('properties') or {}).get('branch', '')).lower()
+
+
+class _Graph:
+    """可变的流程图（节点列表 + 连线列表）"""
+
+    def __init__(self, flow_data: Dict[str, Any]):
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        for node in flow_data.get('nodes', []):
+            self.nodes[node['id']] = dict(node)
+        self.edges: List[Dict[str, Any]] = [
+            dict(edge) for edge in flow_data.get('edges', [])
+            if edge.get('source') in self.nodes and edge.get('target') in self.nodes
+        ]
+
+    def out_edges(self, node_id: str) -> List[Dict[str, Any]]:
+        return [e for e in self.edges if e['source'] == node_id]
+
+    def in_edges(self, node_id: str) -> List[Dict[str, Any]]:
+        return [e for e in self.edges if e['target'] == node_id]
+
+    def successors(self, node_id: str) -> List[str]:
+        return [e['target'] for e in self.out_edges(node_id)]
+
+    def start_nodes(self) -> List[str]:
+        targets = {e['target'] for e in self.edges}
+        return [node_id for node_id in self.nodes if node_id not in targets]
+
+    def is_followed(self, edge: Dict[str, Any]) -> bool:
+        """执行时是否可能沿该连线继续（条件节点只走 true / false 分支）"""
+        source = self.nodes[edge['source']]
+        return source.get('type') != CONDITION_TYPE or _branch(edge) in ('true', 'false')
+
+    def topo_order(self) -> List[str]:
+        """拓扑顺序（存在环时剩余节点按原顺序追加）"""
+        in_degree = {node_id: 0 for node_id in self.nodes}
+        for edge in self.edges:
+            in_degree[edge['target']] += 1
+        queue = [node_id for node_id, degree in in_degree.items() if degree == 0]
+        order = []
+        while queue:
+            node_id = queue.pop(0)
+            order.append(node_id)
+            for target in self.successors(node_id):
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    queue.append(target)
+        order.extend(node_id for node_id in self.nodes if node_id not in order)
+        return order
+
+    def remove_node(self, node_id: str, rewire: bool = True) -> None:
+        """移除节点，rewire 时将入边直接连到各后继（保留入边的分支属性）"""
+        incoming = self.in_edges(node_id)
+        outgoing = self.out_edges(node_id)
+        self.edges = [e for e in self.edges if node_id not in (e['source'], e['target'])]
+        del self.nodes[node_id]
+
+        if not rewire:
+            return
+        for edge_in in incoming:
+            for edge_out in outgoing:
+                exists = any(
+                    e['source'] == edge_in['source'] and e['target'] == edge_out['target']
+                    and _branch(e) == _branch(edge_in)
+                    for e in self.edges
+                )
+                if exists or edge_in['source'] == edge_out['target']:
+                    continue
+                edge = dict(edge_in)
+                edge['id'] = f"{edge_in.get('id', edge_in['source'])}+{edge_out.get('id', edge_out['target'])}"
+                edge['target'] = edge_out['target']
+                self.edges.append(edge)
+
+    def to_flow(self, flow_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {**flow_data, 'nodes': list(self.nodes.values()), 'edges': self.edges}
+
+
+def _get_dataflow(node: Dict[str, Any]) -> Tuple[Optional[Set[str]], Set[str], bool]:
+    """节点的 (写入字段, 读取字段, 是否有副作用)
+
+    未知节点类型执行时直接跳过，写入为 None；未声明读写字段的节点
+    视为读取全部字段且有副作用。
+    """
+    node_class = get_node_class(node.get('type', ''))
+    if node_class is None:
+        return None, set(), False
+
+    properties = node.get('properties', {})
+    try:
+        produces, consumes = node_class.get_dataflow(properties)
+    except Exception as e:
+        logger.debug(f"获取节点读写字段失败: {node.get('id')}: {e}")
+        produces, consumes = None, None
+
+    if produces is None or consumes is None:
+        return set(produces or ()), {ALL_FIELDS}, True
+    return produces, consumes, bool(getattr(node_class, 'side_effects', False))
+
+
+def _prune_unreachable(graph: _Graph, compiled: CompiledFlow) -> None:
+    """移除从起始节点不可达的节点"""
+    reached: Set[str] = set()
+    queue = graph.start_nodes()
+    while queue:
+        node_id = queue.pop(0)
+        if node_id in reached:
+            continue
+        reached.add(node_id)
+        queue.extend(e['target'] for e in graph.out_edges(node_id) if graph.is_followed(e))
+
+    for node_id in [n for n in graph.nodes if n not in reached]:
+        node = graph.nodes[node_id]
+        compiled.pruned.append({
+            'node_id': node_id,
+            'label': _node_label(node),
+            'type': node.get('type'),
+            'reason': 'unreachable',
+            'detail': "从起始节点不可达，永远不会执行"
+        })
+        graph.remove_node(node_id, rewire=False)
+
+
+def _prune_dead(graph: _Graph, compiled: CompiledFlow) -> None:
+    """活跃性分析，移除输出不会被读取且没有副作用的节点"""
+    order = graph.topo_order()
+    succ = {node_id: graph.successors(node_id) for node_id in order}
+    starts = graph.start_nodes()
+    dataflow = {node_id: _get_dataflow(graph.nodes[node_id]) for node_id in order}
+
+    live = {node_id: False for node_id in order}
+    # 节点或其下游存在需要执行的节点（决定条件节点是否保留）
+    reaches_live = {node_id: False for node_id in order}
+    live_in: Dict[str, Set[str]] = {node_id: set() for node_id in order}
+
+    changed = True
+    while changed:
+        changed = False
+        # 上下文跨循环保留：流程起始处读取的字段在任意节点之后都可能被读取
+        entry = set().union(*(live_in[s] for s in starts)) if starts else set()
+
+        for node_id in reversed(order):
+            produces, consumes, side_effects = dataflow[node_id]
+            is_condition = graph.nodes[node_id].get('type') == CONDITION_TYPE
+            live_out = set(entry).union(*(live_in[t] for t in succ[node_id]))
+            downstream_live = any(reaches_live[t] for t in succ[node_id])
+
+            writes = produces or set()
+            node_live = (
+                side_effects
+                or bool(writes & live_out)
+                or (ALL_FIELDS in live_out and bool(writes))
+                or (is_condition and downstream_live)
+            )
+
+            if node_live:
+                # 条件节点只在部分情况下写入，不视为覆盖
+                killed = set() if is_condition else writes
+                new_in = (live_out - killed) | consumes
+            else:
+                new_in = live_out
+
+            if (node_live != live[node_id] or new_in != live_in[node_id]
+                    or reaches_live[node_id] != (node_live or downstream_live)):
+                live[node_id] = node_live
+                live_in[node_id] = new_in
+                reaches_live[node_id] = node_live or downstream_live
+                changed = True
+
+    for node_id in order:
+        if live[node_id]:
+            continue
+        node = graph.nodes[node_id]
+        produces = dataflow[node_id][0]
+        if produces is None:
+            reason, detail = 'unknown_type', f"未知的节点类型: {node.get('type')}"
+        elif not produces:
+            reason, detail = 'no_effect', "节点不写入任何上下文字段"
+        elif node.get('type') == CONDITION_TYPE:
+            reason, detail = 'unused_output', "条件的各分支下游没有需要执行的节点"
+        else:
+            reason = 'unused_output'
+            detail = f"输出字段 {', '.join(sorted(produces))} 未被后续节点读取"
+        compiled.pruned.append({
+            'node_id': node_id,
+            'label': _node_label(node),
+            'type': node.get('type'),
+            'reason': reason,
+            'detail': detail
+        })
+        graph.remove_node(node_id)
+
+
+def _single_chain(graph: _Graph, first_type: str, second_type: str) -> Optional[Tuple[str, str]]:
+    """查找 first -> second 的直连链（first 只有这一条出边，second 只有这一条入边）"""
+    for edge in graph.edges:
+        first, second = graph.nodes[edge['source']], graph.nodes[edge['target']]
+        if first.get('type') != first_type or second.get('type') != second_type:
+            continue
+        if len(graph.out_edges(first['id'])) == 1 and len(graph.in_edges(second['id'])) == 1:
+            return first['id'], second['id']
+    return None
+
+
+def _int_prop(properties: Dict[str, Any], key: str) -> Optional[int]:
+    try:
+        return int(properties.get(key, 0))
+    except (TypeError, ValueError):
+        return None
+
+
+def _merge_crop_axis(outer_pos: int, outer_len: int, inner_pos: int, inner_len: int) -> Optional[Tuple[int, int]]:
+    """合并一个方向上的两次裁剪，返回 (位置, 长度)；长度 0 表示到画面边缘"""
+    if outer_pos < 0 or inner_pos < 0:
+        return None
+    if outer_len <= 0:
+        return outer_pos + inner_pos, max(inner_len, 0)
+    if inner_pos >= outer_len:
+        return None
+    length = outer_len - inner_pos if inner_len <= 0 else min(inner_len, outer_len - inner_pos)
+    return outer_pos + inner_pos, length
+
+
+def _fuse_crop_pushdown(graph: _Graph, compiled: CompiledFlow) -> bool:
+    """不缩放的预处理后紧跟裁剪：调换为先裁剪再预处理"""
+    for edge in list(graph.edges):
+        pre, crop = graph.nodes[edge['source']], graph.nodes[edge['target']]
+        if pre.get('type') != PREPROCESSING_TYPE or crop.get('type') != CROP_TYPE:
+            continue
+        if pre.get('properties', {}).get('resize', False):
+            continue
+        if len(graph.out_edges(pre['id'])) != 1 or len(graph.in_edges(crop['id'])) != 1:
+            continue
+
+        pre_id, crop_id = pre['id'], crop['id']
+        for e in graph.edges:
+            if e is edge:
+                e['source'], e['target'] = crop_id, pre_id
+            elif e['target'] == pre_id:
+                e['target'] = crop_id
+            elif e['source'] == crop_id:
+                e['source'] = pre_id
+
+        compiled.fused.append({
+            'kind': 'crop_pushdown',
+            'nodes': [pre_id, crop_id],
+            'labels': [_node_label(pre), _node_label(crop)],
+            'detail': "先裁剪再预处理，只处理保留区域"
+        })
+        return True
+    return False
+
+
+def _fuse_crops(graph: _Graph, compiled: CompiledFlow) -> bool:
+    """连续两次裁剪合并为一次"""
+    chain = _single_chain(graph, CROP_TYPE, CROP_TYPE)
+    if chain is None:
+        return False
+
+    outer_id, inner_id = chain
+    outer, inner = graph.nodes[outer_id], graph.nodes[inner_id]
+    outer_props, inner_props = outer.get('properties', {}), inner.get('properties', {})
+
+    values = [_int_prop(p, k) for p in (outer_props, inner_props) for k in ('x', 'y', 'width', 'height')]
+    if None in values:
+        return False
+    ox, oy, ow, oh, ix, iy, iw, ih = values
+    merged_x = _merge_crop_axis(ox, ow, ix, iw)
+    merged_y = _merge_crop_axis(oy, oh, iy, ih)
+    if merged_x is None or merged_y is None:
+        return False
+
+    inner['properties'] = {
+        **inner_props,
+        'x': merged_x[0], 'width': merged_x[1],
+        'y': merged_y[0], 'height': merged_y[1],
+        'save_original': bool(outer_props.get('save_original', True) or inner_props.get('save_original', True))
+    }
+    graph.remove_node(outer_id)
+
+    compiled.fused.append({
+        'kind': 'crop_merge',
+        'nodes': [outer_id, inner_id],
+        'labels': [_node_label(outer), _node_label(inner)],
+        'result': inner_id,
+        'detail': f"合并为一次裁剪: ({merged_x[0]}, {merged_y[0]}) {merged_x[1]}x{merged_y[1]}"
+    })
+    return True
+
+
+def compile_flow(flow_data: Dict[str, Any], enabled: Optional[bool] = None) -> CompiledFlow:
+    """编译流程图
+
+    Args:
+        flow_data: 流程数据（包含 nodes 和 edges）
+        enabled: 是否优化，None 时按全局配置 executor.optimize_graph 和
+                 流程 settings.optimize 决定
+
+    Returns:
+        CompiledFlow，未启用或优化失败时 flow 为原流程数据
+    """
+    node_count = len(flow_data.get('nodes', []))
+
+    if enabled is None:
+        from utils.config import get_config_manager
+        settings = flow_data.get('settings') or {}
+        enabled = (get_config_manager().config.executor.optimize_graph
+                   and settings.get('optimize', True) is not False)
+    if not enabled or not node_count:
+        return CompiledFlow(flow=flow_data, enabled=bool(enabled), original_node_count=node_count)
+
+    compiled = CompiledFlow(flow=flow_data, original_node_count=node_count)
+    try:
+        graph = _Graph(flow_data)
+        _prune_unreachable(graph, compiled)
+        _prune_dead(graph, compiled)
+        while _fuse_crop_pushdown(graph, compiled):
+            pass
+        while _fuse_crops(graph, compiled):
+            pass
+    except Exception as e:
+        logger.exception(f"流程图编译失败，按原流程执行: {e}")
+        return CompiledFlow(flow=flow_data, enabled=False, original_node_count=node_count)
+
+    if compiled.changed:
+        compiled.flow = graph.to_flow(flow_data)
+    return compiled
+
+
+@dataclass
+class PipelineStages:
+    """流水线模式的阶段划分
+
+    感知阶段（数据源、裁剪、预处理、识别）只写入上下文字段、没有副作用，
+    可以提前为下一轮执行；动作阶段为其余节点（条件、动作、等待等）。
+    """
+    perception: Dict[str, Any]
+    action: Dict[str, Any]
+    # 感知阶段写入的上下文字段
+    fields: Set[str] = field(default_factory=set)
+
+
+def split_pipeline_stages(flow_data: Dict[str, Any]) -> Tuple[Optional[PipelineStages], str]:
+    """将流程划分为感知阶段和动作阶段
+
+    感知节点：非条件节点、已声明读写字段、无副作用，且所有前驱都是感知节点。
+
+    Returns:
+        (阶段划分, 无法划分的原因)
+    """
+    graph = _Graph(flow_data)
+    perception: List[str] = []
+    dataflow: Dict[str, Tuple[Optional[Set[str]], Set[str], bool]] = {}
+
+    for node_id in graph.topo_order():
+        node = graph.nodes[node_id]
+        produces, consumes, side_effects = dataflow[node_id] = _get_dataflow(node)
+        node_class = get_node_class(node.get('type', ''))
+        preds = [e['source'] for e in graph.in_edges(node_id)]
+        if (node_class is not None and produces is not None and ALL_FIELDS not in consumes
+                and not side_effects and node.get('type') != CONDITION_TYPE
+                and all(p in perception for p in preds)):
+            perception.append(node_id)
+
+    perception_set = set(perception)
+    action = [node_id for node_id in graph.nodes if node_id not in perception_set]
+    if not perception:
+        return None, "没有可提前执行的感知节点"
+    if not action:
+        return None, "没有动作节点"
+
+    fields: Set[str] = set()
+    perception_reads: Set[str] = set()
+    for node_id in perception:
+        fields |= dataflow[node_id][0] or set()
+        perception_reads |= dataflow[node_id][1]
+
+    action_writes: Set[str] = set()
+    for node_id in action:
+        produces, consumes, _ = dataflow[node_id]
+        if ALL_FIELDS in consumes:
+            return None, f"节点 [{_node_label(graph.nodes[node_id])}] 未声明读写字段"
+        action_writes |= produces or set()
+        sources = {e['source'] in perception_set for e in graph.in_edges(node_id)}
+        if len(sources) > 1:
+            return None, f"节点 [{_node_label(graph.nodes[node_id])}] 同时依赖感知和动作节点"
+
+    shared = perception_reads & action_writes
+    if shared:
+        return None, f"感知节点读取动作阶段写入的字段: {', '.join(sorted(shared))}"
+
+    def _subflow(node_ids: Set[str]) -> Dict[str, Any]:
+        return {
+            **flow_data,
+            'nodes': [graph.nodes[n] for n in graph.nodes if n in node_ids],
+            'edges': [e for e in graph.edges if e['source'] in node_ids and e['target'] in node_ids]
+        }
+
+    return PipelineStages(
+        perception=_subflow(perception_set),
+        action=_subflow(set(action)),
+        fields=fields
+    ), ""
@@ -4,6 +4,8 @@
 支持异步执行和循环模式，与 FlowRunContext 配合使用。
 节点执行失败时自动停止流程并返回错误信息。
 支持 SSE 消息发送。
+支持节点超时（timeout_ms）和单轮循环耗时预算（loop_budget_ms），
+超出预算时跳过可选节点并将该轮标记为降级。
 """
 import asyncio
 import time
@@ -11,7 +13,18 @@ from typing import Dict, List, Any, Optional, Union, Tuple
 from loguru import logger
 
 from nodes import get_node_class
-from api.sse_service import send_node_start, send_node_complete, send_node_error
+from nodes.base import NodeSkipped
+from engine.executor_pool import get_executor_pools
+from engine.cancellation import CancelToken, NodeCancelled, cancel_scope
+from api.sse_service import send_node_start, send_node_complete, send_node_error, send_node_timeout
+from monitoring.metrics import get_metrics_collector
+from monitoring.tracer import span
+
+
+# 节点执行超时标记
+_TIMED_OUT = object()
+# 节点本轮跳过标记（节点抛出 NodeSkipped）
+_SKIPPED = object()
 
 
 class AsyncGraphExecutor:
@@ -21,14 +34,75 @@ class AsyncGraphExecutor:
     与 FlowRunContext 配合使用，共享状态和缓存。
     """
 
-    def __init__(self, context):
+    def __init__(self, context, node_overrides: Optional[Dict[str, Any]] = None):
         """初始化异步图执行器
         
         Args:
             context: FlowRunContext 流程运行上下文
+            node_overrides: 节点类型 -> 替代节点类（用于离线基准测试替换数据源/动作节点）
         """
         self.context = context
         self.is_running = False
+        self.node_overrides = node_overrides or {}
+        
+        # 本轮各节点耗时（node_id -> 毫秒）
+        self.node_durations: Dict[str, float] = {}
+        
+        # 本轮降级状态（超时 / 跳过可选节点）
+        self.loop_degraded = False
+        self.timeout_events: List[Dict[str, Any]] = []
+        
+        from utils.config import get_config_manager
+        executor_config = get_config_manager().config.executor
+        self.default_node_timeout_ms = executor_config.default_node_timeout_ms
+        self.default_loop_budget_ms = executor_config.loop_budget_ms
+
+    def _get_loop_budget_ms(self, flow_data: Dict[str, Any]) -> float:
+        """获取循环耗时预算（流程 settings 优先，其次全局配置）"""
+        settings = flow_data.get('settings') or {}
+        try:
+            budget = float(settings.get('loop_budget_ms') or 0)
+        except (TypeError, ValueError):
+            budget = 0
+        return budget if budget > 0 else float(self.default_loop_budget_ms or 0)
+
+    def _get_node_timeout_ms(self, node: Dict[str, Any]) -> float:
+        """获取节点超时时间（节点属性优先，其次全局配置）"""
+        try:
+            timeout = float(node.get('properties', {}).get('timeout_ms') or 0)
+        except (TypeError, ValueError):
+            timeout = 0
+        return timeout if timeout > 0 else float(self.default_node_timeout_ms or 0)
+
+    def _record_timeout(self, node_id: str, node_label: str, node_type: str,
+                        timeout_ms: float, reason: str, skipped: bool) -> None:
+        """记录结构化超时事件并标记本轮降级"""
+        event = {
+            'node_id': node_id,
+            'node_label': node_label,
+            'node_type': node_type,
+            'timeout_ms': timeout_ms,
+            'reason': reason,
+            'skipped': skipped
+        }
+        self.timeout_events.append(event)
+        self.loop_degraded = True
+        
+        if reason == 'budget' and timeout_ms <= 0:
+            logger.warning(f"超出循环预算，跳过可选节点 [{node_label}]")
+        elif reason == 'busy':
+            logger.warning(f"资源繁忙，本轮跳过节点 [{node_label}]")
+        else:
+            logger.warning(f"节点 [{node_label}] 执行超时 ({timeout_ms:.0f}ms, {reason})"
+                           f"{'，已跳过' if skipped else ''}")
+        
+        flow_id = getattr(self.context, 'flow_id', '')
+        if flow_id:
+            send_node_timeout(flow_id, node_id, node_label, node_type, timeout_ms, reason, skipped)
+        try:
+            get_metrics_collector().record_node_timeout(node_type, reason)
+        except Exception as e:
+            logger.debug(f"上报超时指标失败: {e}")
 
     async def execute_once(self, flow_data: Dict[str, Any]) -> bool:
         """执行一轮流程
@@ -58,6 +132,13 @@ class AsyncGraphExecutor:
         """
         try:
             self.is_running = True
+            self.loop_degraded = False
+            self.timeout_events = []
+            self.node_durations = {}
+            
+            # 循环耗时预算
+            loop_start = time.time()
+            loop_budget_ms = self._get_loop_budget_ms(flow_data)
             
             # 获取节点和边
             nodes_data = flow_data.get('nodes', [])
@@ -123,6 +204,33 @@ class AsyncGraphExecutor:
                 if hasattr(self.context, 'current_node_type'):
                     self.context.current_node_type = node_type
                 
+                is_condition_node = node_type == 'condition'
+                is_optional = bool(current_node.get('properties', {}).get('optional', False))
+                
+                # 计算生效超时：节点超时；可选节点同时受剩余循环预算约束
+                timeout_ms = self._get_node_timeout_ms(current_node)
+                timeout_reason = 'node'
+                if loop_budget_ms > 0 and is_optional:
+                    remaining_ms = loop_budget_ms - (time.time() - loop_start) * 1000
+                    if remaining_ms <= 0:
+                        # 预算已耗尽，直接跳过可选节点
+                        executed.add(current_node_id)
+                        self._record_timeout(current_node_id, node_label, node_type,
+                                             0, 'budget', skipped=True)
+                        if hasattr(self.context, 'log_node_execution'):
+                            self.context.log_node_execution(
+                                current_node_id, node_label, node_type,
+                                success=True, error="循环预算已耗尽，已跳过",
+                                status='skipped'
+                            )
+                        self._enqueue_skipped_successors(
+                            current_node_id, is_condition_node, adj_list, executed, queue
+                        )
+                        continue
+                    if timeout_ms <= 0 or remaining_ms < timeout_ms:
+                        timeout_ms = remaining_ms
+                        timeout_reason = 'budget'
+                
                 logger.debug(f"执行节点: {node_label} ({node_type})")
                 
                 # 发送节点开始 SSE 消息
@@ -132,10 +240,53 @@ class AsyncGraphExecutor:
                 
                 # 执行节点
                 node_start_time = time.time()
-                result, error_msg = await self._execute_node_with_error(current_node)
+                with span(f"node:{node_label}", "node", node_id=current_node_id, node_type=node_type):
+                    result, error_msg = await self._execute_node_with_error(
+                        current_node,
+                        timeout=timeout_ms / 1000 if timeout_ms > 0 else None
+                    )
                 node_duration_ms = (time.time() - node_start_time) * 1000
+                self.node_durations[current_node_id] = node_duration_ms
                 
                 executed.add(current_node_id)
+                node_status = None
+                
+                # 节点超时：可选节点跳过，必需节点按失败处理
+                if result is _TIMED_OUT:
+                    self._record_timeout(current_node_id, node_label, node_type,
+                                         timeout_ms, timeout_reason, skipped=is_optional)
+                    if is_optional:
+                        if hasattr(self.context, 'log_node_execution'):
+                            self.context.log_node_execution(
+                                current_node_id, node_label, node_type,
+                                success=True, error=f"超时已跳过 ({timeout_ms:.0f}ms)",
+                                start_ts=node_start_time, duration_ms=node_duration_ms,
+                                status='timeout'
+                            )
+                        self._enqueue_skipped_successors(
+                            current_node_id, is_condition_node, adj_list, executed, queue
+                        )
+                        continue
+                    result = False
+                    error_msg = f"节点 [{node_label}] 执行超时 ({timeout_ms:.0f}ms)"
+                    node_status = 'timeout'
+                
+                # 节点本轮跳过（如 KVM 输入排队超时）：跳过该节点及其后继，下一轮重试，
+                # 流程不进入错误状态
+                if result is _SKIPPED:
+                    self._record_timeout(current_node_id, node_label, node_type,
+                                         0, 'busy', skipped=True)
+                    if hasattr(self.context, 'log_node_execution'):
+                        self.context.log_node_execution(
+                            current_node_id, node_label, node_type,
+                            success=True, error=f"{error_msg}，已跳过",
+                            start_ts=node_start_time, duration_ms=node_duration_ms,
+                            status='skipped'
+                        )
+                    self._enqueue_skipped_successors(
+                        current_node_id, is_condition_node, adj_list, executed, queue
+                    )
+                    continue
                 
                 if hasattr(self.context, 'total_node_executions'):
                     self.context.total_node_executions += 1
@@ -145,13 +296,13 @@ class AsyncGraphExecutor:
                     self.context.log_node_execution(
                         current_node_id, node_label, node_type,
                         success=(result is not False),
-                        error=error_msg
+                        error=error_msg,
+                        start_ts=node_start_time, duration_ms=node_duration_ms,
+                        status=node_status
                     )
                 
                 # 条件节点返回 True/False 是正常的逻辑结果，不是执行失败
                 # 只有非条件节点返回 False 才算执行失败
-                is_condition_node = node_type == 'condition'
-                
                 # 如果节点执行失败，停止流程（条件节点除外）
                 if result is False and not is_condition_node:
                     error_info = error_msg or f"节点 [{node_label}] 执行失败"
@@ -217,11 +368,30 @@ class AsyncGraphExecutor:
         finally:
             self.is_running = False
 
-    async def _execute_node_with_error(self, node: Dict[str, Any]) -> Tuple[Any, Optional[str]]:
+    def _enqueue_skipped_successors(self, node_id: str, is_condition_node: bool,
+                                    adj_list: Dict[str, List[Dict[str, Any]]],
+                                    executed: set, queue: List[str]) -> None:
+        """被跳过的节点继续调度后继节点（条件节点无结果，不进入任何分支）"""
+        if is_condition_node:
+            return
+        for edge_info in adj_list[node_id]:
+            if edge_info['target'] not in executed:
+                queue.append(edge_info['target'])
+
+    async def _execute_node_with_error(self, node: Dict[str, Any],
+                                       timeout: Optional[float] = None) -> Tuple[Any, Optional[str]]:
         """执行单个节点（返回错误信息）
         
+        节点在带截止时间的取消令牌下执行（见 engine.cancellation）。超时后取消令牌并
+        返回 _TIMED_OUT：同步节点的线程无法被强制中断，但耗时节点在写入上下文、
+        提交推理、发送键鼠输入和等待前检查令牌，超时后不再产生副作用。
+        
+        执行器被取消（流程停止、流水线关闭）时同样取消令牌，并等待已开始执行的
+        节点线程退出后再传播取消，调用方随后释放 KVM 等资源时不会与节点并发。
+        
         Args:
             node: 节点数据
+            timeout: 超时时间（秒），None 表示不限制
             
         Returns:
             Tuple[Any, Optional[str]]: (节点执行结果, 错误信息)
@@ -232,7 +402,7 @@ class AsyncGraphExecutor:
         node_label = node.get('label') or node.get('name') or node_type or node_id
         if not isinstance(node_label, str):
             node_label = str(node_label) if node_label else node_id
-        node_class = get_node_class(node_type)
+        node_class = self.node_overrides.get(node_type) or get_node_class(node_type)
         
         if not node_class:
             error_msg = f"未知的节点类型: {node_type}"
@@ -254,18 +424,42 @@ class AsyncGraphExecutor:
                 logger.error(error_msg)
                 return False, error_msg
             
-            # 执行节点（支持异步和同步）
-            if asyncio.iscoroutinefunction(node_instance.execute):
-                result = await node_instance.execute(self.context, properties)
-            else:
-                # 同步节点在线程池中执行，避免阻塞事件循环
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None,
-                    node_instance.execute,
-                    self.context,
-                    properties
-                )
+            # 执行节点（支持异步和同步），取消令牌经 contextvars 传入节点线程
+            token = CancelToken(timeout)
+            future = None
+            with cancel_scope(token):
+                if asyncio.iscoroutinefunction(node_instance.execute):
+                    coro = node_instance.execute(self.context, properties)
+                else:
+                    # 同步节点按类别在独立线程池中执行，避免阻塞事件循环
+                    pool = get_executor_pools().pool_for_node(node_class)
+                    future = pool.submit(
+                        node_instance.execute,
+                        self.context,
+                        properties
+                    )
+                    coro = asyncio.wrap_future(future)
+                
+                try:
+                    result = await asyncio.wait_for(coro, timeout)
+                except asyncio.TimeoutError:
+                    token.cancel()
+                    return _TIMED_OUT, None
+                except asyncio.CancelledError:
+                    token.cancel()
+                    # 排队中的任务直接取消；执行中的节点线程在下一个检查点退出，等待其结束
+                    if future is not None and not future.cancel() and not future.done():
+                        await asyncio.gather(asyncio.wrap_future(future), return_exceptions=True)
+                    raise
+                except NodeCancelled:
+                    # 节点在截止时间到达后自行停止
+                    return _TIMED_OUT, None
+                except NodeSkipped as e:
+                    return _SKIPPED, str(e) or "节点本轮跳过"
+            
+            # 输入节点执行完成后记录输入时间，流水线模式据此判断预取的画面是否过期
+            if getattr(node_class, 'sends_input', False) and hasattr(self.context, 'last_input_time'):
+                self.context.last_input_time = time.monotonic()
             
             logger.debug(f"节点执行完成 [{node_label}]: {result}")
             
@@ -0,0 +1,328 @@
+"""跨流程推理动态批处理
+
+多个流程并发调用同一个模型（由模型注册表共享）时，在一个小的时间窗口内
+收集请求，合并为一批推理后再把结果分发回各请求，提高加速卡利用率。
+
+- 组批采用领导者/跟随者方式：队列空闲时到达的请求成为领导者，等待至多
+  max_wait 或凑满 max_batch 后执行整批；其余请求阻塞等待结果
+- 只有一个流程在使用该模型时不等待，避免单流程场景增加延迟
+- 配置了延迟 SLO 时，等待时间不超过 SLO 减去近期批推理耗时
+- 批大小受推理线程池大小（executor.inference_workers）限制
+- 发起节点已超时取消的请求不再提交，组批时从批次中剔除
+"""
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from engine.model_registry import get_model_registry, MODEL_KIND_YOLO, MODEL_KIND_OCR
+from engine.cancellation import NodeCancelled, check_cancelled, current_cancel_token
+from monitoring.metrics import get_metrics_collector
+from monitoring.tracer import span
+
+
+# 判断模型是否被多个流程使用的时间窗口（秒）
+SOURCE_ACTIVE_WINDOW = 2.0
+
+
+class _Request:
+    """单个推理请求"""
+
+    __slots__ = ('frame', 'params', 'enqueue_time', 'done', 'result', 'error',
+                 'lead', 'batch_size', 'cancel_token')
+
+    def __init__(self, frame: Any, params: Dict[str, Any]):
+        self.frame = frame
+        self.params = params
+        self.enqueue_time = time.monotonic()
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # 被指定为下一任领导者
+        self.lead = False
+        self.batch_size = 0
+        # 发起节点的取消令牌
+        self.cancel_token = current_cancel_token()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token is not None and self.cancel_token.cancelled
+
+
+class _BatchQueue:
+    """单个模型的请求队列"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.cond = threading.Condition()
+        self.pending: List[_Request] = []
+        self.leader_active = False
+        # source -> 最近提交时间
+        self.sources: Dict[str, float] = {}
+
+        # 统计信息
+        self.batches = 0
+        self.requests = 0
+        self.avg_batch_size = 0.0
+        self.avg_queue_delay_ms = 0.0
+        self.exec_ema_ms = 0.0
+        self.max_batch_seen = 0
+
+    def active_sources(self, now: float) -> int:
+        """近期提交过请求的流程数（需持有 cond）"""
+        expired = [s for s, t in self.sources.items() if now - t > SOURCE_ACTIVE_WINDOW]
+        for s in expired:
+            del self.sources[s]
+        return len(self.sources)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'pending': len(self.pending),
+            'batches': self.batches,
+            'requests': self.requests,
+            'avg_batch_size': round(self.avg_batch_size, 2),
+            'max_batch_size': self.max_batch_seen,
+            'avg_queue_delay_ms': round(self.avg_queue_delay_ms, 2),
+            'avg_batch_exec_ms': round(self.exec_ema_ms, 2),
+            'active_sources': len(self.sources)
+        }
+
+
+class InferenceBatcher:
+    """推理批处理服务
+
+    单例模式，按模型实例维护请求队列。
+    """
+
+    _instance: Optional['InferenceBatcher'] = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        """单例模式"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """初始化批处理服务"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+
+        from utils.config import get_config_manager
+        config = get_config_manager().config.batching
+
+        self.enabled = config.enabled
+        self.max_batch = max(1, config.max_batch)
+        self.max_wait_ms = max(0.0, config.max_wait_ms)
+        self.latency_slo_ms = max(0.0, config.latency_slo_ms)
+
+        # 模型实例 -> 请求队列（模型被注册表卸载后自动移除）
+        self._queues: 'weakref.WeakKeyDictionary[Any, _BatchQueue]' = weakref.WeakKeyDictionary()
+        self._queues_lock = threading.Lock()
+
+        logger.info(f"推理批处理初始化完成: enabled={self.enabled}, max_batch={self.max_batch}, "
+                    f"max_wait_ms={self.max_wait_ms}, latency_slo_ms={self.latency_slo_ms}")
+
+    def detect(self, detector: Any, frame: Any, conf_threshold: Optional[float] = None,
+               iou_threshold: Optional[float] = None, source: str = "") -> List[Dict[str, Any]]:
+        """YOLO 检测（与其他流程的同模型请求合并推理）
+
+        Args:
+            detector: YOLODetector 实例
+            frame: 输入图像
+            conf_threshold: 置信度阈值
+            iou_threshold: IOU 阈值
+            source: 请求来源（流程 ID）
+        """
+        params = {'conf': conf_threshold, 'iou': iou_threshold}
+        return self._submit(detector, MODEL_KIND_YOLO, frame, params, source)
+
+    def recognize(self, engine: Any, frame: Any, conf_threshold: Optional[float] = None,
+                  source: str = "", stream: Optional[str] = None) -> List[Dict[str, Any]]:
+        """OCR 识别（与其他流程的同模型请求合并推理）
+
+        Args:
+            engine: OCREngine 实例
+            frame: 输入图像
+            conf_threshold: 置信度阈值
+            source: 请求来源（流程 ID）
+            stream: 数据流标识（引擎启用增量识别时使用）
+        """
+        params = {'conf': conf_threshold, 'stream': stream}
+        return self._submit(engine, MODEL_KIND_OCR, frame, params, source)
+
+    def _get_queue(self, model: Any, kind: str) -> _BatchQueue:
+        with self._queues_lock:
+            queue = self._queues.get(model)
+            if queue is None:
+                name = f"{kind}:{getattr(model, 'backend', '')}:{id(model):x}"
+                queue = self._queues[model] = _BatchQueue(name, kind)
+            return queue
+
+    def _submit(self, model: Any, kind: str, frame: Any, params: Dict[str, Any],
+                source: str) -> List[Dict[str, Any]]:
+        """提交请求并等待结果"""
+        check_cancelled()
+        if not self.enabled or self.max_batch <= 1:
+            with get_model_registry().inference_lock(model):
+                check_cancelled()
+                return self._run_model(model, kind, [frame], [params])[0]
+
+        queue = self._get_queue(model, kind)
+        request = _Request(frame, params)
+
+        with span(f"{kind}.batched", "executor") as trace_args:
+            with queue.cond:
+                queue.pending.append(request)
+                queue.sources[source] = request.enqueue_time
+                is_leader = not queue.leader_active
+                if is_leader:
+                    queue.leader_active = True
+                else:
+                    queue.cond.notify_all()
+
+            if is_leader:
+                self._lead(queue, model, kind)
+
+            while True:
+                request.done.wait()
+                if not request.lead:
+                    break
+                # 接任领导者，执行下一批（自己的请求在其中）
+                request.lead = False
+                request.done.clear()
+                self._lead(queue, model, kind)
+
+            if trace_args is not None:
+                trace_args['batch_size'] = request.batch_size
+
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _max_wait(self, queue: _BatchQueue, now: float) -> float:
+        """当前允许的组批等待时间（秒，需持有 cond）"""
+        if queue.active_sources(now) <= 1:
+            return 0.0
+        wait_ms = self.max_wait_ms
+        if self.latency_slo_ms > 0:
+            wait_ms = min(wait_ms, max(0.0, self.latency_slo_ms - queue.exec_ema_ms))
+        return wait_ms / 1000
+
+    def _lead(self, queue: _BatchQueue, model: Any, kind: str) -> None:
+        """领导者：收集一批请求并执行，然后把领导权交给下一个等待的请求"""
+        with queue.cond:
+            deadline = queue.pending[0].enqueue_time + self._max_wait(queue, time.monotonic())
+            while len(queue.pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                queue.cond.wait(remaining)
+            batch = queue.pending[:self.max_batch]
+            del queue.pending[:self.max_batch]
+
+        # 发起节点已超时的请求不再推理
+        live = []
+        for request in batch:
+            if request.cancelled:
+                request.error = NodeCancelled()
+                request.done.set()
+            else:
+                live.append(request)
+        if live:
+            self._run_batch(queue, model, kind, live)
+
+        with queue.cond:
+            if not queue.pending:
+                queue.leader_active = False
+                return
+            successor = queue.pending[0]
+            successor.lead = True
+        successor.done.set()
+
+    def _run_batch(self, queue: _BatchQueue, model: Any, kind: str, batch: List[_Request]) -> None:
+        """执行一批请求并分发结果"""
+        start = time.monotonic()
+        metrics = get_metrics_collector()
+        for request in batch:
+            metrics.record_inference_queue_delay(kind, start - request.enqueue_time)
+
+        try:
+            with get_model_registry().inference_lock(model):
+                results = self._run_model(
+                    model, kind,
+                    [r.frame for r in batch],
+                    [r.params for r in batch]
+                )
+            for request, result in zip(batch, results):
+                request.result = result
+        except Exception as e:
+            logger.error(f"批量推理失败: {queue.name}: {e}")
+            for request in batch:
+                request.error = e
+
+        exec_ms = (time.monotonic() - start) * 1000
+        size = len(batch)
+        metrics.record_inference_batch(kind, size)
+
+        with queue.cond:
+            alpha = 0.1
+            queue.batches += 1
+            queue.requests += size
+            queue.max_batch_seen = max(queue.max_batch_seen, size)
+            queue.exec_ema_ms = alpha * exec_ms + (1 - alpha) * queue.exec_ema_ms
+            queue.avg_batch_size = alpha * size + (1 - alpha) * queue.avg_batch_size
+            delay_ms = sum(start - r.enqueue_time for r in batch) / size * 1000
+            queue.avg_queue_delay_ms = alpha * delay_ms + (1 - alpha) * queue.avg_queue_delay_ms
+
+        for request in batch:
+            request.batch_size = size
+            request.done.set()
+
+    @staticmethod
+    def _run_model(model: Any, kind: str, frames: List[Any],
+                   params: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """以整批输入调用模型"""
+        if kind == MODEL_KIND_YOLO:
+            return model.detect_batch(
+                frames,
+                [p['conf'] for p in params],
+                [p['iou'] for p in params]
+            )
+        return model.recognize_batch(
+            frames,
+            [p['conf'] for p in params],
+            [p.get('stream') for p in params]
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各模型队列的批处理统计"""
+        with self._queues_lock:
+            queues = list(self._queues.values())
+
+        stats = []
+        for queue in queues:
+            with queue.cond:
+                stats.append(queue.to_dict())
+
+        return {
+            'enabled': self.enabled,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait_ms,
+            'latency_slo_ms': self.latency_slo_ms,
+            'queues': stats
+        }
+
+
+def get_inference_batcher() -> InferenceBatcher:
+    """获取推理批处理服务单例"""
+    return InferenceBatcher()
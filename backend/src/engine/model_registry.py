@@ -0,0 +1,424 @@
+"""全局模型注册表
+
+按模型标识（模型路径 + 后端 + 设备 + 输入尺寸等初始化参数）在进程内共享
+已加载的 YOLO 检测器 / OCR 引擎：
+
+- 多个节点、多个流程使用同一模型时只加载一份，按流程运行引用计数
+- 流程停止后模型不立即释放，空闲模型在数量/内存预算内保持加载（LRU 淘汰），
+  重启流程无需重新加载
+- 同一模型实例被多个流程共享，推理时通过模型锁串行化
+
+阈值等按次传入的参数不参与模型标识，不同阈值的节点可共享同一模型。
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional, Set
+from loguru import logger
+
+from monitoring.metrics import get_metrics_collector
+
+
+MODEL_KIND_YOLO = "yolo"
+MODEL_KIND_OCR = "ocr"
+
+
+def make_model_key(kind: str, params: Dict[str, Any]) -> str:
+    """生成模型标识
+
+    Args:
+        kind: 模型类型（yolo / ocr）
+        params: 影响模型初始化的参数
+
+    Returns:
+        模型标识字符串
+    """
+    return f"{kind}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+def _estimate_model_size(paths: Iterable[Optional[str]]) -> int:
+    """以模型文件大小估算模型占用的内存（字节）"""
+    total = 0
+    for path in paths:
+        if not path:
+            continue
+        try:
+            total += Path(path).stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+class ModelEntry:
+    """已加载的模型"""
+
+    def __init__(self, key: str, kind: str, model: Any, memory_bytes: int, load_time_ms: float):
+        self.key = key
+        self.kind = kind
+        self.model = model
+        self.memory_bytes = memory_bytes
+        self.load_time_ms = load_time_ms
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.owners: Set[str] = set()
+        self.acquire_count = 0
+        # 预热推理耗时（未预热时为 None）
+        self.warmup_time_ms: Optional[float] = None
+        # 推理锁（模型实例被多个流程共享）
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'key': self.key,
+            'kind': self.kind,
+            'backend': getattr(self.model, 'backend', None),
+            'refcount': len(self.owners),
+            'owners': sorted(self.owners),
+            'state': 'active' if self.owners else 'idle',
+            'memory_mb': round(self.memory_bytes / (1024 * 1024), 2),
+            'load_time_ms': round(self.load_time_ms, 1),
+            'warmup_time_ms': round(self.warmup_time_ms, 1) if self.warmup_time_ms is not None else None,
+            'loaded_at': self.loaded_at,
+            'last_used': self.last_used,
+            'acquire_count': self.acquire_count
+        }
+
+
+class ModelRegistry:
+    """全局模型注册表
+
+    单例模式，线程安全。同一模型的并发加载只执行一次。
+    """
+
+    _instance: Optional['ModelRegistry'] = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        """单例模式"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """初始化模型注册表"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+
+        from utils.config import get_config_manager
+        config = get_config_manager().config.model_registry
+
+        self.max_idle_models = max(0, config.max_idle_models)
+        self.max_memory_bytes = int(config.max_memory_mb * 1024 * 1024)
+        self.warmup_enabled = config.warmup
+        self.warmup_frame_size = (config.warmup_frame_width, config.warmup_frame_height)
+
+        # key -> ModelEntry（按最近使用排序，最久未使用的在前）
+        self._entries: 'OrderedDict[str, ModelEntry]' = OrderedDict()
+        # id(model) -> ModelEntry，用于获取推理锁
+        self._by_model: Dict[int, ModelEntry] = {}
+        # key -> 加载锁，防止同一模型被并发重复加载
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._data_lock = threading.Lock()
+
+        self.load_count = 0
+        self.hit_count = 0
+        self.eviction_count = 0
+
+        logger.info(f"模型注册表初始化完成: max_idle_models={self.max_idle_models}, "
+                    f"max_memory_mb={config.max_memory_mb}")
+
+    def acquire(self, kind: str, params: Dict[str, Any], factory: Callable[[], Any],
+                owner: str, model_paths: Iterable[Optional[str]] = ()) -> Any:
+        """获取共享模型，不存在时加载
+
+        Args:
+            kind: 模型类型
+            params: 模型标识参数
+            factory: 模型加载函数
+            owner: 持有者（流程运行标识），同一持有者重复获取只计一次引用
+            model_paths: 模型文件路径（用于估算内存）
+
+        Returns:
+            模型实例
+
+        Raises:
+            factory 抛出的异常
+        """
+        key = make_model_key(kind, params)
+
+        entry = self._acquire_loaded(key, owner)
+        if entry is not None:
+            return entry.model
+
+        with self._data_lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # 等待期间可能已被其他线程加载
+            entry = self._acquire_loaded(key, owner)
+            if entry is not None:
+                return entry.model
+
+            try:
+                start = time.perf_counter()
+                model = factory()
+                load_time_ms = (time.perf_counter() - start) * 1000
+
+                entry = ModelEntry(key, kind, model, _estimate_model_size(model_paths), load_time_ms)
+                entry.owners.add(owner)
+                entry.acquire_count = 1
+
+                with self._data_lock:
+                    self._entries[key] = entry
+                    self._by_model[id(model)] = entry
+                    self.load_count += 1
+                    self._evict_locked()
+                    self._update_metrics_locked()
+            finally:
+                # 加载失败时同样移除加载锁，避免失败的模型标识一直占用
+                with self._data_lock:
+                    if self._load_locks.get(key) is load_lock:
+                        del self._load_locks[key]
+
+        get_metrics_collector().record_model_acquire(kind, hit=False)
+        logger.info(f"模型已加载: {key} ({load_time_ms:.0f}ms)")
+        return model
+
+    def _acquire_loaded(self, key: str, owner: str) -> Optional[ModelEntry]:
+        """获取已加载的模型并增加引用"""
+        with self._data_lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.owners.add(owner)
+            entry.acquire_count += 1
+            entry.last_used = time.time()
+            self._entries.move_to_end(key)
+            self.hit_count += 1
+            self._update_metrics_locked()
+
+        get_metrics_collector().record_model_acquire(entry.kind, hit=True)
+        return entry
+
+    def release(self, owner: str, keep: Iterable[Any] = ()) -> int:
+        """释放持有者对模型的引用
+
+        引用归零的模型转为空闲状态，在预算内保持加载。
+
+        Args:
+            owner: 持有者（流程运行标识）
+            keep: 保留引用的模型实例（流程热更新时仍在使用的模型）
+
+        Returns:
+            释放的模型数
+        """
+        keep_ids = {id(model) for model in keep}
+        released = 0
+        with self._data_lock:
+            for key, entry in list(self._entries.items()):
+                if owner in entry.owners and id(entry.model) not in keep_ids:
+                    entry.owners.discard(owner)
+                    entry.last_used = time.time()
+                    self._entries.move_to_end(key)
+                    released += 1
+            self._evict_locked()
+            self._update_metrics_locked()
+        return released
+
+    def get_owned_models(self, owner: str) -> List[Any]:
+        """获取持有者当前引用的模型实例"""
+        with self._data_lock:
+            return [entry.model for entry in self._entries.values() if owner in entry.owners]
+
+    def inference_lock(self, model: Any) -> ContextManager:
+        """获取模型的推理锁（非注册表管理的模型返回空上下文）"""
+        entry = self._by_model.get(id(model))
+        if entry is None or entry.model is not model:
+            return nullcontext()
+        return entry.lock
+
+    def warm_up(self, model: Any) -> Optional[float]:
+        """对模型执行一次预热推理（使用空白帧）
+
+        首次推理会触发设备内存分配等一次性开销，预热后流程第一轮不再承担。
+        每个模型实例只预热一次，同一模型的并发预热只执行一次。
+
+        Args:
+            model: 注册表管理的模型实例
+
+        Returns:
+            预热耗时（毫秒），已预热、未启用或非注册表管理的模型返回 None
+        """
+        if not self.warmup_enabled:
+            return None
+        entry = self._by_model.get(id(model))
+        if entry is None or entry.model is not model or entry.warmup_time_ms is not None:
+            return None
+
+        with entry.lock:
+            if entry.warmup_time_ms is not None:
+                return None
+
+            import numpy as np
+            width, height = self.warmup_frame_size
+            frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+            start = time.perf_counter()
+            try:
+                if entry.kind == MODEL_KIND_YOLO:
+                    model.detect(frame)
+                else:
+                    model.recognize(frame)
+            except Exception as e:
+                logger.warning(f"模型预热失败: {entry.key}: {e}")
+            entry.warmup_time_ms = (time.perf_counter() - start) * 1000
+
+        logger.info(f"模型已预热: {entry.key} ({entry.warmup_time_ms:.0f}ms)")
+        return entry.warmup_time_ms
+
+    def _evict_locked(self) -> None:
+        """按空闲数量和内存预算淘汰最久未使用的空闲模型（需持有 _data_lock）"""
+        idle_keys = [key for key, entry in self._entries.items() if not entry.owners]
+        total_memory = sum(entry.memory_bytes for entry in self._entries.values())
+
+        for key in idle_keys:
+            over_count = len(idle_keys) > self.max_idle_models
+            over_memory = self.max_memory_bytes > 0 and total_memory > self.max_memory_bytes
+            if not (over_count or over_memory):
+                break
+
+            entry = self._entries.pop(key)
+            self._by_model.pop(id(entry.model), None)
+            idle_keys = idle_keys[1:]
+            total_memory -= entry.memory_bytes
+            self.eviction_count += 1
+            logger.info(f"空闲模型已卸载: {key}")
+
+    def clear_idle(self) -> int:
+        """卸载所有空闲模型
+
+        Returns:
+            卸载的模型数
+        """
+        with self._data_lock:
+            idle_keys = [key for key, entry in self._entries.items() if not entry.owners]
+            for key in idle_keys:
+                entry = self._entries.pop(key)
+                self._by_model.pop(id(entry.model), None)
+            self.eviction_count += len(idle_keys)
+            self._update_metrics_locked()
+        return len(idle_keys)
+
+    def _update_metrics_locked(self) -> None:
+        active = sum(1 for entry in self._entries.values() if entry.owners)
+        memory = sum(entry.memory_bytes for entry in self._entries.values())
+        get_metrics_collector().update_model_registry(active, len(self._entries) - active, memory)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取已加载模型列表和统计信息"""
+        with self._data_lock:
+            models: List[Dict[str, Any]] = [entry.to_dict() for entry in self._entries.values()]
+            total = self.load_count + self.hit_count
+            return {
+                'models': models,
+                'loaded': len(models),
+                'active': sum(1 for m in models if m['refcount'] > 0),
+                'memory_mb': round(sum(m['memory_mb'] for m in models), 2),
+                'max_idle_models': self.max_idle_models,
+                'max_memory_mb': round(self.max_memory_bytes / (1024 * 1024), 2),
+                'load_count': self.load_count,
+                'hit_count': self.hit_count,
+                'hit_rate': self.hit_count / total if total > 0 else 0.0,
+                'eviction_count': self.eviction_count
+            }
+
+
+def get_model_registry() -> ModelRegistry:
+    """获取全局模型注册表单例"""
+    return ModelRegistry()
+
+
+def acquire_yolo_detector(owner: str, properties: Dict[str, Any]) -> Any:
+    """按 YOLO 节点属性获取共享检测器
+
+    Args:
+        owner: 持有者（流程运行标识）
+        properties: YOLO 节点属性
+    """
+    from detection.yolo_detector import YOLODetector
+
+    params = {
+        'model_path': properties.get('model_path', 'models/yolov8n.bmodel'),
+        'backend': properties.get('backend', 'auto'),
+        'dev_id': int(properties.get('dev_id', 0))
+    }
+
+    def factory():
+        return YOLODetector(
+            model_path=params['model_path'],
+            conf_threshold=float(properties.get('conf_threshold', 0.25)),
+            iou_threshold=float(properties.get('iou_threshold', 0.45)),
+            backend=params['backend'],
+            dev_id=params['dev_id']
+        )
+
+    return get_model_registry().acquire(
+        MODEL_KIND_YOLO, params, factory, owner, model_paths=[params['model_path']]
+    )
+
+
+def acquire_ocr_engine(owner: str, properties: Dict[str, Any]) -> Any:
+    """按 OCR 节点属性获取共享 OCR 引擎
+
+    Args:
+        owner: 持有者（流程运行标识）
+        properties: OCR 节点属性
+    """
+    from ocr.ocr_engine import OCREngine
+
+    # 注意：img_size_h 必须为 48，与 PP-OCR 模型匹配
+    img_size_w = int(properties.get('img_size_w', 640))
+    img_size_h = int(properties.get('img_size_h', 48))
+
+    # 支持多个尺寸用于不同长度的文本
+    img_size = [[img_size_w, img_size_h]]
+    # 如果宽度较大，添加一个较小的尺寸用于短文本
+    if img_size_w > 400:
+        img_size.insert(0, [320, img_size_h])
+
+    params = {
+        'backend': properties.get('backend', 'auto'),
+        'det_model': properties.get('det_model'),
+        'rec_model': properties.get('rec_model'),
+        'cls_model': properties.get('cls_model') or None,
+        'char_dict_path': properties.get('char_dict_path'),
+        'use_angle_cls': bool(properties.get('use_angle_cls', False)),
+        'dev_id': int(properties.get('dev_id', 0)),
+        'img_size': img_size,
+        'use_beam_search': bool(properties.get('use_beam_search', False)),
+        'beam_size': int(properties.get('beam_size', 5)),
+        'cpu_threads': int(properties.get('cpu_threads', 0)),
+        'det_mode': properties.get('det_mode') or 'resize',
+        'det_text_height': int(properties.get('det_text_height', 16)),
+        'incremental': bool(properties.get('incremental', False))
+    }
+
+    def factory():
+        return OCREngine(
+            lang=['ch', 'en'],  # 默认中英文
+            conf_threshold=float(properties.get('conf_threshold', 0.5)),
+            **params
+        )
+
+    return get_model_registry().acquire(
+        MODEL_KIND_OCR, params, factory, owner,
+        model_paths=[params['det_model'], params['rec_model'], params['cls_model']]
+    )
@@ -0,0 +1,192 @@
+"""流水线循环执行器
+
+顺序模式下一轮循环依次执行 采集 → 识别 → 条件 → 动作 → 等待，识别模型在动作
+和等待期间空闲。流水线模式将流程划分为感知阶段和动作阶段
+（见 engine.graph_compiler.split_pipeline_stages），第 N 轮的动作阶段执行时
+同时为第 N+1 轮执行感知阶段：
+
+- 预取的感知阶段在独立的上下文视图中执行，写入的字段在下一轮开始时才提交到
+  流程上下文，不影响正在执行的动作阶段
+- 画面采集之后如果发生了鼠标键盘输入，预取的结果视为过期，丢弃后重新感知
+- 流程无法划分阶段时按顺序模式执行
+
+适用于动作以等待为主的流程（大部分循环没有点击），循环频率接近
+max(感知耗时, 动作耗时) 而不是两者之和。
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+
+from engine.graph_compiler import PipelineStages, split_pipeline_stages
+from engine.graph_executor import AsyncGraphExecutor
+from monitoring.metrics import get_metrics_collector
+
+
+LOOP_MODE_SEQUENTIAL = "sequential"
+LOOP_MODE_PIPELINED = "pipelined"
+
+
+class _StageContext:
+    """感知阶段的上下文视图
+
+    感知阶段写入的字段（以及执行器维护的当前节点信息）保存在本地，
+    其余属性直接读写流程上下文（模型缓存、KVM 连接状态、统计等）。
+    """
+
+    _EXECUTOR_FIELDS = ('current_node_id', 'current_node_label', 'current_node_type')
+
+    def __init__(self, base: Any, fields: Iterable[str]):
+        object.__setattr__(self, '_base', base)
+        object.__setattr__(self, '_fields', frozenset(fields) | frozenset(self._EXECUTOR_FIELDS))
+        object.__setattr__(self, '_values', {})
+
+    def __getattr__(self, name: str) -> Any:
+        values = object.__getattribute__(self, '_values')
+        if name in values:
+            return values[name]
+        return getattr(object.__getattribute__(self, '_base'), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in self._fields:
+            self._values[name] = value
+        else:
+            setattr(self._base, name, value)
+
+    def commit(self) -> None:
+        """将感知阶段写入的字段提交到流程上下文"""
+        for name, value in self._values.items():
+            if name not in self._EXECUTOR_FIELDS:
+                setattr(self._base, name, value)
+
+
+@dataclass
+class _Perception:
+    """一次感知阶段的执行结果"""
+    context: _StageContext
+    executor: AsyncGraphExecutor
+    captured_at: float
+    success: bool
+    error: Optional[str]
+
+
+class PipelinedExecutor:
+    """流水线循环执行器
+
+    接口与 AsyncGraphExecutor 一致（execute_once_with_error、node_durations、
+    loop_degraded、timeout_events），可直接替换。
+    """
+
+    def __init__(self, context, node_overrides: Optional[Dict[str, Any]] = None):
+        self.context = context
+        self.node_overrides = node_overrides
+        self.action_executor = AsyncGraphExecutor(context, node_overrides)
+
+        self.node_durations: Dict[str, float] = {}
+        self.loop_degraded = False
+        self.timeout_events: List[Dict[str, Any]] = []
+
+        self._flow: Optional[Dict[str, Any]] = None
+        self._stages: Optional[PipelineStages] = None
+        self._prefetch: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.prefetch_hits = 0
+        self.prefetch_stale = 0
+        self.sequential_loops = 0
+        self.fallback_reason = ""
+
+    async def _prepare(self, flow_data: Dict[str, Any]) -> None:
+        """流程数据变化时重新划分阶段"""
+        if flow_data is self._flow:
+            return
+        await self.close()
+        self._flow = flow_data
+        self._stages, self.fallback_reason = split_pipeline_stages(flow_data)
+        flow_name = getattr(self.context, 'flow_name', '')
+        if self._stages is None:
+            logger.info(f"流程 {flow_name} 无法流水线执行，按顺序执行: {self.fallback_reason}")
+        else:
+            logger.info(f"流程 {flow_name} 流水线执行: 感知 {len(self._stages.perception['nodes'])} 个节点, "
+                        f"动作 {len(self._stages.action['nodes'])} 个节点")
+
+    async def _perceive(self) -> _Perception:
+        """执行一次感知阶段（写入保存在独立的上下文视图中）"""
+        stage_context = _StageContext(self.context, self._stages.fields)
+        executor = AsyncGraphExecutor(stage_context, self.node_overrides)
+        captured_at = time.monotonic()
+        success, error = await executor.execute_once_with_error(self._stages.perception)
+        return _Perception(stage_context, executor, captured_at, success, error)
+
+    async def _take_prefetched(self) -> Optional[_Perception]:
+        """取出预取的感知结果，过期时丢弃"""
+        if self._prefetch is None:
+            return None
+        task, self._prefetch = self._prefetch, None
+        perception = await task
+
+        if perception.captured_at < getattr(self.context, 'last_input_time', 0.0):
+            self.prefetch_stale += 1
+            get_metrics_collector().record_pipeline_prefetch('stale')
+            logger.debug("预取画面采集后发生了输入，重新感知")
+            return None
+        self.prefetch_hits += 1
+        get_metrics_collector().record_pipeline_prefetch('hit')
+        return perception
+
+    async def execute_once_with_error(self, flow_data: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        """执行一轮：使用（预取的）感知结果，执行动作阶段的同时预取下一轮"""
+        await self._prepare(flow_data)
+
+        if self._stages is None:
+            self.sequential_loops += 1
+            result = await self.action_executor.execute_once_with_error(flow_data)
+            self.node_durations = self.action_executor.node_durations
+            self.loop_degraded = self.action_executor.loop_degraded
+            self.timeout_events = self.action_executor.timeout_events
+            return result
+
+        perception = await self._take_prefetched()
+        if perception is None:
+            perception = await self._perceive()
+
+        self.node_durations = dict(perception.executor.node_durations)
+        self.loop_degraded = perception.executor.loop_degraded
+        self.timeout_events = list(perception.executor.timeout_events)
+        if not perception.success:
+            return False, perception.error
+
+        perception.context.commit()
+
+        # 下一轮的感知阶段与本轮动作阶段并行
+        if not getattr(self.context, 'stop_requested', False):
+            self._prefetch = asyncio.ensure_future(self._perceive())
+
+        success, error = await self.action_executor.execute_once_with_error(self._stages.action)
+        self.node_durations.update(self.action_executor.node_durations)
+        self.loop_degraded = self.loop_degraded or self.action_executor.loop_degraded
+        self.timeout_events.extend(self.action_executor.timeout_events)
+        return success, error
+
+    async def close(self) -> None:
+        """取消进行中的预取，并等待其节点线程退出
+
+        预取的感知阶段可能正在线程池中采集画面，返回后调用方才能安全释放 KVM 连接。
+        """
+        if self._prefetch is None:
+            return
+        task, self._prefetch = self._prefetch, None
+        task.cancel()
+        await asyncio.wait({task})
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.prefetch_hits + self.prefetch_stale
+        return {
+            'mode': LOOP_MODE_PIPELINED if self._stages is not None else LOOP_MODE_SEQUENTIAL,
+            'fallback_reason': self.fallback_reason or None,
+            'prefetch_hits': self.prefetch_hits,
+            'prefetch_stale': self.prefetch_stale,
+            'hit_rate': round(self.prefetch_hits / total, 3) if total else None,
+            'sequential_loops': self.sequential_loops
+        }
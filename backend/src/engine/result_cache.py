@@ -0,0 +1,236 @@
+"""节点结果缓存
+
+画面未变化时，YOLO/OCR 等推理节点无需重复推理。
+缓存以输入图像内容哈希 + 节点有效参数为键，LRU 淘汰，并限制总内存占用。
+"""
+import copy
+import hashlib
+import json
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+
+from monitoring.metrics import get_metrics_collector
+
+# 不超过该大小（字节）的图像整体做 blake2b 哈希
+FULL_HASH_BYTES = 256 * 1024
+# 大图像 blake2b 采样步长（行、列）
+SAMPLE_STRIDE = 4
+
+
+def compute_cache_key(image: Any, node_type: str, params: Dict[str, Any]) -> Optional[str]:
+    """计算缓存键
+
+    整帧做 blake2b 开销较大（1080p 约 10ms），大图像改为对行列步长采样的视图做 blake2b，
+    再附加全部像素的 CRC32，单个像素变化（如时钟数字）同样会改变缓存键。
+    裁剪节点之后的小区域仍整体哈希。
+
+    Args:
+        image: 输入图像（numpy 数组）
+        node_type: 节点类型
+        params: 影响结果的有效参数（模型、阈值、裁剪区域等）
+
+    Returns:
+        缓存键，图像无法哈希时返回 None
+    """
+    try:
+        import numpy as np
+        data = np.ascontiguousarray(image)
+    except Exception:
+        return None
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(node_type.encode('utf-8'))
+    h.update(str((data.shape, data.dtype.str)).encode('utf-8'))
+    h.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    if data.nbytes <= FULL_HASH_BYTES or data.ndim < 2:
+        h.update(memoryview(data).cast('B'))
+    else:
+        sample = np.ascontiguousarray(data[::SAMPLE_STRIDE, ::SAMPLE_STRIDE])
+        h.update(memoryview(sample).cast('B'))
+        h.update(zlib.crc32(memoryview(data).cast('B')).to_bytes(4, 'little'))
+    return h.hexdigest()
+
+
+def _estimate_size(obj: Any) -> int:
+    """估算结果对象占用的内存（字节）"""
+    nbytes = getattr(obj, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_estimate_size(k) + _estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_estimate_size(v) for v in obj)
+    return size
+
+
+class ResultCache:
+    """节点结果 LRU 缓存
+
+    单例模式，所有流程共享。按条目数和内存上限淘汰最久未使用的结果，
+    并按 (flow_id, node_id) 统计命中率。
+    """
+
+    _instance: Optional['ResultCache'] = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        """单例模式"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """初始化结果缓存"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+
+        from utils.config import get_config_manager
+        config = get_config_manager().config.result_cache
+
+        self.enabled = config.enabled
+        self.max_entries = max(1, config.max_entries)
+        self.max_memory = int(config.max_memory_mb * 1024 * 1024)
+
+        # key -> (结果, 估算大小)
+        self._entries: 'OrderedDict[str, Tuple[Any, int]]' = OrderedDict()
+        self._memory = 0
+        self._data_lock = threading.Lock()
+
+        # (flow_id, run_id, node_id) -> {'hits': n, 'misses': n}
+        self._node_stats: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+
+        logger.info(f"节点结果缓存初始化完成: enabled={self.enabled}, "
+                    f"max_entries={self.max_entries}, max_memory={config.max_memory_mb}MB")
+
+    def get(self, key: Optional[str], flow_id: str = "", node_id: str = "",
+            node_type: str = "", run_id: str = "") -> Optional[Any]:
+        """查询缓存
+
+        Args:
+            key: 缓存键
+            flow_id: 流程 ID（用于命中率统计）
+            node_id: 节点 ID（用于命中率统计）
+            node_type: 节点类型（用于指标标签）
+            run_id: 流程运行标识（用于命中率统计）
+
+        Returns:
+            缓存结果的副本，未命中返回 None
+        """
+        if key is None:
+            return None
+
+        with self._data_lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            stats = self._node_stats.setdefault((flow_id, run_id, node_id), {'hits': 0, 'misses': 0})
+            stats['hits' if entry is not None else 'misses'] += 1
+
+        try:
+            get_metrics_collector().record_result_cache(node_type, entry is not None)
+        except Exception as e:
+            logger.debug(f"上报缓存指标失败: {e}")
+
+        if entry is None:
+            return None
+        return copy.deepcopy(entry[0])
+
+    def put(self, key: Optional[str], result: Any) -> None:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            result: 节点结果
+        """
+        if key is None:
+            return
+
+        value = copy.deepcopy(result)
+        size = _estimate_size(value) + len(key)
+        if size > self.max_memory:
+            return
+
+        with self._data_lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._memory -= old[1]
+
+            self._entries[key] = (value, size)
+            self._memory += size
+
+            # LRU 淘汰
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._memory > self.max_memory):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._memory -= evicted_size
+
+            entries, memory = len(self._entries), self._memory
+
+        try:
+            get_metrics_collector().update_result_cache(entries, memory)
+        except Exception as e:
+            logger.debug(f"上报缓存指标失败: {e}")
+
+    def get_hit_rate(self, flow_id: str, node_id: str, run_id: str = "") -> float:
+        """获取节点的缓存命中率"""
+        with self._data_lock:
+            stats = self._node_stats.get((flow_id, run_id, node_id))
+            if not stats:
+                return 0.0
+            total = stats['hits'] + stats['misses']
+            return stats['hits'] / total if total else 0.0
+
+    def clear(self, flow_id: Optional[str] = None, run_id: Optional[str] = None) -> None:
+        """清空缓存
+
+        Args:
+            flow_id: 仅清除该流程的命中率统计，None 表示清空全部
+            run_id: 仅清除该流程指定运行的命中率统计（流程停止后立即重启时，
+                旧运行的清理不影响新运行）
+        """
+        with self._data_lock:
+            if flow_id is None:
+                self._entries.clear()
+                self._memory = 0
+                self._node_stats.clear()
+            else:
+                for key in [k for k in self._node_stats
+                            if k[0] == flow_id and (run_id is None or k[1] == run_id)]:
+                    del self._node_stats[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._data_lock:
+            nodes = []
+            for (flow_id, _, node_id), stats in self._node_stats.items():
+                total = stats['hits'] + stats['misses']
+                nodes.append({
+                    'flow_id': flow_id,
+                    'node_id': node_id,
+                    'hits': stats['hits'],
+                    'misses': stats['misses'],
+                    'hit_rate': stats['hits'] / total if total else 0.0
+                })
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'memory_bytes': self._memory,
+                'max_memory_bytes': self.max_memory,
+                'nodes': nodes
+            }
+
+
+def get_result_cache() -> ResultCache:
+    """获取节点结果缓存单例"""
+    return ResultCache()
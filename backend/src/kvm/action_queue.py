@@ -0,0 +1,250 @@
+"""KVM 输入仲裁队列
+
+多个流程共享同一个 KVM 时，各自的鼠标/键盘事件序列可能交错（例如一个流程
+正在输入文本时另一个流程点击了别处），导致输入错乱。
+
+每个 KVM 一个仲裁队列，同一时刻只允许一个动作序列（点击、文本输入、组合键）
+执行：
+- 按优先级（high > normal > low）授予执行权
+- 同一优先级内按流程轮转，避免某个流程连续占用
+- 同一线程可重入（动作节点包住的多步序列内部再调用发送接口）
+- 排队超时或发起节点超时取消时放弃执行，避免过期动作仍被发送
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+from loguru import logger
+
+from monitoring.metrics import get_metrics_collector
+from engine.cancellation import NodeCancelled, current_cancel_token
+
+
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low"
+
+# 优先级顺序（数值越小越先执行）
+_PRIORITY_ORDER = {PRIORITY_HIGH: 0, PRIORITY_NORMAL: 1, PRIORITY_LOW: 2}
+
+
+class ActionQueueTimeout(Exception):
+    """排队等待执行权超时"""
+    pass
+
+
+class _QueueBusy:
+    """排队超时的结果标记
+
+    布尔值为假（兼容按真假判断发送结果的调用方），调用方可用 `is QUEUE_BUSY`
+    与发送失败区分：图执行器据此跳过本轮该节点，而不是让流程进入错误状态。
+    """
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return 'QUEUE_BUSY'
+
+
+QUEUE_BUSY = _QueueBusy()
+
+
+# 当前动作序列的发起者与优先级（由动作节点设置，KVMManager 发送接口读取）
+_action_owner: 'contextvars.ContextVar[Optional[str]]' = contextvars.ContextVar(
+    'kvm_action_owner', default=None
+)
+_action_priority: 'contextvars.ContextVar[str]' = contextvars.ContextVar(
+    'kvm_action_priority', default=PRIORITY_NORMAL
+)
+
+
+@contextmanager
+def action_scope(owner: str, priority: str = PRIORITY_NORMAL) -> Iterator[None]:
+    """设置当前动作序列的发起者（流程 ID）和优先级"""
+    owner_token = _action_owner.set(owner)
+    priority_token = _action_priority.set(priority if priority in _PRIORITY_ORDER else PRIORITY_NORMAL)
+    try:
+        yield
+    finally:
+        _action_owner.reset(owner_token)
+        _action_priority.reset(priority_token)
+
+
+class _Ticket:
+    """排队中的动作序列"""
+
+    __slots__ = ('owner', 'priority', 'name', 'enqueue_time', 'thread_id')
+
+    def __init__(self, owner: str, priority: str, name: str):
+        self.owner = owner
+        self.priority = priority
+        self.name = name
+        self.enqueue_time = time.monotonic()
+        self.thread_id = threading.get_ident()
+
+
+class KVMActionQueue:
+    """单个 KVM 的输入仲裁队列"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self._cond = threading.Condition()
+        # 优先级 -> (owner -> 该流程的排队序列)，owner 顺序即轮转顺序
+        self._waiting: Dict[str, 'OrderedDict[str, Deque[_Ticket]]'] = {
+            p: OrderedDict() for p in _PRIORITY_ORDER
+        }
+        self._holder: Optional[_Ticket] = None
+        self._depth = 0
+
+        # 统计信息
+        self.granted = 0
+        self.timeouts = 0
+        self.avg_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.avg_hold_ms = 0.0
+        self.per_owner: Dict[str, int] = {}
+
+    def _waiting_count(self) -> int:
+        return sum(len(q) for owners in self._waiting.values() for q in owners.values())
+
+    def _head(self) -> Optional[_Ticket]:
+        """下一个应获得执行权的序列"""
+        for priority in sorted(self._waiting, key=_PRIORITY_ORDER.get):
+            owners = self._waiting[priority]
+            if owners:
+                return next(iter(owners.values()))[0]
+        return None
+
+    def _remove(self, ticket: _Ticket, served: bool) -> None:
+        """从排队中移除；获得执行权的流程轮转到同优先级队尾"""
+        owners = self._waiting[ticket.priority]
+        tickets = owners.get(ticket.owner)
+        if not tickets:
+            return
+        try:
+            tickets.remove(ticket)
+        except ValueError:
+            return
+        if not tickets:
+            del owners[ticket.owner]
+        elif served:
+            owners.move_to_end(ticket.owner)
+
+    @contextmanager
+    def sequence(self, owner: str, priority: str = PRIORITY_NORMAL, name: str = "",
+                 timeout: Optional[float] = None) -> Iterator[None]:
+        """独占执行一个动作序列
+
+        Args:
+            owner: 发起者（流程 ID）
+            priority: 优先级 high / normal / low
+            name: 动作名称（日志用）
+            timeout: 最长排队时间（秒），None 表示一直等待
+
+        Raises:
+            ActionQueueTimeout: 排队超时
+            NodeCancelled: 排队期间发起节点超时取消
+        """
+        thread_id = threading.get_ident()
+        cancel_token = current_cancel_token()
+
+        with self._cond:
+            # 同一线程重入：已持有执行权，直接执行
+            if self._holder is not None and self._holder.thread_id == thread_id:
+                self._depth += 1
+                reentrant = True
+            else:
+                reentrant = False
+                ticket = _Ticket(owner, priority, name)
+                self._waiting[priority].setdefault(owner, deque()).append(ticket)
+                self._update_depth_metric()
+
+                deadline = None if timeout is None else ticket.enqueue_time + timeout
+                while self._holder is not None or self._head() is not ticket:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._remove(ticket, served=False)
+                        self.timeouts += 1
+                        self._update_depth_metric()
+                        self._cond.notify_all()
+                        raise ActionQueueTimeout(
+                            f"KVM {self.key} 动作排队超时: {name or 'action'} ({owner})"
+                        )
+                    if cancel_token is not None:
+                        if cancel_token.cancelled:
+                            self._remove(ticket, served=False)
+                            self._update_depth_metric()
+                            self._cond.notify_all()
+                            raise NodeCancelled()
+                        # 令牌无法唤醒条件变量，最长等待到节点截止时间
+                        token_remaining = cancel_token.remaining()
+                        if token_remaining is not None:
+                            remaining = token_remaining if remaining is None else min(remaining, token_remaining)
+                    self._cond.wait(remaining)
+
+                self._remove(ticket, served=True)
+                self._holder = ticket
+                self._depth = 1
+                self._update_depth_metric()
+
+        if reentrant:
+            try:
+                yield
+            finally:
+                with self._cond:
+                    self._depth -= 1
+            return
+
+        wait = time.monotonic() - ticket.enqueue_time
+        get_metrics_collector().record_kvm_action_wait(priority, wait)
+        if wait > 0.1:
+            logger.debug(f"KVM {self.key} 动作排队 {wait * 1000:.0f}ms: {name} ({owner})")
+
+        hold_start = time.monotonic()
+        try:
+            yield
+        finally:
+            hold_ms = (time.monotonic() - hold_start) * 1000
+            with self._cond:
+                self._holder = None
+                self._depth = 0
+                alpha = 0.1
+                wait_ms = wait * 1000
+                self.granted += 1
+                self.avg_wait_ms = alpha * wait_ms + (1 - alpha) * self.avg_wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+                self.avg_hold_ms = alpha * hold_ms + (1 - alpha) * self.avg_hold_ms
+                self.per_owner[owner] = self.per_owner.get(owner, 0) + 1
+                self._cond.notify_all()
+
+    def _update_depth_metric(self) -> None:
+        get_metrics_collector().update_kvm_action_queue(self.key, self._waiting_count())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'key': self.key,
+                'waiting': self._waiting_count(),
+                'holder': self._holder.owner if self._holder else None,
+                'holder_action': self._holder.name if self._holder else None,
+                'granted': self.granted,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.avg_wait_ms, 2),
+                'max_wait_ms': round(self.max_wait_ms, 2),
+                'avg_hold_ms': round(self.avg_hold_ms, 2),
+                'per_owner': dict(self.per_owner)
+            }
+
+
+def current_owner() -> str:
+    """当前动作序列的发起者（未设置时使用线程名）"""
+    return _action_owner.get() or threading.current_thread().name
+
+
+def current_priority() -> str:
+    """当前动作序列的优先级"""
+    return _action_priority.get()
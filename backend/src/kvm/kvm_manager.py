@@ -9,12 +9,14 @@
 - 直接同步发送鼠标/键盘事件
 """
 
+import functools
 import threading
 import time
 import os
 import sys
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional
 from dataclasses import dataclass, field
 from loguru import logger
 
@@ -27,6 +29,11 @@ if src_path not in sys.path:
 
 # 导入同步 KVM 客户端
 from sync_client import SyncKVMClient
+from monitoring.tracer import span, traced
+from engine.cancellation import check_cancelled
+from kvm.action_queue import (
+    KVMActionQueue, ActionQueueTimeout, QUEUE_BUSY, action_scope, current_owner, current_priority
+)
 
 
 @dataclass
@@ -44,6 +51,25 @@ class KVMInstance:
     lock: threading.Lock = field(default_factory=threading.Lock)
 
 
+def _arbitrated(action: str):
+    """发送接口装饰器：在该 KVM 的仲裁队列中独占执行
+
+    已处于同一 KVM 的动作序列中时直接执行（可重入）；排队超时返回 QUEUE_BUSY
+    （布尔值为假，但与发送失败区分）。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, ip, port, channel, *args, **kwargs):
+            try:
+                with self.action_sequence(ip, port, channel, name=action):
+                    return func(self, ip, port, channel, *args, **kwargs)
+            except ActionQueueTimeout as e:
+                logger.warning(str(e))
+                return QUEUE_BUSY
+        return wrapper
+    return decorator
+
+
 class KVMManager:
     """KVM 连接池管理器
     
@@ -77,6 +103,15 @@ class KVMManager:
         self._instances: Dict[str, KVMInstance] = {}
         self._global_lock = threading.Lock()
         
+        # KVM 输入仲裁队列（按 ip:port:channel）
+        from utils.config import get_config_manager
+        queue_config = get_config_manager().config.kvm_action_queue
+        self._action_queue_enabled = queue_config.enabled
+        self._action_queue_timeout = (
+            queue_config.max_wait_ms / 1000 if queue_config.max_wait_ms > 0 else None
+        )
+        self._action_queues: Dict[str, KVMActionQueue] = {}
+        
         logger.info("KVM 连接池管理器初始化完成（同步版本）")
     
     @staticmethod
@@ -84,6 +119,59 @@ class KVMManager:
         """生成唯一 key"""
         return f"{ip}:{port}:{channel}"
     
+    def _get_action_queue(self, key: str) -> KVMActionQueue:
+        """获取 KVM 的仲裁队列（不存在时创建）"""
+        queue = self._action_queues.get(key)
+        if queue is None:
+            with self._global_lock:
+                queue = self._action_queues.setdefault(key, KVMActionQueue(key))
+        return queue
+    
+    @contextmanager
+    def action_sequence(
+        self,
+        ip: str,
+        port: int,
+        channel: int,
+        owner: Optional[str] = None,
+        priority: Optional[str] = None,
+        name: str = ""
+    ) -> Iterator[None]:
+        """独占 KVM 执行一个动作序列
+        
+        序列内的所有发送接口调用不会与其他流程的动作交错。
+        
+        Args:
+            ip: KVM IP
+            port: 端口
+            channel: 通道
+            owner: 发起者（流程 ID），默认沿用外层序列或当前线程名
+            priority: 优先级 high / normal / low，默认沿用外层序列
+            name: 动作名称（日志和统计用）
+            
+        序列开始前检查当前节点的取消令牌：节点超时后不再发送任何输入。
+        
+        Raises:
+            ActionQueueTimeout: 排队超时
+            NodeCancelled: 当前节点已超时取消
+        """
+        if not self._action_queue_enabled:
+            check_cancelled()
+            yield
+            return
+        
+        queue = self._get_action_queue(self._generate_key(ip, port, channel))
+        with action_scope(owner or current_owner(), priority or current_priority()):
+            with queue.sequence(current_owner(), current_priority(), name, self._action_queue_timeout):
+                check_cancelled()
+                yield
+    
+    def get_action_queue_stats(self) -> List[Dict[str, Any]]:
+        """获取各 KVM 仲裁队列的统计信息"""
+        with self._global_lock:
+            queues = list(self._action_queues.values())
+        return [queue.get_stats() for queue in queues]
+    
     def get_or_create(
         self,
         ip: str,
@@ -199,6 +287,8 @@ class KVMManager:
                 logger.error(f"连接 KVM 异常: {e}", exc_info=True)
                 return None
     
+    @traced("kvm.send_mouse_click", "kvm")
+    @_arbitrated("mouse_click")
     def send_mouse_click(
         self,
         ip: str,
@@ -343,6 +433,8 @@ class KVMManager:
             logger.error(f"重连异常: {e}")
             return False
     
+    @traced("kvm.send_mouse_double_click", "kvm")
+    @_arbitrated("mouse_double_click")
     def send_mouse_double_click(
         self,
         ip: str,
@@ -433,6 +525,8 @@ class KVMManager:
             instance.connected = False
             return False
     
+    @traced("kvm.send_mouse_move", "kvm")
+    @_arbitrated("mouse_move")
     def send_mouse_move(
         self,
         ip: str,
@@ -483,6 +577,8 @@ class KVMManager:
             instance.connected = False
             return False
     
+    @traced("kvm.send_mouse_drag", "kvm")
+    @_arbitrated("mouse_drag")
     def send_mouse_drag(
         self,
         ip: str,
@@ -577,6 +673,8 @@ class KVMManager:
             instance.connected = False
             return False
     
+    @traced("kvm.send_key_input", "kvm")
+    @_arbitrated("key_input")
     def send_key_input(
         self,
         ip: str,
@@ -643,7 +741,11 @@ class KVMManager:
         if not instance or not instance.client:
             return None
         
-        return instance.client.get_latest_frame(timeout)
+        with span("kvm.get_latest_frame", "kvm") as trace_args:
+            frame = instance.client.get_latest_frame(timeout)
+            if trace_args is not None:
+                trace_args['frame_age_ms'] = self._frame_age_ms(instance)
+            return frame
     
     def wait_for_new_frame(
         self,
@@ -674,7 +776,20 @@ class KVMManager:
         if not instance or not instance.client:
             return None
         
-        return instance.client.wait_for_new_frame(timeout)
+        with span("kvm.wait_for_new_frame", "kvm") as trace_args:
+            frame = instance.client.wait_for_new_frame(timeout)
+            if trace_args is not None:
+                trace_args['frame_age_ms'] = self._frame_age_ms(instance)
+            return frame
+    
+    @staticmethod
+    def _frame_age_ms(instance: KVMInstance) -> Optional[float]:
+        """当前缓存帧距解码完成的时间（毫秒），用于追踪"""
+        try:
+            frame_time = instance.client.get_frame_info().get('frame_time', 0)
+            return (time.time() - frame_time) * 1000 if frame_time else None
+        except Exception:
+            return None
     
     def release(self, ip: str, port: int, channel: int = 0) -> None:
         """释放 KVM 连接
@@ -708,6 +823,56 @@ class KVMManager:
                 del self._instances[key]
                 logger.info(f"KVM 连接已释放: {key}")
     
+    # 按键映射（X11 keysym）
+    _KEY_MAP = {
+        "ENTER": 0xFF0D,
+        "ESC": 0xFF1B,
+        "TAB": 0xFF09,
+        "BACKSPACE": 0xFF08,
+        "DELETE": 0xFFFF,
+        "SPACE": 0x0020,
+        "UP": 0xFF52,
+        "DOWN": 0xFF54,
+        "LEFT": 0xFF51,
+        "RIGHT": 0xFF53,
+        "HOME": 0xFF50,
+        "END": 0xFF57,
+        "PAGEUP": 0xFF55,
+        "PAGEDOWN": 0xFF56,
+        "F1": 0xFFBE,
+        "F2": 0xFFBF,
+        "F3": 0xFFC0,
+        "F4": 0xFFC1,
+        "F5": 0xFFC2,
+        "F6": 0xFFC3,
+        "F7": 0xFFC4,
+        "F8": 0xFFC5,
+        "F9": 0xFFC6,
+        "F10": 0xFFC7,
+        "F11": 0xFFC8,
+        "F12": 0xFFC9,
+    }
+    
+    # 组合键修饰键
+    _MODIFIER_MAP = {
+        "CTRL": 0xFFE3,
+        "SHIFT": 0xFFE1,
+        "ALT": 0xFFE9,
+        "WIN": 0xFFEB,
+    }
+    
+    @classmethod
+    def _resolve_key_code(cls, key: str) -> int:
+        """按键名称转换为 keysym，未知按键返回 0"""
+        name = key.upper()
+        if name in cls._MODIFIER_MAP:
+            return cls._MODIFIER_MAP[name]
+        if name in cls._KEY_MAP:
+            return cls._KEY_MAP[name]
+        return ord(key[0]) if len(key) == 1 else 0
+    
+    @traced("kvm.send_key_press", "kvm")
+    @_arbitrated("key_press")
     def send_key_press(
         self,
         ip: str,
@@ -733,37 +898,7 @@ class KVMManager:
             logger.warning(f"KVM 未连接: {key_name}")
             return False
         
-        # 按键映射
-        key_map = {
-            "ENTER": 0xFF0D,
-            "ESC": 0xFF1B,
-            "TAB": 0xFF09,
-            "BACKSPACE": 0xFF08,
-            "DELETE": 0xFFFF,
-            "SPACE": 0x0020,
-            "UP": 0xFF52,
-            "DOWN": 0xFF54,
-            "LEFT": 0xFF51,
-            "RIGHT": 0xFF53,
-            "HOME": 0xFF50,
-            "END": 0xFF57,
-            "PAGEUP": 0xFF55,
-            "PAGEDOWN": 0xFF56,
-            "F1": 0xFFBE,
-            "F2": 0xFFBF,
-            "F3": 0xFFC0,
-            "F4": 0xFFC1,
-            "F5": 0xFFC2,
-            "F6": 0xFFC3,
-            "F7": 0xFFC4,
-            "F8": 0xFFC5,
-            "F9": 0xFFC6,
-            "F10": 0xFFC7,
-            "F11": 0xFFC8,
-            "F12": 0xFFC9,
-        }
-        
-        key_code = key_map.get(key.upper(), ord(key[0]) if len(key) == 1 else 0)
+        key_code = self._resolve_key_code(key)
         if key_code == 0:
             logger.warning(f"未知按键: {key}")
             return False
@@ -780,6 +915,60 @@ class KVMManager:
             logger.error(f"发送按键失败: {e}")
             return False
     
+    @traced("kvm.send_hotkey", "kvm")
+    @_arbitrated("hotkey")
+    def send_hotkey(
+        self,
+        ip: str,
+        port: int,
+        channel: int,
+        hotkey: str
+    ) -> bool:
+        """发送组合键（依次按下，逆序释放）
+        
+        Args:
+            ip: KVM IP
+            port: 端口
+            channel: 通道
+            hotkey: 组合键（如 "ctrl+c", "alt+tab"）
+            
+        Returns:
+            是否成功
+        """
+        key_name = self._generate_key(ip, port, channel)
+        instance = self._instances.get(key_name)
+        
+        if not instance or not instance.connected or not instance.client:
+            logger.warning(f"KVM 未连接: {key_name}")
+            return False
+        
+        key_codes = [self._resolve_key_code(k.strip()) for k in hotkey.split('+') if k.strip()]
+        if not key_codes or 0 in key_codes:
+            logger.warning(f"未知组合键: {hotkey}")
+            return False
+        
+        pressed: List[int] = []
+        try:
+            for key_code in key_codes:
+                instance.client.send_key_press(key_code)
+                pressed.append(key_code)
+                time.sleep(0.05)
+            logger.debug(f"组合键发送: {hotkey}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"发送组合键失败: {e}")
+            return False
+            
+        finally:
+            # 确保已按下的键全部释放，避免修饰键卡住
+            for key_code in reversed(pressed):
+                try:
+                    instance.client.send_key_release(key_code)
+                    time.sleep(0.02)
+                except Exception:
+                    pass
+    
     def get_frame(
         self,
         ip: str,
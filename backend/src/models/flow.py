@@ -45,6 +45,7 @@ class Flow(BaseModel):
     nodes: List[FlowNode] = Field(default_factory=list, description="节点列表")
     edges: List[FlowEdge] = Field(default_factory=list, description="连线列表")
     variables: Dict[str, Any] = Field(default_factory=dict, description="全局变量")
+    settings: Dict[str, Any] = Field(default_factory=dict, description="运行设置（如 loop_budget_ms 循环耗时预算）")
     created_at: str = Field(default_factory=lambda: datetime.now().isoformat(), description="创建时间")
     updated_at: str = Field(default_factory=lambda: datetime.now().isoformat(), description="更新时间")
     
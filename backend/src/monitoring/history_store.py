@@ -0,0 +1,521 @@
+"""执行历史存储
+
+按流程持久化每个节点、每轮循环的执行记录（SQLite），用于查询任意时间窗口内
+各节点的耗时分位数和失败率。
+
+- 写入经队列由后台线程批量提交，不阻塞流程执行
+- 流程/节点标识归并到 series 表，明细行只存整数 ID、时间、耗时与结果码
+- 每条记录写入时计算对数分桶编号，分位数查询在 SQL 中按桶聚合，
+  不需要把明细加载到内存（相对误差约 5%）
+- 超过明细保留期（或明细行数超过上限）的数据降采样为按时间段、按分桶的
+  汇总行；超过总保留期的汇总行删除
+- 多个工作进程可写同一数据库（WAL 模式）
+"""
+import math
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+
+# 结果码
+RESULT_OK = 0
+RESULT_FAILED = 1
+RESULT_TIMEOUT = 2
+RESULT_SKIPPED = 3
+# 循环成功完成，但有节点超时被跳过或超出循环预算（不计入失败率）
+RESULT_DEGRADED = 4
+
+RESULT_CODES = {
+    'ok': RESULT_OK,
+    'failed': RESULT_FAILED,
+    'timeout': RESULT_TIMEOUT,
+    'skipped': RESULT_SKIPPED,
+    'degraded': RESULT_DEGRADED,
+}
+
+# 循环耗时记录使用的节点 ID
+LOOP_NODE_ID = "__loop__"
+
+# 耗时对数分桶：下界 0.01ms，相邻桶比例 1.1
+_BIN_BASE = 1.1
+_BIN_MIN_MS = 0.01
+_LOG_BIN_BASE = math.log(_BIN_BASE)
+
+
+def duration_bin(duration_ms: float) -> int:
+    """耗时所属的对数分桶编号"""
+    if duration_ms <= _BIN_MIN_MS:
+        return 0
+    return int(math.log(duration_ms / _BIN_MIN_MS) / _LOG_BIN_BASE) + 1
+
+
+def bin_value(bin_id: int) -> float:
+    """分桶代表值（桶内几何中点，毫秒）"""
+    if bin_id <= 0:
+        return _BIN_MIN_MS
+    return _BIN_MIN_MS * _BIN_BASE ** (bin_id - 0.5)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    flow_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    node_type TEXT NOT NULL,
+    node_label TEXT,
+    UNIQUE (flow_id, node_id, node_type)
+);
+CREATE TABLE IF NOT EXISTS executions (
+    series_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    duration_ms REAL NOT NULL,
+    bin INTEGER NOT NULL,
+    result INTEGER NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_executions_series_ts ON executions (series_id, ts);
+CREATE INDEX IF NOT EXISTS idx_executions_ts ON executions (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    series_id INTEGER NOT NULL,
+    bucket_ts REAL NOT NULL,
+    bin INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    timeouts INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    degraded INTEGER NOT NULL DEFAULT 0,
+    sum_ms REAL NOT NULL,
+    max_ms REAL NOT NULL,
+    PRIMARY KEY (series_id, bucket_ts, bin)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_ts ON rollups (bucket_ts);
+"""
+
+
+class HistoryStore:
+    """执行历史存储
+
+    单例模式。记录接口只入队，由后台线程批量写入。
+    """
+
+    _instance: Optional['HistoryStore'] = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        """单例模式"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """初始化执行历史存储"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+
+        from utils.config import get_config_manager
+        config = get_config_manager().config.history
+
+        self.enabled = config.enabled
+        self.db_path = config.db_path
+        self.flush_interval = max(0.05, config.flush_interval)
+        self.batch_size = max(1, config.batch_size)
+        self.raw_retention = config.raw_retention_hours * 3600
+        self.rollup_bucket = max(1, config.rollup_bucket_seconds)
+        self.retention = config.retention_days * 86400
+        self.max_raw_rows = config.max_raw_rows
+        self.maintenance_interval = config.maintenance_interval
+
+        self._queue: 'queue.Queue[Tuple]' = queue.Queue(maxsize=config.max_queue)
+        self._series_cache: Dict[Tuple[str, str, str], int] = {}
+        self._dropped = 0
+        self._written = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self._schema_ready = False
+
+        logger.info(f"执行历史存储初始化完成: enabled={self.enabled}, db={self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接（首次连接时创建数据库和表）"""
+        if not self._schema_ready:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            conn.executescript(_SCHEMA)
+            # 旧版本数据库的汇总表没有 degraded 列
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(rollups)")}
+            if 'degraded' not in columns:
+                conn.execute("ALTER TABLE rollups ADD COLUMN degraded INTEGER NOT NULL DEFAULT 0")
+            self._schema_ready = True
+        return conn
+
+    def _ensure_started(self) -> None:
+        """按需启动后台写入线程"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._writer_loop, name="HistoryWriter", daemon=True
+                )
+                self._thread.start()
+
+    # ==================== 记录 ====================
+
+    def record_node(self, flow_id: str, node_id: str, node_type: str, node_label: str,
+                    start_ts: float, duration_ms: float, status: str = 'ok',
+                    error: Optional[str] = None) -> None:
+        """记录一次节点执行
+
+        Args:
+            flow_id: 流程 ID
+            node_id: 节点 ID
+            node_type: 节点类型
+            node_label: 节点名称
+            start_ts: 开始时间（time.time）
+            duration_ms: 耗时（毫秒）
+            status: 结果: ok / failed / timeout / skipped
+            error: 错误信息
+        """
+        if not self.enabled or not flow_id:
+            return
+        self._enqueue((flow_id, node_id, node_type, node_label, start_ts,
+                       duration_ms, RESULT_CODES.get(status, RESULT_FAILED), error))
+
+    def record_loop(self, flow_id: str, start_ts: float, duration_ms: float,
+                    success: bool, degraded: bool = False) -> None:
+        """记录一轮循环（作为 node_id 为 __loop__ 的序列存储）
+
+        降级但成功完成的循环单独计数，不计入失败率。
+        """
+        if not self.enabled or not flow_id:
+            return
+        if not success:
+            result = RESULT_FAILED
+        elif degraded:
+            result = RESULT_DEGRADED
+        else:
+            result = RESULT_OK
+        self._enqueue((flow_id, LOOP_NODE_ID, LOOP_NODE_ID, "循环", start_ts,
+                       duration_ms, result, None))
+
+    def _enqueue(self, row: Tuple) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # 写入跟不上时丢弃，不阻塞流程执行
+            self._dropped += 1
+
+    # ==================== 后台写入 ====================
+
+    def _writer_loop(self) -> None:
+        conn = self._connect()
+        last_maintenance = 0.0
+        while not self._stop_event.is_set():
+            rows = self._drain(self.flush_interval)
+            if rows:
+                try:
+                    self._write_rows(conn, rows)
+                except Exception as e:
+                    logger.error(f"写入执行历史失败: {e}")
+
+            if time.time() - last_maintenance >= self.maintenance_interval:
+                last_maintenance = time.time()
+                try:
+                    self._maintain(conn)
+                except Exception as e:
+                    logger.error(f"执行历史降采样失败: {e}")
+
+        # 写入剩余记录
+        rows = self._drain(0)
+        while rows:
+            self._write_rows(conn, rows)
+            rows = self._drain(0)
+        conn.close()
+
+    def _drain(self, timeout: float) -> List[Tuple]:
+        """等待并取出一批记录"""
+        rows = []
+        try:
+            rows.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+        except queue.Empty:
+            return rows
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _series_id(self, conn: sqlite3.Connection, flow_id: str, node_id: str,
+                   node_type: str, node_label: str) -> int:
+        key = (flow_id, node_id, node_type)
+        series_id = self._series_cache.get(key)
+        if series_id is None:
+            conn.execute(
+                "INSERT OR IGNORE INTO series (flow_id, node_id, node_type, node_label) VALUES (?, ?, ?, ?)",
+                (flow_id, node_id, node_type, node_label)
+            )
+            series_id = conn.execute(
+                "SELECT id FROM series WHERE flow_id = ? AND node_id = ? AND node_type = ?", key
+            ).fetchone()[0]
+            self._series_cache[key] = series_id
+        return series_id
+
+    def _write_rows(self, conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+        with conn:
+            values = [
+                (self._series_id(conn, flow_id, node_id, node_type, label),
+                 ts, duration_ms, duration_bin(duration_ms), result, error)
+                for flow_id, node_id, node_type, label, ts, duration_ms, result, error in rows
+            ]
+            conn.executemany(
+                "INSERT INTO executions (series_id, ts, duration_ms, bin, result, error) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                values
+            )
+        self._written += len(values)
+
+    def _maintain(self, conn: sqlite3.Connection) -> None:
+        """降采样旧明细、删除过期汇总"""
+        now = time.time()
+        cutoff = now - self.raw_retention
+
+        # 明细行数超限时提前降采样最旧的部分
+        if self.max_raw_rows > 0:
+            count = conn.execute("SELECT COUNT(*) FROM executions").fetchone()[0]
+            if count > self.max_raw_rows:
+                row = conn.execute(
+                    "SELECT ts FROM executions ORDER BY ts LIMIT 1 OFFSET ?",
+                    (count - self.max_raw_rows,)
+                ).fetchone()
+                if row is not None:
+                    cutoff = max(cutoff, row[0])
+
+        # 以汇总时间段边界截断，保证同一时间段只汇总一次
+        cutoff = math.floor(cutoff / self.rollup_bucket) * self.rollup_bucket
+        bucket = self.rollup_bucket
+
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO rollups (series_id, bucket_ts, bin, count, failures, timeouts,
+                                     skipped, degraded, sum_ms, max_ms)
+                SELECT series_id, CAST(ts / ? AS INTEGER) * ?, bin, COUNT(*),
+                       SUM(result = 1), SUM(result = 2), SUM(result = 3), SUM(result = 4),
+                       SUM(duration_ms), MAX(duration_ms)
+                FROM executions WHERE ts < ?
+                GROUP BY series_id, CAST(ts / ? AS INTEGER), bin
+                ON CONFLICT (series_id, bucket_ts, bin) DO UPDATE SET
+                    count = count + excluded.count,
+                    failures = failures + excluded.failures,
+                    timeouts = timeouts + excluded.timeouts,
+                    skipped = skipped + excluded.skipped,
+                    degraded = degraded + excluded.degraded,
+                    sum_ms = sum_ms + excluded.sum_ms,
+                    max_ms = MAX(max_ms, excluded.max_ms)
+                """,
+                (bucket, bucket, cutoff, bucket)
+            )
+            rolled = conn.execute("DELETE FROM executions WHERE ts < ?", (cutoff,)).rowcount
+            expired = conn.execute(
+                "DELETE FROM rollups WHERE bucket_ts < ?", (now - self.retention,)
+            ).rowcount
+
+        if rolled or expired:
+            logger.info(f"执行历史降采样: 汇总明细 {rolled} 条, 删除过期汇总 {expired} 条")
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """等待队列中的记录写入完成"""
+        deadline = time.time() + timeout
+        while not self._queue.empty() and time.time() < deadline:
+            time.sleep(0.01)
+
+    def shutdown(self) -> None:
+        """停止后台写入线程（写入剩余记录）"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+    # ==================== 查询 ====================
+
+    def query_node_stats(self, flow_id: str, start_ts: Optional[float] = None,
+                         end_ts: Optional[float] = None,
+                         node_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """查询时间窗口内各节点的耗时分位数和失败率
+
+        明细与汇总数据在 SQL 中按耗时分桶聚合，结果规模与分桶数成正比。
+
+        Args:
+            flow_id: 流程 ID
+            start_ts: 窗口开始时间（time.time），None 表示不限
+            end_ts: 窗口结束时间，None 表示当前
+            node_id: 只查询指定节点（循环耗时使用 __loop__）
+
+        Returns:
+            每个节点的统计: count, failures, timeouts, skipped, degraded, failure_rate,
+            mean_ms, max_ms, p50_ms, p90_ms, p95_ms, p99_ms
+        """
+        if not self.enabled:
+            return []
+
+        start_ts = start_ts if start_ts is not None else 0.0
+        end_ts = end_ts if end_ts is not None else time.time()
+
+        series_sql = "SELECT id, node_id, node_type, node_label FROM series WHERE flow_id = ?"
+        series_args: List[Any] = [flow_id]
+        if node_id is not None:
+            series_sql += " AND node_id = ?"
+            series_args.append(node_id)
+
+        conn = self._connect()
+        try:
+            series = {row[0]: row[1:] for row in conn.execute(series_sql, series_args)}
+            if not series:
+                return []
+
+            placeholders = ",".join("?" * len(series))
+            ids = list(series.keys())
+            rows = conn.execute(
+                f"""
+                SELECT series_id, bin, SUM(count), SUM(failures), SUM(timeouts),
+                       SUM(skipped), SUM(degraded), SUM(sum_ms), MAX(max_ms)
+                FROM (
+                    SELECT series_id, bin, COUNT(*) AS count,
+                           SUM(result = 1) AS failures, SUM(result = 2) AS timeouts,
+                           SUM(result = 3) AS skipped, SUM(result = 4) AS degraded,
+                           SUM(duration_ms) AS sum_ms, MAX(duration_ms) AS max_ms
+                    FROM executions
+                    WHERE series_id IN ({placeholders}) AND ts >= ? AND ts <= ?
+                    GROUP BY series_id, bin
+                    UNION ALL
+                    SELECT series_id, bin, count, failures, timeouts, skipped, degraded, sum_ms, max_ms
+                    FROM rollups
+                    WHERE series_id IN ({placeholders}) AND bucket_ts >= ? AND bucket_ts <= ?
+                )
+                GROUP BY series_id, bin
+                ORDER BY series_id, bin
+                """,
+                ids + [start_ts, end_ts] + ids + [start_ts, end_ts]
+            ).fetchall()
+        finally:
+            conn.close()
+
+        histograms: Dict[int, List[Tuple]] = {}
+        for row in rows:
+            histograms.setdefault(row[0], []).append(row[1:])
+
+        results = []
+        for series_id, bins in histograms.items():
+            node, node_type, label = series[series_id]
+            results.append({
+                'node_id': node,
+                'node_type': node_type,
+                'node_label': label,
+                **self._summarize(bins)
+            })
+        return results
+
+    @staticmethod
+    def _summarize(bins: List[Tuple]) -> Dict[str, Any]:
+        """由分桶直方图计算统计值
+
+        Args:
+            bins: [(bin, count, failures, timeouts, skipped, degraded, sum_ms, max_ms), ...]，按 bin 升序
+        """
+        count = sum(b[1] for b in bins)
+        failures = sum(b[2] for b in bins)
+        timeouts = sum(b[3] for b in bins)
+        skipped = sum(b[4] for b in bins)
+        degraded = sum(b[5] for b in bins)
+        max_ms = max(b[7] for b in bins)
+
+        percentiles = {}
+        for name, q in (('p50_ms', 0.5), ('p90_ms', 0.9), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            target = q * count
+            cumulative = 0
+            value = max_ms
+            for b in bins:
+                cumulative += b[1]
+                if cumulative >= target:
+                    value = min(bin_value(b[0]), max_ms)
+                    break
+            percentiles[name] = round(value, 3)
+
+        return {
+            'count': count,
+            'failures': failures,
+            'timeouts': timeouts,
+            'skipped': skipped,
+            'degraded': degraded,
+            'failure_rate': round((failures + timeouts) / count, 4) if count else 0.0,
+            'mean_ms': round(sum(b[6] for b in bins) / count, 3) if count else 0.0,
+            'max_ms': round(max_ms, 3),
+            **percentiles
+        }
+
+    def get_recent_errors(self, flow_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """查询流程最近的失败记录（仅明细数据）"""
+        if not self.enabled:
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                """
+                SELECT s.node_id, s.node_type, s.node_label, e.ts, e.duration_ms, e.result, e.error
+                FROM executions e JOIN series s ON s.id = e.series_id
+                WHERE s.flow_id = ? AND e.result IN (1, 2)
+                ORDER BY e.ts DESC LIMIT ?
+                """,
+                (flow_id, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        names = {v: k for k, v in RESULT_CODES.items()}
+        return [
+            {
+                'node_id': row[0], 'node_type': row[1], 'node_label': row[2],
+                'timestamp': row[3], 'duration_ms': round(row[4], 3),
+                'status': names.get(row[5], 'failed'), 'error': row[6]
+            }
+            for row in rows
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储状态"""
+        stats = {
+            'enabled': self.enabled,
+            'db_path': self.db_path,
+            'queued': self._queue.qsize(),
+            'written': self._written,
+            'dropped': self._dropped,
+        }
+        if self.enabled:
+            conn = self._connect()
+            try:
+                stats['raw_rows'] = conn.execute("SELECT COUNT(*) FROM executions").fetchone()[0]
+                stats['rollup_rows'] = conn.execute("SELECT COUNT(*) FROM rollups").fetchone()[0]
+            finally:
+                conn.close()
+        return stats
+
+
+def get_history_store() -> HistoryStore:
+    """获取执行历史存储单例"""
+    return HistoryStore()
@@ -67,6 +67,16 @@ class MetricsCollector:
             'ocr_errors_total',
             'OCR 识别错误总数'
         )
+        self.ocr_reprocessed_ratio = Histogram(
+            'ocr_reprocessed_ratio',
+            '增量 OCR 每帧重新处理的画面比例',
+            buckets=(0.0, 0.01, 0.02, 0.05, 0.1, 0.2, 0.35, 0.5, 1.0)
+        )
+        self.ocr_rec_cache_requests_total = Counter(
+            'ocr_rec_cache_requests_total',
+            '文本识别结果缓存查询总数（按裁剪图像计）',
+            ['result']
+        )
         
         # 键鼠 API 调用指标
         self.kvm_api_calls_total = Counter(
@@ -108,6 +118,109 @@ class MetricsCollector:
             buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)
         )
         
+        # 节点执行线程池指标
+        self.executor_queue_depth = Gauge(
+            'executor_queue_depth',
+            '线程池排队任务数',
+            ['pool']
+        )
+        self.executor_active_workers = Gauge(
+            'executor_active_workers',
+            '线程池执行中任务数',
+            ['pool']
+        )
+        self.executor_wait_duration = Histogram(
+            'executor_wait_duration_seconds',
+            '任务在线程池中的排队等待耗时（秒）',
+            ['pool'],
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+        )
+        self.flow_admission_delay = Histogram(
+            'flow_admission_delay_seconds',
+            '推理池饱和导致的循环启动延迟（秒）',
+            buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+        )
+        
+        # 节点结果缓存指标
+        self.result_cache_requests_total = Counter(
+            'result_cache_requests_total',
+            '节点结果缓存查询总数',
+            ['node_type', 'result']
+        )
+        self.result_cache_memory_bytes = Gauge(
+            'result_cache_memory_bytes',
+            '节点结果缓存占用内存（字节）'
+        )
+        self.result_cache_entries = Gauge(
+            'result_cache_entries',
+            '节点结果缓存条目数'
+        )
+        
+        # 节点超时与循环预算指标
+        self.node_timeouts_total = Counter(
+            'node_timeouts_total',
+            '节点超时总数',
+            ['node_type', 'reason']
+        )
+        self.flow_degraded_loops_total = Counter(
+            'flow_degraded_loops_total',
+            '因超时或超出预算而降级的循环总数'
+        )
+        
+        # 模型注册表指标
+        self.model_acquire_total = Counter(
+            'model_acquire_total',
+            '模型获取总数',
+            ['kind', 'result']
+        )
+        self.model_registry_models = Gauge(
+            'model_registry_models',
+            '已加载模型数',
+            ['state']
+        )
+        self.model_registry_memory_bytes = Gauge(
+            'model_registry_memory_bytes',
+            '已加载模型估算内存（字节）'
+        )
+        
+        # 推理批处理指标
+        self.inference_batch_size = Histogram(
+            'inference_batch_size',
+            '推理批大小',
+            ['kind'],
+            buckets=(1, 2, 3, 4, 6, 8, 12, 16)
+        )
+        self.inference_queue_delay = Histogram(
+            'inference_queue_delay_seconds',
+            '推理请求组批排队时间（秒）',
+            ['kind'],
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+        )
+        
+        self.kvm_action_wait = Histogram(
+            'kvm_action_wait_seconds',
+            'KVM 动作序列排队时间（秒）',
+            ['priority'],
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+        )
+        self.kvm_action_queue_depth = Gauge(
+            'kvm_action_queue_depth',
+            '排队等待执行的 KVM 动作序列数',
+            ['kvm']
+        )
+        
+        self.flow_swap_duration = Histogram(
+            'flow_swap_duration_seconds',
+            '流程热更新切换耗时（秒）',
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+        )
+        
+        self.pipeline_prefetch_total = Counter(
+            'pipeline_prefetch_total',
+            '流水线模式预取感知结果次数',
+            ['result']
+        )
+        
         logger.info("监控指标收集器已初始化")
     
     def update_rtsp_metrics(self, metrics: Dict[str, Any]) -> None:
@@ -151,6 +264,26 @@ class MetricsCollector:
         """记录 OCR 识别错误"""
         self.ocr_errors_total.inc()
     
+    def record_ocr_reprocessed(self, ratio: float) -> None:
+        """记录增量 OCR 重新处理的画面比例
+        
+        Args:
+            ratio: 重新处理的面积 / 画面面积（整帧识别为 1.0）
+        """
+        self.ocr_reprocessed_ratio.observe(ratio)
+    
+    def record_rec_cache(self, hits: int, misses: int) -> None:
+        """记录文本识别结果缓存查询
+        
+        Args:
+            hits: 命中的裁剪图像数
+            misses: 未命中的裁剪图像数
+        """
+        if hits:
+            self.ocr_rec_cache_requests_total.labels(result='hit').inc(hits)
+        if misses:
+            self.ocr_rec_cache_requests_total.labels(result='miss').inc(misses)
+    
     def record_kvm_api_call(
         self,
         action: str,
@@ -190,6 +323,142 @@ class MetricsCollector:
         """
         self.rule_triggers_total.labels(rule_name=rule_name).inc()
         self.rule_execution_duration.observe(duration)
+    
+    def record_executor_task(self, pool: str, wait_time: float) -> None:
+        """记录线程池任务排队等待
+        
+        Args:
+            pool: 线程池名称
+            wait_time: 排队等待耗时（秒）
+        """
+        self.executor_wait_duration.labels(pool=pool).observe(wait_time)
+    
+    def update_executor_pool(self, pool: str, queue_depth: int, active: int) -> None:
+        """更新线程池排队深度和执行中任务数
+        
+        Args:
+            pool: 线程池名称
+            queue_depth: 排队任务数
+            active: 执行中任务数
+        """
+        self.executor_queue_depth.labels(pool=pool).set(queue_depth)
+        self.executor_active_workers.labels(pool=pool).set(active)
+    
+    def record_admission_delay(self, delay: float) -> None:
+        """记录准入控制导致的循环启动延迟
+        
+        Args:
+            delay: 延迟时间（秒）
+        """
+        self.flow_admission_delay.observe(delay)
+    
+    def record_result_cache(self, node_type: str, hit: bool) -> None:
+        """记录节点结果缓存查询
+        
+        Args:
+            node_type: 节点类型
+            hit: 是否命中
+        """
+        self.result_cache_requests_total.labels(
+            node_type=node_type,
+            result='hit' if hit else 'miss'
+        ).inc()
+    
+    def update_result_cache(self, entries: int, memory_bytes: int) -> None:
+        """更新节点结果缓存占用
+        
+        Args:
+            entries: 条目数
+            memory_bytes: 占用内存（字节）
+        """
+        self.result_cache_entries.set(entries)
+        self.result_cache_memory_bytes.set(memory_bytes)
+    
+    def record_node_timeout(self, node_type: str, reason: str) -> None:
+        """记录节点超时
+        
+        Args:
+            node_type: 节点类型
+            reason: 超时原因: node / budget / busy
+        """
+        self.node_timeouts_total.labels(node_type=node_type, reason=reason).inc()
+    
+    def record_degraded_loop(self) -> None:
+        """记录降级循环"""
+        self.flow_degraded_loops_total.inc()
+    
+    def record_model_acquire(self, kind: str, hit: bool) -> None:
+        """记录模型获取
+        
+        Args:
+            kind: 模型类型: yolo / ocr
+            hit: 是否复用已加载的模型
+        """
+        self.model_acquire_total.labels(kind=kind, result='hit' if hit else 'load').inc()
+    
+    def update_model_registry(self, active: int, idle: int, memory_bytes: int) -> None:
+        """更新模型注册表状态
+        
+        Args:
+            active: 使用中的模型数
+            idle: 空闲模型数
+            memory_bytes: 估算内存（字节）
+        """
+        self.model_registry_models.labels(state='active').set(active)
+        self.model_registry_models.labels(state='idle').set(idle)
+        self.model_registry_memory_bytes.set(memory_bytes)
+    
+    def record_inference_batch(self, kind: str, batch_size: int) -> None:
+        """记录推理批大小
+        
+        Args:
+            kind: 模型类型: yolo / ocr
+            batch_size: 批大小
+        """
+        self.inference_batch_size.labels(kind=kind).observe(batch_size)
+    
+    def record_inference_queue_delay(self, kind: str, delay: float) -> None:
+        """记录推理请求组批排队时间
+        
+        Args:
+            kind: 模型类型: yolo / ocr
+            delay: 排队时间（秒）
+        """
+        self.inference_queue_delay.labels(kind=kind).observe(delay)
+    
+    def record_kvm_action_wait(self, priority: str, wait: float) -> None:
+        """记录 KVM 动作序列排队时间
+        
+        Args:
+            priority: 优先级: high / normal / low
+            wait: 排队时间（秒）
+        """
+        self.kvm_action_wait.labels(priority=priority).observe(wait)
+    
+    def update_kvm_action_queue(self, kvm: str, depth: int) -> None:
+        """更新 KVM 动作排队数
+        
+        Args:
+            kvm: KVM 标识（ip:port:channel）
+            depth: 排队数
+        """
+        self.kvm_action_queue_depth.labels(kvm=kvm).set(depth)
+    
+    def record_flow_swap(self, duration: float) -> None:
+        """记录流程热更新切换耗时
+        
+        Args:
+            duration: 切换耗时（秒）
+        """
+        self.flow_swap_duration.observe(duration)
+    
+    def record_pipeline_prefetch(self, result: str) -> None:
+        """记录流水线模式预取结果
+        
+        Args:
+            result: hit（直接使用）/ stale（画面采集后发生了输入，重新感知）
+        """
+        self.pipeline_prefetch_total.labels(result=result).inc()
 
 
 # 全局指标收集器实例
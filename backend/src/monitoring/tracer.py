@@ -0,0 +1,222 @@
+"""轻量级分段追踪模块
+
+按流程循环记录嵌套的耗时分段（span），用于分析一轮循环的时间分布
+（等帧、预处理、推理各阶段、KVM 发送等）。
+
+- 追踪上下文通过 contextvars 传递，线程池任务会复制当前上下文
+- 按采样率决定每轮循环是否记录，未采样时 span() 几乎无开销
+- 每个流程保留最近 N 轮的记录，可导出为 Chrome trace-event JSON
+  （chrome://tracing 或 Perfetto 直接打开）
+"""
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+from loguru import logger
+
+
+class LoopTrace:
+    """单轮循环的追踪记录"""
+
+    __slots__ = ('flow_id', 'loop_count', 'start_time', 'events')
+
+    def __init__(self, flow_id: str, loop_count: int):
+        self.flow_id = flow_id
+        self.loop_count = loop_count
+        self.start_time = time.time()
+        self.events: List[Dict[str, Any]] = []
+
+    def add_span(self, name: str, category: str, start: float, duration: float,
+                 args: Optional[Dict[str, Any]] = None) -> None:
+        """添加一个已完成的 span（时间单位：秒，time.time 时间基准）"""
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': duration * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        # list.append 在 CPython 中是原子操作，多线程追加无需加锁
+        self.events.append(event)
+
+
+# 当前追踪的循环（None 表示未采样）
+_current_trace: 'contextvars.ContextVar[Optional[LoopTrace]]' = contextvars.ContextVar(
+    'current_trace', default=None
+)
+
+
+def current_trace() -> Optional[LoopTrace]:
+    """获取当前上下文中的循环追踪记录"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, category: str = "node", **args) -> Iterator[Optional[Dict[str, Any]]]:
+    """记录一个耗时分段
+
+    用法:
+        with span("ocr.det", "ocr", boxes=3) as s:
+            ...
+            if s is not None:
+                s['boxes'] = len(boxes)
+
+    Args:
+        name: 分段名称
+        category: 分类（executor / node / ocr / yolo / kvm 等）
+        **args: 附加参数
+
+    Yields:
+        附加参数字典（未采样时为 None），可在分段内补充参数
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    start = time.time()
+    try:
+        yield args
+    finally:
+        trace.add_span(name, category, start, time.time() - start, args)
+
+
+def traced(name: str, category: str) -> Callable:
+    """函数追踪装饰器，将整个函数调用记录为一个 span"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Tracer:
+    """分段追踪管理器
+
+    单例模式，管理采样和各流程最近 N 轮的追踪记录。
+    """
+
+    _instance: Optional['Tracer'] = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        """单例模式"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """初始化追踪管理器"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+
+        from utils.config import get_config_manager
+        config = get_config_manager().config.tracing
+
+        self.enabled = config.enabled
+        self.sample_rate = max(0.0, min(1.0, config.sample_rate))
+        self.max_loops = max(1, config.max_loops)
+
+        # flow_id -> 最近 N 轮追踪记录
+        self._traces: Dict[str, Deque[LoopTrace]] = {}
+        self._data_lock = threading.Lock()
+
+        logger.info(f"分段追踪初始化完成: enabled={self.enabled}, "
+                    f"sample_rate={self.sample_rate}, max_loops={self.max_loops}")
+
+    def start_loop(self, flow_id: str, loop_count: int) -> Optional[LoopTrace]:
+        """开始一轮循环的追踪（按采样率决定是否记录）
+
+        Returns:
+            追踪记录，未采样返回 None
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            _current_trace.set(None)
+            return None
+
+        trace = LoopTrace(flow_id, loop_count)
+        _current_trace.set(trace)
+        return trace
+
+    def end_loop(self, trace: Optional[LoopTrace]) -> None:
+        """结束一轮循环的追踪，保存到最近 N 轮记录中"""
+        _current_trace.set(None)
+        if trace is None:
+            return
+
+        with self._data_lock:
+            traces = self._traces.get(trace.flow_id)
+            if traces is None:
+                traces = self._traces[trace.flow_id] = deque(maxlen=self.max_loops)
+            traces.append(trace)
+
+    def export_chrome_trace(self, flow_id: str) -> Dict[str, Any]:
+        """导出流程最近 N 轮的 Chrome trace-event JSON
+
+        Args:
+            flow_id: 流程 ID
+
+        Returns:
+            {"traceEvents": [...], "displayTimeUnit": "ms", "otherData": {...}}
+        """
+        with self._data_lock:
+            traces = list(self._traces.get(flow_id, ()))
+
+        events: List[Dict[str, Any]] = []
+        thread_ids = set()
+        for trace in traces:
+            for event in list(trace.events):
+                events.append(event)
+                thread_ids.add((event['pid'], event['tid']))
+
+        # 线程名称元数据
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for pid, tid in thread_ids:
+            events.append({
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': pid,
+                'tid': tid,
+                'args': {'name': names.get(tid, str(tid))}
+            })
+
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'flow_id': flow_id,
+                'loops': [t.loop_count for t in traces],
+                'sample_rate': self.sample_rate
+            }
+        }
+
+    def clear(self, flow_id: Optional[str] = None) -> None:
+        """清除追踪记录"""
+        with self._data_lock:
+            if flow_id is None:
+                self._traces.clear()
+            else:
+                self._traces.pop(flow_id, None)
+
+
+def get_tracer() -> Tracer:
+    """获取分段追踪管理器单例"""
+    return Tracer()
@@ -52,10 +52,17 @@ def get_all_node_configs() -> List:
     """
     _ensure_imports()
     
+    from .base import COMMON_EXECUTION_PROPERTIES
+    
     configs = []
     for node_class in NODE_REGISTRY.values():
         try:
             config = node_class.get_config()
+            # 追加通用执行控制属性（超时、可选）
+            existing_keys = {prop.key for prop in config.properties}
+            for prop in COMMON_EXECUTION_PROPERTIES:
+                if prop.key not in existing_keys:
+                    config.properties.append(prop.model_copy())
             configs.append(config)
         except Exception as e:
             logger.error(f"获取节点配置失败 {node_class.__name__}: {e}")
@@ -3,14 +3,29 @@
 包含鼠标操作、键盘操作、等待等动作节点。
 使用 KVM 连接池进行鼠标和键盘操作。
 """
-import re
-import time
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Set, Tuple
 from loguru import logger
 
-from nodes.base import BaseNode, NodeConfig, NodePropertyDef
+from nodes.base import BaseNode, NodeConfig, NodePropertyDef, NodeSkipped
 from nodes import register_node
 from api.sse_service import send_debug
+from engine.cancellation import cancellable_sleep
+from ocr.result_set import OCRResultSet, parse_region, result_center
+
+
+# 动作优先级（多个流程共享同一 KVM 时按优先级排队执行）
+_PRIORITY_PROPERTY = NodePropertyDef(
+    key="priority",
+    label="动作优先级",
+    type="select",
+    default="normal",
+    options=[
+        {"label": "高", "value": "high"},
+        {"label": "普通", "value": "normal"},
+        {"label": "低", "value": "low"}
+    ],
+    group="执行控制"
+)
 
 
 def _get_kvm_config(context: Any) -> Optional[Dict[str, Any]]:
@@ -23,14 +38,16 @@ def _get_kvm_config(context: Any) -> Optional[Dict[str, Any]]:
 def _find_text_position(
     ocr_results: list, 
     target_text: str, 
-    match_mode: str = "contains"
+    match_mode: str = "contains",
+    properties: Optional[Dict[str, Any]] = None
 ) -> Optional[Tuple[int, int]]:
     """在 OCR 结果中查找指定文本的位置
     
     Args:
-        ocr_results: OCR 结果列表
+        ocr_results: OCR 结果列表（OCRResultSet 时复用其索引）
         target_text: 目标文本或正则表达式
-        match_mode: 匹配模式 ("contains" | "exact" | "regex")
+        match_mode: 匹配模式 ("contains" | "exact" | "regex" | "fuzzy")
+        properties: 节点属性，读取模糊匹配距离、查找区域和参照文本
         
     Returns:
         (x, y) 中心坐标，未找到返回 None
@@ -41,52 +58,23 @@ def _find_text_position(
     
     logger.debug(f"_find_text_position: 查找 '{target_text}' (模式={match_mode}), OCR结果数={len(ocr_results)}")
     
-    # 编译正则表达式（如果是正则模式）
-    regex_pattern = None
-    if match_mode == "regex":
-        try:
-            regex_pattern = re.compile(target_text)
-        except re.error as e:
-            logger.error(f"正则表达式语法错误: {target_text}, 错误: {e}")
-            return None
-    
-    for result in ocr_results:
-        text = result.get('text', '')
-        
-        # 根据匹配模式判断
-        matched = False
-        if match_mode == "exact":
-            matched = (text == target_text)
-        elif match_mode == "regex":
-            matched = (regex_pattern and regex_pattern.search(text) is not None)
-        else:  # contains
-            matched = (target_text in text)
-        
-        if matched:
-            logger.debug(f"_find_text_position: 匹配成功 '{target_text}' in '{text}'")
-            # 获取中心坐标
-            center = result.get('center')
-            if center:
-                logger.debug(f"_find_text_position: 使用 center={center}")
-                return (int(center[0]), int(center[1]))
-            
-            # 从 bbox 计算中心
-            bbox = result.get('bbox')
-            if bbox and len(bbox) >= 4:
-                # bbox 格式: [[x1,y1], [x2,y2], [x3,y3], [x4,y4]] 或 [x, y, w, h]
-                if isinstance(bbox[0], list):
-                    x_coords = [p[0] for p in bbox]
-                    y_coords = [p[1] for p in bbox]
-                    cx = sum(x_coords) / len(x_coords)
-                    cy = sum(y_coords) / len(y_coords)
-                else:
-                    cx = bbox[0] + bbox[2] / 2
-                    cy = bbox[1] + bbox[3] / 2
-                logger.debug(f"_find_text_position: 从 bbox 计算 center=({cx}, {cy})")
-                return (int(cx), int(cy))
+    properties = properties or {}
+    result = OCRResultSet.wrap(ocr_results).find(
+        target_text,
+        match_mode,
+        max_distance=int(properties.get('fuzzy_distance', 1)),
+        region=parse_region(properties.get('search_region')),
+        anchor=properties.get('anchor_text') or None,
+        direction=properties.get('anchor_direction') or 'right',
+        normalize=bool(properties.get('normalize_text', False))
+    )
+    if result is None:
+        logger.debug(f"_find_text_position: 未找到 '{target_text}'")
+        return None
     
-    logger.debug(f"_find_text_position: 未找到 '{target_text}'")
-    return None
+    center = result_center(result)
+    logger.debug(f"_find_text_position: 匹配成功 '{target_text}' in '{result.get('text', '')}', center={center}")
+    return center
 
 
 @register_node
@@ -99,6 +87,21 @@ class MouseActionNode(BaseNode):
     - 使用固定坐标
     """
     
+    side_effects = True
+    sends_input = True
+    produces = ()
+    
+    @classmethod
+    def get_dataflow(cls, properties: Dict[str, Any]) -> Tuple[Set[str], Set[str]]:
+        """按位置模式确定读取的识别结果"""
+        consumes = {'kvm_config'}
+        position_mode = properties.get('position_mode', 'ocr_match')
+        if position_mode == 'ocr_match':
+            consumes.add('ocr_results')
+        elif position_mode == 'detection':
+            consumes.add('detection_results')
+        return set(), consumes
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -162,9 +165,59 @@ class MouseActionNode(BaseNode):
                     options=[
                         {"label": "包含", "value": "contains"},
                         {"label": "精确匹配", "value": "exact"},
-                        {"label": "正则表达式", "value": "regex"}
+                        {"label": "正则表达式", "value": "regex"},
+                        {"label": "模糊匹配", "value": "fuzzy"}
                     ],
-                    description="包含: 文本包含目标即匹配; 精确: 完全一致; 正则: 使用正则表达式 (如 下.*步)",
+                    description="包含: 文本包含目标即匹配; 精确: 完全一致; 正则: 使用正则表达式 (如 下.*步); "
+                                "模糊: 允许少量识别错误",
+                    depends_on="position_mode",
+                    depends_value="ocr_match"
+                ),
+                NodePropertyDef(
+                    key="normalize_text",
+                    label="忽略全半角/大小写/空格",
+                    type="boolean",
+                    default=False,
+                    description="包含、精确、模糊匹配及参照文本比较前统一全半角、大小写并去除空格（如 OK 与 ｏｋ 视为相同）",
+                    depends_on="position_mode",
+                    depends_value="ocr_match"
+                ),
+                NodePropertyDef(
+                    key="fuzzy_distance",
+                    label="允许错误字数",
+                    type="number",
+                    default=1,
+                    description="模糊匹配允许的最大编辑距离（最多为目标文本长度减 1 的一半）",
+                    depends_on="match_mode",
+                    depends_value="fuzzy"
+                ),
+                NodePropertyDef(
+                    key="anchor_text",
+                    label="参照文本",
+                    type="text",
+                    placeholder="可选，只在该文本指定方向查找（目标文本留空表示任意文本）",
+                    depends_on="position_mode",
+                    depends_value="ocr_match"
+                ),
+                NodePropertyDef(
+                    key="anchor_direction",
+                    label="参照方向",
+                    type="select",
+                    default="right",
+                    options=[
+                        {"label": "右侧", "value": "right"},
+                        {"label": "左侧", "value": "left"},
+                        {"label": "下方", "value": "below"},
+                        {"label": "上方", "value": "above"}
+                    ],
+                    depends_on="position_mode",
+                    depends_value="ocr_match"
+                ),
+                NodePropertyDef(
+                    key="search_region",
+                    label="查找区域",
+                    type="text",
+                    placeholder="可选，x,y,w,h（留空表示全画面）",
                     depends_on="position_mode",
                     depends_value="ocr_match"
                 ),
@@ -208,13 +261,19 @@ class MouseActionNode(BaseNode):
                     type="number",
                     default=0,
                     placeholder="相对于匹配位置的Y偏移"
-                )
+                ),
+                _PRIORITY_PROPERTY
             ]
         )
     
+    def _get_kvm_manager(self, context: Any) -> Any:
+        """获取 KVM 管理器（离线基准测试中替换为动作记录器）"""
+        from kvm.kvm_manager import get_kvm_manager
+        return get_kvm_manager()
+    
     def execute(self, context: Any, properties: Dict[str, Any]) -> Any:
         """执行鼠标操作"""
-        from kvm.kvm_manager import get_kvm_manager
+        from kvm.action_queue import ActionQueueTimeout
         
         flow_id = getattr(context, 'flow_id', '')
         loop_count = getattr(context, 'loop_count', 0)
@@ -250,7 +309,7 @@ class MouseActionNode(BaseNode):
                 target_text = properties.get('target_text', '')
                 match_mode = properties.get('match_mode', 'contains')
                 
-                if not target_text:
+                if not target_text and not properties.get('anchor_text'):
                     logger.warning("目标文本未指定，跳过鼠标操作")
                     if flow_id:
                         send_debug(flow_id, f"⚠️ 鼠标[{loop_count}]: 目标文本未指定")
@@ -271,7 +330,7 @@ class MouseActionNode(BaseNode):
                         r_center = r.get('center', 'N/A')
                         logger.debug(f"  OCR[{i}]: '{r_text}' @ {r_center}")
                 
-                pos = _find_text_position(ocr_results, target_text, match_mode)
+                pos = _find_text_position(ocr_results, target_text, match_mode, properties)
                 if pos:
                     x, y = pos
                     position_found = True
@@ -327,65 +386,79 @@ class MouseActionNode(BaseNode):
             y += offset_y
             
             # 执行鼠标操作
-            kvm_manager = get_kvm_manager()
+            kvm_manager = self._get_kvm_manager(context)
             
-            if action_type == 'click':
-                if flow_id:
-                    send_debug(flow_id, f"🖱️ 鼠标[{loop_count}]: 点击 ({x}, {y}), {button}键")
-                logger.info(f"准备鼠标点击: 坐标=({x}, {y}), 按钮={button}")
-                
-                result = kvm_manager.send_mouse_click(
-                    kvm_config['ip'],
-                    kvm_config['port'],
-                    kvm_config['channel'],
-                    x, y, button
-                )
-                if result:
-                    logger.info(f"鼠标点击发送成功: ({x}, {y}), button={button}")
-                    if flow_id:
-                        send_debug(flow_id, f"✅ 鼠标[{loop_count}]: 点击成功")
-                else:
-                    logger.error(f"鼠标点击发送失败: ({x}, {y}), button={button}")
+            # 在 KVM 仲裁队列中独占执行，避免与其他流程的输入交错
+            with kvm_manager.action_sequence(
+                kvm_config['ip'],
+                kvm_config['port'],
+                kvm_config['channel'],
+                owner=flow_id,
+                priority=properties.get('priority', 'normal'),
+                name=f"mouse_{action_type}"
+            ):
+                if action_type == 'click':
                     if flow_id:
-                        send_debug(flow_id, f"❌ 鼠标[{loop_count}]: 点击失败")
-                return result
+                        send_debug(flow_id, f"🖱️ 鼠标[{loop_count}]: 点击 ({x}, {y}), {button}键")
+                    logger.info(f"准备鼠标点击: 坐标=({x}, {y}), 按钮={button}")
                 
-            elif action_type == 'double_click':
-                if flow_id:
-                    send_debug(flow_id, f"🖱️ 鼠标[{loop_count}]: 双击 ({x}, {y}), {button}键")
-                    
-                # 使用新的双击方法
-                result = kvm_manager.send_mouse_double_click(
-                    kvm_config['ip'],
-                    kvm_config['port'],
-                    kvm_config['channel'],
-                    x, y, button
-                )
-                if result:
-                    logger.info(f"鼠标双击成功: ({x}, {y})")
-                    if flow_id:
-                        send_debug(flow_id, f"✅ 鼠标[{loop_count}]: 双击成功")
-                else:
+                    result = kvm_manager.send_mouse_click(
+                        kvm_config['ip'],
+                        kvm_config['port'],
+                        kvm_config['channel'],
+                        x, y, button
+                    )
+                    if result:
+                        logger.info(f"鼠标点击发送成功: ({x}, {y}), button={button}")
+                        if flow_id:
+                            send_debug(flow_id, f"✅ 鼠标[{loop_count}]: 点击成功")
+                    else:
+                        logger.error(f"鼠标点击发送失败: ({x}, {y}), button={button}")
+                        if flow_id:
+                            send_debug(flow_id, f"❌ 鼠标[{loop_count}]: 点击失败")
+                    return result
+                
+                elif action_type == 'double_click':
                     if flow_id:
-                        send_debug(flow_id, f"❌ 鼠标[{loop_count}]: 双击失败")
-                return result
+                        send_debug(flow_id, f"🖱️ 鼠标[{loop_count}]: 双击 ({x}, {y}), {button}键")
+                    
+                    # 使用新的双击方法
+                    result = kvm_manager.send_mouse_double_click(
+                        kvm_config['ip'],
+                        kvm_config['port'],
+                        kvm_config['channel'],
+                        x, y, button
+                    )
+                    if result:
+                        logger.info(f"鼠标双击成功: ({x}, {y})")
+                        if flow_id:
+                            send_debug(flow_id, f"✅ 鼠标[{loop_count}]: 双击成功")
+                    else:
+                        if flow_id:
+                            send_debug(flow_id, f"❌ 鼠标[{loop_count}]: 双击失败")
+                    return result
                 
-            elif action_type == 'move':
-                if flow_id:
-                    send_debug(flow_id, f"🖱️ 鼠标[{loop_count}]: 移动到 ({x}, {y})")
+                elif action_type == 'move':
+                    if flow_id:
+                        send_debug(flow_id, f"🖱️ 鼠标[{loop_count}]: 移动到 ({x}, {y})")
                     
-                result = kvm_manager.send_mouse_move(
-                    kvm_config['ip'],
-                    kvm_config['port'],
-                    kvm_config['channel'],
-                    x, y
-                )
-                if result:
-                    logger.info(f"鼠标移动成功: ({x}, {y})")
-                return result
+                    result = kvm_manager.send_mouse_move(
+                        kvm_config['ip'],
+                        kvm_config['port'],
+                        kvm_config['channel'],
+                        x, y
+                    )
+                    if result:
+                        logger.info(f"鼠标移动成功: ({x}, {y})")
+                    return result
             
             return True
             
+        except ActionQueueTimeout as e:
+            logger.warning(f"鼠标操作排队超时，本轮跳过: {e}")
+            if flow_id:
+                send_debug(flow_id, f"⏳ 鼠标[{loop_count}]: KVM 输入繁忙，本轮跳过")
+            raise NodeSkipped("KVM 输入队列繁忙") from e
         except Exception as e:
             logger.error(f"鼠标操作失败: {e}")
             if flow_id:
@@ -400,6 +473,11 @@ class KeyboardActionNode(BaseNode):
     支持文本输入和特殊按键。
     """
     
+    side_effects = True
+    sends_input = True
+    produces = ()
+    consumes = ('kvm_config',)
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -488,13 +566,19 @@ class KeyboardActionNode(BaseNode):
                     ],
                     depends_on="action_type",
                     depends_value="hotkey"
-                )
+                ),
+                _PRIORITY_PROPERTY
             ]
         )
     
+    def _get_kvm_manager(self, context: Any) -> Any:
+        """获取 KVM 管理器（离线基准测试中替换为动作记录器）"""
+        from kvm.kvm_manager import get_kvm_manager
+        return get_kvm_manager()
+    
     def execute(self, context: Any, properties: Dict[str, Any]) -> Any:
         """执行键盘操作"""
-        from kvm.kvm_manager import get_kvm_manager
+        from kvm.action_queue import ActionQueueTimeout
         
         try:
             action_type = properties.get('action_type', 'input')
@@ -505,38 +589,61 @@ class KeyboardActionNode(BaseNode):
                 logger.error("KVM 配置未找到")
                 return False
             
-            kvm_manager = get_kvm_manager()
+            kvm_manager = self._get_kvm_manager(context)
             
-            if action_type == 'input':
-                text = properties.get('text', '')
-                if not text:
-                    logger.warning("输入文本为空")
-                    return True
+            with kvm_manager.action_sequence(
+                kvm_config['ip'],
+                kvm_config['port'],
+                kvm_config['channel'],
+                owner=getattr(context, 'flow_id', ''),
+                priority=properties.get('priority', 'normal'),
+                name=f"keyboard_{action_type}"
+            ):
+                if action_type == 'input':
+                    text = properties.get('text', '')
+                    if not text:
+                        logger.warning("输入文本为空")
+                        return True
                 
-                result = kvm_manager.send_key_input(
-                    kvm_config['ip'],
-                    kvm_config['port'],
-                    kvm_config['channel'],
-                    text
-                )
-                if result:
-                    logger.info(f"键盘输入: {text}")
-                return result
+                    result = kvm_manager.send_key_input(
+                        kvm_config['ip'],
+                        kvm_config['port'],
+                        kvm_config['channel'],
+                        text
+                    )
+                    if result:
+                        logger.info(f"键盘输入: {text}")
+                    return result
                 
-            elif action_type == 'key':
-                key = properties.get('key', 'ENTER')
-                result = kvm_manager.send_key_press(
-                    kvm_config['ip'],
-                    kvm_config['port'],
-                    kvm_config['channel'],
-                    key
-                )
-                if result:
-                    logger.info(f"按键: {key}")
-                return result
+                elif action_type == 'key':
+                    key = properties.get('key', 'ENTER')
+                    result = kvm_manager.send_key_press(
+                        kvm_config['ip'],
+                        kvm_config['port'],
+                        kvm_config['channel'],
+                        key
+                    )
+                    if result:
+                        logger.info(f"按键: {key}")
+                    return result
+                
+                elif action_type == 'hotkey':
+                    hotkey = properties.get('hotkey', 'ctrl+c')
+                    result = kvm_manager.send_hotkey(
+                        kvm_config['ip'],
+                        kvm_config['port'],
+                        kvm_config['channel'],
+                        hotkey
+                    )
+                    if result:
+                        logger.info(f"组合键: {hotkey}")
+                    return result
             
             return True
             
+        except ActionQueueTimeout as e:
+            logger.warning(f"键盘操作排队超时，本轮跳过: {e}")
+            raise NodeSkipped("KVM 输入队列繁忙") from e
         except Exception as e:
             logger.error(f"键盘操作失败: {e}")
             return False
@@ -549,6 +656,10 @@ class WaitNode(BaseNode):
     等待指定的毫秒数。
     """
     
+    side_effects = True
+    produces = ()
+    consumes = ()
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -576,7 +687,7 @@ class WaitNode(BaseNode):
             duration_s = duration_ms / 1000.0
             
             logger.debug(f"等待 {duration_ms} 毫秒")
-            time.sleep(duration_s)
+            cancellable_sleep(duration_s)
             return True
             
         except Exception as e:
@@ -3,7 +3,7 @@
 定义所有节点的基类和配置结构。
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Set, Tuple
 from pydantic import BaseModel, Field
 
 
@@ -44,12 +44,53 @@ class NodeConfig(BaseModel):
     actions: List[NodeActionDef] = Field(default_factory=list, description="节点交互方法列表")
 
 
+# 所有节点通用的执行控制属性（由 get_all_node_configs 追加到节点配置中）
+COMMON_EXECUTION_PROPERTIES: List[NodePropertyDef] = [
+    NodePropertyDef(
+        key="timeout_ms",
+        label="超时时间(ms)",
+        type="number",
+        default=0,
+        placeholder="0 表示使用全局默认值",
+        group="执行控制"
+    ),
+    NodePropertyDef(
+        key="optional",
+        label="可选节点",
+        type="boolean",
+        default=False,
+        group="执行控制"
+    ),
+]
+
+
+class NodeSkipped(Exception):
+    """节点本轮跳过
+
+    节点因外部资源暂时不可用（如 KVM 输入队列繁忙）无法执行时抛出。图执行器跳过
+    该节点及其后继并将本轮标记为降级，流程不进入错误状态，下一轮重试。
+    """
+    pass
+
+
 class BaseNode(ABC):
     """节点基类
     
     所有节点都应该继承此基类，并实现 get_config 和 execute 方法。
     """
     
+    # 同步节点执行所用的线程池类别: inference / io / cpu
+    executor_pool: str = "io"
+    
+    # 节点写入 / 读取的上下文字段（供流程图编译器做活跃性分析，见 engine.graph_compiler）
+    # None 表示未声明，编译器按读取全部字段、有副作用保守处理，不会裁剪
+    produces: Optional[Tuple[str, ...]] = None
+    consumes: Optional[Tuple[str, ...]] = None
+    # 有外部副作用的节点（鼠标键盘、等待、变量等）始终执行
+    side_effects: bool = False
+    # 向被控端发送输入的节点（鼠标键盘），执行后之前采集的画面视为过期
+    sends_input: bool = False
+    
     def __init__(self):
         """初始化节点"""
         pass
@@ -78,6 +119,22 @@ class BaseNode(ABC):
         """
         pass
     
+    @classmethod
+    def get_dataflow(cls, properties: Dict[str, Any]) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+        """按节点属性返回写入和读取的上下文字段
+        
+        默认使用类属性 produces / consumes，读写字段随属性变化的节点重写此方法。
+        
+        Args:
+            properties: 节点配置的属性值
+            
+        Returns:
+            (写入字段, 读取字段)，未声明时为 None
+        """
+        produces = set(cls.produces) if cls.produces is not None else None
+        consumes = set(cls.consumes) if cls.consumes is not None else None
+        return produces, consumes
+    
     def validate(self, properties: Dict[str, Any]) -> Tuple[bool, List[str]]:
         """验证节点参数
         
@@ -3,55 +3,70 @@
 包含条件判断、循环、变量操作等逻辑节点。
 条件节点支持 OCR 文本匹配、检测结果判断等多种条件类型。
 """
-import re
-from typing import Dict, Any, Optional, List, Tuple
+from functools import lru_cache
+from operator import eq, ne, gt, lt, ge, le
+from typing import Dict, Any, Optional, List, Set, Tuple
 from loguru import logger
 
 from nodes.base import BaseNode, NodeConfig, NodePropertyDef
 from nodes import register_node
+from engine.expression import ExpressionError, compile_expression
+from ocr.result_set import OCRResultSet, parse_region
+
+
+# 变量比较运算符
+_COMPARE_OPERATORS = {
+    '==': eq,
+    '!=': ne,
+    '>': gt,
+    '<': lt,
+    '>=': ge,
+    '<=': le,
+}
+
+
+@lru_cache(maxsize=256)
+def _parse_compare_number(compare_value: str) -> Optional[float]:
+    """解析数字比较值（同一比较值只解析一次），非数字返回 None"""
+    if compare_value.replace('.', '').replace('-', '').isdigit():
+        try:
+            return float(compare_value)
+        except ValueError:
+            return None
+    return None
 
 
 def _find_text_in_ocr_results(
     ocr_results: List[Dict],
     target_text: str,
-    match_mode: str = "contains"
+    match_mode: str = "contains",
+    properties: Optional[Dict[str, Any]] = None
 ) -> Optional[Dict]:
     """在 OCR 结果中查找指定文本
     
     Args:
-        ocr_results: OCR 识别结果列表
+        ocr_results: OCR 识别结果列表（OCRResultSet 时复用其索引）
         target_text: 目标文本或正则表达式
-        match_mode: 匹配模式 ("exact" | "contains" | "regex")
+        match_mode: 匹配模式 ("exact" | "contains" | "regex" | "fuzzy")
+        properties: 节点属性，读取模糊匹配距离、查找区域和参照文本
         
     Returns:
         匹配的结果项，未找到返回 None
     """
-    if not ocr_results or not target_text:
+    properties = properties or {}
+    anchor_text = properties.get('anchor_text') or None
+    if not ocr_results or not (target_text or anchor_text):
         return None
     
-    # 编译正则表达式（如果是正则模式）
-    regex_pattern = None
-    if match_mode == "regex":
-        try:
-            regex_pattern = re.compile(target_text)
-        except re.error as e:
-            logger.error(f"正则表达式语法错误: {target_text}, 错误: {e}")
-            return None
-    
-    for result in ocr_results:
-        text = result.get('text', '')
-        
-        if match_mode == "exact":
-            if text == target_text:
-                return result
-        elif match_mode == "regex":
-            if regex_pattern and regex_pattern.search(text):
-                return result
-        else:  # contains
-            if target_text in text:
-                return result
-    
-    return None
+    return OCRResultSet.wrap(ocr_results).find(
+        target_text,
+        match_mode,
+        max_distance=int(properties.get('fuzzy_distance', 1)),
+        region=parse_region(properties.get('search_region')),
+        anchor=anchor_text,
+        direction=properties.get('anchor_direction') or 'right',
+        normalize=bool(properties.get('normalize_text', False))
+    )
 
 
 @register_node
@@ -68,6 +83,31 @@ class ConditionNode(BaseNode):
     下游节点根据边的 branch 属性（true/false）决定是否执行。
     """
     
+    executor_pool = "cpu"
+    
+    # 条件类型 -> 读取的上下文字段
+    _CONDITION_CONSUMES = {
+        'ocr_text_found': {'ocr_results'},
+        'ocr_has_result': {'ocr_results'},
+        'detection_found': {'detection_results'},
+        'variable': {'variables'},
+    }
+    
+    @classmethod
+    def get_dataflow(cls, properties: Dict[str, Any]) -> Tuple[Set[str], Optional[Set[str]]]:
+        """按条件类型确定读取的字段（未知类型按读取全部字段处理）"""
+        condition_type = properties.get('condition_type', 'ocr_text_found')
+        consumes = cls._CONDITION_CONSUMES.get(condition_type)
+        if condition_type == 'expression':
+            try:
+                consumes = compile_expression(properties.get('expression', '')).fields
+            except ExpressionError:
+                consumes = None
+        produces = set()
+        if condition_type in ('ocr_text_found', 'ocr_has_result'):
+            produces = {'ocr_target_found', 'ocr_matched_results'}
+        return produces, set(consumes) if consumes is not None else None
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -112,9 +152,64 @@ class ConditionNode(BaseNode):
                     options=[
                         {"label": "包含", "value": "contains"},
                         {"label": "精确匹配", "value": "exact"},
-                        {"label": "正则表达式", "value": "regex"}
+                        {"label": "正则表达式", "value": "regex"},
+                        {"label": "模糊匹配", "value": "fuzzy"}
+                    ],
+                    description="包含: 文本包含目标即匹配; 精确: 完全一致; 正则: 使用正则表达式 (如 下.*步); "
+                                "模糊: 允许少量识别错误",
+                    depends_on="condition_type",
+                    depends_value="ocr_text_found",
+                    group="ocr"
+                ),
+                NodePropertyDef(
+                    key="normalize_text",
+                    label="忽略全半角/大小写/空格",
+                    type="boolean",
+                    default=False,
+                    description="包含、精确、模糊匹配及参照文本比较前统一全半角、大小写并去除空格（如 OK 与 ｏｋ 视为相同）",
+                    depends_on="condition_type",
+                    depends_value="ocr_text_found",
+                    group="ocr"
+                ),
+                NodePropertyDef(
+                    key="fuzzy_distance",
+                    label="允许错误字数",
+                    type="number",
+                    default=1,
+                    description="模糊匹配允许的最大编辑距离（最多为目标文本长度减 1 的一半）",
+                    depends_on="match_mode",
+                    depends_value="fuzzy",
+                    group="ocr"
+                ),
+                NodePropertyDef(
+                    key="anchor_text",
+                    label="参照文本",
+                    type="text",
+                    placeholder="可选，只在该文本指定方向查找（目标文本留空表示任意文本）",
+                    depends_on="condition_type",
+                    depends_value="ocr_text_found",
+                    group="ocr"
+                ),
+                NodePropertyDef(
+                    key="anchor_direction",
+                    label="参照方向",
+                    type="select",
+                    default="right",
+                    options=[
+                        {"label": "右侧", "value": "right"},
+                        {"label": "左侧", "value": "left"},
+                        {"label": "下方", "value": "below"},
+                        {"label": "上方", "value": "above"}
                     ],
-                    description="包含: 文本包含目标即匹配; 精确: 完全一致; 正则: 使用正则表达式 (如 下.*步)",
+                    depends_on="condition_type",
+                    depends_value="ocr_text_found",
+                    group="ocr"
+                ),
+                NodePropertyDef(
+                    key="search_region",
+                    label="查找区域",
+                    type="text",
+                    placeholder="可选，x,y,w,h（留空表示全画面）",
                     depends_on="condition_type",
                     depends_value="ocr_text_found",
                     group="ocr"
@@ -179,7 +274,7 @@ class ConditionNode(BaseNode):
                     label="表达式",
                     type="textarea",
                     required=True,
-                    placeholder="例如: ${count} > 5 && ${status} == 'active'",
+                    placeholder="例如: count(ocr, '确认') > 0 and vars.retry < 3 或 ${count} > 5 && ${status} == 'active'",
                     depends_on="condition_type",
                     depends_value="expression",
                     group="expression"
@@ -243,7 +338,7 @@ class ConditionNode(BaseNode):
         target_text = properties.get('target_text', '')
         match_mode = properties.get('match_mode', 'contains')
         
-        if not target_text:
+        if not target_text and not properties.get('anchor_text'):
             logger.warning("目标文本未指定")
             return False
         
@@ -253,7 +348,7 @@ class ConditionNode(BaseNode):
             return False
         
         # 查找目标文本
-        matched = _find_text_in_ocr_results(ocr_results, target_text, match_mode)
+        matched = _find_text_in_ocr_results(ocr_results, target_text, match_mode, properties)
         
         if matched:
             logger.info(f"OCR 匹配成功: '{target_text}'")
@@ -309,35 +404,21 @@ class ConditionNode(BaseNode):
             logger.debug(f"变量 '{var_name}' 不存在")
             return False
         
+        compare = _COMPARE_OPERATORS.get(operator)
+        if compare is None:
+            logger.warning(f"未知的比较运算符: {operator}")
+            return False
+        
         try:
-            # 尝试转换为数字比较
-            if compare_value.replace('.', '').replace('-', '').isdigit():
-                actual_num = float(actual_value)
-                compare_num = float(compare_value)
-                
-                if operator == '==':
-                    result = actual_num == compare_num
-                elif operator == '!=':
-                    result = actual_num != compare_num
-                elif operator == '>':
-                    result = actual_num > compare_num
-                elif operator == '<':
-                    result = actual_num < compare_num
-                elif operator == '>=':
-                    result = actual_num >= compare_num
-                elif operator == '<=':
-                    result = actual_num <= compare_num
-                else:
-                    result = False
-            else:
+            compare_num = _parse_compare_number(str(compare_value))
+            if compare_num is not None:
+                # 数字比较
+                result = compare(float(actual_value), compare_num)
+            elif operator in ('==', '!='):
                 # 字符串比较
-                actual_str = str(actual_value)
-                if operator == '==':
-                    result = actual_str == compare_value
-                elif operator == '!=':
-                    result = actual_str != compare_value
-                else:
-                    result = False
+                result = compare(str(actual_value), compare_value)
+            else:
+                result = False
             
             logger.debug(f"变量比较: {var_name}({actual_value}) {operator} {compare_value} = {result}")
             return result
@@ -354,13 +435,16 @@ class ConditionNode(BaseNode):
             logger.warning("表达式为空")
             return False
         
-        # 简单实现：检查是否有检测或 OCR 结果
-        if hasattr(context, 'detection_results') and context.detection_results:
-            return True
-        if hasattr(context, 'ocr_results') and context.ocr_results:
-            return True
+        # 表达式按源码缓存编译结果，每次求值只执行编译好的闭包
+        try:
+            compiled = compile_expression(expression)
+        except ExpressionError as e:
+            logger.error(f"表达式语法错误: {expression}: {e}")
+            return False
         
-        return False
+        result = compiled.test(context)
+        logger.debug(f"表达式求值: {expression} = {result}")
+        return result
 
 
 @register_node
@@ -371,6 +455,10 @@ class LoopNode(BaseNode):
     此节点主要用于控制循环次数和计数。
     """
     
+    executor_pool = "cpu"
+    produces = ()
+    consumes = ()
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -420,6 +508,12 @@ class LoopNode(BaseNode):
 class VariableNode(BaseNode):
     """变量操作节点"""
     
+    executor_pool = "cpu"
+    # 变量对外可见（运行状态、其他流程设置），始终执行
+    side_effects = True
+    produces = ('variables',)
+    consumes = ('variables',)
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
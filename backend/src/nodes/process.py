@@ -3,12 +3,47 @@
 包含图像预处理、YOLO 检测、OCR 识别等处理节点。
 节点使用流程上下文中的缓存实例，避免重复初始化。
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple
 from loguru import logger
 
 from nodes.base import BaseNode, NodeConfig, NodePropertyDef
 from nodes import register_node
 from api.sse_service import send_debug
+from engine.result_cache import get_result_cache, compute_cache_key
+from engine.inference_batcher import get_inference_batcher
+from engine.cancellation import check_cancelled
+from ocr.result_set import OCRResultSet
+
+
+def _result_cache_key(context: Any, node_type: str, properties: Dict[str, Any]) -> Optional[str]:
+    """计算推理节点的结果缓存键
+
+    键由当前帧内容哈希、节点有效参数和裁剪区域组成；缓存关闭时返回 None。
+    """
+    if not get_result_cache().enabled or not properties.get('cache_enabled', True):
+        return None
+    
+    params = {k: v for k, v in properties.items() if k != 'cache_enabled'}
+    params['_crop_offset'] = getattr(context, 'crop_offset', None)
+    params['_crop_size'] = getattr(context, 'crop_size', None)
+    return compute_cache_key(context.current_frame, node_type, params)
+
+
+def _model_owner(context: Any) -> str:
+    """模型注册表中的持有者标识（流程运行上下文按运行区分）"""
+    return getattr(context, 'model_owner', '') or getattr(context, 'flow_id', '') or 'default'
+
+
+def _send_cache_hit(flow_id: str, node_id: str, prefix: str, count: int, run_id: str = "") -> None:
+    """发送缓存命中调试信息（含该节点命中率）"""
+    if not flow_id:
+        return
+    hit_rate = get_result_cache().get_hit_rate(flow_id, node_id, run_id)
+    send_debug(flow_id, f"{prefix}: 画面未变化，复用缓存结果 {count} 条", {
+        "node_id": node_id,
+        "cache_hit": True,
+        "cache_hit_rate": round(hit_rate, 4)
+    })
 
 
 @register_node
@@ -19,6 +54,16 @@ class ImageCropNode(BaseNode):
     裁剪后的图像会替换 context.current_frame。
     """
     
+    executor_pool = "cpu"
+    
+    @classmethod
+    def get_dataflow(cls, properties: Dict[str, Any]) -> Tuple[Set[str], Set[str]]:
+        """保存原图时同时写入 original_frame"""
+        produces = {'current_frame', 'crop_offset', 'crop_size'}
+        if properties.get('save_original', True):
+            produces.add('original_frame')
+        return produces, {'current_frame'}
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -138,6 +183,15 @@ class ImageCropNode(BaseNode):
 class PreprocessingNode(BaseNode):
     """图像预处理节点"""
     
+    executor_pool = "cpu"
+    
+    @classmethod
+    def get_dataflow(cls, properties: Dict[str, Any]) -> Tuple[Set[str], Set[str]]:
+        """未启用任何处理时不改变当前帧"""
+        if not any(properties.get(op, False) for op in ('resize', 'denoise', 'sharpen')):
+            return set(), set()
+        return {'current_frame'}, {'current_frame'}
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -234,6 +288,10 @@ class YOLODetectionNode(BaseNode):
     使用流程上下文中缓存的检测器实例。
     """
     
+    executor_pool = "inference"
+    produces = ('detection_results',)
+    consumes = ('current_frame', 'crop_offset', 'crop_size')
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -285,6 +343,13 @@ class YOLODetectionNode(BaseNode):
                     label="目标标签",
                     type="textarea",
                     placeholder="多个标签用逗号分隔（留空表示不过滤）"
+                ),
+                NodePropertyDef(
+                    key="cache_enabled",
+                    label="启用结果缓存",
+                    type="boolean",
+                    default=True,
+                    description="画面和参数未变化时复用上次结果，跳过推理"
                 )
             ]
         )
@@ -300,27 +365,43 @@ class YOLODetectionNode(BaseNode):
             return False
         
         try:
-            detector = self._get_or_create_detector(context, properties)
-            if detector is None:
-                logger.error("无法创建 YOLO 检测器")
+            node_id = getattr(context, 'current_node_id', '') or ''
+            cache = get_result_cache()
+            cache_key = _result_cache_key(context, 'yolo_detection', properties)
+            run_id = getattr(context, 'run_id', '')
+            results = cache.get(cache_key, flow_id, node_id, 'yolo_detection', run_id)
+            
+            if results is not None:
+                # 画面未变化，复用缓存结果
+                _send_cache_hit(flow_id, node_id, "YOLO", len(results), run_id)
+            else:
+                detector = self._get_or_create_detector(context, properties)
+                if detector is None:
+                    logger.error("无法创建 YOLO 检测器")
+                    if flow_id:
+                        send_debug(flow_id, "YOLO: 无法创建检测器")
+                    return False
+                
+                conf_threshold = float(properties.get('conf_threshold', 0.25))
+                iou_threshold = float(properties.get('iou_threshold', 0.45))
+                
+                # 发送调试信息
                 if flow_id:
-                    send_debug(flow_id, "YOLO: 无法创建检测器")
-                return False
-            
-            conf_threshold = float(properties.get('conf_threshold', 0.25))
-            iou_threshold = float(properties.get('iou_threshold', 0.45))
-            
-            # 发送调试信息
-            if flow_id:
-                frame_shape = context.current_frame.shape if hasattr(context.current_frame, 'shape') else 'unknown'
-                send_debug(flow_id, f"YOLO: 开始检测，图像尺寸={frame_shape}，置信度={conf_threshold}")
-            
-            results = detector.detect(
-                context.current_frame,
-                conf_threshold=conf_threshold,
-                iou_threshold=iou_threshold
-            )
+                    frame_shape = context.current_frame.shape if hasattr(context.current_frame, 'shape') else 'unknown'
+                    send_debug(flow_id, f"YOLO: 开始检测，图像尺寸={frame_shape}，置信度={conf_threshold}")
+                
+                # 检测器可能被多个流程共享，经批处理服务合并推理
+                results = get_inference_batcher().detect(
+                    detector,
+                    context.current_frame,
+                    conf_threshold=conf_threshold,
+                    iou_threshold=iou_threshold,
+                    source=flow_id
+                )
+                cache.put(cache_key, results)
             
+            # 节点已超时则不再写入上下文（后续节点已在使用上下文）
+            check_cancelled()
             context.detection_results = results
             result_count = len(results) if results else 0
             logger.debug(f"YOLO检测完成，检测到 {result_count} 个目标")
@@ -355,27 +436,21 @@ class YOLODetectionNode(BaseNode):
             return False
     
     def _get_or_create_detector(self, context: Any, properties: Dict[str, Any]):
-        """获取或创建 YOLO 检测器"""
-        from detection.yolo_detector import YOLODetector
+        """获取或创建 YOLO 检测器（通过全局模型注册表共享）"""
+        from engine.model_registry import acquire_yolo_detector
         
         node_id = getattr(context, 'current_node_id', 'default')
         
         if not hasattr(context, 'yolo_detectors'):
             context.yolo_detectors = {}
         
-        config_key = f"{node_id}_{properties.get('model_path')}_{properties.get('backend')}"
+        config_key = f"{node_id}_{properties.get('model_path')}_{properties.get('backend')}_{properties.get('dev_id')}"
         
         if config_key not in context.yolo_detectors:
             try:
-                detector = YOLODetector(
-                    model_path=properties.get('model_path', 'models/yolov8n.bmodel'),
-                    conf_threshold=float(properties.get('conf_threshold', 0.25)),
-                    iou_threshold=float(properties.get('iou_threshold', 0.45)),
-                    backend=properties.get('backend', 'auto'),
-                    dev_id=int(properties.get('dev_id', 0))
-                )
-                context.yolo_detectors[config_key] = detector
-                logger.info(f"YOLO检测器已创建: {properties.get('model_path')}")
+                owner = _model_owner(context)
+                context.yolo_detectors[config_key] = acquire_yolo_detector(owner, properties)
+                logger.info(f"YOLO检测器已就绪: {properties.get('model_path')}")
             except Exception as e:
                 logger.error(f"创建YOLO检测器失败: {e}")
                 return None
@@ -402,6 +477,10 @@ class OCRRecognitionNode(BaseNode):
     ]
     """
     
+    executor_pool = "inference"
+    produces = ('ocr_results', 'ocr_matched_results', 'ocr_target_found', 'matched_text_position')
+    consumes = ('current_frame', 'crop_offset', 'crop_size')
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -420,6 +499,7 @@ class OCRRecognitionNode(BaseNode):
                     options=[
                         {"label": "自动选择", "value": "auto"},
                         {"label": "PP-OCR Sophon", "value": "sophon"},
+                        {"label": "CPU (ONNX)", "value": "cpu"},
                         {"label": "模拟模式", "value": "mock"}
                     ]
                 ),
@@ -428,14 +508,14 @@ class OCRRecognitionNode(BaseNode):
                     label="检测模型路径",
                     type="text",
                     default="models/ch_PP-OCRv4_det_fp16.bmodel",
-                    placeholder="检测模型 BModel 路径"
+                    placeholder="检测模型 BModel / ONNX 路径"
                 ),
                 NodePropertyDef(
                     key="rec_model",
                     label="识别模型路径",
                     type="text",
                     default="models/ch_PP-OCRv4_rec_fp16.bmodel",
-                    placeholder="识别模型 BModel 路径"
+                    placeholder="识别模型 BModel / ONNX 路径"
                 ),
                 NodePropertyDef(
                     key="char_dict_path",
@@ -457,6 +537,32 @@ class OCRRecognitionNode(BaseNode):
                     type="number",
                     default=0
                 ),
+                NodePropertyDef(
+                    key="cpu_threads",
+                    label="CPU 线程数",
+                    type="number",
+                    default=0,
+                    description="CPU 后端推理线程数，0 表示自动"
+                ),
+                NodePropertyDef(
+                    key="det_mode",
+                    label="检测模式",
+                    type="select",
+                    default="resize",
+                    options=[
+                        {"label": "整帧缩放", "value": "resize"},
+                        {"label": "分块检测", "value": "tile"},
+                        {"label": "自适应缩放", "value": "adaptive"}
+                    ],
+                    description="高分辨率画面上的小字可使用分块或自适应缩放检测"
+                ),
+                NodePropertyDef(
+                    key="det_text_height",
+                    label="预期文字高度",
+                    type="number",
+                    default=16,
+                    description="画面中文字的大致像素高度（自适应缩放模式）"
+                ),
                 NodePropertyDef(
                     key="conf_threshold",
                     label="置信度阈值",
@@ -498,6 +604,20 @@ class OCRRecognitionNode(BaseNode):
                     type="number",
                     default=5,
                     description="Beam Search 宽度（仅在启用时有效）"
+                ),
+                NodePropertyDef(
+                    key="cache_enabled",
+                    label="启用结果缓存",
+                    type="boolean",
+                    default=True,
+                    description="画面和参数未变化时复用上次结果，跳过推理"
+                ),
+                NodePropertyDef(
+                    key="incremental",
+                    label="增量识别",
+                    type="boolean",
+                    default=False,
+                    description="只对与上一帧相比变化的区域重新检测和识别，适合大部分静止的画面"
                 )
             ]
         )
@@ -514,31 +634,48 @@ class OCRRecognitionNode(BaseNode):
             return False
         
         try:
-            ocr_engine = self._get_or_create_engine(context, properties)
-            if ocr_engine is None:
-                logger.error("无法创建 OCR 引擎")
+            node_id = getattr(context, 'current_node_id', '') or ''
+            cache = get_result_cache()
+            cache_key = _result_cache_key(context, 'ocr_recognition', properties)
+            run_id = getattr(context, 'run_id', '')
+            normalized_results = cache.get(cache_key, flow_id, node_id, 'ocr_recognition', run_id)
+            
+            if normalized_results is not None:
+                # 画面未变化，复用缓存结果
+                _send_cache_hit(flow_id, node_id, f"♻️ OCR[{loop_count}]", len(normalized_results), run_id)
+            else:
+                ocr_engine = self._get_or_create_engine(context, properties)
+                if ocr_engine is None:
+                    logger.error("无法创建 OCR 引擎")
+                    if flow_id:
+                        send_debug(flow_id, f"❌ OCR[{loop_count}]: 无法创建 OCR 引擎")
+                    return False
+                
+                conf_threshold = float(properties.get('conf_threshold', 0.6))
+                
+                # 发送调试信息
+                frame_shape = context.current_frame.shape if hasattr(context.current_frame, 'shape') else 'unknown'
                 if flow_id:
-                    send_debug(flow_id, f"❌ OCR[{loop_count}]: 无法创建 OCR 引擎")
-                return False
-            
-            conf_threshold = float(properties.get('conf_threshold', 0.6))
-            
-            # 发送调试信息
-            frame_shape = context.current_frame.shape if hasattr(context.current_frame, 'shape') else 'unknown'
-            if flow_id:
-                send_debug(flow_id, f"🔍 OCR[{loop_count}]: 开始识别 {frame_shape[1]}x{frame_shape[0]}...")
-            
-            # 执行 OCR 识别
-            raw_results = ocr_engine.recognize(
-                context.current_frame,
-                conf_threshold=conf_threshold
-            )
+                    send_debug(flow_id, f"🔍 OCR[{loop_count}]: 开始识别 {frame_shape[1]}x{frame_shape[0]}...")
+                
+                # 执行 OCR 识别
+                raw_results = get_inference_batcher().recognize(
+                    ocr_engine,
+                    context.current_frame,
+                    conf_threshold=conf_threshold,
+                    source=flow_id,
+                    stream=f"{flow_id}:{node_id}"
+                )
+                
+                # 标准化输出格式
+                normalized_results = self._normalize_results(raw_results)
+                cache.put(cache_key, normalized_results)
             
-            # 标准化输出格式
-            normalized_results = self._normalize_results(raw_results)
+            # 节点已超时则不再写入上下文（后续节点已在使用上下文）
+            check_cancelled()
             
-            # 存入上下文
-            context.ocr_results = normalized_results
+            # 存入上下文（带索引的结果集，供条件判断、鼠标操作等节点查询）
+            context.ocr_results = OCRResultSet(normalized_results)
             
             # 清除之前的匹配结果
             if hasattr(context, 'ocr_matched_results'):
@@ -625,8 +762,8 @@ class OCRRecognitionNode(BaseNode):
         return normalized
     
     def _get_or_create_engine(self, context: Any, properties: Dict[str, Any]):
-        """获取或创建 OCR 引擎"""
-        from ocr.ocr_engine import OCREngine
+        """获取或创建 OCR 引擎（通过全局模型注册表共享）"""
+        from engine.model_registry import acquire_ocr_engine
         
         node_id = getattr(context, 'current_node_id', 'default')
         
@@ -634,41 +771,26 @@ class OCRRecognitionNode(BaseNode):
             context.ocr_engines = {}
         
         # 计算配置 key（包含影响引擎初始化的参数）
-        # 注意：img_size_h 必须为 48，与 PP-OCR 模型匹配
         img_size_w = int(properties.get('img_size_w', 640))
         img_size_h = int(properties.get('img_size_h', 48))
         use_beam_search = properties.get('use_beam_search', False)
         beam_size = int(properties.get('beam_size', 5))
+        cpu_threads = int(properties.get('cpu_threads', 0))
+        det_mode = properties.get('det_mode') or 'resize'
+        det_text_height = int(properties.get('det_text_height', 16))
+        incremental = bool(properties.get('incremental', False))
         
         config_key = (f"{node_id}_{properties.get('backend')}_{properties.get('det_model')}_"
-                      f"{img_size_w}x{img_size_h}_beam{use_beam_search}")
+                      f"{properties.get('rec_model')}_{img_size_w}x{img_size_h}_"
+                      f"beam{use_beam_search}{beam_size}_threads{cpu_threads}_"
+                      f"det{det_mode}{det_text_height}_inc{incremental}")
         
         if config_key not in context.ocr_engines:
             try:
-                # 构建 img_size 参数
-                # 支持多个尺寸用于不同长度的文本
-                img_size = [[img_size_w, img_size_h]]
-                # 如果宽度较大，添加一个较小的尺寸用于短文本
-                if img_size_w > 400:
-                    img_size.insert(0, [320, img_size_h])
-                
-                engine = OCREngine(
-                    lang=['ch', 'en'],  # 默认中英文
-                    conf_threshold=float(properties.get('conf_threshold', 0.5)),
-                    use_angle_cls=properties.get('use_angle_cls', False),
-                    backend=properties.get('backend', 'auto'),
-                    det_model=properties.get('det_model'),
-                    rec_model=properties.get('rec_model'),
-                    cls_model=properties.get('cls_model') or None,
-                    char_dict_path=properties.get('char_dict_path'),
-                    dev_id=int(properties.get('dev_id', 0)),
-                    img_size=img_size,
-                    use_beam_search=use_beam_search,
-                    beam_size=beam_size
-                )
-                context.ocr_engines[config_key] = engine
-                logger.info(f"OCR引擎已创建: backend={properties.get('backend')}, "
-                           f"img_size={img_size}, beam_search={use_beam_search}")
+                owner = _model_owner(context)
+                context.ocr_engines[config_key] = acquire_ocr_engine(owner, properties)
+                logger.info(f"OCR引擎已就绪: backend={properties.get('backend')}, "
+                           f"img_size={img_size_w}x{img_size_h}, beam_search={use_beam_search}")
             except Exception as e:
                 logger.error(f"创建OCR引擎失败: {e}")
                 return None
@@ -23,6 +23,9 @@ from api.sse_service import send_debug
 class RTSPSourceNode(BaseNode):
     """RTSP 视频源节点"""
     
+    produces = ('current_frame', 'current_timestamp')
+    consumes = ()
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -83,6 +86,9 @@ class KVMSourceNode(BaseNode):
     使用 KVM 连接池管理器获取帧，多流程共享同一 KVM 连接。
     """
     
+    produces = ('current_frame', 'current_timestamp', 'kvm_config')
+    consumes = ()
+    
     @classmethod
     def get_config(cls) -> NodeConfig:
         return NodeConfig(
@@ -0,0 +1,314 @@
+"""增量 OCR
+
+连续帧画面大部分不变时，只对变化区域重新检测和识别:
+1. 当前帧与同一数据流上一帧按块比较灰度差异，得到变化块（脏块），并向外扩展 margin 块
+2. 上一帧中与脏块相交的文本框作废，其所在的块也并入脏块（整行重新识别）
+3. 脏块的各连通区域裁剪后整批送入 OCR 引擎，结果坐标平移回原图
+4. 完全位于未变化块内的上一帧结果直接保留
+
+脏块占比超过 full_ratio、画面尺寸或置信度阈值变化、首帧时整帧识别。
+每帧记录重新处理的画面比例（整帧识别为 1.0）。
+
+OCR 引擎由多个流程共享，增量状态按数据流（流程 + 节点）分别保存。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from monitoring.metrics import get_metrics_collector
+
+
+# 比较块边长（像素）
+INCREMENTAL_BLOCK_SIZE = 32
+# 像素灰度差超过该值视为变化（过滤视频压缩噪声）
+INCREMENTAL_PIXEL_THRESHOLD = 24
+# 块内变化像素数达到该值视为脏块
+INCREMENTAL_MIN_CHANGED_PIXELS = 4
+# 脏块向外扩展的块数（覆盖新出现文字的边缘）
+INCREMENTAL_MARGIN_BLOCKS = 1
+# 脏区域占比超过该值时整帧识别
+INCREMENTAL_FULL_RATIO = 0.5
+# 脏区域数超过该值时整帧识别（避免大量小区域逐个检测）
+INCREMENTAL_MAX_REGIONS = 16
+# 最多保存状态的数据流数
+INCREMENTAL_MAX_STREAMS = 32
+
+
+class _StreamState:
+    """单个数据流的上一帧状态"""
+
+    __slots__ = ('gray', 'results', 'conf')
+
+    def __init__(self, gray: np.ndarray, results: List[Dict[str, Any]], conf: Optional[float]):
+        self.gray = gray
+        self.results = results
+        self.conf = conf
+
+
+def _to_gray(frame: np.ndarray) -> np.ndarray:
+    """灰度参考帧（独立副本，调用方复用帧缓冲区时不受影响）"""
+    if frame.ndim == 3 and frame.shape[2] == 3:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    if frame.ndim == 3:
+        return frame[:, :, 0].copy()
+    return frame.copy()
+
+
+def _result_rect(result: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """识别结果的外接矩形 (x0, y0, x1, y1)"""
+    x, y, w, h = result['bbox_rect']
+    return x, y, x + w, y + h
+
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """复制识别结果（坐标列表单独复制）"""
+    result = dict(result)
+    result['bbox'] = [list(pt) for pt in result['bbox']]
+    result['bbox_rect'] = list(result['bbox_rect'])
+    return result
+
+
+def _shift_result(result: Dict[str, Any], dx: int, dy: int) -> Dict[str, Any]:
+    """区域内识别结果的坐标平移回原图"""
+    result['bbox'] = [[pt[0] + dx, pt[1] + dy] for pt in result['bbox']]
+    x, y, w, h = result['bbox_rect']
+    result['bbox_rect'] = [x + dx, y + dy, w, h]
+    return result
+
+
+class IncrementalOCR:
+    """增量 OCR 调度
+
+    不直接调用模型，由调用方传入整批识别函数（OCREngine 的后端 recognize_batch），
+    本类负责计算脏区域、拼装结果和维护各数据流的状态。
+    """
+
+    def __init__(
+        self,
+        block_size: int = INCREMENTAL_BLOCK_SIZE,
+        pixel_threshold: int = INCREMENTAL_PIXEL_THRESHOLD,
+        min_changed_pixels: int = INCREMENTAL_MIN_CHANGED_PIXELS,
+        margin_blocks: int = INCREMENTAL_MARGIN_BLOCKS,
+        full_ratio: float = INCREMENTAL_FULL_RATIO,
+        max_regions: int = INCREMENTAL_MAX_REGIONS,
+        max_streams: int = INCREMENTAL_MAX_STREAMS
+    ):
+        self.block_size = block_size
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_pixels = min_changed_pixels
+        self.margin_blocks = margin_blocks
+        self.full_ratio = full_ratio
+        self.max_regions = max_regions
+        self.max_streams = max_streams
+
+        self._states: 'OrderedDict[str, _StreamState]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.frames = 0
+        self.full_frames = 0
+        self.unchanged_frames = 0
+        self.last_ratio = 1.0
+        self.avg_ratio = 1.0
+        self.diff_time = 0.0
+
+    def dirty_blocks(self, prev_gray: np.ndarray, gray: np.ndarray) -> np.ndarray:
+        """按块比较两帧，返回脏块掩码（块行数 x 块列数，bool）"""
+        h, w = gray.shape
+        bs = self.block_size
+        _, changed = cv2.threshold(cv2.absdiff(prev_gray, gray), self.pixel_threshold, 1, cv2.THRESH_BINARY)
+        # 积分图求各块变化像素数（最后一行 / 列块可能不满）
+        integral = cv2.integral(changed)
+        ys = np.minimum(np.arange(0, h + bs, bs), h)
+        xs = np.minimum(np.arange(0, w + bs, bs), w)
+        corners = integral[np.ix_(ys, xs)]
+        counts = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+        return counts >= self.min_changed_pixels
+
+    def _expand(self, mask: np.ndarray) -> np.ndarray:
+        if self.margin_blocks <= 0:
+            return mask
+        size = 2 * self.margin_blocks + 1
+        kernel = np.ones((size, size), dtype=np.uint8)
+        return cv2.dilate(mask.astype(np.uint8), kernel).astype(bool)
+
+    def _block_span(self, rect, rows: int, cols: int) -> Tuple[int, int, int, int]:
+        """矩形覆盖的块范围 (行起, 行止, 列起, 列止)，止为开区间"""
+        bs = self.block_size
+        x0, y0, x1, y1 = rect
+        return (max(0, int(y0 // bs)), min(rows, int(y1 // bs) + 1),
+                max(0, int(x0 // bs)), min(cols, int(x1 // bs) + 1))
+
+    def plan(self, state: Optional[_StreamState], gray: np.ndarray, conf: Optional[float]):
+        """计算一帧的处理方式
+
+        Returns:
+            (kept, regions, mask): 保留的上一帧结果、需要重新识别的区域
+            [(x, y, w, h)]、脏块掩码；regions 为 None 表示整帧识别
+        """
+        if state is None or state.gray.shape != gray.shape or state.conf != conf:
+            return [], None, None
+
+        mask = self.dirty_blocks(state.gray, gray)
+        if not mask.any():
+            return state.results, [], mask
+        mask = self._expand(mask)
+
+        # 与脏块相交的上一帧文本框作废，其覆盖的块整体重新识别
+        rows, cols = mask.shape
+        kept = []
+        touched = mask.copy()
+        for result in state.results:
+            r0, r1, c0, c1 = self._block_span(_result_rect(result), rows, cols)
+            if mask[r0:r1, c0:c1].any():
+                touched[r0:r1, c0:c1] = True
+            else:
+                kept.append(result)
+        mask = touched
+
+        if mask.mean() > self.full_ratio:
+            logger.debug(f"增量 OCR: 变化区域占比 {mask.mean():.1%}，整帧识别")
+            return [], None, None
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+        if count - 1 > self.max_regions:
+            logger.debug(f"增量 OCR: 变化区域 {count - 1} 个，整帧识别")
+            return [], None, None
+
+        h, w = gray.shape
+        bs = self.block_size
+        regions = []
+        for bx, by, bw, bh, _ in stats[1:].tolist():
+            x, y = bx * bs, by * bs
+            regions.append((x, y, min(w, (bx + bw) * bs) - x, min(h, (by + bh) * bs) - y))
+        return kept, regions, mask
+
+    def recognize_batch(
+        self,
+        recognize_batch: Callable[[List[np.ndarray], List[Optional[float]]], List[List[Dict[str, Any]]]],
+        frames: Sequence[np.ndarray],
+        conf_thresholds: Sequence[Optional[float]],
+        streams: Sequence[Optional[str]]
+    ) -> List[List[Dict[str, Any]]]:
+        """增量识别一批帧
+
+        Args:
+            recognize_batch: 整批识别函数
+            frames: 输入图像列表(BGR格式)
+            conf_thresholds: 每张图像的置信度阈值
+            streams: 每张图像所属的数据流，None 表示不做增量识别
+
+        Returns:
+            每张图像的识别结果列表
+        """
+        diff_start = time.time()
+        plans = []
+        inputs: List[np.ndarray] = []
+        input_confs: List[Optional[float]] = []
+        # 每个输入 -> (帧序号, 区域, 脏块掩码)
+        owners = []
+        grays = []
+        for id, (frame, conf, stream) in enumerate(zip(frames, conf_thresholds, streams)):
+            gray = _to_gray(frame) if stream is not None else None
+            grays.append(gray)
+            state = None
+            if stream is not None:
+                with self._lock:
+                    state = self._states.get(stream)
+            kept, regions, mask = self.plan(state, gray, conf) if gray is not None else ([], None, None)
+            plans.append((kept, regions, state))
+            if regions is None:
+                inputs.append(frame)
+                input_confs.append(conf)
+                owners.append((id, None, None))
+                continue
+            for region in regions:
+                x, y, w, h = region
+                inputs.append(frame[y:y + h, x:x + w])
+                input_confs.append(conf)
+                owners.append((id, region, mask))
+        self.diff_time += time.time() - diff_start
+
+        outputs = recognize_batch(inputs, input_confs) if inputs else []
+
+        results: List[List[Dict[str, Any]]] = [list(kept) for kept, _, _ in plans]
+        bs = self.block_size
+        for (id, region, mask), output in zip(owners, outputs):
+            if region is None:
+                results[id].extend(output)
+                continue
+            x, y = region[0], region[1]
+            rows, cols = mask.shape
+            for result in output:
+                result = _shift_result(result, x, y)
+                x0, y0, x1, y1 = _result_rect(result)
+                # 中心落在未变化块内的文本框与保留的结果重复，丢弃
+                row = min(rows - 1, int((y0 + y1) / 2 // bs))
+                col = min(cols - 1, int((x0 + x1) / 2 // bs))
+                if mask[row, col]:
+                    results[id].append(result)
+
+        for id, (frame, stream) in enumerate(zip(frames, streams)):
+            _, regions, state = plans[id]
+            if regions:
+                results[id].sort(key=lambda r: (r['bbox_rect'][1], r['bbox_rect'][0]))
+            self._record(frame, regions)
+            if stream is not None:
+                gray = grays[id]
+                if regions is not None:
+                    # 参考帧只更新重新识别过的区域，缓慢变化（如渐变）累积到阈值后仍会被发现
+                    gray = state.gray
+                    if regions:
+                        gray = gray.copy()
+                        for x, y, w, h in regions:
+                            gray[y:y + h, x:x + w] = grays[id][y:y + h, x:x + w]
+                with self._lock:
+                    self._states[stream] = _StreamState(gray, results[id], conf_thresholds[id])
+                    self._states.move_to_end(stream)
+                    while len(self._states) > self.max_streams:
+                        self._states.popitem(last=False)
+                # 调用方可能修改返回的结果，状态中保留独立副本
+                results[id] = [_copy_result(r) for r in results[id]]
+        return results
+
+    def _record(self, frame: np.ndarray, regions: Optional[List[Tuple[int, int, int, int]]]) -> None:
+        """记录重新处理的画面比例"""
+        if regions is None:
+            ratio = 1.0
+            self.full_frames += 1
+        else:
+            area = float(frame.shape[0] * frame.shape[1]) or 1.0
+            ratio = sum(w * h for _, _, w, h in regions) / area
+            if not regions:
+                self.unchanged_frames += 1
+        self.frames += 1
+        self.last_ratio = ratio
+        alpha = 0.1
+        self.avg_ratio = alpha * ratio + (1 - alpha) * self.avg_ratio
+        get_metrics_collector().record_ocr_reprocessed(ratio)
+
+    def reset(self, stream: Optional[str] = None) -> None:
+        """清除数据流状态（stream 为 None 时清除全部）"""
+        with self._lock:
+            if stream is None:
+                self._states.clear()
+            else:
+                self._states.pop(stream, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'frames': self.frames,
+            'full_frames': self.full_frames,
+            'unchanged_frames': self.unchanged_frames,
+            'streams': len(self._states),
+            'last_reprocessed_ratio': round(self.last_ratio, 4),
+            'avg_reprocessed_ratio': round(self.avg_ratio, 4),
+            'diff_time': self.diff_time
+        }
@@ -1,7 +1,7 @@
 """OCR 识别模块
 
-支持PP-OCR Sophon硬件加速和模拟模式。
-优先使用PP-OCR Sophon引擎,如果不可用则回退到模拟模式。
+支持PP-OCR Sophon硬件加速、CPU(ONNX 模型)和模拟模式。
+优先使用PP-OCR Sophon引擎,其次 CPU 引擎,如果都不可用则回退到模拟模式。
 """
 import time
 import random
@@ -10,6 +10,9 @@ from pathlib import Path
 import numpy as np
 from loguru import logger
 
+from monitoring.tracer import traced
+from ocr.incremental import IncrementalOCR
+
 # 尝试导入PP-OCR Sophon引擎
 try:
     from ocr.ppocr_sophon import PPOCRSophon
@@ -18,11 +21,19 @@ except ImportError:
     PPOCR_SOPHON_AVAILABLE = False
     logger.debug("PP-OCR Sophon引擎不可用,将使用模拟模式")
 
+# 尝试导入PP-OCR CPU引擎(ONNX Runtime / OpenCV DNN)
+try:
+    from ocr.ppocr_cpu import PPOCRCpu
+    PPOCR_CPU_AVAILABLE = True
+except ImportError as e:
+    PPOCR_CPU_AVAILABLE = False
+    logger.debug(f"PP-OCR CPU引擎不可用: {e}")
+
 
 class OCREngine:
     """OCR 识别引擎
     
-    支持PP-OCR Sophon硬件加速和模拟模式。
+    支持PP-OCR Sophon硬件加速、CPU(ONNX 模型)和模拟模式。
     自动检测并选择可用的后端。
     
     Attributes:
@@ -30,13 +41,16 @@ class OCREngine:
         conf_threshold: 最小置信度阈值
         use_angle_cls: 是否使用方向分类器
         use_gpu: 是否使用 GPU
-        backend: 使用的后端('sophon'或'mock')
+        backend: 使用的后端('sophon'、'cpu'或'mock')
         mock_mode: 是否为模拟模式
         det_model: 检测模型路径
         rec_model: 识别模型路径
         cls_model: 分类模型路径
         char_dict_path: 字符字典路径
         dev_id: Sophon设备ID
+        cpu_threads: CPU后端推理线程数(0 表示由运行时决定)
+        det_mode: 检测模式('resize'、'tile'或'adaptive')
+        incremental: 是否启用增量识别(只重新处理相邻帧间变化的区域)
     """
     
     def __init__(
@@ -53,7 +67,12 @@ class OCREngine:
         dev_id: int = 0,
         img_size: list = None,
         use_beam_search: bool = False,
-        beam_size: int = 5
+        beam_size: int = 5,
+        cpu_threads: int = 0,
+        det_limit_side_len: int = 960,
+        det_mode: str = "resize",
+        det_text_height: int = 16,
+        incremental: bool = False
     ):
         """初始化 OCR 引擎
         
@@ -62,15 +81,21 @@ class OCREngine:
             conf_threshold: 最小置信度阈值
             use_angle_cls: 是否使用方向分类器
             use_gpu: 是否使用 GPU
-            backend: 后端选择('auto','sophon','mock')
-            det_model: 检测模型BModel路径
-            rec_model: 识别模型BModel路径
-            cls_model: 分类模型BModel路径
+            backend: 后端选择('auto','sophon','cpu','mock')
+            det_model: 检测模型路径(Sophon 为 BModel,CPU 为 ONNX)
+            rec_model: 识别模型路径(Sophon 为 BModel,CPU 为 ONNX)
+            cls_model: 分类模型路径(Sophon 为 BModel,CPU 为 ONNX)
             char_dict_path: 字符字典路径(ppocr_keys_v1.txt)
             dev_id: Sophon设备ID
             img_size: 识别模型输入尺寸列表,如 [[320, 48], [640, 48]]
             use_beam_search: 是否使用 beam search
             beam_size: beam search 宽度
+            cpu_threads: CPU后端推理线程数(0 表示由运行时决定)
+            det_limit_side_len: CPU后端检测输入最长边
+            det_mode: 检测模式,'resize' 整帧缩放,'tile' 原分辨率分块,
+                'adaptive' 按预期文字高度缩放后分块(适合 1440p/4K 画面)
+            det_text_height: 预期文字高度(像素,自适应检测模式)
+            incremental: 是否启用增量识别,调用时需指定数据流(stream)
         """
         self.lang = lang or ['ch', 'en']
         self.conf_threshold = conf_threshold
@@ -86,7 +111,13 @@ class OCREngine:
         self.img_size = img_size or [[320, 48], [640, 48]]
         self.use_beam_search = use_beam_search
         self.beam_size = beam_size
+        self.cpu_threads = cpu_threads
+        self.det_limit_side_len = det_limit_side_len
+        self.det_mode = det_mode
+        self.det_text_height = det_text_height
         self.mock_mode = True
+        # 增量识别(按数据流保存上一帧的文本框和识别结果)
+        self.incremental = IncrementalOCR() if incremental else None
         
         # 实际OCR引擎实例
         self.ocr_engine = None
@@ -119,16 +150,21 @@ class OCREngine:
         """
         # 确定使用的后端
         use_sophon = False
+        use_cpu = False
         
         if self.backend == "sophon":
             use_sophon = True
+        elif self.backend == "cpu":
+            use_cpu = True
         elif self.backend == "mock":
             use_sophon = False
         elif self.backend == "auto":
-            # 自动检测:如果指定了模型路径且PP-OCR Sophon可用,则使用Sophon
-            if PPOCR_SOPHON_AVAILABLE and self.det_model and self.rec_model:
+            # 自动检测:模型文件存在时,ONNX 模型使用CPU引擎,其余使用Sophon引擎
+            if self.det_model and self.rec_model:
                 if Path(self.det_model).exists() and Path(self.rec_model).exists():
-                    use_sophon = True
+                    is_onnx = self.det_model.endswith('.onnx') and self.rec_model.endswith('.onnx')
+                    use_cpu = is_onnx and PPOCR_CPU_AVAILABLE
+                    use_sophon = not is_onnx and PPOCR_SOPHON_AVAILABLE
         
         # 尝试使用Sophon后端
         if use_sophon:
@@ -138,6 +174,7 @@ class OCREngine:
                 logger.info(f"识别模型: {self.rec_model}")
                 logger.info(f"字符字典: {self.char_dict_path}")
                 logger.info(f"识别尺寸: {self.img_size}, beam_search={self.use_beam_search}")
+                logger.info(f"检测模式: {self.det_mode}")
                 self.ocr_engine = PPOCRSophon(
                     det_model=self.det_model,
                     rec_model=self.rec_model,
@@ -148,7 +185,9 @@ class OCREngine:
                     dev_id=self.dev_id,
                     img_size=self.img_size,
                     use_beam_search=self.use_beam_search,
-                    beam_size=self.beam_size
+                    beam_size=self.beam_size,
+                    det_mode=self.det_mode,
+                    det_text_height=self.det_text_height
                 )
                 self.mock_mode = False
                 self.backend = "sophon"
@@ -157,6 +196,35 @@ class OCREngine:
             except Exception as e:
                 logger.warning(f"PP-OCR Sophon后端初始化失败: {e}, 回退到模拟模式")
         
+        # 尝试使用CPU后端
+        if use_cpu:
+            try:
+                if not PPOCR_CPU_AVAILABLE:
+                    raise RuntimeError("PP-OCR CPU引擎不可用")
+                logger.info(f"尝试使用PP-OCR CPU后端")
+                logger.info(f"识别尺寸: {self.img_size}, 线程数: {self.cpu_threads or 'auto'}")
+                self.ocr_engine = PPOCRCpu(
+                    det_model=self.det_model,
+                    rec_model=self.rec_model,
+                    cls_model=self.cls_model,
+                    char_dict_path=self.char_dict_path,
+                    use_angle_cls=self.use_angle_cls,
+                    rec_thresh=self.conf_threshold,
+                    img_size=self.img_size,
+                    use_beam_search=self.use_beam_search,
+                    beam_size=self.beam_size,
+                    threads=self.cpu_threads,
+                    det_limit_side_len=self.det_limit_side_len,
+                    det_mode=self.det_mode,
+                    det_text_height=self.det_text_height
+                )
+                self.mock_mode = False
+                self.backend = "cpu"
+                logger.success(f"OCR引擎初始化成功(PP-OCR CPU后端)")
+                return True
+            except Exception as e:
+                logger.warning(f"PP-OCR CPU后端初始化失败: {e}, 回退到模拟模式")
+        
         # 回退到模拟模式
         logger.info(f"初始化 OCR 引擎(模拟模式)")
         logger.warning("当前使用模拟模式,不会加载真实OCR引擎")
@@ -168,16 +236,19 @@ class OCREngine:
         logger.success("OCR 引擎初始化成功(模拟模式)")
         return True
     
+    @traced("ocr.recognize", "ocr")
     def recognize(
         self,
         frame_or_roi: np.ndarray,
-        conf_threshold: Optional[float] = None
+        conf_threshold: Optional[float] = None,
+        stream: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """识别图像中的文字
         
         Args:
             frame_or_roi: 输入图像或 ROI (BGR格式)
             conf_threshold: 置信度阈值(可选,覆盖默认值)
+            stream: 数据流标识(启用增量识别时,同一数据流的相邻帧只重新处理变化区域)
             
         Returns:
             识别结果列表,每个结果包含:
@@ -186,9 +257,11 @@ class OCREngine:
             - bbox: 文本边界框 [[x1,y1], [x2,y2], [x3,y3], [x4,y4]]
             - bbox_rect: 矩形边界框 [x, y, w, h]
         """
-        # 使用PP-OCR Sophon后端
+        # 使用PP-OCR Sophon / CPU后端
         if not self.mock_mode and self.ocr_engine is not None:
             try:
+                if self.incremental is not None and stream is not None:
+                    return self._recognize_incremental([frame_or_roi], [conf_threshold], [stream])[0]
                 return self.ocr_engine.recognize(frame_or_roi, conf_threshold)
             except Exception as e:
                 logger.error(f"PP-OCR识别失败: {e}, 回退到模拟模式")
@@ -270,6 +343,55 @@ class OCREngine:
             self.stats['errors'] += 1
             return []
     
+    @traced("ocr.recognize_batch", "ocr")
+    def recognize_batch(
+        self,
+        frames: List[np.ndarray],
+        conf_thresholds: Optional[List[Optional[float]]] = None,
+        streams: Optional[List[Optional[str]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """批量识别多张图像中的文字
+        
+        Args:
+            frames: 输入图像列表 (BGR格式)
+            conf_thresholds: 每张图像的置信度阈值(可选)
+            streams: 每张图像所属的数据流(可选,用于增量识别)
+            
+        Returns:
+            每张图像的识别结果列表,格式同 recognize()
+        """
+        if conf_thresholds is None:
+            conf_thresholds = [None] * len(frames)
+        
+        # PP-OCR Sophon / CPU 后端整批推理
+        if not self.mock_mode and self.ocr_engine is not None:
+            try:
+                if self.incremental is not None and streams is not None and any(streams):
+                    return self._recognize_incremental(frames, conf_thresholds, streams)
+                return self.ocr_engine.recognize_batch(frames, conf_thresholds)
+            except Exception as e:
+                logger.error(f"PP-OCR批量识别失败: {e}, 回退到逐张识别")
+        
+        return [self.recognize(frame, conf) for frame, conf in zip(frames, conf_thresholds)]
+    
+    def _recognize_incremental(
+        self,
+        frames: List[np.ndarray],
+        conf_thresholds: List[Optional[float]],
+        streams: List[Optional[str]]
+    ) -> List[List[Dict[str, Any]]]:
+        """增量识别: 只对各数据流相邻帧间变化的区域重新检测和识别"""
+        errors = self.ocr_engine.stats.get('errors', 0)
+        results = self.incremental.recognize_batch(
+            self.ocr_engine.recognize_batch, frames, conf_thresholds, streams
+        )
+        if self.ocr_engine.stats.get('errors', 0) != errors:
+            # 后端识别出错时返回空结果,不能作为后续帧的基准
+            for stream in streams:
+                if stream is not None:
+                    self.incremental.reset(stream)
+        return results
+    
     def recognize_region(
         self,
         frame: np.ndarray,
@@ -364,12 +486,14 @@ class OCREngine:
         Returns:
             统计信息字典
         """
-        # 如果使用PP-OCR Sophon后端,返回Sophon统计信息
+        # 如果使用PP-OCR Sophon / CPU后端,返回引擎统计信息
         if not self.mock_mode and self.ocr_engine is not None:
             try:
                 stats = self.ocr_engine.get_stats()
-                stats['backend'] = 'sophon'
+                stats['backend'] = self.backend
                 stats['mock_mode'] = False
+                if self.incremental is not None:
+                    stats['incremental'] = self.incremental.get_stats()
                 return stats
             except:
                 pass
@@ -11,7 +11,11 @@ import os
 import cv2
 import numpy as np
 import argparse
-import sophon.sail as sail
+try:
+    import sophon.sail as sail
+except ImportError:
+    # CPU 后端（ppocr_cpu）只复用预处理和后处理，不需要 SAIL
+    sail = None
 import math
 import logging
 import time
@@ -21,6 +25,12 @@ class PPOCRv2Cls(object):
     def __init__(self, args):
         self.cls_thresh = args.cls_thresh
         self.label_list = args.label_list
+        self.load_model(args)
+        self.preprocess_time = 0.0
+        self.inference_time = 0.0
+        self.postprocess_time = 0.0
+
+    def load_model(self, args):
         # load bmodel
         model_path = args.bmodel_cls
         logging.info("using model {}".format(model_path))
@@ -30,9 +40,6 @@ class PPOCRv2Cls(object):
         logging.info("load bmodel success!")
         self.input_shape = self.net.get_max_input_shapes(self.graph_name)[self.input_name]
         self.cls_batch_size = self.input_shape[0] # Max batch size in model stages.
-        self.preprocess_time = 0.0
-        self.inference_time = 0.0
-        self.postprocess_time = 0.0
         
     def preprocess(self, img):
         h, w, _ = img.shape
@@ -0,0 +1,301 @@
+"""PP-OCR CPU引擎
+
+在没有 Sophon TPU 的主机(开发、CI 环境)上运行导出为 ONNX 的 PP-OCR
+检测、分类、识别模型。推理使用 ONNX Runtime(未安装时使用 OpenCV DNN),
+预处理、DB 后处理、文本框裁剪和 CTC 解码复用 Sophon 版本的实现。
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from ocr.ppocr_sophon import PPOCRSophon, Args, PPOCR_AVAILABLE
+
+if not PPOCR_AVAILABLE:
+    raise ImportError("PP-OCR预处理/后处理模块不可用(需要 opencv-python、shapely、pyclipper)")
+
+from ocr.ppocr_sophon import predict_det, predict_rec, predict_cls
+
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+    logger.debug("onnxruntime 未安装,CPU OCR 后端使用 OpenCV DNN")
+
+
+# 检测模型输入尺寸需为 32 的倍数
+_DET_ALIGN = 32
+
+
+class OnnxModel:
+    """ONNX 模型推理(ONNX Runtime 优先,未安装时使用 OpenCV DNN)
+
+    Attributes:
+        input_shape: 模型输入形状,动态维度为 -1(OpenCV DNN 无法获取,全部为 -1)
+        runtime: 实际使用的推理运行时('onnxruntime' / 'opencv')
+    """
+
+    def __init__(self, model_path: str, threads: int = 0):
+        """
+        Args:
+            model_path: ONNX 模型路径
+            threads: 算子内并行线程数,0 表示由运行时决定(仅 ONNX Runtime;
+                OpenCV DNN 的线程数为进程级设置,见配置 executor.opencv_threads)
+        """
+        self.model_path = model_path
+        self.threads = threads
+        self.session = None
+        self.net = None
+        # OpenCV DNN 的 Net 对象不是线程安全的
+        self._lock = threading.Lock()
+
+        if ORT_AVAILABLE:
+            options = ort.SessionOptions()
+            if threads > 0:
+                options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(
+                model_path, sess_options=options, providers=['CPUExecutionProvider']
+            )
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            self.input_shape = [d if isinstance(d, int) and d > 0 else -1 for d in model_input.shape]
+            self.runtime = 'onnxruntime'
+        else:
+            self.net = cv2.dnn.readNetFromONNX(model_path)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            self.input_name = ''
+            self.input_shape = [-1, -1, -1, -1]
+            self.runtime = 'opencv'
+
+    def run(self, tensor: np.ndarray) -> np.ndarray:
+        """推理,返回第一个输出"""
+        tensor = np.ascontiguousarray(tensor, dtype=np.float32)
+        if self.session is not None:
+            return self.session.run(None, {self.input_name: tensor})[0]
+        with self._lock:
+            self.net.setInput(tensor)
+            return self.net.forward()
+
+
+class CpuTextDetector(predict_det.PPOCRv2Det):
+    """PP-OCR 检测模型(ONNX)
+
+    动态输入尺寸的模型按最长边限制缩放后补齐到 32 的倍数,
+    不像 BModel 那样补齐为正方形;分块检测时块大小为 limit_side_len 的正方形。
+    """
+
+    def __init__(self, args):
+        self.limit_side_len = args.det_limit_side_len
+        super().__init__(args)
+
+    def load_model(self, args):
+        self.net = OnnxModel(args.det_model, args.threads)
+        batch, _, height, width = (self.net.input_shape + [-1] * 4)[:4]
+        self.dynamic_shape = height <= 0 or width <= 0
+        # 分块检测的各块尺寸相同，动态批大小模型整批推理
+        self.dynamic_batch = batch <= 0
+        if self.dynamic_shape:
+            self.input_shape = [1, 3, self.limit_side_len, self.limit_side_len]
+            self.det_batch_size = 1
+        else:
+            self.input_shape = [max(batch, 1), 3, height, width]
+            self.det_batch_size = self.input_shape[0]
+
+    def preprocess(self, img):
+        if not self.dynamic_shape:
+            return super().preprocess(img)
+
+        h, w, _ = img.shape
+        ratio = min(1.0, float(self.limit_side_len) / max(h, w))
+        resize_h = max(1, int(h * ratio))
+        resize_w = max(1, int(w * ratio))
+        if h != resize_h or w != resize_w:
+            img = cv2.resize(img, (resize_w, resize_h))
+        img = (img.astype('float32') - self.mean) * self.scale
+
+        pad_h = -(-resize_h // _DET_ALIGN) * _DET_ALIGN
+        pad_w = -(-resize_w // _DET_ALIGN) * _DET_ALIGN
+        padding_im = np.zeros((3, pad_h, pad_w), dtype=np.float32)
+        padding_im[:, 0:resize_h, 0:resize_w] = np.transpose(img, (2, 0, 1))
+        return padding_im, [h, w, resize_h, resize_w]
+
+    def predict(self, tensor):
+        return self.net.run(tensor)
+
+
+class CpuTextRecognizer(predict_rec.PPOCRv2Rec):
+    """PP-OCR 识别模型(ONNX),CTC 解码沿用 PPOCRv2Rec.postprocess
+
+    动态形状模型按宽高比排序组批,每批补齐到批内最大宽度。
+    """
+
+    def load_model(self, args):
+        self.net = OnnxModel(args.rec_model, args.threads)
+        batch, width = self.net.input_shape[0], self.net.input_shape[-1]
+        self.input_shape = self.net.input_shape
+        self.rec_batch_size = batch if batch > 0 else args.rec_batch_size
+        # 动态形状模型每批补齐到批内最大宽度
+        self.dynamic_batch = batch <= 0
+        self.dynamic_width = width <= 0
+
+    def predict(self, tensor):
+        start_infer = time.time()
+        outputs = self.net.run(tensor)
+        self.inference_time += time.time() - start_infer
+        return outputs
+
+
+class CpuTextClassifier(predict_cls.PPOCRv2Cls):
+    """PP-OCR 方向分类模型(ONNX)"""
+
+    # 动态输入尺寸模型的默认输入形状(PP-OCR 方向分类模型为 3x48x192)
+    DEFAULT_INPUT_SHAPE = [6, 3, 48, 192]
+
+    def load_model(self, args):
+        self.net = OnnxModel(args.cls_model, args.threads)
+        shape = (self.net.input_shape + [-1] * 4)[:4]
+        self.input_shape = [s if s > 0 else d for s, d in zip(shape, self.DEFAULT_INPUT_SHAPE)]
+        self.cls_batch_size = self.input_shape[0]
+
+    def predict(self, tensor):
+        return self.net.run(tensor)
+
+
+class PPOCRCpu(PPOCRSophon):
+    """PP-OCR CPU引擎
+
+    接口与 PPOCRSophon 相同(recognize / recognize_batch / get_stats),
+    模型为 ONNX 格式。
+
+    Attributes:
+        threads: 算子内并行线程数(0 表示由运行时决定)
+        det_limit_side_len: 检测输入最长边(动态尺寸模型)
+        rec_batch_size: 识别批大小(动态批大小模型)
+    """
+
+    def __init__(
+        self,
+        det_model: str,
+        rec_model: str,
+        cls_model: str = None,
+        char_dict_path: str = None,
+        use_angle_cls: bool = False,
+        rec_thresh: float = 0.5,
+        img_size: list = None,
+        use_space_char: bool = True,
+        use_beam_search: bool = False,
+        beam_size: int = 5,
+        threads: int = 0,
+        det_limit_side_len: int = 960,
+        rec_batch_size: int = 8,
+        det_mode: str = "resize",
+        det_text_height: int = 16
+    ):
+        """初始化PP-OCR CPU引擎
+
+        Args:
+            det_model: 检测模型 ONNX 路径
+            rec_model: 识别模型 ONNX 路径
+            cls_model: 分类模型 ONNX 路径(可选)
+            char_dict_path: 字符字典路径(ppocr_keys_v1.txt)
+            use_angle_cls: 是否使用方向分类
+            rec_thresh: 识别置信度阈值
+            img_size: 识别模型输入尺寸列表,如 [[320, 48], [640, 48]]
+            use_space_char: 是否使用空格字符
+            use_beam_search: 是否使用 beam search
+            beam_size: beam search 宽度
+            threads: 算子内并行线程数,0 表示由运行时决定
+            det_limit_side_len: 检测输入最长边(动态尺寸模型)
+            rec_batch_size: 识别批大小(动态批大小模型)
+            det_mode: 检测模式('resize' / 'tile' / 'adaptive')
+            det_text_height: 预期文字高度(像素,自适应检测模式)
+        """
+        self.threads = threads
+        self.det_limit_side_len = det_limit_side_len
+        self.rec_batch_size = rec_batch_size
+        super().__init__(
+            det_model=det_model,
+            rec_model=rec_model,
+            cls_model=cls_model,
+            char_dict_path=char_dict_path,
+            use_angle_cls=use_angle_cls,
+            rec_thresh=rec_thresh,
+            img_size=img_size,
+            use_space_char=use_space_char,
+            use_beam_search=use_beam_search,
+            beam_size=beam_size,
+            det_mode=det_mode,
+            det_text_height=det_text_height
+        )
+
+    def _check_runtime(self) -> None:
+        """CPU 后端只需要 ONNX Runtime 或 OpenCV DNN(OpenCV 为必需依赖)"""
+        pass
+
+    def _load_models(self) -> None:
+        """加载所有 ONNX 模型"""
+        try:
+            logger.info("正在加载PP-OCR CPU模型...")
+            logger.info(f"检测模型: {self.det_model}")
+            logger.info(f"识别模型: {self.rec_model}")
+            logger.info(f"字符字典: {self.char_dict_path}")
+            logger.info(f"推理运行时: {'onnxruntime' if ORT_AVAILABLE else 'opencv'}, "
+                        f"线程数: {self.threads or 'auto'}")
+
+            det_args = Args(
+                det_model=self.det_model,
+                threads=self.threads,
+                det_limit_side_len=self.det_limit_side_len,
+                det_mode=self.det_mode,
+                det_text_height=self.det_text_height
+            )
+            self.text_detector = CpuTextDetector(det_args)
+            logger.info(f"检测模型加载成功: {self.det_model}")
+
+            rec_args = Args(
+                rec_model=self.rec_model,
+                threads=self.threads,
+                rec_batch_size=self.rec_batch_size,
+                char_dict_path=self.char_dict_path,
+                img_size=self.img_size,
+                use_space_char=self.use_space_char,
+                use_beam_search=self.use_beam_search,
+                beam_size=self.beam_size
+            )
+            self.text_recognizer = CpuTextRecognizer(rec_args)
+            logger.info(f"识别模型加载成功: {self.rec_model}")
+
+            if self.use_angle_cls and self.cls_model:
+                cls_args = Args(
+                    cls_model=self.cls_model,
+                    threads=self.threads,
+                    label_list=['0', '180'],
+                    cls_thresh=0.9
+                )
+                self.text_classifier = CpuTextClassifier(cls_args)
+                logger.info(f"分类模型加载成功: {self.cls_model}")
+
+            logger.success("PP-OCR CPU引擎初始化成功")
+
+        except Exception as e:
+            logger.error(f"加载PP-OCR CPU模型失败: {e}")
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息
+
+        Returns:
+            统计信息字典
+        """
+        stats = super().get_stats()
+        stats['runtime'] = self.text_detector.net.runtime if self.text_detector else None
+        stats['threads'] = self.threads
+        return stats
@@ -11,7 +11,11 @@ import os
 import cv2
 import numpy as np
 import argparse
-import sophon.sail as sail
+try:
+    import sophon.sail as sail
+except ImportError:
+    # CPU 后端（ppocr_cpu）只复用预处理和后处理，不需要 SAIL
+    sail = None
 import math
 import logging
 import time
@@ -20,6 +24,22 @@ logging.basicConfig(level=logging.DEBUG)
 from shapely.geometry import Polygon
 import pyclipper
 
+
+# 检测模式: 整帧缩放 / 原分辨率分块 / 按文字高度自适应缩放后分块
+DET_MODE_RESIZE = "resize"
+DET_MODE_TILE = "tile"
+DET_MODE_ADAPTIVE = "adaptive"
+# 自适应模式下缩放后的目标文字高度（像素）
+DET_TARGET_TEXT_HEIGHT = 16
+# 相邻块重叠（缩放后像素），需大于一行文字的高度
+DET_TILE_OVERLAP = 64
+
+
+def _clipper_round(values):
+    """与 Clipper 的 Round 一致: 远离 0 方向四舍五入"""
+    return np.where(values < 0, np.ceil(values - 0.5), np.floor(values + 0.5))
+
+
 class DBPostProcess(object):
     """
     The post process for Differentiable Binarization (DB).
@@ -32,6 +52,7 @@ class DBPostProcess(object):
                  unclip_ratio=1.5,
                  use_dilation=False,
                  score_mode="fast",
+                 use_fast_path=True,
                  **kwargs):
         self.thresh = thresh
         self.box_thresh = box_thresh
@@ -45,6 +66,8 @@ class DBPostProcess(object):
 
         self.dilation_kernel = None if not use_dilation else np.array(
             [[1, 1], [1, 1]])
+        # 轴对齐文本框批量打分和外扩（仅 score_mode="fast"）
+        self.use_fast_path = use_fast_path
 
     def boxes_from_bitmap(self, pred, _bitmap, dest_width, dest_height):
         '''
@@ -61,6 +84,9 @@ class DBPostProcess(object):
         elif len(outs) == 2:
             contours, _ = outs[0], outs[1]
         num_contours = min(len(contours), self.max_candidates)
+        if self.use_fast_path and self.score_mode == "fast":
+            return self.boxes_from_contours_fast(pred, contours[:num_contours],
+                                                 dest_width, dest_height)
         boxes = []
         scores = []
         for index in range(num_contours):
@@ -75,19 +101,115 @@ class DBPostProcess(object):
                 score = self.box_score_slow(pred, contour)
             if self.box_thresh > score:
                 continue
-            box = self.unclip(points).reshape(-1, 1, 2)
-            box, sside = self.get_mini_boxes(box)
-            if sside < self.min_size + 2:
+            box = self.expand_box(points, width, height, dest_width, dest_height)
+            if box is None:
                 continue
-            box = np.array(box)
-            box[:, 0] = np.clip(
-                np.round(box[:, 0] / width * dest_width), 0, dest_width)
-            box[:, 1] = np.clip(
-                np.round(box[:, 1] / height * dest_height), 0, dest_height)
-            boxes.append(box.astype(np.int16))
+            boxes.append(box)
             scores.append(score)
         return np.array(boxes, dtype=np.int16), scores
 
+    def expand_box(self, points, width, height, dest_width, dest_height):
+        """外扩文本框并缩放到原图坐标，过小时返回 None"""
+        box = self.unclip(points).reshape(-1, 1, 2)
+        box, sside = self.get_mini_boxes(box)
+        if sside < self.min_size + 2:
+            return None
+        box = np.array(box)
+        box[:, 0] = np.clip(
+            np.round(box[:, 0] / width * dest_width), 0, dest_width)
+        box[:, 1] = np.clip(
+            np.round(box[:, 1] / height * dest_height), 0, dest_height)
+        return box.astype(np.int16)
+
+    def boxes_from_contours_fast(self, pred, contours, dest_width, dest_height):
+        """
+        boxes_from_bitmap 的快速路径，结果与逐个处理一致（坐标误差不超过 1 像素）:
+        - 外接矩形对角线小于 min_size 的轮廓不计算最小外接矩形
+        - 轴对齐的最小外接矩形用积分图一次性打分（与 box_score_fast 的
+          fillPoly 填充范围相同），外扩按 pyclipper 对矩形的偏移结果直接计算
+        - 倾斜的矩形按原流程逐个处理
+        """
+        height, width = pred.shape
+        min_size = self.min_size
+        results = []
+        aligned_index = []
+        aligned_points = []
+        for index, contour in enumerate(contours):
+            _, _, bw, bh = cv2.boundingRect(contour)
+            # 最小外接矩形的边长不超过轮廓点集的直径
+            if (bw - 1) ** 2 + (bh - 1) ** 2 < min_size ** 2:
+                continue
+            bounding_box = cv2.minAreaRect(contour)
+            if min(bounding_box[1]) < min_size:
+                continue
+            points = cv2.boxPoints(bounding_box)
+            corners = points.tolist()
+            if len({x for x, _ in corners}) <= 2 and len({y for _, y in corners}) <= 2:
+                aligned_index.append(index)
+                aligned_points.append(points)
+                continue
+            points = np.array(self.order_box_points(points))
+            score = self.box_score_fast(pred, points.reshape(-1, 2))
+            if self.box_thresh > score:
+                continue
+            box = self.expand_box(points, width, height, dest_width, dest_height)
+            if box is not None:
+                results.append((index, box, score))
+
+        if aligned_points:
+            results.extend(self._aligned_boxes(pred, aligned_index, np.stack(aligned_points),
+                                               dest_width, dest_height))
+        results.sort(key=lambda item: item[0])
+        boxes = [box for _, box, _ in results]
+        scores = [score for _, _, score in results]
+        return np.array(boxes, dtype=np.int16), scores
+
+    def _aligned_boxes(self, pred, indexes, points, dest_width, dest_height):
+        """批量处理轴对齐的文本框，points: (N, 4, 2) float32"""
+        h, w = pred.shape
+        x0, x1 = points[:, :, 0].min(axis=1), points[:, :, 0].max(axis=1)
+        y0, y1 = points[:, :, 1].min(axis=1), points[:, :, 1].max(axis=1)
+
+        # box_score_fast: 先按 floor/ceil 取外接区域，再把相对坐标截断为整数
+        # 后用 fillPoly 填充（矩形包含边界像素）
+        xmin = np.clip(np.floor(x0).astype(np.int32), 0, w - 1)
+        xmax = np.clip(np.ceil(x1).astype(np.int32), 0, w - 1)
+        ymin = np.clip(np.floor(y0).astype(np.int32), 0, h - 1)
+        ymax = np.clip(np.ceil(y1).astype(np.int32), 0, h - 1)
+
+        def fill_range(lo, hi, start, stop):
+            rel_lo = (lo.astype(np.float64) - start).astype(np.float32).astype(np.int32)
+            rel_hi = (hi.astype(np.float64) - start).astype(np.float32).astype(np.int32)
+            return (start + np.clip(rel_lo, 0, stop - start),
+                    start + np.clip(rel_hi, 0, stop - start))
+
+        c0, c1 = fill_range(x0, x1, xmin, xmax)
+        r0, r1 = fill_range(y0, y1, ymin, ymax)
+        integral = cv2.integral(pred, sdepth=cv2.CV_64F)
+        sums = (integral[r1 + 1, c1 + 1] - integral[r0, c1 + 1]
+                - integral[r1 + 1, c0] + integral[r0, c0])
+        scores = sums / ((r1 - r0 + 1) * (c1 - c0 + 1))
+
+        # unclip: pyclipper 把坐标截断为整数，矩形四边各外扩 distance 后四舍五入
+        x0, x1 = x0.astype(np.float64), x1.astype(np.float64)
+        y0, y1 = y0.astype(np.float64), y1.astype(np.float64)
+        distance = (x1 - x0) * (y1 - y0) * self.unclip_ratio / (2 * ((x1 - x0) + (y1 - y0)))
+        ex0 = _clipper_round(np.trunc(x0) - distance)
+        ex1 = _clipper_round(np.trunc(x1) + distance)
+        ey0 = _clipper_round(np.trunc(y0) - distance)
+        ey1 = _clipper_round(np.trunc(y1) + distance)
+
+        keep = (scores >= self.box_thresh) & (np.minimum(ex1 - ex0, ey1 - ey0) >= self.min_size + 2)
+        bx0 = np.clip(np.round(ex0 / w * dest_width), 0, dest_width)
+        bx1 = np.clip(np.round(ex1 / w * dest_width), 0, dest_width)
+        by0 = np.clip(np.round(ey0 / h * dest_height), 0, dest_height)
+        by1 = np.clip(np.round(ey1 / h * dest_height), 0, dest_height)
+        boxes = np.stack([np.stack([bx0, by0], axis=1), np.stack([bx1, by0], axis=1),
+                          np.stack([bx1, by1], axis=1), np.stack([bx0, by1], axis=1)],
+                         axis=1).astype(np.int16)
+
+        return [(indexes[i], boxes[i], float(scores[i])) for i in np.flatnonzero(keep)]
+
     def unclip(self, box):
         unclip_ratio = self.unclip_ratio
         poly = Polygon(box)
@@ -99,7 +221,12 @@ class DBPostProcess(object):
 
     def get_mini_boxes(self, contour):
         bounding_box = cv2.minAreaRect(contour)
-        points = sorted(list(cv2.boxPoints(bounding_box)), key=lambda x: x[0])
+        box = self.order_box_points(cv2.boxPoints(bounding_box))
+        return box, min(bounding_box[1])
+
+    def order_box_points(self, box_points):
+        """按 左上、右上、右下、左下 排列矩形顶点"""
+        points = sorted(list(box_points), key=lambda x: x[0])
 
         index_1, index_2, index_3, index_4 = 0, 1, 2, 3
         if points[1][1] > points[0][1]:
@@ -118,7 +245,7 @@ class DBPostProcess(object):
         box = [
             points[index_1], points[index_2], points[index_3], points[index_4]
         ]
-        return box, min(bounding_box[1])
+        return box
 
     def box_score_fast(self, bitmap, _box):
         '''
@@ -177,18 +304,68 @@ class DBPostProcess(object):
             boxes_batch.append({'points': boxes})
         return boxes_batch
 
+def merge_tile_boxes(boxes, tile_ids, min_line_overlap=0.5):
+    """合并相邻块的文本框
+
+    重叠区域内的文字会被两个块重复检测，跨接缝的文字行在两个块中各检测出
+    一部分。来自不同块、外接矩形相交且属于同一行（垂直方向重叠不少于较矮
+    文本框高度的 min_line_overlap）的文本框合并为外接矩形，其余保持原样。
+
+    Args:
+        boxes: 文本框列表，每个为 (4, 2) 原图坐标（左上、右上、右下、左下）
+        tile_ids: 每个文本框所属的块序号
+
+    Returns:
+        合并后的文本框列表，按从上到下、从左到右排列
+    """
+    if len(boxes) == 0:
+        return []
+    points = np.stack(boxes).astype(np.float32)
+    x0, x1 = points[:, :, 0].min(axis=1), points[:, :, 0].max(axis=1)
+    y0, y1 = points[:, :, 1].min(axis=1), points[:, :, 1].max(axis=1)
+    tile_ids = np.asarray(tile_ids)
+
+    overlap_w = np.minimum(x1[:, None], x1[None, :]) - np.maximum(x0[:, None], x0[None, :])
+    overlap_h = np.minimum(y1[:, None], y1[None, :]) - np.maximum(y0[:, None], y0[None, :])
+    heights = y1 - y0
+    connect = ((overlap_w > 0) & (overlap_h > 0)
+               & (overlap_h >= min_line_overlap * np.minimum(heights[:, None], heights[None, :]))
+               & (tile_ids[:, None] != tile_ids[None, :]))
+
+    # 并查集合并相连的文本框
+    parent = list(range(len(boxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in np.argwhere(np.triu(connect, 1)).tolist():
+        parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(len(boxes)):
+        groups.setdefault(find(i), []).append(i)
+
+    merged = []
+    for members in groups.values():
+        if len(members) == 1:
+            merged.append(points[members[0]])
+            continue
+        gx0, gx1 = x0[members].min(), x1[members].max()
+        gy0, gy1 = y0[members].min(), y1[members].max()
+        merged.append(np.array([[gx0, gy0], [gx1, gy0], [gx1, gy1], [gx0, gy1]], dtype=np.float32))
+    merged.sort(key=lambda box: (float(box[:, 1].min()), float(box[:, 0].min())))
+    return merged
+
+
 class PPOCRv2Det(object):
+    # 模型批大小是否可变（BModel 只有编译时的固定批大小）
+    dynamic_batch = False
+
     def __init__(self, args):
-        # load bmodel
-        model_path = args.bmodel_det
-        logging.info("using model {}".format(model_path))
-        self.net = sail.Engine(model_path, args.dev_id, sail.IOMode.SYSIO)
-        self.graph_name = self.net.get_graph_names()[0]
-        self.input_name = self.net.get_input_names(self.graph_name)[0]
-        self.input_shape = self.net.get_input_shape(self.graph_name, self.input_name)
-        self.det_batch_size = self.input_shape[0]
-        logging.info("load bmodel success!")
-        #self.input_shape = self.net.get_max_input_shapes(self.graph_name)[self.input_name]
+        self.load_model(args)
         # preprocess
         self.det_limit_side_len = sorted([self.input_shape[2], self.input_shape[3]])
         self.mean = np.array([0.485, 0.456, 0.406]).reshape((1, 1, 3)).astype('float32') * 255.0
@@ -204,7 +381,22 @@ class PPOCRv2Det(object):
         self.preprocess_time = 0.0
         self.inference_time = 0.0
         self.postprocess_time = 0.0
-        
+        # 检测模式（分块检测）
+        self.det_mode = getattr(args, 'det_mode', DET_MODE_RESIZE) or DET_MODE_RESIZE
+        self.det_text_height = getattr(args, 'det_text_height', DET_TARGET_TEXT_HEIGHT) or DET_TARGET_TEXT_HEIGHT
+        self.tile_overlap = getattr(args, 'det_tile_overlap', DET_TILE_OVERLAP)
+
+    def load_model(self, args):
+        # load bmodel
+        model_path = args.bmodel_det
+        logging.info("using model {}".format(model_path))
+        self.net = sail.Engine(model_path, args.dev_id, sail.IOMode.SYSIO)
+        self.graph_name = self.net.get_graph_names()[0]
+        self.input_name = self.net.get_input_names(self.graph_name)[0]
+        self.input_shape = self.net.get_input_shape(self.graph_name, self.input_name)
+        self.det_batch_size = self.input_shape[0]
+        logging.info("load bmodel success!")
+        #self.input_shape = self.net.get_max_input_shapes(self.graph_name)[self.input_name]
 
     def preprocess(self, img):
         h, w, _ = img.shape
@@ -293,20 +485,14 @@ class PPOCRv2Det(object):
             points[pno, 1] = int(min(max(points[pno, 1], 0), img_height - 1))
         return points
 
-    def __call__(self, img_list):
-        img_num = len(img_list)
-        img_input_list = []
-        img_size_list = []
-        # 对每张图片进行预处理
-        start_prep = time.time()
-        for img in img_list:
-            img, [src_h, src_w, resize_h, resize_w] = self.preprocess(img)
-            img_input_list.append(img)
-            img_size_list.append([src_h, src_w, resize_h, resize_w])
-        self.preprocess_time += time.time() - start_prep
-        # 组batch操作
-        start_infer = time.time()
+    def run_batches(self, img_input_list):
+        """按模型批大小组批推理，返回每张输入的输出"""
+        img_num = len(img_input_list)
         outputs_list = []
+        if self.dynamic_batch and img_num > 1 and len({img.shape for img in img_input_list}) == 1:
+            outputs_list.extend(self.predict(np.stack(img_input_list)))
+            self.count += 1
+            return outputs_list
         for beg_img_no in range(0, img_num, self.det_batch_size):
             end_img_no = min(img_num, beg_img_no + self.det_batch_size)
             if beg_img_no + self.det_batch_size > img_num:
@@ -322,6 +508,98 @@ class PPOCRv2Det(object):
                 outputs = self.predict(img_input)
                 outputs_list.extend(outputs)
                 self.count+=1
+        return outputs_list
+
+    def tile_scale(self, img):
+        """分块检测的缩放比例
+
+        分块模式按原分辨率检测；自适应模式把预期文字高度缩放到
+        DET_TARGET_TEXT_HEIGHT，不放大，缩小到整帧能放进一个块时等同整帧缩放。
+        """
+        if self.det_mode != DET_MODE_ADAPTIVE:
+            return 1.0
+        h, w = img.shape[:2]
+        fit_scale = min(1.0, float(self.input_shape[2]) / h, float(self.input_shape[3]) / w)
+        scale = float(DET_TARGET_TEXT_HEIGHT) / self.det_text_height
+        return min(1.0, max(fit_scale, scale))
+
+    def plan_tiles(self, height, width):
+        """块左上角坐标（缩放后图像坐标），相邻块重叠 tile_overlap，最后一块贴齐边缘"""
+        tile_h, tile_w = self.input_shape[2], self.input_shape[3]
+
+        def starts(length, tile):
+            if length <= tile:
+                return [0]
+            step = max(1, tile - self.tile_overlap)
+            positions = list(range(0, length - tile, step))
+            positions.append(length - tile)
+            return positions
+
+        return [(x, y) for y in starts(height, tile_h) for x in starts(width, tile_w)]
+
+    def preprocess_tile(self, tile):
+        """归一化并补齐到模型输入尺寸"""
+        tile_h, tile_w = tile.shape[:2]
+        img = (tile.astype('float32') - self.mean) * self.scale
+        padding_im = np.zeros((3, self.input_shape[2], self.input_shape[3]), dtype=np.float32)
+        padding_im[:, 0:tile_h, 0:tile_w] = np.transpose(img, (2, 0, 1))
+        return padding_im
+
+    def detect_tiled(self, img_list):
+        """分块检测: 每帧切成重叠的模型尺寸块，所有块整批推理，合并接缝处的文本框"""
+        start_prep = time.time()
+        tiles = []
+        img_input_list = []
+        for id, img in enumerate(img_list):
+            h, w = img.shape[:2]
+            scale = self.tile_scale(img)
+            if scale != 1.0:
+                img = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))))
+            scaled_h, scaled_w = img.shape[:2]
+            for x, y in self.plan_tiles(scaled_h, scaled_w):
+                tile = img[y:y + self.input_shape[2], x:x + self.input_shape[3]]
+                img_input_list.append(self.preprocess_tile(tile))
+                tiles.append((id, x, y, scale, tile.shape[0], tile.shape[1], h, w))
+        self.preprocess_time += time.time() - start_prep
+
+        start_infer = time.time()
+        outputs_list = self.run_batches(img_input_list)
+        self.inference_time += time.time() - start_infer
+
+        start_post = time.time()
+        boxes_list = [[] for _ in img_list]
+        tile_ids_list = [[] for _ in img_list]
+        for tile_no, ((id, x, y, scale, tile_h, tile_w, h, w), outputs) in enumerate(zip(tiles, outputs_list)):
+            src_h = max(1, int(round(tile_h / scale)))
+            src_w = max(1, int(round(tile_w / scale)))
+            for box in self.postprocess(outputs, src_h, src_w, tile_h, tile_w):
+                box = box.astype(np.float32)
+                box[:, 0] = np.clip(box[:, 0] + x / scale, 0, w - 1)
+                box[:, 1] = np.clip(box[:, 1] + y / scale, 0, h - 1)
+                boxes_list[id].append(box)
+                tile_ids_list[id].append(tile_no)
+
+        dt_boxes_list = [np.array(merge_tile_boxes(boxes, tile_ids), dtype=np.float32)
+                         for boxes, tile_ids in zip(boxes_list, tile_ids_list)]
+        self.postprocess_time += time.time() - start_post
+        return dt_boxes_list
+
+    def __call__(self, img_list):
+        if self.det_mode in (DET_MODE_TILE, DET_MODE_ADAPTIVE):
+            return self.detect_tiled(img_list)
+
+        img_input_list = []
+        img_size_list = []
+        # 对每张图片进行预处理
+        start_prep = time.time()
+        for img in img_list:
+            img, [src_h, src_w, resize_h, resize_w] = self.preprocess(img)
+            img_input_list.append(img)
+            img_size_list.append([src_h, src_w, resize_h, resize_w])
+        self.preprocess_time += time.time() - start_prep
+        # 组batch操作
+        start_infer = time.time()
+        outputs_list = self.run_batches(img_input_list)
         self.inference_time += time.time() - start_infer
         # 对输出进行后处理
         start_post = time.time()
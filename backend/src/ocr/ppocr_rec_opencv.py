@@ -12,22 +12,49 @@ import os
 import cv2
 import numpy as np
 import argparse
-import sophon.sail as sail
+try:
+    import sophon.sail as sail
+except ImportError:
+    # CPU 后端（ppocr_cpu）只复用预处理和后处理，不需要 SAIL
+    sail = None
 import logging
+import math
 import time
 logging.basicConfig(level=logging.DEBUG)
+
+# CTC beam search 剪枝参数
+BEAM_BLANK_SKIP = 0.999
+BEAM_MIN_CHAR_PROB = 1e-4
+BEAM_SCORE_RATIO = 1e-4
+_NEG_INF = float('-inf')
+
+# 动态宽度模型的批宽度对齐（识别网络水平方向下采样 8 倍）
+REC_WIDTH_ALIGN = 8
+
+
+def _safe_log(prob):
+    return math.log(prob) if prob > 0 else _NEG_INF
+
+
+def _log_add(a, b):
+    """log(exp(a) + exp(b))"""
+    if a == _NEG_INF:
+        return b
+    if b == _NEG_INF:
+        return a
+    if a > b:
+        return a + math.log1p(math.exp(b - a))
+    return b + math.log1p(math.exp(a - b))
+
+
 # input: x.1, [1, 3, 32, 124], float32, scale: 1
 class PPOCRv2Rec(object):
+    # 模型输入宽度 / 批大小是否可变（BModel 只有编译时的固定形状）
+    dynamic_width = False
+    dynamic_batch = False
+
     def __init__(self, args):
-        # load bmodel
-        model_path = args.bmodel_rec
-        logging.info("using model {}".format(model_path))
-        self.net = sail.Engine(model_path, args.dev_id, sail.IOMode.SYSIO)
-        self.graph_name = self.net.get_graph_names()[0]
-        self.input_name = self.net.get_input_names(self.graph_name)[0]
-        self.input_shape = self.net.get_input_shape(self.graph_name, self.input_name)
-        self.rec_batch_size = self.input_shape[0] # Max batch size in model stages.
-        logging.info("load bmodel success!")
+        self.load_model(args)
         self.img_size = args.img_size
         self.img_size = sorted(self.img_size, key=lambda x: x[0])
         self.img_ratio = [x[0]/x[1] for x in self.img_size]
@@ -41,15 +68,32 @@ class PPOCRv2Rec(object):
                 self.character.append(line)
         if args.use_space_char:
             self.character.append(" ")
+        # 按索引数组批量取字符
+        self.character_array = np.array(self.character, dtype=object)
         self.preprocess_time = 0.0
         self.inference_time = 0.0
         self.postprocess_time = 0.0
         self.beam_search = args.use_beam_search
         self.beam_size = args.beam_size
+        # 补齐统计（按列）: 有效内容、实际输入、按固定宽度分桶时的输入
+        self.content_columns = 0
+        self.padded_columns = 0
+        self.bucket_columns = 0
+
+    def load_model(self, args):
+        # load bmodel
+        model_path = args.bmodel_rec
+        logging.info("using model {}".format(model_path))
+        self.net = sail.Engine(model_path, args.dev_id, sail.IOMode.SYSIO)
+        self.graph_name = self.net.get_graph_names()[0]
+        self.input_name = self.net.get_input_names(self.graph_name)[0]
+        self.input_shape = self.net.get_input_shape(self.graph_name, self.input_name)
+        self.rec_batch_size = self.input_shape[0] # Max batch size in model stages.
+        logging.info("load bmodel success!")
     
-    def preprocess(self, img):
-        start_prep = time.time()
-        h, w, _ = img.shape
+    def resize_shape(self, img):
+        """识别输入尺寸: (缩放高度, 缩放宽度, 补齐宽度)"""
+        h, w = img.shape[:2]
         ratio = w / float(h)
         if ratio > self.img_ratio[-1]:
             logging.debug("Warning: ratio out of range: h = %d, w = %d, ratio = %f, bmodel with larger width is recommended."%(h, w, ratio))
@@ -63,20 +107,77 @@ class PPOCRv2Rec(object):
                     resized_w = int(resized_h * ratio)
                     padding_w = int(resized_h * max_ratio)
                     break
+        return resized_h, resized_w, padding_w
+
+    def preprocess(self, img, out=None):
+        """缩放、归一化并补齐到识别输入尺寸
+
+        out: 预分配的 (3, 缩放高度, 补齐宽度) 输入张量槽位（需为全 0），为 None 时新建
+        """
+        start_prep = time.time()
+        h, w = img.shape[:2]
+        resized_h, resized_w, padding_w = self.resize_shape(img)
             
         if h != resized_h or w != resized_w:
             img = cv2.resize(img, (resized_w, resized_h))
-        img = img.astype('float32')
-        img = np.transpose(img, (2, 0, 1))
-        img -= 127.5
-        img *= 0.0078125
-
-        padding_im = np.zeros((3, resized_h, padding_w), dtype=np.float32)
-        padding_im[:, :, 0:resized_w] = img
+        if out is None:
+            out = np.zeros((3, resized_h, padding_w), dtype=np.float32)
+        region = out[:, :, 0:resized_w]
+        region[...] = np.transpose(img, (2, 0, 1))
+        region -= 127.5
+        region *= 0.0078125
         
         self.preprocess_time += time.time() - start_prep
-        return padding_im
+        return out
+
+    def build_inputs(self, img_list):
+        """按宽高比排序组批，每批补齐到批内最大宽度，预处理到预分配的输入张量
+
+        宽高比相近的文本框放在同一批。固定形状模型的批宽度取 img_size 中
+        能容纳批内最宽文本框的宽度（与原来的分桶相同），动态宽度模型取批内
+        最大宽度（按 REC_WIDTH_ALIGN 对齐），短文本不再补齐到 320/640。
+
+        Returns:
+            [{"tensor": (n, 3, H, W) 输入张量, "ids": 图像序号}]
+        """
+        shapes = [self.resize_shape(img) for img in img_list]
+        order = sorted(range(len(img_list)), key=lambda idx: shapes[idx][1])
+
+        groups = []
+        for idx in order:
+            resized_h, resized_w, padding_w = shapes[idx]
+            key = resized_h if self.dynamic_width else (resized_h, padding_w)
+            if not groups or groups[-1][0] != key or len(groups[-1][1]) >= self.rec_batch_size:
+                groups.append((key, []))
+            groups[-1][1].append(idx)
+
+        inputs = []
+        for _, ids in groups:
+            resized_h = shapes[ids[0]][0]
+            if self.dynamic_width:
+                max_w = max(shapes[idx][1] for idx in ids)
+                batch_w = -(-max_w // REC_WIDTH_ALIGN) * REC_WIDTH_ALIGN
+            else:
+                batch_w = shapes[ids[0]][2]
+            tensor = np.zeros((len(ids), 3, resized_h, batch_w), dtype=np.float32)
+            for slot, idx in enumerate(ids):
+                self.preprocess(img_list[idx], tensor[slot])
+                self.content_columns += shapes[idx][1]
+                self.bucket_columns += shapes[idx][2]
+            self.padded_columns += batch_w * len(ids)
+            inputs.append({"tensor": tensor, "ids": ids})
+        return inputs
 
+    def padding_stats(self):
+        """补齐统计: 实际补齐比例，以及相对固定宽度分桶节省的输入比例"""
+        return {
+            'padding_ratio': round(1 - self.content_columns / self.padded_columns, 3)
+            if self.padded_columns else 0.0,
+            'bucket_padding_ratio': round(1 - self.content_columns / self.bucket_columns, 3)
+            if self.bucket_columns else 0.0,
+            'padding_saved': round(1 - self.padded_columns / self.bucket_columns, 3)
+            if self.bucket_columns else 0.0,
+        }
 
     def predict(self, tensor):
         start_infer = time.time()
@@ -87,112 +188,149 @@ class PPOCRv2Rec(object):
 
     def postprocess(self, outputs, beam_search=False, beam_width=5):
         start_post = time.time()
-        result_list = []
 
         if beam_search:
-            max_seq_len, num_classes = outputs.shape[1], outputs.shape[2]
-
-            for batch_idx in range(outputs.shape[0]):
-                beams = [{'prefix': [], 'score': 1.0, 'confs':[]}] 
-
-                for t in range(max_seq_len):
-                    new_beams = []
-
-                    for beam in beams:
-
-                        next_char_probs = outputs[batch_idx, t]
-                        top_candidates = np.argsort(-next_char_probs)[:beam_width]
-
-                        for c in top_candidates:
-                                new_prefix = beam['prefix'] + [c]
-                                new_score = beam['score'] * next_char_probs[c]
-                                new_confs = beam['confs'] + [next_char_probs[c]]
-                                new_beams.append({'prefix': new_prefix, 'score': new_score, 'confs':new_confs})
-
-                    new_beams.sort(key=lambda x: -x['score'])
-                    beams = new_beams[:beam_width]
-
-                best_beam = max(beams, key=lambda x: x['score'])
-
-                char_list = []
-                conf_list = []
-                pre_c = best_beam['prefix'][0]
-                if pre_c != 0:
-                    char_list.append(self.character[pre_c])
-                    conf_list.append(best_beam['confs'][0])
-                for idx, c in enumerate(best_beam['prefix']):
-                    if (pre_c==c) or (c==0):
-                        if c ==0:
-                            pre_c = c
-                        continue
-                    char_list.append(self.character[c])
-                    conf_list.append(best_beam['confs'][idx])
-                    pre_c = c
-                result_list.append((''.join(char_list), np.mean(conf_list)))
-
-        else:  # original postprocess
-            preds_idx = outputs.argmax(axis=2)
-            preds_prob = outputs.max(axis=2)
-            for batch_idx, pred_idx in enumerate(preds_idx):
-                char_list = []
-                conf_list = []
-                pre_c = pred_idx[0]
-                if pre_c != 0:
-                    char_list.append(self.character[pre_c])
-                    conf_list.append(preds_prob[batch_idx][0])
-                for idx, c in enumerate(pred_idx):
-                    if (pre_c == c) or (c == 0):
-                        if c == 0:
-                            pre_c = c
-                        continue
-                    char_list.append(self.character[c])
-                    conf_list.append(preds_prob[batch_idx][idx])
-                    pre_c = c
-
-                result_list.append((''.join(char_list), np.mean(conf_list)))
+            result_list = self.beam_search_decode(outputs, beam_width)
+        else:
+            result_list = self.greedy_decode(outputs)
 
         self.postprocess_time += time.time() - start_post
         return result_list
 
+    def greedy_decode(self, outputs):
+        """CTC 贪心解码（整批向量化）
+
+        每个时间步取最大概率字符，去掉与前一时间步相同的字符和 blank，
+        置信度为保留字符概率的均值（没有保留字符时为 nan）。
+        """
+        preds_idx = outputs.argmax(axis=2)
+        preds_prob = np.take_along_axis(outputs, preds_idx[:, :, None], axis=2)[:, :, 0]
+
+        # 保留: 非 blank 且与前一时间步不同
+        keep = preds_idx != 0
+        keep[:, 1:] &= preds_idx[:, 1:] != preds_idx[:, :-1]
+
+        counts = keep.sum(axis=1)
+        conf_sums = np.where(keep, preds_prob, 0).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            confs = conf_sums / counts.astype(conf_sums.dtype)
+
+        chars = self.character_array[preds_idx[keep]].tolist()
+        ends = np.cumsum(counts).tolist()
+        result_list = []
+        begin = 0
+        for batch_idx, end in enumerate(ends):
+            result_list.append((''.join(chars[begin:end]), confs[batch_idx]))
+            begin = end
+        return result_list
+
+    def beam_search_decode(self, outputs, beam_width=5):
+        """CTC 前缀 beam search（对数空间）
+
+        每个前缀分别记录以 blank 结尾和以非 blank 结尾的概率，重复字符只有
+        被 blank 隔开时才扩展前缀，不同对齐路径折叠为同一前缀时概率合并。
+        剪枝:
+        - blank 概率不低于 BEAM_BLANK_SKIP 的时间步只延续现有前缀，不扩展
+        - 其余时间步只扩展概率不低于 BEAM_MIN_CHAR_PROB 的字符，多于 beam_width
+          个时取概率最高的 beam_width 个（argpartition）
+        - 得分低于最优前缀 BEAM_SCORE_RATIO 倍的前缀直接丢弃
+        置信度为输出文本各字符首次出现时刻概率的均值，与贪心解码一致。
+        """
+        batch_size, max_seq_len, num_classes = outputs.shape
+        beam_width = max(1, min(int(beam_width), num_classes - 1))
+
+        active = (outputs[:, :, 0] < BEAM_BLANK_SKIP).tolist()
+        with np.errstate(divide='ignore'):
+            log_blanks = np.log(outputs[:, :, 0]).tolist()
+        score_cutoff = math.log(BEAM_SCORE_RATIO)
+
+        result_list = []
+        for batch_idx in range(batch_size):
+            probs = outputs[batch_idx]
+            # 前缀 -> [log P(blank 结尾), log P(非 blank 结尾), 各字符置信度]
+            beams = {(): [0.0, _NEG_INF, ()]}
+
+            for t in range(max_seq_len):
+                step = probs[t]
+                log_blank = log_blanks[batch_idx][t]
+                next_beams = {}
+
+                if not active[batch_idx][t]:
+                    for prefix, (p_b, p_nb, confs) in beams.items():
+                        p_repeat = p_nb + _safe_log(step[prefix[-1]]) if prefix else _NEG_INF
+                        next_beams[prefix] = [_log_add(p_b, p_nb) + log_blank, p_repeat, confs]
+                else:
+                    candidate_idx = np.flatnonzero(step >= BEAM_MIN_CHAR_PROB)
+                    if len(candidate_idx) > beam_width:
+                        top = np.argpartition(step[candidate_idx], -beam_width)[-beam_width:]
+                        candidate_idx = candidate_idx[top]
+                    candidates = [(c, float(step[c])) for c in candidate_idx.tolist() if c != 0]
+                    candidate_ids = {c for c, _ in candidates}
+                    for prefix, (p_b, p_nb, confs) in beams.items():
+                        p_total = _log_add(p_b, p_nb)
+                        entry = next_beams.setdefault(prefix, [_NEG_INF, _NEG_INF, confs])
+                        entry[0] = _log_add(entry[0], p_total + log_blank)
+
+                        last = prefix[-1] if prefix else None
+                        if last is not None and last not in candidate_ids:
+                            # 重复字符不在候选中时也要延续非 blank 结尾的路径
+                            entry[1] = _log_add(entry[1], p_nb + _safe_log(step[last]))
+
+                        for c, prob in candidates:
+                            log_prob = math.log(prob)
+                            if c == last:
+                                # 重复字符: 折叠到原前缀；被 blank 隔开时扩展
+                                entry[1] = _log_add(entry[1], p_nb + log_prob)
+                                source = p_b
+                            else:
+                                source = p_total
+                            if source == _NEG_INF:
+                                continue
+                            new_prefix = prefix + (c,)
+                            new_entry = next_beams.setdefault(new_prefix, [_NEG_INF, _NEG_INF, confs + (prob,)])
+                            new_entry[1] = _log_add(new_entry[1], source + log_prob)
+
+                if len(next_beams) > 1:
+                    ranked = sorted(((_log_add(p_b, p_nb), prefix) for prefix, (p_b, p_nb, _) in next_beams.items()),
+                                    reverse=True)
+                    cutoff = ranked[0][0] + score_cutoff
+                    beams = {prefix: next_beams[prefix] for score, prefix in ranked[:beam_width] if score >= cutoff}
+                else:
+                    beams = next_beams
+
+            # 不同标签序列解码为相同文本时合并（字典中可能有重复字符）
+            texts = {}
+            for prefix, (p_b, p_nb, confs) in beams.items():
+                text = ''.join(self.character_array[list(prefix)].tolist()) if prefix else ''
+                score = _log_add(p_b, p_nb)
+                if text in texts:
+                    best_score, best_confs = texts[text]
+                    texts[text] = (_log_add(best_score, score), best_confs)
+                else:
+                    texts[text] = (score, confs)
+
+            text, (_, confs) = max(texts.items(), key=lambda item: item[1][0])
+            conf = np.mean(np.array(confs, dtype=outputs.dtype)) if confs else outputs.dtype.type(np.nan)
+            result_list.append((text, conf))
+        return result_list
+
     def __call__(self, img_list):
-        img_dict = {}
-        for img_size in self.img_size:
-            img_dict[img_size[0]] = {"imgs":[], "ids":[], "res":[]}
-        for id, img in enumerate(img_list):
-            img = self.preprocess(img)
-            if img is None:
-                continue
-            img_dict[img.shape[2]]["imgs"].append(img)
-            img_dict[img.shape[2]]["ids"].append(id)
-
-        for size_w in img_dict.keys():
-            if size_w > 640:
-                for img_input in img_dict[size_w]["imgs"]:
-                    img_input = np.expand_dims(img_input, axis=0)
-                    outputs = self.predict(img_input)
-                    res = self.postprocess(outputs,self.beam_search,self.beam_size)
-                    img_dict[size_w]["res"].extend(res)
+        results = [None] * len(img_list)
+        for batch in self.build_inputs(img_list):
+            tensor = batch["tensor"]
+            # 固定形状模型只有 1 和 rec_batch_size 两种批大小，宽图只有批大小 1
+            if self.dynamic_batch or (len(tensor) == self.rec_batch_size and tensor.shape[3] <= 640):
+                res = self.postprocess(self.predict(tensor), self.beam_search, self.beam_size)
             else:
-                img_num = len(img_dict[size_w]["imgs"])
-                for beg_img_no in range(0, img_num, self.rec_batch_size):
-                    end_img_no = min(img_num, beg_img_no + self.rec_batch_size)
-                    if beg_img_no + self.rec_batch_size > img_num:
-                        for ino in range(beg_img_no, end_img_no):
-                            img_input = np.expand_dims(img_dict[size_w]["imgs"][ino], axis=0)
-                            outputs = self.predict(img_input)
-                            res = self.postprocess(outputs,self.beam_search,self.beam_size)
-                            img_dict[size_w]["res"].extend(res)   
-                    else:
-                        img_input = np.stack(img_dict[size_w]["imgs"][beg_img_no:end_img_no])
-                        outputs = self.predict(img_input)
-                        res = self.postprocess(outputs,self.beam_search,self.beam_size)
-                        img_dict[size_w]["res"].extend(res)
-
-        rec_res = {"res":[], "ids":[]}
-        for size_w in img_dict.keys():
-            rec_res["res"].extend(img_dict[size_w]["res"])
-            rec_res["ids"].extend(img_dict[size_w]["ids"])
-        return rec_res
+                res = []
+                for ino in range(len(tensor)):
+                    outputs = self.predict(tensor[ino:ino + 1])
+                    res.extend(self.postprocess(outputs, self.beam_search, self.beam_size))
+            for idx, item in zip(batch["ids"], res):
+                results[idx] = item
+
+        # 结果按输入顺序排列
+        return {"res": results, "ids": list(range(len(img_list)))}
 
 def main(opt):
     ppocrv2_rec = PPOCRv2Rec(opt)
@@ -3,11 +3,14 @@
 基于Sophon SAIL库的PP-OCR文字识别引擎,集成检测、分类、识别三个模型
 """
 import time
-import copy
 import numpy as np
 from typing import List, Dict, Any, Optional
 from loguru import logger
 
+from monitoring.metrics import get_metrics_collector
+from monitoring.tracer import current_trace
+from ocr.rec_cache import crop_key, get_rec_cache, model_cache_key
+
 try:
     import sophon.sail as sail
     SAIL_AVAILABLE = True
@@ -34,19 +37,57 @@ except ImportError as e:
     logger.warning(f"PP-OCR模块未找到: {e}")
 
 
+# 四边与坐标轴的偏差不超过该值(像素)的文本框按轴对齐处理
+AXIS_ALIGNED_TOLERANCE = 1.0
+
+
+def _axis_aligned_rect(img, points):
+    """文本框(左上、右上、右下、左下)近似轴对齐且在图像内时返回 (x0, y0, x1, y1)"""
+    (x_tl, y_tl), (x_tr, y_tr), (x_br, y_br), (x_bl, y_bl) = points.tolist()
+    tol = AXIS_ALIGNED_TOLERANCE
+    if (abs(y_tl - y_tr) > tol or abs(y_bl - y_br) > tol
+            or abs(x_tl - x_bl) > tol or abs(x_tr - x_br) > tol):
+        return None
+    x0 = int(round(min(x_tl, x_bl)))
+    y0 = int(round(min(y_tl, y_tr)))
+    x1 = int(round(max(x_tr, x_br)))
+    y1 = int(round(max(y_bl, y_br)))
+    height, width = img.shape[:2]
+    if x0 < 0 or y0 < 0 or x1 > width or y1 > height or x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
+
+
 def get_rotate_crop_image(img, points):
     """从图像中裁剪并旋转文本区域
     
+    轴对齐的文本框直接返回原图切片(不复制,由识别预处理一次缩放到识别高度),
+    其余文本框做透视变换。
+    
     Args:
         img: 输入图像
         points: 四个角点坐标
         
     Returns:
-        裁剪后的图像
+        裁剪后的图像(可能是原图的视图,不要原地修改)
     """
     import cv2
     
     assert len(points) == 4, "points必须是4个点"
+    points = np.asarray(points, dtype=np.float32)
+    
+    rect = _axis_aligned_rect(img, points)
+    if rect is not None:
+        x0, y0, x1, y1 = rect
+        # 与透视变换相同的输出尺寸: 宽高为角点距离,至少 16
+        dst_img = img[y0:y1, x0:x1]
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            dst_img = cv2.resize(dst_img, (max(16, x1 - x0), max(16, y1 - y0)),
+                                 interpolation=cv2.INTER_CUBIC)
+        if dst_img.shape[0] * 1.0 / dst_img.shape[1] >= 1.5:
+            dst_img = np.rot90(dst_img)
+        return dst_img
+    
     img_crop_width = int(
         max(
             np.linalg.norm(points[0] - points[1]),
@@ -95,6 +136,8 @@ class Args:
     - use_space_char: 是否使用空格字符
     - use_beam_search: 是否使用 beam search
     - beam_size: beam search 宽度
+    - det_mode: 检测模式('resize' / 'tile' / 'adaptive')
+    - det_text_height: 预期文字高度(像素,自适应检测模式)
     """
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
@@ -128,7 +171,9 @@ class PPOCRSophon:
         img_size: list = None,
         use_space_char: bool = True,
         use_beam_search: bool = False,
-        beam_size: int = 5
+        beam_size: int = 5,
+        det_mode: str = "resize",
+        det_text_height: int = 16
     ):
         """初始化PP-OCR Sophon引擎
         
@@ -144,12 +189,11 @@ class PPOCRSophon:
             use_space_char: 是否使用空格字符
             use_beam_search: 是否使用 beam search
             beam_size: beam search 宽度
+            det_mode: 检测模式,'resize' 整帧缩放,'tile' 原分辨率分块,
+                'adaptive' 按预期文字高度缩放后分块
+            det_text_height: 预期文字高度(像素,自适应检测模式)
         """
-        if not SAIL_AVAILABLE:
-            raise RuntimeError("sophon.sail 未安装,无法使用PP-OCR Sophon引擎")
-        
-        if not PPOCR_AVAILABLE:
-            raise RuntimeError("PP-OCR模块未找到")
+        self._check_runtime()
         
         self.det_model = det_model
         self.rec_model = rec_model
@@ -162,6 +206,8 @@ class PPOCRSophon:
         self.use_space_char = use_space_char
         self.use_beam_search = use_beam_search
         self.beam_size = beam_size
+        self.det_mode = det_mode
+        self.det_text_height = det_text_height
         
         # 初始化各个模块
         self.text_detector = None
@@ -185,6 +231,17 @@ class PPOCRSophon:
         
         # 加载模型
         self._load_models()
+        
+        # 识别结果缓存(同一识别模型的引擎实例共享)
+        self.rec_cache = get_rec_cache(self._rec_cache_key())
+    
+    def _check_runtime(self) -> None:
+        """检查推理运行时是否可用"""
+        if not SAIL_AVAILABLE:
+            raise RuntimeError("sophon.sail 未安装,无法使用PP-OCR Sophon引擎")
+        
+        if not PPOCR_AVAILABLE:
+            raise RuntimeError("PP-OCR模块未找到")
     
     def _load_models(self) -> None:
         """加载所有模型"""
@@ -199,7 +256,9 @@ class PPOCRSophon:
                 bmodel_det=self.det_model,
                 dev_id=self.dev_id,
                 det_limit_side_len=[640],  # 检测器会从模型获取实际尺寸
-                det_limit_type='max'
+                det_limit_type='max',
+                det_mode=self.det_mode,
+                det_text_height=self.det_text_height
             )
             self.text_detector = predict_det.PPOCRv2Det(det_args)
             logger.info(f"检测模型加载成功: {self.det_model}")
@@ -234,6 +293,72 @@ class PPOCRSophon:
             logger.error(f"加载PP-OCR模型失败: {e}")
             raise
     
+    def _rec_cache_key(self) -> str:
+        """识别结果缓存标识(影响识别结果的模型与参数)"""
+        return model_cache_key(
+            self.rec_model,
+            backend=type(self).__name__,
+            char_dict_path=self.char_dict_path,
+            img_size=self.img_size,
+            use_space_char=self.use_space_char,
+            use_beam_search=self.use_beam_search,
+            beam_size=self.beam_size,
+            cls_model=self.cls_model if self.text_classifier is not None else None
+        )
+    
+    def _classify_and_recognize(self, imgs: List[np.ndarray], trace) -> Dict[str, Any]:
+        """方向分类 + 文本识别,命中缓存的裁剪图像不送入模型
+        
+        Args:
+            imgs: 文本裁剪图像列表
+            trace: 当前分段追踪(可为 None)
+            
+        Returns:
+            {'res': 与 imgs 一一对应的 (文本, 置信度) 列表, 'cls_time', 'rec_time', 'cache_hits'}
+        """
+        res: List[Any] = [None] * len(imgs)
+        keys: List[bytes] = []
+        if self.rec_cache is not None and imgs:
+            keys = [crop_key(img) for img in imgs]
+            res = self.rec_cache.lookup(keys)
+        miss_ids = [i for i, item in enumerate(res) if item is None]
+        miss_imgs = [imgs[i] for i in miss_ids]
+        if keys:
+            try:
+                get_metrics_collector().record_rec_cache(len(imgs) - len(miss_ids), len(miss_ids))
+            except Exception as e:
+                logger.debug(f"上报识别缓存指标失败: {e}")
+        
+        # 方向分类
+        cls_time = 0.0
+        if self.use_angle_cls and self.text_classifier and len(miss_imgs) > 0:
+            cls_start = time.time()
+            miss_imgs, cls_res = self.text_classifier(miss_imgs)
+            cls_time = time.time() - cls_start
+            if trace is not None:
+                trace.add_span("ocr.cls", "ocr", cls_start, cls_time)
+        
+        # 文本识别
+        rec_time = 0.0
+        if miss_imgs:
+            rec_start = time.time()
+            rec_res = self.text_recognizer(miss_imgs)
+            rec_time = time.time() - rec_start
+            if trace is not None:
+                trace.add_span("ocr.rec", "ocr", rec_start, rec_time,
+                               {'crops': len(miss_imgs), 'cache_hits': len(imgs) - len(miss_imgs)})
+            for i, id in enumerate(rec_res.get("ids")):
+                res[miss_ids[id]] = rec_res["res"][i]
+            if keys:
+                self.rec_cache.store([keys[i] for i in miss_ids], [res[i] for i in miss_ids])
+        
+        return {
+            'res': res,
+            'cls_time': cls_time,
+            'rec_time': rec_time,
+            'cache_hits': len(imgs) - len(miss_ids)
+        }
+    
     def recognize(
         self,
         frame_or_roi: np.ndarray,
@@ -252,23 +377,46 @@ class PPOCRSophon:
             - bbox: 文本边界框 [[x1,y1], [x2,y2], [x3,y3], [x4,y4]]
             - bbox_rect: 矩形边界框 [x, y, w, h]
         """
+        return self.recognize_batch([frame_or_roi], [conf_threshold])[0]
+    
+    def recognize_batch(
+        self,
+        frames: List[np.ndarray],
+        conf_thresholds: Optional[List[Optional[float]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """批量识别多张图像中的文字
+        
+        检测、分类、识别三个阶段分别以整批输入调用模型
+        (按模型的 det_batch_size / rec_batch_size 组批)。
+        
+        Args:
+            frames: 输入图像列表(BGR格式)
+            conf_thresholds: 每张图像的置信度阈值(可选,None 使用默认值)
+            
+        Returns:
+            每张图像的识别结果列表,格式同 recognize()
+        """
         if self.text_detector is None or self.text_recognizer is None:
             logger.error("模型未加载")
-            return []
+            return [[] for _ in frames]
         
         start_time = time.time()
+        trace = current_trace()
         
         try:
-            # 使用阈值
-            thresh = conf_threshold if conf_threshold is not None else self.rec_thresh
+            if conf_thresholds is None:
+                conf_thresholds = [None] * len(frames)
+            threshs = [t if t is not None else self.rec_thresh for t in conf_thresholds]
             
-            # 准备输入(单张图片)
-            img_list = [frame_or_roi]
+            img_list = list(frames)
             
             # 检测文本框
             det_start = time.time()
             dt_boxes_list = self.text_detector(img_list)
             det_time = time.time() - det_start
+            if trace is not None:
+                trace.add_span("ocr.det", "ocr", det_start, det_time,
+                               {'boxes': sum(len(b) for b in dt_boxes_list), 'batch': len(img_list)})
             
             # 准备裁剪图像字典
             img_dict = {"imgs": [], "dt_boxes": [], "pic_ids": []}
@@ -277,30 +425,25 @@ class PPOCRSophon:
                 self.crop_num += len(dt_boxes)
                 start_crop = time.time()
                 for bno in range(len(dt_boxes)):
-                    tmp_box = copy.deepcopy(dt_boxes[bno])
-                    img_crop = get_rotate_crop_image(img_list[id], tmp_box)
+                    img_crop = get_rotate_crop_image(img_list[id], dt_boxes[bno])
                     img_dict["imgs"].append(img_crop)
                     img_dict["dt_boxes"].append(dt_boxes[bno])
                     img_dict["pic_ids"].append(id)
                 self.crop_time += time.time() - start_crop
+                if trace is not None:
+                    trace.add_span("ocr.crop", "ocr", start_crop, time.time() - start_crop,
+                                   {'crops': len(dt_boxes)})
             
-            # 方向分类
-            cls_time = 0.0
-            if self.use_angle_cls and self.text_classifier and len(img_dict["imgs"]) > 0:
-                cls_start = time.time()
-                img_dict["imgs"], cls_res = self.text_classifier(img_dict["imgs"])
-                cls_time = time.time() - cls_start
+            # 方向分类 + 文本识别(命中识别结果缓存的裁剪图像跳过模型)
+            rec_out = self._classify_and_recognize(img_dict["imgs"], trace)
+            cls_time = rec_out['cls_time']
+            rec_time = rec_out['rec_time']
             
-            # 文本识别
-            rec_start = time.time()
-            rec_res = self.text_recognizer(img_dict["imgs"])
-            rec_time = time.time() - rec_start
-            
-            # 组装结果
-            recognitions = []
-            for i, id in enumerate(rec_res.get("ids")):
-                text, score = rec_res["res"][i]
-                if score >= thresh:
+            # 组装结果(按原图分发)
+            results: List[List[Dict[str, Any]]] = [[] for _ in img_list]
+            for id, (text, score) in enumerate(rec_out['res']):
+                pic_id = img_dict["pic_ids"][id]
+                if score >= threshs[pic_id]:
                     dt_box = img_dict["dt_boxes"][id]
                     
                     # 计算矩形边界框
@@ -318,12 +461,13 @@ class PPOCRSophon:
                         'bbox_rect': [float(x), float(y), float(w), float(h)]
                     }
                     
-                    recognitions.append(recognition)
+                    results[pic_id].append(recognition)
             
             # 更新统计
             total_time = time.time() - start_time
-            self.stats['total_recognitions'] += 1
-            self.stats['total_texts'] += len(recognitions)
+            total_texts = sum(len(r) for r in results)
+            self.stats['total_recognitions'] += len(img_list)
+            self.stats['total_texts'] += total_texts
             
             alpha = 0.1
             self.stats['avg_recognition_time'] = (
@@ -342,15 +486,15 @@ class PPOCRSophon:
             logger.debug(
                 f"OCR识别完成 - 总耗时: {total_time:.3f}s "
                 f"(检测:{det_time:.3f}s, 分类:{cls_time:.3f}s, "
-                f"识别:{rec_time:.3f}s), 识别数: {len(recognitions)}"
+                f"识别:{rec_time:.3f}s), 图像数: {len(img_list)}, 识别数: {total_texts}"
             )
             
-            return recognitions
+            return results
             
         except Exception as e:
             logger.exception(f"OCR识别失败: {e}")
             self.stats['errors'] += 1
-            return []
+            return [[] for _ in frames]
     
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息
@@ -361,6 +505,10 @@ class PPOCRSophon:
         stats = self.stats.copy()
         stats['crop_num'] = self.crop_num
         stats['crop_time'] = self.crop_time
+        if self.text_recognizer is not None:
+            stats['rec_padding'] = self.text_recognizer.padding_stats()
+        if self.rec_cache is not None:
+            stats['rec_cache'] = self.rec_cache.get_stats()
         return stats
 
 
@@ -0,0 +1,191 @@
+"""文本识别结果缓存
+
+界面上的固定文字（按钮、菜单项等）每轮循环裁剪出的文本图像逐字节相同，
+无需重复送入识别模型。缓存以裁剪图像内容哈希为键、(文本, 置信度) 为值，
+LRU 淘汰，并限制条目数和内存占用。
+
+同一识别模型（模型文件、输入尺寸、解码方式、方向分类模型均相同）的所有引擎实例
+共享一个缓存，因此多个流程使用同一识别模型时互相命中。
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from loguru import logger
+
+# 每个条目除键和文本外的固定开销（OrderedDict 节点、元组、float）估算值（字节）
+ENTRY_OVERHEAD = 160
+
+
+def crop_key(crop: np.ndarray) -> bytes:
+    """计算裁剪图像的缓存键
+
+    形状、数据类型与像素内容共同参与哈希，视图会先转为连续内存。
+
+    Args:
+        crop: 文本裁剪图像
+
+    Returns:
+        16 字节摘要
+    """
+    data = np.ascontiguousarray(crop)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str((data.shape, data.dtype.str)).encode('utf-8'))
+    h.update(memoryview(data).cast('B'))
+    return h.digest()
+
+
+def model_cache_key(rec_model: str, **params: Any) -> str:
+    """生成识别模型的缓存标识
+
+    模型文件的大小和修改时间参与标识，替换模型文件后不会命中旧结果。
+
+    Args:
+        rec_model: 识别模型路径
+        **params: 影响识别结果的其他参数（输入尺寸、字典、解码方式等）
+
+    Returns:
+        缓存标识字符串
+    """
+    try:
+        st = os.stat(rec_model)
+        version = f"{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        version = "-"
+    items = ",".join(f"{k}={params[k]!r}" for k in sorted(params))
+    return f"{os.path.abspath(rec_model)}@{version}|{items}"
+
+
+class RecognitionCache:
+    """单个识别模型的结果 LRU 缓存
+
+    Attributes:
+        max_entries: 最大条目数
+        max_memory: 内存上限（字节）
+        hits: 命中次数
+        misses: 未命中次数
+    """
+
+    def __init__(self, max_entries: int, max_memory: int):
+        """初始化识别结果缓存
+
+        Args:
+            max_entries: 最大条目数
+            max_memory: 内存上限（字节）
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_memory = max_memory
+
+        # key -> (文本, 置信度, 估算大小)
+        self._entries: 'OrderedDict[bytes, Tuple[str, float, int]]' = OrderedDict()
+        self._memory = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, keys: Sequence[bytes]) -> List[Optional[Tuple[str, float]]]:
+        """批量查询
+
+        Args:
+            keys: 裁剪图像缓存键列表
+
+        Returns:
+            与 keys 一一对应的 (文本, 置信度)，未命中为 None
+        """
+        found: List[Optional[Tuple[str, float]]] = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    found.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                found.append((entry[0], entry[1]))
+            hits = sum(1 for item in found if item is not None)
+            self.hits += hits
+            self.misses += len(found) - hits
+        return found
+
+    def store(self, keys: Sequence[bytes], values: Sequence[Tuple[str, float]]) -> None:
+        """批量写入
+
+        Args:
+            keys: 裁剪图像缓存键列表
+            values: 与 keys 一一对应的 (文本, 置信度)
+        """
+        with self._lock:
+            for key, (text, score) in zip(keys, values):
+                size = sys.getsizeof(key) + sys.getsizeof(text) + ENTRY_OVERHEAD
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._memory -= old[2]
+                self._entries[key] = (text, float(score), size)
+                self._memory += size
+
+            # LRU 淘汰
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._memory > self.max_memory):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._memory -= evicted_size
+
+    def clear(self) -> None:
+        """清空缓存和计数"""
+        with self._lock:
+            self._entries.clear()
+            self._memory = 0
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self._memory,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+# 识别模型缓存标识 -> RecognitionCache
+_caches: Dict[str, RecognitionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_rec_cache(model_key: str) -> Optional[RecognitionCache]:
+    """获取识别模型共享的结果缓存
+
+    Args:
+        model_key: 识别模型缓存标识（见 model_cache_key）
+
+    Returns:
+        RecognitionCache 实例，配置禁用时返回 None
+    """
+    with _caches_lock:
+        cache = _caches.get(model_key)
+        if cache is not None:
+            return cache
+
+        from utils.config import get_config_manager
+        config = get_config_manager().config.rec_cache
+        if not config.enabled:
+            return None
+
+        cache = RecognitionCache(config.max_entries, int(config.max_memory_mb * 1024 * 1024))
+        _caches[model_key] = cache
+        logger.info(f"识别结果缓存已创建: max_entries={cache.max_entries}, "
+                    f"max_memory={config.max_memory_mb}MB")
+        return cache
+
+
+def get_rec_cache_stats() -> Dict[str, Any]:
+    """获取所有识别模型缓存的统计信息"""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {key: cache.get_stats() for key, cache in caches.items()}
@@ -0,0 +1,444 @@
+"""OCR 结果集
+
+OCRRecognitionNode 每帧生成一个 OCRResultSet 存入 context.ocr_results，
+条件判断、鼠标操作等节点通过它查询文本，而不是各自遍历结果列表:
+- 精确 / 包含匹配默认比较原文本；节点开启文本归一化后比较 NFKC（全角转半角）、
+  大小写折叠、去除空白后的文本
+- 在连接后的文本上查找完成包含匹配；2-gram 倒排索引筛选候选，
+  支持限定编辑距离的模糊匹配
+- 网格空间索引，支持区域（ROI）内查找和相对参照文本（如“标签右侧的文本”）查找
+- 正则表达式编译结果缓存
+
+OCRResultSet 继承 list，原有按列表读取 OCR 结果的代码无需修改。
+索引各部分在首次用到时构建，结果集长度变化时自动重建。
+"""
+import re
+import unicodedata
+from bisect import bisect_right
+from collections import Counter
+from functools import cached_property, lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+
+# 匹配模式
+MATCH_EXACT = "exact"
+MATCH_CONTAINS = "contains"
+MATCH_REGEX = "regex"
+MATCH_FUZZY = "fuzzy"
+
+# 相对参照文本的方向
+DIRECTION_RIGHT = "right"
+DIRECTION_LEFT = "left"
+DIRECTION_ABOVE = "above"
+DIRECTION_BELOW = "below"
+
+# 包含匹配时连接各文本的分隔符
+_SEPARATOR = "\n"
+
+# 空间索引网格边长（像素）
+GRID_CELL_SIZE = 64
+# 左右方向查找时，与参照文本垂直重叠不少于较矮文本高度的比例才算同一行
+SAME_LINE_OVERLAP = 0.5
+
+
+def normalize_text(text: str) -> str:
+    """文本归一化: NFKC（全角转半角等）、大小写折叠、去除空白
+
+    OCR 对空格的识别不稳定，匹配时忽略所有空白。
+    """
+    if not text:
+        return ""
+    return "".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str) -> "re.Pattern":
+    """编译正则表达式（同一表达式只编译一次），语法错误抛出 re.error"""
+    return re.compile(pattern)
+
+
+def substring_distance(pattern: str, text: str) -> int:
+    """pattern 与 text 中最相近子串的编辑距离（Sellers 算法）"""
+    prev = list(range(len(pattern) + 1))
+    best = prev[-1]
+    for ch in text:
+        cur = [0]
+        for i, pch in enumerate(pattern, 1):
+            cur.append(min(prev[i] + 1, cur[i - 1] + 1, prev[i - 1] + (pch != ch)))
+        best = min(best, cur[-1])
+        prev = cur
+    return best
+
+
+def parse_region(value: Any) -> Optional[Tuple[float, float, float, float]]:
+    """解析区域 "x,y,w,h" 或 [x, y, w, h]，为空或格式错误返回 None"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.replace("，", ",").split(",")
+    try:
+        x, y, w, h = (float(v) for v in value)
+    except (TypeError, ValueError):
+        logger.warning(f"区域格式错误（应为 x,y,w,h）: {value}")
+        return None
+    if w <= 0 or h <= 0:
+        return None
+    return x, y, w, h
+
+
+def result_rect(result: Dict[str, Any]) -> Optional[Tuple[float, float, float, float]]:
+    """结果的外接矩形 (x0, y0, x1, y1)"""
+    bbox = result.get("bbox")
+    if bbox and len(bbox) >= 4:
+        if isinstance(bbox[0], (list, tuple)):
+            xs = [p[0] for p in bbox]
+            ys = [p[1] for p in bbox]
+            return min(xs), min(ys), max(xs), max(ys)
+        return bbox[0], bbox[1], bbox[0] + bbox[2], bbox[1] + bbox[3]
+    rect = result.get("rect") or result.get("bbox_rect")
+    if rect and len(rect) >= 4:
+        return rect[0], rect[1], rect[0] + rect[2], rect[1] + rect[3]
+    center = result.get("center")
+    if center:
+        return center[0], center[1], center[0], center[1]
+    return None
+
+
+def result_center(result: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """结果的中心坐标，优先使用 center 字段，否则由外接矩形计算"""
+    center = result.get("center")
+    if center:
+        return int(center[0]), int(center[1])
+    bbox = result.get("bbox")
+    if bbox and len(bbox) >= 4 and isinstance(bbox[0], (list, tuple)):
+        return (int(sum(p[0] for p in bbox) / len(bbox)),
+                int(sum(p[1] for p in bbox) / len(bbox)))
+    rect = result_rect(result)
+    if rect is None:
+        return None
+    return int((rect[0] + rect[2]) / 2), int((rect[1] + rect[3]) / 2)
+
+
+class _TextIndex:
+    """文本索引（原文本或归一化文本各一份）
+
+    各部分在首次用到时构建，n-gram 索引只在模糊匹配时构建。
+    """
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+
+    @cached_property
+    def exact(self) -> Dict[str, List[int]]:
+        """文本 -> 结果序号（精确匹配）"""
+        exact = {}
+        for idx, text in enumerate(self.texts):
+            exact.setdefault(text, []).append(idx)
+        return exact
+
+    @cached_property
+    def haystack(self) -> Tuple[str, List[int]]:
+        """以分隔符连接的文本及各文本的起始偏移（包含匹配）"""
+        starts = []
+        offset = 0
+        for text in self.texts:
+            starts.append(offset)
+            offset += len(text) + len(_SEPARATOR)
+        return _SEPARATOR.join(self.texts), starts
+
+    @cached_property
+    def grams(self) -> Dict[str, set]:
+        """2-gram -> 结果序号集合（模糊匹配的候选筛选）"""
+        grams = {}
+        for idx, text in enumerate(self.texts):
+            for gram in _bigrams(text):
+                grams.setdefault(gram, set()).add(idx)
+        return grams
+
+    def contains(self, needle: str) -> List[int]:
+        """文本包含 needle 的结果序号"""
+        if _SEPARATOR in needle:
+            # 含分隔符的目标可能跨文本匹配（只可能出现在原文本中），逐项判断
+            return [idx for idx, text in enumerate(self.texts) if needle in text]
+        haystack, starts = self.haystack
+        ids = []
+        pos = haystack.find(needle)
+        while pos >= 0:
+            idx = bisect_right(starts, pos) - 1
+            ids.append(idx)
+            # 同一文本只记录一次，从下一个文本开始继续查找
+            if idx + 1 >= len(starts):
+                break
+            pos = haystack.find(needle, starts[idx + 1])
+        return ids
+
+
+class _Index:
+    """结果集索引
+
+    各部分在首次用到时构建: 文本索引按是否归一化分别构建，
+    网格索引只在区域 / 参照文本查询时构建。
+    """
+
+    def __init__(self, results: Sequence[Dict[str, Any]], cell_size: int):
+        self.results = results
+        self.size = len(results)
+        self.cell_size = cell_size
+
+    @cached_property
+    def raw(self) -> _TextIndex:
+        return _TextIndex([r.get("text", "") or "" for r in self.results])
+
+    @cached_property
+    def normalized(self) -> _TextIndex:
+        return _TextIndex([normalize_text(r.get("text", "")) for r in self.results])
+
+    @cached_property
+    def rects(self) -> List[Optional[Tuple[float, float, float, float]]]:
+        return [result_rect(r) for r in self.results]
+
+    @cached_property
+    def grid(self) -> Dict[Tuple[int, int], List[int]]:
+        """网格 -> 外接矩形覆盖该网格的结果序号"""
+        grid = {}
+        for idx, rect in enumerate(self.rects):
+            if rect is None:
+                continue
+            for cell in self._cells(rect):
+                grid.setdefault(cell, []).append(idx)
+        return grid
+
+    def _cells(self, rect):
+        x0, y0, x1, y1 = (int(v // self.cell_size) for v in rect)
+        return [(gx, gy) for gy in range(y0, y1 + 1) for gx in range(x0, x1 + 1)]
+
+    def query_rect(self, rect) -> set:
+        """外接矩形与 rect 相交的结果序号"""
+        x0, y0, x1, y1 = rect
+        grid = self.grid
+        ids = set()
+        for cell in self._cells(rect):
+            ids.update(grid.get(cell, ()))
+        return {idx for idx in ids
+                if self.rects[idx][0] <= x1 and self.rects[idx][2] >= x0
+                and self.rects[idx][1] <= y1 and self.rects[idx][3] >= y0}
+
+
+def _bigrams(text: str) -> set:
+    """文本的 2-gram 集合"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class OCRResultSet(list):
+    """带索引的 OCR 结果列表
+
+    元素与原 OCR 结果相同（包含 text、confidence、bbox、center、rect 的字典）。
+
+    Example:
+        results = OCRResultSet(normalized_results)
+        results.find("确定")                               # 包含匹配
+        results.find("登陆", match_mode="fuzzy")            # 允许 1 处识别错误
+        results.find("ok", normalize=True)                 # 忽略全半角、大小写和空格
+        results.find("", anchor="IP地址", direction="right")  # 标签右侧的文本
+        results.in_region((0, 0, 400, 300))                # 区域内的文本
+    """
+
+    def __init__(self, results: Iterable[Dict[str, Any]] = (), cell_size: int = GRID_CELL_SIZE):
+        super().__init__(results)
+        self.cell_size = cell_size
+        self._index: Optional[_Index] = None
+
+    @classmethod
+    def wrap(cls, results: Optional[Iterable[Dict[str, Any]]]) -> "OCRResultSet":
+        """已是 OCRResultSet 时直接返回（复用索引），否则包装为结果集"""
+        if isinstance(results, cls):
+            return results
+        return cls(results or ())
+
+    def __getstate__(self):
+        # 复制 / 序列化时不携带索引
+        return {"cell_size": getattr(self, "cell_size", GRID_CELL_SIZE)}
+
+    @property
+    def index(self) -> _Index:
+        index = getattr(self, "_index", None)
+        if index is None or index.size != len(self):
+            index = self._index = _Index(self, getattr(self, "cell_size", GRID_CELL_SIZE))
+        return index
+
+    def find(
+        self,
+        target: str,
+        match_mode: str = MATCH_CONTAINS,
+        max_distance: int = 1,
+        region: Optional[Sequence[float]] = None,
+        anchor: Optional[str] = None,
+        direction: str = DIRECTION_RIGHT,
+        normalize: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """查找第一个匹配的结果，未找到返回 None（参数见 find_all）"""
+        matches = self.find_all(target, match_mode, max_distance, region, anchor, direction, normalize)
+        return matches[0] if matches else None
+
+    def find_all(
+        self,
+        target: str,
+        match_mode: str = MATCH_CONTAINS,
+        max_distance: int = 1,
+        region: Optional[Sequence[float]] = None,
+        anchor: Optional[str] = None,
+        direction: str = DIRECTION_RIGHT,
+        normalize: bool = False
+    ) -> List[Dict[str, Any]]:
+        """查找所有匹配的结果
+
+        Args:
+            target: 目标文本或正则表达式；指定 anchor 时可为空，表示参照文本该方向的任意文本
+            match_mode: 匹配模式 ("exact" | "contains" | "regex" | "fuzzy")
+            max_distance: 模糊匹配允许的最大编辑距离（不超过目标长度减 1 的一半）
+            region: 限定区域 (x, y, w, h)，按结果中心点判断
+            anchor: 参照文本（包含匹配），只在其 direction 方向查找
+            direction: 相对参照文本的方向 ("right" | "left" | "above" | "below")
+            normalize: 精确 / 包含 / 模糊匹配（含参照文本）前归一化文本，忽略全半角、
+                大小写和空白；默认比较原文本
+
+        Returns:
+            匹配结果列表: 指定 anchor 时按与参照文本的距离排列，
+            模糊匹配按编辑距离排列，其余按识别结果顺序排列
+        """
+        if not self or (not target and not anchor):
+            return []
+
+        if target:
+            ids = self._match(target, match_mode, max_distance, normalize)
+        else:
+            ids = list(range(len(self)))
+
+        if region is not None:
+            inside = self._region_ids(region)
+            ids = [idx for idx in ids if idx in inside]
+
+        if anchor:
+            anchor_ids = self._match(anchor, MATCH_CONTAINS, 0, normalize)
+            if not anchor_ids:
+                return []
+            ids = self._relative_ids(anchor_ids[0], ids, direction)
+
+        return [self[idx] for idx in ids]
+
+    def in_region(self, region: Sequence[float]) -> List[Dict[str, Any]]:
+        """中心点位于区域 (x, y, w, h) 内的结果"""
+        return [self[idx] for idx in sorted(self._region_ids(region))]
+
+    def neighbors(self, result: Dict[str, Any], direction: str = DIRECTION_RIGHT) -> List[Dict[str, Any]]:
+        """位于 result 指定方向的结果，按距离由近到远排列"""
+        for idx, item in enumerate(self):
+            if item is result:
+                return [self[i] for i in self._relative_ids(idx, range(len(self)), direction)]
+        return []
+
+    def _match(self, target: str, match_mode: str, max_distance: int, normalize: bool) -> List[int]:
+        """匹配目标文本的结果序号"""
+        if match_mode == MATCH_REGEX:
+            try:
+                pattern = compile_pattern(target)
+            except re.error as e:
+                logger.error(f"正则表达式语法错误: {target}, 错误: {e}")
+                return []
+            return [idx for idx, r in enumerate(self) if pattern.search(r.get("text", ""))]
+
+        if normalize:
+            index = self.index.normalized
+            needle = normalize_text(target)
+        else:
+            index = self.index.raw
+            needle = target
+        if not needle:
+            return []
+        if match_mode == MATCH_EXACT:
+            return list(index.exact.get(needle, ()))
+
+        max_distance = min(max(int(max_distance), 0), (len(needle) - 1) // 2)
+        if match_mode != MATCH_FUZZY or max_distance == 0:
+            return index.contains(needle)
+
+        # 模糊匹配: 每处编辑最多破坏 2 个 2-gram，共有 2-gram 数不足的结果直接排除
+        grams = _bigrams(needle)
+        required = len(grams) - 2 * max_distance
+        if required > 0:
+            counts = Counter(idx for g in grams for idx in index.grams.get(g, ()))
+            candidates = sorted(idx for idx, count in counts.items() if count >= required)
+        else:
+            candidates = range(len(self))
+        min_length = len(needle) - max_distance
+        scored = []
+        for idx in candidates:
+            if len(index.texts[idx]) < min_length:
+                continue
+            distance = substring_distance(needle, index.texts[idx])
+            if distance <= max_distance:
+                scored.append((distance, idx))
+        scored.sort()
+        return [idx for _, idx in scored]
+
+    def _region_ids(self, region: Sequence[float]) -> set:
+        x, y, w, h = region
+        index = self.index
+        ids = set()
+        for idx in index.query_rect((x, y, x + w, y + h)):
+            rect = index.rects[idx]
+            cx, cy = (rect[0] + rect[2]) / 2, (rect[1] + rect[3]) / 2
+            if x <= cx <= x + w and y <= cy <= y + h:
+                ids.add(idx)
+        return ids
+
+    def _relative_ids(self, anchor_id: int, ids: Iterable[int], direction: str) -> List[int]:
+        """ids 中位于参照结果 direction 方向的序号，按间距由近到远排列
+
+        左右方向要求与参照文本属于同一行，上下方向要求水平方向有重叠。
+        """
+        index = self.index
+        anchor = index.rects[anchor_id]
+        if anchor is None:
+            return []
+        ax0, ay0, ax1, ay1 = anchor
+        anchor_cx, anchor_cy = (ax0 + ax1) / 2, (ay0 + ay1) / 2
+        # 空间索引只检查参照文本所在行 / 列方向的条带
+        extent = max(max(rect[2], rect[3]) for rect in index.rects if rect is not None)
+        if direction == DIRECTION_RIGHT:
+            band = (anchor_cx, ay0, extent, ay1)
+        elif direction == DIRECTION_LEFT:
+            band = (0, ay0, anchor_cx, ay1)
+        elif direction == DIRECTION_BELOW:
+            band = (ax0, anchor_cy, ax1, extent)
+        elif direction == DIRECTION_ABOVE:
+            band = (ax0, 0, ax1, anchor_cy)
+        else:
+            logger.warning(f"未知的方向: {direction}")
+            return []
+        nearby = index.query_rect(band)
+
+        scored = []
+        for idx in ids:
+            if idx == anchor_id or idx not in nearby:
+                continue
+            x0, y0, x1, y1 = index.rects[idx]
+            cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+            if direction in (DIRECTION_RIGHT, DIRECTION_LEFT):
+                overlap = min(y1, ay1) - max(y0, ay0)
+                if overlap < SAME_LINE_OVERLAP * min(y1 - y0, ay1 - ay0):
+                    continue
+                if direction == DIRECTION_RIGHT:
+                    gap, ahead = x0 - ax1, cx > anchor_cx
+                else:
+                    gap, ahead = ax0 - x1, cx < anchor_cx
+            elif direction == DIRECTION_BELOW:
+                gap, ahead = y0 - ay1, cy > anchor_cy
+            else:
+                gap, ahead = ay0 - y1, cy < anchor_cy
+            if ahead:
+                scored.append((max(gap, 0.0), idx))
+        scored.sort()
+        return [idx for _, idx in scored]
@@ -188,6 +188,14 @@ class FlowService:
             if edge.target not in node_ids:
                 errors.append(f"连线 {edge.id} 的目标节点 {edge.target} 不存在")
         
+        # 检查条件表达式语法
+        from engine.expression import validate_expression
+        for node in flow.nodes:
+            if node.type == 'condition' and node.properties.get('condition_type') == 'expression':
+                error = validate_expression(node.properties.get('expression', ''))
+                if error:
+                    errors.append(f"节点 {node.label or node.id} 的表达式无效: {error}")
+        
         # 检查循环依赖
         if self._has_cycle(flow):
             errors.append("流程存在循环依赖")
@@ -39,6 +39,108 @@ class FlowsConfig(BaseModel):
     auto_execute: bool = Field(default=False, description="是否自动执行流程")
 
 
+class ExecutorConfig(BaseModel):
+    """节点执行线程池配置
+
+    同步节点按类别在独立线程池中执行，避免等待/IO 节点占满线程池而饿死推理。
+    """
+    inference_workers: int = Field(default=2, description="推理线程池大小（YOLO/OCR）")
+    io_workers: int = Field(default=16, description="IO/动作线程池大小（KVM 收发、等待）")
+    cpu_workers: int = Field(default=4, description="CPU 预处理线程池大小（裁剪、预处理、逻辑）")
+    opencv_threads: int = Field(default=0, description="OpenCV 全局线程数（进程级，启动时设置一次），0 表示不修改")
+    admission_queue_depth: int = Field(default=4, description="推理池排队任务数达到该值时延迟启动新一轮循环")
+    admission_max_wait: float = Field(default=5.0, description="准入控制最长等待时间（秒），超时后仍启动循环")
+    default_node_timeout_ms: int = Field(default=0, description="节点默认超时时间（毫秒），0 表示不限制")
+    loop_budget_ms: int = Field(default=0, description="单轮循环默认耗时预算（毫秒），0 表示不限制")
+    optimize_graph: bool = Field(default=True, description="执行前编译流程图，裁剪结果不会被读取的节点")
+
+
+class ResultCacheConfig(BaseModel):
+    """节点结果缓存配置
+
+    画面未变化时，YOLO/OCR 节点直接复用上次的识别结果。
+    """
+    enabled: bool = Field(default=True, description="是否启用节点结果缓存")
+    max_entries: int = Field(default=256, description="最大缓存条目数")
+    max_memory_mb: float = Field(default=32.0, description="缓存内存上限（MB）")
+
+
+class RecCacheConfig(BaseModel):
+    """文本识别结果缓存配置
+
+    以文本裁剪图像的内容哈希为键缓存识别结果，使用同一识别模型的流程共享。
+    """
+    enabled: bool = Field(default=True, description="是否启用识别结果缓存")
+    max_entries: int = Field(default=4096, description="每个识别模型的最大缓存条目数")
+    max_memory_mb: float = Field(default=8.0, description="每个识别模型的缓存内存上限（MB）")
+
+
+class ModelRegistryConfig(BaseModel):
+    """全局模型注册表配置
+
+    流程停止后模型保持加载（空闲），超出数量或内存预算时按 LRU 卸载。
+    """
+    max_idle_models: int = Field(default=4, description="最多保留的空闲模型数")
+    max_memory_mb: float = Field(default=1024.0, description="已加载模型的内存预算（MB，按模型文件大小估算），0 表示不限制")
+    warmup: bool = Field(default=True, description="模型加载后是否用空白帧执行一次预热推理")
+    warmup_frame_width: int = Field(default=1920, description="预热帧宽度")
+    warmup_frame_height: int = Field(default=1080, description="预热帧高度")
+
+
+class BatchingConfig(BaseModel):
+    """跨流程推理批处理配置
+
+    多个流程并发使用同一模型时，在时间窗口内合并请求为一批推理。
+    """
+    enabled: bool = Field(default=True, description="是否启用推理批处理")
+    max_batch: int = Field(default=8, description="单批最大请求数")
+    max_wait_ms: float = Field(default=5.0, description="组批最长等待时间（毫秒）")
+    latency_slo_ms: float = Field(default=0.0, description="推理延迟目标（毫秒），组批等待不超过目标减去批推理耗时，0 表示不限制")
+
+
+class HistoryConfig(BaseModel):
+    """执行历史存储配置"""
+    enabled: bool = Field(default=True, description="是否记录执行历史")
+    db_path: str = Field(default="data/history.db", description="SQLite 数据库路径")
+    flush_interval: float = Field(default=1.0, description="批量写入间隔（秒）")
+    batch_size: int = Field(default=500, description="单次写入最大记录数")
+    max_queue: int = Field(default=100000, description="写入队列上限，超出时丢弃记录")
+    raw_retention_hours: float = Field(default=24.0, description="明细保留时间（小时），之后降采样为汇总")
+    max_raw_rows: int = Field(default=2000000, description="明细行数上限，超出时提前降采样最旧数据，0 表示不限制")
+    rollup_bucket_seconds: int = Field(default=60, description="汇总时间段长度（秒）")
+    retention_days: float = Field(default=30.0, description="汇总数据保留天数")
+    maintenance_interval: float = Field(default=300.0, description="降采样检查间隔（秒）")
+
+
+class KVMActionQueueConfig(BaseModel):
+    """KVM 输入仲裁配置
+
+    多个流程共享同一 KVM 时，动作序列按优先级和流程轮转依次独占执行。
+    """
+    enabled: bool = Field(default=True, description="是否启用 KVM 动作排队")
+    max_wait_ms: float = Field(default=5000.0, description="动作最长排队时间（毫秒），超时放弃该动作，0 表示一直等待")
+
+
+class TracingConfig(BaseModel):
+    """分段追踪配置"""
+    enabled: bool = Field(default=True, description="是否启用分段追踪")
+    sample_rate: float = Field(default=0.05, description="循环采样率（0-1）")
+    max_loops: int = Field(default=20, description="每个流程保留的最近循环数")
+
+
+class RunnerConfig(BaseModel):
+    """流程运行模式配置
+
+    thread 模式下所有流程在 API 进程内的事件循环线程中执行；
+    process 模式下流程分配到多个工作进程执行，绕开 GIL 限制。
+    """
+    mode: str = Field(default="thread", description="运行模式: thread / process")
+    workers: int = Field(default=0, description="工作进程数，0 表示使用 CPU 核数")
+    status_interval: float = Field(default=0.5, description="工作进程上报状态快照的间隔（秒）")
+    command_timeout: float = Field(default=10.0, description="等待工作进程响应控制命令的超时时间（秒）")
+    loop_mode: str = Field(default="sequential", description="循环模式: sequential / pipelined（动作阶段执行时预取下一轮感知结果）")
+
+
 class Config(BaseModel):
     """系统总配置
     
@@ -49,6 +151,15 @@ class Config(BaseModel):
     monitoring: MonitoringConfig = Field(default_factory=MonitoringConfig)
     api: APIConfig = Field(default_factory=APIConfig)
     flows: FlowsConfig = Field(default_factory=FlowsConfig)
+    executor: ExecutorConfig = Field(default_factory=ExecutorConfig)
+    runner: RunnerConfig = Field(default_factory=RunnerConfig)
+    result_cache: ResultCacheConfig = Field(default_factory=ResultCacheConfig)
+    rec_cache: RecCacheConfig = Field(default_factory=RecCacheConfig)
+    tracing: TracingConfig = Field(default_factory=TracingConfig)
+    model_registry: ModelRegistryConfig = Field(default_factory=ModelRegistryConfig)
+    batching: BatchingConfig = Field(default_factory=BatchingConfig)
+    history: HistoryConfig = Field(default_factory=HistoryConfig)
+    kvm_action_queue: KVMActionQueueConfig = Field(default_factory=KVMActionQueueConfig)
 
 
 class ConfigManager:
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+DB 文本检测后处理基准
+
+在合成的检测概率图（密集 UI 画面: 大量轴对齐文本行、少量倾斜文本和噪点）上
+对比 DBPostProcess 的逐轮廓原流程与快速路径（use_fast_path），
+校验两者输出的文本框一致（坐标误差不超过 --tolerance 像素），再测量耗时。
+
+用法:
+    python tests/bench_db_postprocess.py [--lines 300] [--rotated 10] [--noise 400] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ocr.ppocr_det_opencv import DBPostProcess
+
+# 1920x1080 画面按最长边 960 缩放后的检测图尺寸
+MAP_HEIGHT, MAP_WIDTH = 544, 960
+SRC_HEIGHT, SRC_WIDTH = 1080, 1920
+
+
+def make_prob_map(rng: np.random.Generator, lines: int, rotated: int, noise: int) -> np.ndarray:
+    """生成检测模型输出的概率图"""
+    prob = np.zeros((MAP_HEIGHT, MAP_WIDTH), dtype=np.float32)
+    # 文本行按行排布，互不重叠
+    row_height = 18
+    rows = MAP_HEIGHT // row_height
+    placed = 0
+    while placed < lines:
+        row = int(rng.integers(0, rows))
+        h = int(rng.integers(6, 12))
+        w = int(rng.integers(8, 120))
+        x = int(rng.integers(0, MAP_WIDTH - w))
+        y = row * row_height + 3
+        if prob[y:y + h, max(x - 4, 0):x + w + 4].any():
+            continue
+        prob[y:y + h, x:x + w] = rng.uniform(0.6, 0.95)
+        placed += 1
+    for _ in range(rotated):
+        center = (float(rng.integers(100, MAP_WIDTH - 100)), float(rng.integers(50, MAP_HEIGHT - 50)))
+        size = (float(rng.integers(40, 160)), float(rng.integers(8, 16)))
+        points = cv2.boxPoints((center, size, float(rng.uniform(5, 40)))).astype(np.int32)
+        cv2.fillPoly(prob, [points], float(rng.uniform(0.7, 0.95)))
+    for _ in range(noise):
+        x = int(rng.integers(0, MAP_WIDTH - 2))
+        y = int(rng.integers(0, MAP_HEIGHT - 2))
+        prob[y:y + int(rng.integers(1, 3)), x:x + int(rng.integers(1, 3))] = rng.uniform(0.35, 0.9)
+    prob = cv2.GaussianBlur(prob, (3, 3), 0)
+    return prob
+
+
+def run(post: DBPostProcess, prob: np.ndarray):
+    outs = {'maps': prob[None, None, :, :]}
+    shape_list = np.array([[SRC_HEIGHT, SRC_WIDTH, MAP_HEIGHT / SRC_HEIGHT, MAP_WIDTH / SRC_WIDTH]])
+    return post(outs, shape_list)[0]['points']
+
+
+def compare(expected: np.ndarray, actual: np.ndarray, tolerance: int) -> int:
+    """返回坐标误差超过容差的文本框数量"""
+    assert len(expected) == len(actual), (len(expected), len(actual))
+    if len(expected) == 0:
+        return 0
+    diff = np.abs(expected.astype(np.int32) - actual.astype(np.int32)).reshape(len(expected), -1).max(axis=1)
+    return int((diff > tolerance).sum())
+
+
+def measure(func, repeat: int) -> float:
+    """返回平均耗时（毫秒）"""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="DB 文本检测后处理基准")
+    parser.add_argument('--lines', type=int, default=200, help="轴对齐文本行数")
+    parser.add_argument('--rotated', type=int, default=10, help="倾斜文本数")
+    parser.add_argument('--noise', type=int, default=400, help="噪点数")
+    parser.add_argument('--repeat', type=int, default=20, help="重复次数")
+    parser.add_argument('--tolerance', type=int, default=2, help="原图坐标容差（像素）")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    prob = make_prob_map(rng, args.lines, args.rotated, args.noise)
+    reference = DBPostProcess(use_fast_path=False)
+    fast = DBPostProcess(use_fast_path=True)
+
+    expected = run(reference, prob)
+    actual = run(fast, prob)
+    mismatched = compare(expected, actual, args.tolerance)
+
+    reference_ms = measure(lambda: run(reference, prob), args.repeat)
+    fast_ms = measure(lambda: run(fast, prob), args.repeat)
+    print(f"检测图 {MAP_WIDTH}x{MAP_HEIGHT}, 文本框 {len(expected)}, 超出容差 {mismatched}")
+    print(f"{'reference ms':>14} {'fast ms':>10} {'speedup':>8}")
+    print(f"{reference_ms:>14.2f} {fast_ms:>10.2f} {reference_ms / fast_ms:>7.1f}x")
+    return 1 if mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
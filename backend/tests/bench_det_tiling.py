@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+文本检测分块基准
+
+在高分辨率画面上对比三种检测模式:
+- resize:   整帧缩放到模型输入尺寸（原流程）
+- tile:     原分辨率切成重叠的模型尺寸块，整批推理后合并接缝处文本框
+- adaptive: 按预期文字高度缩放后分块
+
+报告每帧耗时、文本框数，以及相对标注框的召回率 / 精确率（IoU 阈值 --iou）。
+未指定 --image 时使用合成的 UI 画面（小号文字，标注框由 cv2.getTextSize 给出）。
+
+用法:
+    python tests/bench_det_tiling.py --det models/ch_PP-OCRv4_det.onnx \\
+        [--image frame.png] [--size 2560x1440] [--text-height 16] [--runs 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ocr.ppocr_sophon import Args, predict_det
+from ocr.ppocr_det_opencv import DET_MODE_RESIZE, DET_MODE_TILE, DET_MODE_ADAPTIVE
+
+MODES = [DET_MODE_RESIZE, DET_MODE_TILE, DET_MODE_ADAPTIVE]
+WORDS = ["File", "Edit", "View", "Settings", "OK", "Cancel", "Apply", "Status: Connected",
+         "192.168.1.100", "Login failed, please retry", "Device list", "Save changes"]
+
+
+def synthetic_frame(rng: np.random.Generator, width: int, height: int):
+    """生成带小号文字的 UI 画面，返回 (画面, 标注框列表 [x0, y0, x1, y1])"""
+    frame = np.full((height, width, 3), 240, dtype=np.uint8)
+    font_scale, thickness = 0.45, 1
+    gt_boxes = []
+    row_height = 28
+    for y in range(24, height - 8, row_height):
+        x = int(rng.integers(8, 60))
+        while True:
+            text = WORDS[int(rng.integers(0, len(WORDS)))]
+            (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+            if x + w >= width - 8:
+                break
+            cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                        (30, 30, 30), thickness, cv2.LINE_AA)
+            gt_boxes.append([x, y - h, x + w, y + baseline])
+            x += w + int(rng.integers(30, 160))
+    return frame, gt_boxes
+
+
+def make_detector(args):
+    if args.det.endswith('.onnx'):
+        from ocr.ppocr_cpu import CpuTextDetector
+        return CpuTextDetector(Args(det_model=args.det, threads=args.threads,
+                                    det_limit_side_len=args.limit_side_len,
+                                    det_text_height=args.text_height))
+    return predict_det.PPOCRv2Det(Args(bmodel_det=args.det, dev_id=args.dev_id,
+                                       det_text_height=args.text_height))
+
+
+def box_iou(box, gt) -> float:
+    x0, y0 = box.min(axis=0)
+    x1, y1 = box.max(axis=0)
+    ix = max(0.0, min(x1, gt[2]) - max(x0, gt[0]))
+    iy = max(0.0, min(y1, gt[3]) - max(y0, gt[1]))
+    inter = ix * iy
+    union = (x1 - x0) * (y1 - y0) + (gt[2] - gt[0]) * (gt[3] - gt[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match(boxes, gt_boxes, threshold: float):
+    """返回 (召回的标注框数, 命中标注框的检测框数)"""
+    if not gt_boxes:
+        return 0, 0
+    ious = np.array([[box_iou(box, gt) for gt in gt_boxes] for box in boxes]).reshape(len(boxes), len(gt_boxes))
+    hits = ious >= threshold
+    return int(hits.any(axis=0).sum()), int(hits.any(axis=1).sum())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="文本检测分块基准")
+    parser.add_argument('--det', required=True, help="检测模型路径（ONNX 或 BModel）")
+    parser.add_argument('--image', default=None, help="测试图片（默认合成 UI 画面）")
+    parser.add_argument('--size', default='2560x1440', help="合成画面尺寸，如 1920x1080")
+    parser.add_argument('--text-height', type=int, default=16, help="自适应模式的预期文字高度")
+    parser.add_argument('--limit-side-len', type=int, default=960, help="动态尺寸 ONNX 模型的输入最长边")
+    parser.add_argument('--threads', type=int, default=0, help="CPU 推理线程数")
+    parser.add_argument('--dev-id', type=int, default=0, help="Sophon 设备ID")
+    parser.add_argument('--iou', type=float, default=0.3, help="匹配标注框的 IoU 阈值")
+    parser.add_argument('--runs', type=int, default=10, help="每种模式测量次数")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    gt_boxes = []
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            print(f"无法读取图片: {args.image}")
+            return 1
+    else:
+        width, height = (int(v) for v in args.size.lower().split('x'))
+        frame, gt_boxes = synthetic_frame(np.random.default_rng(args.seed), width, height)
+
+    detector = make_detector(args)
+    print(f"画面 {frame.shape[1]}x{frame.shape[0]}, 模型输入 {detector.input_shape}, "
+          f"标注框 {len(gt_boxes) or '-'}, 每种模式 {args.runs} 次")
+    print(f"{'mode':>10} {'ms/frame':>9} {'boxes':>6} {'recall':>8} {'precision':>10}")
+    for mode in MODES:
+        detector.det_mode = mode
+        boxes = detector([frame])[0]
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            detector([frame])
+        ms = (time.perf_counter() - start) * 1000 / args.runs
+        if gt_boxes:
+            recalled, precise = match(boxes, gt_boxes, args.iou)
+            recall = f"{recalled / len(gt_boxes):.1%}"
+            precision = f"{precise / len(boxes):.1%}" if len(boxes) else "-"
+        else:
+            recall = precision = "-"
+        print(f"{mode:>10} {ms:>9.1f} {len(boxes):>6} {recall:>8} {precision:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
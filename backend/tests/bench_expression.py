@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+条件表达式求值微基准
+
+对比三种方式每秒求值次数：
+- compiled: 编译一次（compile_expression 缓存），每次只执行闭包
+- reparse:  每次求值都重新解析编译（不使用缓存）
+- eval:     等价的 Python 表达式每次调用 eval（仅作参考，节点中不使用）
+
+用法:
+    python tests/bench_expression.py [--seconds 1.0] [--ocr 50]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from engine.expression import compile_expression
+
+
+class BenchContext:
+    """模拟流程上下文"""
+
+    def __init__(self, ocr_count: int):
+        self.ocr_results = [
+            {'text': f'文本{i}', 'confidence': 0.9, 'center': (i, i)} for i in range(ocr_count - 1)
+        ] + [{'text': '请确认操作', 'confidence': 0.95, 'center': (10, 10)}]
+        self.detection_results = [{'label': 'button', 'confidence': 0.8}, {'label': 'dialog', 'confidence': 0.7}]
+        self.variables = {'retry': '2', 'status': 'active', 'count': 7}
+        self.flags = {}
+        self.counters = {}
+        self.loop_count = 42
+        self.ocr_target_found = False
+
+
+# (表达式, 等价的 Python 表达式)
+CASES = [
+    ("vars.retry < 3",
+     "float(variables.get('retry')) < 3"),
+    ("${count} > 5 && ${status} == 'active'",
+     "variables.get('count') > 5 and variables.get('status') == 'active'"),
+    ("count(ocr, '确认') > 0 and vars.retry < 3",
+     "sum(1 for r in ocr_results if '确认' in r['text']) > 0 and float(variables.get('retry')) < 3"),
+    ("exists(det, 'dialog') and conf(det, 'button') >= 0.5 or loop % 10 == 0",
+     "(any(d['label'] == 'dialog' for d in detection_results) and "
+     "max([d['confidence'] for d in detection_results if d['label'] == 'button'] or [0]) >= 0.5) "
+     "or loop_count % 10 == 0"),
+]
+
+
+def measure(func, seconds: float) -> float:
+    """在给定时间内重复调用，返回每秒调用次数"""
+    count = 0
+    batch = 100
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(batch):
+            func()
+        count += batch
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="条件表达式求值微基准")
+    parser.add_argument('--seconds', type=float, default=1.0, help="每项测量时间（秒）")
+    parser.add_argument('--ocr', type=int, default=50, help="模拟 OCR 结果数量")
+    args = parser.parse_args()
+
+    context = BenchContext(args.ocr)
+    python_env = {
+        'ocr_results': context.ocr_results,
+        'detection_results': context.detection_results,
+        'variables': context.variables,
+        'loop_count': context.loop_count,
+    }
+    uncached_compile = compile_expression.__wrapped__
+
+    print(f"OCR 结果数: {args.ocr}, 每项测量 {args.seconds:.1f}s")
+    print(f"{'表达式':<60} {'compiled/s':>12} {'reparse/s':>12} {'eval/s':>12}")
+    for source, python_source in CASES:
+        expression = compile_expression(source)
+        assert expression.test(context) == bool(eval(python_source, {}, python_env)), source
+
+        compiled = measure(lambda: expression.test(context), args.seconds)
+        reparse = measure(lambda: uncached_compile(source).test(context), args.seconds)
+        evaluated = measure(lambda: eval(python_source, {}, python_env), args.seconds)
+        print(f"{source:<60} {compiled:>12,.0f} {reparse:>12,.0f} {evaluated:>12,.0f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
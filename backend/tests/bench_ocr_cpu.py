@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+CPU OCR 后端基准
+
+以不同推理线程数运行 PPOCRCpu，报告每帧 1080p 画面的整帧耗时
+（检测 + 裁剪 + 识别）以及检测 / 识别耗时拆分。
+
+用法:
+    python tests/bench_ocr_cpu.py --det models/ch_PP-OCRv4_det.onnx \\
+        --rec models/ch_PP-OCRv4_rec.onnx --dict models/ppocr_keys_v1.txt \\
+        [--cls models/ch_ppocr_cls.onnx] [--image frame.png] \\
+        [--threads 1,2,4,8] [--runs 20]
+
+未指定 --image 时使用合成的 1080p 文本画面。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ocr.ppocr_cpu import PPOCRCpu
+
+
+def synthetic_frame() -> np.ndarray:
+    """生成带文本的 1920x1080 画面"""
+    frame = np.full((1080, 1920, 3), 235, dtype=np.uint8)
+    lines = ["Settings", "Network Status: Connected", "OK", "Cancel",
+             "Login failed, please retry", "Device 192.168.1.100", "Apply changes"]
+    for row in range(12):
+        for col in range(3):
+            text = lines[(row * 3 + col) % len(lines)]
+            cv2.putText(frame, text, (60 + col * 620, 70 + row * 85),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (20, 20, 20), 2, cv2.LINE_AA)
+    return frame
+
+
+def percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def bench(args, frame: np.ndarray, threads: int) -> dict:
+    """按给定线程数运行一组测量"""
+    engine = PPOCRCpu(
+        det_model=args.det,
+        rec_model=args.rec,
+        cls_model=args.cls,
+        char_dict_path=args.dict,
+        use_angle_cls=bool(args.cls),
+        threads=threads
+    )
+    # 预热（首次推理包含内存分配和算子初始化）
+    results = engine.recognize(frame)
+
+    totals = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        results = engine.recognize(frame)
+        totals.append((time.perf_counter() - start) * 1000)
+
+    # 检测 / 识别耗时为引擎统计中的滑动平均
+    stats = engine.get_stats()
+    return {
+        'threads': threads,
+        'runtime': stats.get('runtime'),
+        'texts': len(results),
+        'mean': float(np.mean(totals)),
+        'p50': percentile(totals, 50),
+        'p95': percentile(totals, 95),
+        'det': stats.get('avg_det_time', 0.0) * 1000,
+        'rec': stats.get('avg_rec_time', 0.0) * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CPU OCR 后端基准")
+    parser.add_argument('--det', required=True, help="检测模型 ONNX 路径")
+    parser.add_argument('--rec', required=True, help="识别模型 ONNX 路径")
+    parser.add_argument('--dict', required=True, help="字符字典路径")
+    parser.add_argument('--cls', default=None, help="方向分类模型 ONNX 路径（可选）")
+    parser.add_argument('--image', default=None, help="测试图片（默认合成 1080p 画面）")
+    parser.add_argument('--threads', default='1,2,4,8', help="线程数列表，逗号分隔")
+    parser.add_argument('--runs', type=int, default=20, help="每组测量次数")
+    args = parser.parse_args()
+
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            print(f"无法读取图片: {args.image}")
+            return 1
+        frame = cv2.resize(frame, (1920, 1080))
+    else:
+        frame = synthetic_frame()
+
+    thread_counts = [int(t) for t in args.threads.split(',') if t.strip()]
+    print(f"画面: {frame.shape[1]}x{frame.shape[0]}, 每组 {args.runs} 次")
+    print(f"{'线程':>6} {'运行时':>12} {'文本数':>6} {'mean ms':>9} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'det ms':>9} {'rec ms':>9}")
+    for threads in thread_counts:
+        r = bench(args, frame, threads)
+        print(f"{r['threads']:>6} {r['runtime']:>12} {r['texts']:>6} {r['mean']:>9.1f} "
+              f"{r['p50']:>9.1f} {r['p95']:>9.1f} {r['det']:>9.1f} {r['rec']:>9.1f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
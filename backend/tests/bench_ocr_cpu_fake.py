@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+CPU OCR 后端流程检查（模拟 ONNX 模型）
+
+不需要 ONNX 模型文件和 onnxruntime：用模拟的 OnnxModel 替换 ppocr_cpu 中的推理，
+检测、组批、裁剪、CTC 解码、结果组装走 PPOCRCpu 的真实流程:
+- 检测模型: 深色像素的连通域（横向膨胀连成单词）外接矩形内缩后作为文本概率图
+- 识别模型: 每 8 像素宽的列按深色像素数映射为一个字符（相同裁剪给出相同文本）
+- 分类模型: 全部判为 0 度
+
+分别以动态形状和固定形状模型运行，检查:
+- recognize() 检出合成画面中的文本行（相对标注框的召回率）
+- recognize_batch() 与逐帧 recognize() 结果一致，识别模型按批调用
+- tile 检测模式在高分辨率小字画面上的召回率（resize / adaptive 仅报告）
+并报告每帧耗时。任一检查失败时返回非 0。
+
+用法:
+    python tests/bench_ocr_cpu_fake.py [--runs 5] [--iou 0.5]
+"""
+
+import argparse
+import os
+import string
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import ocr.ppocr_cpu as ppocr_cpu
+from ocr.ppocr_cpu import PPOCRCpu
+
+CHARS = string.digits + string.ascii_lowercase
+WORDS = ["File", "Edit", "View", "Settings", "OK", "Cancel", "Apply", "Status",
+         "192.168.1.100", "Login", "Device list", "Save changes"]
+
+# 模型输入形状（-1 为动态维度）
+SCENARIOS = {
+    'dynamic': {'det': [-1, 3, -1, -1], 'rec': [-1, 3, 48, -1], 'cls': [-1, 3, 48, 192]},
+    'fixed': {'det': [1, 3, 640, 640], 'rec': [8, 3, 48, 640], 'cls': [6, 3, 48, 192]},
+}
+
+
+class FakeOnnxModel:
+    """替代 ppocr_cpu.OnnxModel 的模拟模型（按模型文件名区分 det / rec / cls）"""
+
+    shapes = SCENARIOS['dynamic']
+    num_classes = len(CHARS) + 2  # blank + 字典 + 空格
+
+    def __init__(self, model_path: str, threads: int = 0):
+        self.model_path = model_path
+        self.threads = threads
+        self.kind = os.path.splitext(os.path.basename(model_path))[0]
+        self.input_name = 'x'
+        self.input_shape = list(self.shapes[self.kind])
+        self.runtime = 'fake'
+        self.batch_sizes = []
+
+    def run(self, tensor: np.ndarray) -> np.ndarray:
+        tensor = np.ascontiguousarray(tensor, dtype=np.float32)
+        self.batch_sizes.append(len(tensor))
+        if self.kind == 'det':
+            return self._det(tensor)
+        if self.kind == 'rec':
+            return self._rec(tensor)
+        probs = np.zeros((len(tensor), 2), dtype=np.float32)
+        probs[:, 0] = 0.99
+        probs[:, 1] = 0.01
+        return probs
+
+    @staticmethod
+    def _det(tensor: np.ndarray) -> np.ndarray:
+        """单词连通域的外接矩形内缩后作为概率图（模拟 DB 收缩标签，后处理 unclip 后还原）"""
+        # 归一化后背景约为 +2，文字约为 -1.7，补齐区域为 0
+        dark = (tensor.mean(axis=1) < -0.5).astype(np.uint8)
+        kernel = np.ones((3, 11), dtype=np.uint8)
+        maps = np.zeros((len(tensor), 1) + tensor.shape[2:], dtype=np.float32)
+        for i, mask in enumerate(dark):
+            _, _, stats, _ = cv2.connectedComponentsWithStats(cv2.dilate(mask, kernel), connectivity=8)
+            for x, y, w, h, _ in stats[1:].tolist():
+                d = int(round(min(w, h) * 0.2))
+                if w > 2 * d and h > 2 * d:
+                    maps[i, 0, y + d:y + h - d, x + d:x + w - d] = 0.95
+        return maps
+
+    def _rec(self, tensor: np.ndarray) -> np.ndarray:
+        n, _, _, width = tensor.shape
+        steps = max(1, width // 8)
+        dark = tensor.mean(axis=1)[:, :, :steps * 8] < -0.5
+        counts = dark.reshape(n, dark.shape[1], steps, 8).sum(axis=(1, 3))
+        idx = np.where(counts > 0, 1 + counts % len(CHARS), 0)
+        probs = np.full((n, steps, self.num_classes), 0.1 / (self.num_classes - 1), dtype=np.float32)
+        np.put_along_axis(probs, idx[:, :, None], 0.9, axis=2)
+        return probs
+
+
+def synthetic_frame(rng: np.random.Generator, width: int, height: int, font_scale: float):
+    """生成 UI 画面，返回 (画面, 标注框列表 [x0, y0, x1, y1])"""
+    frame = np.full((height, width, 3), 235, dtype=np.uint8)
+    thickness = 1 if font_scale < 0.6 else 2
+    gt_boxes = []
+    row_height = int(60 * font_scale) + 12
+    for y in range(row_height, height - 8, row_height):
+        x = int(rng.integers(8, 60))
+        while True:
+            text = WORDS[int(rng.integers(0, len(WORDS)))]
+            (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+            if x + w >= width - 8:
+                break
+            cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                        (20, 20, 20), thickness, cv2.LINE_AA)
+            gt_boxes.append([x, y - h, x + w, y + baseline])
+            x += w + int(rng.integers(60, 200))
+    return frame, gt_boxes
+
+
+def iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def recall(results, gt_boxes, threshold: float) -> float:
+    boxes = [[x, y, x + w, y + h] for x, y, w, h in (r['bbox_rect'] for r in results)]
+    found = sum(1 for gt in gt_boxes if any(iou(gt, box) >= threshold for box in boxes))
+    return found / len(gt_boxes) if gt_boxes else 1.0
+
+
+def result_keys(results):
+    return [(r['text'], round(r['conf'], 4), tuple(int(round(v)) for v in r['bbox_rect'])) for r in results]
+
+
+def make_engine(model_dir: str, dict_path: str, det_mode: str = 'resize') -> PPOCRCpu:
+    engine = PPOCRCpu(
+        det_model=os.path.join(model_dir, 'det.onnx'),
+        rec_model=os.path.join(model_dir, 'rec.onnx'),
+        cls_model=os.path.join(model_dir, 'cls.onnx'),
+        char_dict_path=dict_path,
+        use_angle_cls=True,
+        img_size=[[320, 48], [640, 48]],
+        det_limit_side_len=960,
+        det_mode=det_mode
+    )
+    # 关闭识别结果缓存，每次都调用识别模型
+    engine.rec_cache = None
+    return engine
+
+
+def timed(func, runs: int):
+    result = func()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, float(np.mean(times))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CPU OCR 后端流程检查（模拟 ONNX 模型）")
+    parser.add_argument('--runs', type=int, default=5, help="计时重复次数")
+    parser.add_argument('--iou', type=float, default=0.5, help="召回率 IoU 阈值")
+    parser.add_argument('--min-recall', type=float, default=0.9, help="召回率下限")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ppocr_cpu.OnnxModel = FakeOnnxModel
+    rng = np.random.default_rng(args.seed)
+    frames = [synthetic_frame(rng, 1280, 720, 0.8) for _ in range(3)]
+    large, large_gt = synthetic_frame(rng, 2560, 1440, 0.45)
+
+    failures = []
+    print(f"{'scenario':>9} {'check':>16} {'texts':>6} {'recall':>7} {'ms':>8}  note")
+    with tempfile.TemporaryDirectory() as model_dir:
+        dict_path = os.path.join(model_dir, 'keys.txt')
+        with open(dict_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(CHARS) + '\n')
+        for name in ('det', 'rec', 'cls'):
+            open(os.path.join(model_dir, f'{name}.onnx'), 'wb').close()
+
+        for scenario, shapes in SCENARIOS.items():
+            FakeOnnxModel.shapes = shapes
+            engine = make_engine(model_dir, dict_path)
+
+            # 单帧
+            single, single_ms = timed(lambda: engine.recognize(frames[0][0]), args.runs)
+            single_recall = recall(single, frames[0][1], args.iou)
+            empty = sum(1 for r in single if not r['text'])
+            print(f"{scenario:>9} {'recognize':>16} {len(single):>6} {single_recall:>7.1%} "
+                  f"{single_ms:>8.1f}  空文本 {empty}")
+            if single_recall < args.min_recall:
+                failures.append(f"{scenario}: recognize 召回率 {single_recall:.1%}")
+            if empty:
+                failures.append(f"{scenario}: recognize 有 {empty} 个空文本")
+
+            # 批量与逐帧一致
+            images = [frame for frame, _ in frames]
+            expected = [engine.recognize(img) for img in images]
+            rec_model = engine.text_recognizer.net
+            rec_model.batch_sizes.clear()
+            batch, batch_ms = timed(lambda: engine.recognize_batch(images), args.runs)
+            mismatched = sum(result_keys(e) != result_keys(a) for e, a in zip(expected, batch))
+            max_batch = max(rec_model.batch_sizes) if rec_model.batch_sizes else 0
+            print(f"{scenario:>9} {'recognize_batch':>16} {sum(len(r) for r in batch):>6} {'':>7} "
+                  f"{batch_ms / len(images):>8.1f}  与逐帧不一致 {mismatched} 帧, 识别最大批 {max_batch}")
+            if mismatched:
+                failures.append(f"{scenario}: recognize_batch 与 recognize 不一致 {mismatched} 帧")
+            if max_batch <= 1:
+                failures.append(f"{scenario}: 识别模型未按批调用")
+
+            # 高分辨率画面分块检测
+            for det_mode in ('resize', 'tile', 'adaptive'):
+                mode_engine = make_engine(model_dir, dict_path, det_mode)
+                results, mode_ms = timed(lambda: mode_engine.recognize(large), args.runs)
+                mode_recall = recall(results, large_gt, args.iou)
+                det_calls = len(mode_engine.text_detector.net.batch_sizes) // (args.runs + 1)
+                print(f"{scenario:>9} {det_mode:>16} {len(results):>6} {mode_recall:>7.1%} "
+                      f"{mode_ms:>8.1f}  2560x1440, 检测调用 {det_calls} 次/帧")
+                if det_mode == 'tile' and mode_recall < args.min_recall:
+                    failures.append(f"{scenario}: tile 召回率 {mode_recall:.1%}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
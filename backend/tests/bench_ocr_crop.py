@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+OCR 裁剪阶段基准
+
+对比每帧裁剪阶段（文本框裁剪 + 构建识别输入张量）的耗时:
+- before: 每个文本框 deepcopy + 透视变换裁剪，识别预处理逐张缩放后 np.stack 组批
+- after:  轴对齐文本框直接切片，一次缩放到识别高度，写入预分配的输入张量
+
+同时比较两者生成的识别输入张量（轴对齐且不小于 16 像素的文本框应完全一致）。
+
+用法:
+    python tests/bench_ocr_crop.py [--boxes 150] [--rotated 5] [--repeat 20]
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ocr.ppocr_sophon import get_rotate_crop_image
+from ocr.ppocr_rec_opencv import PPOCRv2Rec
+
+FRAME_HEIGHT, FRAME_WIDTH = 1080, 1920
+IMG_SIZE = [[320, 48], [640, 48]]
+
+
+def make_recognizer() -> PPOCRv2Rec:
+    """不加载模型，只初始化预处理需要的参数"""
+    rec = object.__new__(PPOCRv2Rec)
+    rec.img_size = sorted(IMG_SIZE, key=lambda x: x[0])
+    rec.img_ratio = sorted(x[0] / x[1] for x in rec.img_size)
+    rec.rec_batch_size = 6
+    rec.preprocess_time = 0.0
+    rec.content_columns = rec.padded_columns = rec.bucket_columns = 0
+    return rec
+
+
+def make_boxes(rng: np.random.Generator, count: int, rotated: int):
+    """生成检测输出格式的文本框（左上、右上、右下、左下，float32）"""
+    boxes = []
+    for _ in range(count):
+        w = int(rng.integers(12, 420))
+        h = int(rng.integers(14, 40))
+        x = int(rng.integers(0, FRAME_WIDTH - w - 1))
+        y = int(rng.integers(0, FRAME_HEIGHT - h - 1))
+        boxes.append(np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float32))
+    for _ in range(rotated):
+        center = (float(rng.integers(300, FRAME_WIDTH - 300)), float(rng.integers(100, FRAME_HEIGHT - 100)))
+        points = cv2.boxPoints((center, (float(rng.integers(80, 300)), float(rng.integers(20, 36))),
+                                float(rng.uniform(5, 30))))
+        order = np.argsort(points[:, 0])
+        left, right = points[order[:2]], points[order[2:]]
+        tl, bl = left[np.argsort(left[:, 1])]
+        tr, br = right[np.argsort(right[:, 1])]
+        boxes.append(np.array([tl, tr, br, bl], dtype=np.float32))
+    return boxes
+
+
+def reference_crop(img, points):
+    """原实现: 每个文本框都做透视变换"""
+    points = copy.deepcopy(points)
+    img_crop_width = max(16, int(max(np.linalg.norm(points[0] - points[1]),
+                                     np.linalg.norm(points[2] - points[3]))))
+    img_crop_height = max(16, int(max(np.linalg.norm(points[0] - points[3]),
+                                      np.linalg.norm(points[1] - points[2]))))
+    pts_std = np.float32([[0, 0], [img_crop_width, 0],
+                          [img_crop_width, img_crop_height], [0, img_crop_height]])
+    M = cv2.getPerspectiveTransform(points, pts_std)
+    dst_img = cv2.warpPerspective(img, M, (img_crop_width, img_crop_height),
+                                  borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if dst_img.shape[0] * 1.0 / dst_img.shape[1] >= 1.5:
+        dst_img = np.rot90(dst_img)
+    return dst_img
+
+
+def reference_inputs(rec: PPOCRv2Rec, crops):
+    """原实现: 逐张预处理后按宽度分组 np.stack"""
+    groups = {size[0]: [] for size in rec.img_size}
+    ids = {size[0]: [] for size in rec.img_size}
+    for id, crop in enumerate(crops):
+        img = rec.preprocess(crop)
+        groups[img.shape[2]].append(img)
+        ids[img.shape[2]].append(id)
+    return [{"tensor": np.stack(imgs), "ids": ids[w]} for w, imgs in groups.items() if imgs]
+
+
+def before(rec, frame, boxes):
+    return reference_inputs(rec, [reference_crop(frame, box) for box in boxes])
+
+
+def after(rec, frame, boxes):
+    return rec.build_inputs([get_rotate_crop_image(frame, box) for box in boxes])
+
+
+def measure(func, repeat: int) -> float:
+    """返回平均耗时（毫秒）"""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="OCR 裁剪阶段基准")
+    parser.add_argument('--boxes', type=int, default=150, help="轴对齐文本框数")
+    parser.add_argument('--rotated', type=int, default=5, help="倾斜文本框数")
+    parser.add_argument('--repeat', type=int, default=20, help="重复次数")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frame = rng.integers(0, 256, size=(FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+    boxes = make_boxes(rng, args.boxes, args.rotated)
+    rec = make_recognizer()
+
+    def by_id(batches):
+        return {id: batch["tensor"][slot] for batch in batches for slot, id in enumerate(batch["ids"])}
+
+    expected, actual = by_id(before(rec, frame, boxes)), by_id(after(rec, frame, boxes))
+    identical = 0
+    max_diff = 0.0
+    for id, tensor in actual.items():
+        diff = float(np.abs(tensor - expected[id]).max())
+        max_diff = max(max_diff, diff)
+        identical += diff == 0.0
+
+    before_ms = measure(lambda: before(rec, frame, boxes), args.repeat)
+    after_ms = measure(lambda: after(rec, frame, boxes), args.repeat)
+    print(f"画面 {FRAME_WIDTH}x{FRAME_HEIGHT}, 文本框 {len(boxes)} (倾斜 {args.rotated}), "
+          f"识别输入完全一致 {identical}/{len(boxes)}, 最大差异 {max_diff:.4f}")
+    print(f"{'before ms/frame':>16} {'after ms/frame':>16} {'speedup':>8}")
+    print(f"{before_ms:>16.2f} {after_ms:>16.2f} {before_ms / after_ms:>7.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
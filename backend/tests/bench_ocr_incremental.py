@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+增量 OCR 基准
+
+模拟大部分静止的 KVM 画面序列（时钟每帧更新、状态文字偶尔变化、周期性弹出对话框），
+对比每帧整帧识别与增量识别（IncrementalOCR）:
+- 每帧重新处理的画面比例与 OCR 耗时
+- 增量识别结果与整帧识别结果的一致性（文本和外接矩形）
+
+指定 --det/--rec/--dict 时使用 PPOCRCpu（ONNX 模型），否则使用 OpenCV 连通域
+模拟的文本检测识别（耗时与处理面积成正比，相同图像块给出相同文本），
+此时一致性检查只验证增量拼装逻辑。
+
+用法:
+    python tests/bench_ocr_incremental.py [--frames 60] [--popup-every 20]
+    python tests/bench_ocr_incremental.py --det models/ch_PP-OCRv4_det.onnx \\
+        --rec models/ch_PP-OCRv4_rec.onnx --dict models/ppocr_keys_v1.txt
+"""
+
+import argparse
+import os
+import sys
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ocr.incremental import IncrementalOCR
+
+WIDTH, HEIGHT = 1920, 1080
+WORDS = ["Settings", "Network Status: Connected", "OK", "Cancel", "Device 192.168.1.100",
+         "Apply changes", "Login", "Help", "File", "Edit", "View", "Save"]
+
+
+class BlobOCR:
+    """OpenCV 连通域模拟的 OCR 后端"""
+
+    def recognize_batch(self, frames, conf_thresholds):
+        results = []
+        for frame in frames:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            mask = (gray < 128).astype(np.uint8)
+            mask = cv2.dilate(mask, np.ones((5, 15), dtype=np.uint8))
+            count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+            items = []
+            for x, y, w, h, _ in stats[1:]:
+                crop = np.ascontiguousarray(gray[y:y + h, x:x + w] < 128)
+                items.append({
+                    'text': f"{zlib.crc32(crop.tobytes()):08x}",
+                    'conf': 0.9,
+                    'bbox': [[float(x), float(y)], [float(x + w), float(y)],
+                             [float(x + w), float(y + h)], [float(x), float(y + h)]],
+                    'bbox_rect': [float(x), float(y), float(w), float(h)]
+                })
+            results.append(items)
+        return results
+
+
+def make_backend(args):
+    if args.det:
+        from ocr.ppocr_cpu import PPOCRCpu
+        engine = PPOCRCpu(det_model=args.det, rec_model=args.rec, char_dict_path=args.dict)
+        return engine.recognize_batch
+    return BlobOCR().recognize_batch
+
+
+def make_frames(rng: np.random.Generator, count: int, popup_every: int):
+    """生成画面序列"""
+    base = np.full((HEIGHT, WIDTH, 3), 235, dtype=np.uint8)
+    for row in range(20):
+        for col in range(4):
+            text = WORDS[int(rng.integers(0, len(WORDS)))]
+            cv2.putText(base, text, (40 + col * 470, 60 + row * 50), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.7, (20, 20, 20), 2, cv2.LINE_AA)
+    frames = []
+    status = "Idle"
+    for i in range(count):
+        frame = base.copy()
+        # 右下角时钟每帧更新
+        cv2.putText(frame, f"12:{i // 60:02d}:{i % 60:02d}", (1760, 1060), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6, (20, 20, 20), 1, cv2.LINE_AA)
+        # 状态文字偶尔变化
+        if rng.random() < 0.2:
+            status = ["Idle", "Running", "Copying files", "Done"][int(rng.integers(0, 4))]
+        cv2.putText(frame, f"Status: {status}", (40, 1040), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.7, (20, 20, 20), 2, cv2.LINE_AA)
+        # 周期性弹出对话框（持续 3 帧）
+        if popup_every and i % popup_every < 3 and i >= popup_every:
+            cv2.rectangle(frame, (660, 340), (1260, 740), (250, 250, 250), -1)
+            cv2.rectangle(frame, (660, 340), (1260, 740), (90, 90, 90), 2)
+            cv2.putText(frame, "Confirm operation?", (740, 500), cv2.FONT_HERSHEY_SIMPLEX,
+                        1.0, (20, 20, 20), 2, cv2.LINE_AA)
+            cv2.putText(frame, "OK      Cancel", (800, 660), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.9, (20, 20, 20), 2, cv2.LINE_AA)
+        frames.append(frame)
+    return frames
+
+
+def result_keys(results):
+    return sorted((r['text'], tuple(int(round(v)) for v in r['bbox_rect'])) for r in results)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="增量 OCR 基准")
+    parser.add_argument('--det', default=None, help="检测模型 ONNX 路径（可选）")
+    parser.add_argument('--rec', default=None, help="识别模型 ONNX 路径")
+    parser.add_argument('--dict', default=None, help="字符字典路径")
+    parser.add_argument('--frames', type=int, default=60, help="画面帧数")
+    parser.add_argument('--popup-every', type=int, default=20, help="对话框弹出间隔（帧）")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    recognize_batch = make_backend(args)
+    frames = make_frames(np.random.default_rng(args.seed), args.frames, args.popup_every)
+    incremental = IncrementalOCR()
+
+    full_ms = []
+    inc_ms = []
+    ratios = []
+    mismatched = 0
+    for frame in frames:
+        start = time.perf_counter()
+        expected = recognize_batch([frame], [None])[0]
+        full_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        actual = incremental.recognize_batch(recognize_batch, [frame], [None], ["bench"])[0]
+        inc_ms.append((time.perf_counter() - start) * 1000)
+        ratios.append(incremental.last_ratio)
+        mismatched += result_keys(expected) != result_keys(actual)
+
+    stats = incremental.get_stats()
+    # 首帧必然整帧识别，稳态指标从第二帧开始统计
+    steady = slice(1, None)
+    print(f"画面 {WIDTH}x{HEIGHT}, {len(frames)} 帧, 后端 {'PPOCRCpu' if args.det else 'BlobOCR'}")
+    print(f"整帧识别 {stats['full_frames']} 帧, 画面未变化 {stats['unchanged_frames']} 帧, "
+          f"结果不一致 {mismatched} 帧")
+    print(f"{'full ms/frame':>14} {'incremental ms':>15} {'speedup':>8} {'reprocessed':>12} {'p95 reproc':>11}")
+    full_mean, inc_mean = float(np.mean(full_ms[steady])), float(np.mean(inc_ms[steady]))
+    print(f"{full_mean:>14.2f} {inc_mean:>15.2f} {full_mean / inc_mean:>7.1f}x "
+          f"{float(np.mean(ratios[steady])):>12.1%} {float(np.percentile(ratios[steady], 95)):>11.1%}")
+    return 1 if mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+OCR 结果查找基准
+
+一帧 OCR 结果上执行多次查找（一个流程中多个条件判断 / 鼠标操作节点查询同一帧），
+对比逐项遍历（原实现，正则每次重新编译）与 OCRResultSet 索引查询的耗时。
+OCRResultSet 的耗时包含首次查询时构建索引。
+
+用法:
+    python tests/bench_ocr_lookup.py [--results 300] [--queries 20] [--repeat 50]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ocr.result_set import OCRResultSet
+
+CHARS = "确定取消下一步上保存设置网络状态登录失败请重试设备列表应用更改"
+
+
+def make_results(rng: np.random.Generator, count: int):
+    results = []
+    for _ in range(count):
+        text = ''.join(rng.choice(list(CHARS), size=int(rng.integers(2, 12))))
+        x, y = int(rng.integers(0, 1800)), int(rng.integers(0, 1040))
+        w, h = 16 * len(text), 20
+        results.append({
+            'text': text,
+            'confidence': 0.9,
+            'bbox': [[x, y], [x + w, y], [x + w, y + h], [x, y + h]],
+            'center': (x + w / 2, y + h / 2),
+            'rect': [x, y, w, h]
+        })
+    return results
+
+
+def linear_find(results, target, match_mode):
+    """原实现: 逐项遍历"""
+    pattern = re.compile(target) if match_mode == "regex" else None
+    for result in results:
+        text = result.get('text', '')
+        if match_mode == "exact":
+            if text == target:
+                return result
+        elif match_mode == "regex":
+            if pattern.search(text):
+                return result
+        elif target in text:
+            return result
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="OCR 结果查找基准")
+    parser.add_argument('--results', type=int, default=300, help="每帧 OCR 结果数")
+    parser.add_argument('--queries', type=int, default=20, help="每帧查找次数")
+    parser.add_argument('--repeat', type=int, default=50, help="重复帧数")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = make_results(rng, args.results)
+    # 一半查找命中靠后的结果，一半查找不存在的文本（条件判断常见的“未出现”）
+    queries = []
+    for i in range(args.queries):
+        if i % 2:
+            queries.append((results[int(rng.integers(args.results // 2, args.results))]['text'], "contains"))
+        else:
+            queries.append(("不存在的文本" + str(i), "contains"))
+    queries.append((r"下.*步", "regex"))
+
+    for target, mode in queries:
+        expected = linear_find(results, target, mode)
+        actual = OCRResultSet(results).find(target, mode)
+        assert (expected is None) == (actual is None), target
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for target, mode in queries:
+            linear_find(results, target, mode)
+    linear_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        result_set = OCRResultSet(results)
+        for target, mode in queries:
+            result_set.find(target, mode)
+    indexed_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+    start = time.perf_counter()
+    result_set = OCRResultSet(results)
+    for _ in range(args.repeat):
+        for target, _mode in queries:
+            result_set.find(target, "fuzzy")
+    fuzzy_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+    print(f"OCR 结果 {len(results)}, 每帧查找 {len(queries)} 次")
+    print(f"{'linear ms':>10} {'indexed ms':>11} {'speedup':>8} {'fuzzy ms':>9}")
+    print(f"{linear_ms:>10.3f} {indexed_ms:>11.3f} {linear_ms / indexed_ms:>7.1f}x {fuzzy_ms:>9.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
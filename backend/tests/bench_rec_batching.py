@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+识别组批补齐比例基准
+
+按 KVM 画面常见的文本框宽高比分布生成裁剪图，比较不同模型形状下
+PPOCRv2Rec.build_inputs 的补齐比例（补齐列数 / 输入总列数），
+以及相对按 img_size 固定宽度分桶（saved）和相对 320/640 分桶（vs fixed）
+节省的输入列数（识别计算量近似与之成正比）:
+- fixed:    BModel 编译宽度 320/640（与原分桶相同）
+- compiled: 编译更多宽度 80/160/320/640
+- dynamic:  动态宽度 ONNX 模型，每批补齐到批内最大宽度
+
+用法:
+    python tests/bench_rec_batching.py [--crops 150] [--batch 6]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ocr.ppocr_rec_opencv import PPOCRv2Rec
+
+STRATEGIES = [
+    ("fixed", [[320, 48], [640, 48]], False),
+    ("compiled", [[80, 48], [160, 48], [320, 48], [640, 48]], False),
+    ("dynamic", [[320, 48], [640, 48]], True),
+]
+
+
+def make_recognizer(img_size, dynamic: bool, batch: int) -> PPOCRv2Rec:
+    """不加载模型，只初始化组批需要的参数"""
+    rec = object.__new__(PPOCRv2Rec)
+    rec.img_size = sorted(img_size, key=lambda x: x[0])
+    rec.img_ratio = sorted(x[0] / x[1] for x in rec.img_size)
+    rec.rec_batch_size = batch
+    rec.dynamic_width = dynamic
+    rec.dynamic_batch = dynamic
+    rec.preprocess_time = 0.0
+    rec.content_columns = rec.padded_columns = rec.bucket_columns = 0
+    return rec
+
+
+def make_crops(rng: np.random.Generator, count: int):
+    """大部分是短词（按钮、菜单、标签），少量长句"""
+    crops = []
+    for _ in range(count):
+        h = int(rng.integers(18, 36))
+        if rng.random() < 0.8:
+            w = int(h * rng.uniform(0.8, 4.0))
+        else:
+            w = int(h * rng.uniform(4.0, 16.0))
+        crops.append(np.full((h, w, 3), 128, dtype=np.uint8))
+    return crops
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="识别组批补齐比例基准")
+    parser.add_argument('--crops', type=int, default=150, help="每帧文本框数")
+    parser.add_argument('--batch', type=int, default=6, help="识别批大小")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    crops = make_crops(np.random.default_rng(args.seed), args.crops)
+    print(f"文本框 {len(crops)}, 批大小 {args.batch}")
+    print(f"{'strategy':>10} {'batches':>8} {'columns':>9} {'padding':>8} {'bucket padding':>15} "
+          f"{'saved':>7} {'vs fixed':>9} {'build ms':>9}")
+    fixed_columns = None
+    for name, img_size, dynamic in STRATEGIES:
+        rec = make_recognizer(img_size, dynamic, args.batch)
+        start = time.perf_counter()
+        batches = rec.build_inputs(crops)
+        build_ms = (time.perf_counter() - start) * 1000
+        assert sorted(id for batch in batches for id in batch["ids"]) == list(range(len(crops)))
+        stats = rec.padding_stats()
+        fixed_columns = fixed_columns or rec.padded_columns
+        print(f"{name:>10} {len(batches):>8} {rec.padded_columns:>9} {stats['padding_ratio']:>8.1%} "
+              f"{stats['bucket_padding_ratio']:>15.1%} {stats['padding_saved']:>7.1%} "
+              f"{1 - rec.padded_columns / fixed_columns:>9.1%} {build_ms:>9.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
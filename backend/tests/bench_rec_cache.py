@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+文本识别结果缓存基准
+
+模拟大部分静止的 KVM 画面序列（固定菜单/按钮文字，时钟每帧更新、状态文字偶尔变化），
+对比关闭 / 开启识别结果缓存时:
+- 每帧 OCR 耗时
+- 缓存命中率
+- 两种方式识别结果是否一致
+
+指定 --det/--rec/--dict 时使用 PPOCRCpu（ONNX 模型），否则使用 OpenCV 连通域模拟的
+文本检测和耗时与裁剪面积成正比的模拟识别器（相同裁剪图像给出相同文本），
+检测、裁剪、结果组装走 PPOCRSophon.recognize_batch 的真实流程。
+
+用法:
+    python tests/bench_rec_cache.py [--frames 60]
+    python tests/bench_rec_cache.py --det models/ch_PP-OCRv4_det.onnx \\
+        --rec models/ch_PP-OCRv4_rec.onnx --dict models/ppocr_keys_v1.txt
+"""
+
+import argparse
+import os
+import sys
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+# 添加 src 路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ocr.ppocr_sophon import PPOCRSophon
+
+WIDTH, HEIGHT = 1920, 1080
+WORDS = ["确定", "下一步", "Settings", "Network Status: Connected", "OK", "Cancel",
+         "Device 192.168.1.100", "Apply changes", "Login", "Help", "File", "Save"]
+
+
+class BlobDetector:
+    """OpenCV 连通域模拟的文本检测器"""
+
+    def __call__(self, img_list):
+        boxes_list = []
+        for img in img_list:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            mask = cv2.dilate((gray < 128).astype(np.uint8), np.ones((5, 15), dtype=np.uint8))
+            _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+            boxes = [np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float32)
+                     for x, y, w, h, _ in stats[1:].tolist()]
+            boxes_list.append(boxes)
+        return boxes_list
+
+
+class SlowRecognizer:
+    """模拟识别器: 缩放到 48 高后做与宽度成正比的计算"""
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self._proj = rng.standard_normal((48 * 3, 256)).astype(np.float32)
+        self._hidden = rng.standard_normal((256, 256)).astype(np.float32)
+
+    def __call__(self, imgs):
+        res = []
+        for img in imgs:
+            h, w = img.shape[:2]
+            norm = cv2.resize(img, (max(1, int(w * 48 / h)), 48)).astype(np.float32) / 255.0
+            feats = norm.transpose(1, 0, 2).reshape(norm.shape[1], -1) @ self._proj
+            for _ in range(8):
+                feats = np.tanh(feats @ self._hidden * 0.01)
+            res.append((f"{zlib.crc32(np.ascontiguousarray(img).tobytes()):08x}", 0.95))
+        return {"ids": list(range(len(imgs))), "res": res}
+
+    def padding_stats(self):
+        return {}
+
+
+class BlobOCR(PPOCRSophon):
+    """使用模拟检测器 / 识别器的 PPOCRSophon"""
+
+    def _check_runtime(self) -> None:
+        pass
+
+    def _load_models(self) -> None:
+        self.text_detector = BlobDetector()
+        self.text_recognizer = SlowRecognizer()
+
+
+def make_engine(args):
+    if args.det:
+        from ocr.ppocr_cpu import PPOCRCpu
+        return PPOCRCpu(det_model=args.det, rec_model=args.rec, char_dict_path=args.dict)
+    return BlobOCR(det_model="blob", rec_model="blob")
+
+
+def make_frames(rng: np.random.Generator, count: int):
+    """生成画面序列"""
+    base = np.full((HEIGHT, WIDTH, 3), 235, dtype=np.uint8)
+    for row in range(20):
+        for col in range(4):
+            text = WORDS[int(rng.integers(0, len(WORDS)))]
+            cv2.putText(base, text, (40 + col * 470, 60 + row * 50), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.7, (20, 20, 20), 2, cv2.LINE_AA)
+    frames = []
+    status = "Idle"
+    for i in range(count):
+        frame = base.copy()
+        cv2.putText(frame, f"12:{i // 60:02d}:{i % 60:02d}", (1760, 1060), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6, (20, 20, 20), 1, cv2.LINE_AA)
+        if rng.random() < 0.2:
+            status = ["Idle", "Running", "Copying files", "Done"][int(rng.integers(0, 4))]
+        cv2.putText(frame, f"Status: {status}", (40, 1040), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.7, (20, 20, 20), 2, cv2.LINE_AA)
+        frames.append(frame)
+    return frames
+
+
+def run(engine, frames):
+    """逐帧识别，返回 (结果列表, 每帧耗时 ms)"""
+    results, times = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        results.append(engine.recognize(frame))
+        times.append((time.perf_counter() - start) * 1000)
+    return results, times
+
+
+def result_keys(results):
+    return [(r['text'], round(r['conf'], 4), tuple(int(round(v)) for v in r['bbox_rect'])) for r in results]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="文本识别结果缓存基准")
+    parser.add_argument('--det', default=None, help="检测模型 ONNX 路径（可选）")
+    parser.add_argument('--rec', default=None, help="识别模型 ONNX 路径")
+    parser.add_argument('--dict', default=None, help="字符字典路径")
+    parser.add_argument('--frames', type=int, default=60, help="画面帧数")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    engine = make_engine(args)
+    cache = engine.rec_cache
+    if cache is None:
+        print("识别结果缓存未启用（配置 rec_cache.enabled）")
+        return 1
+    frames = make_frames(np.random.default_rng(args.seed), args.frames)
+
+    engine.rec_cache = None
+    expected, plain_ms = run(engine, frames)
+    engine.rec_cache = cache
+    cache.clear()
+    actual, cached_ms = run(engine, frames)
+
+    mismatched = sum(result_keys(e) != result_keys(a) for e, a in zip(expected, actual))
+    stats = cache.get_stats()
+    crops = sum(len(r) for r in expected) / len(frames)
+    # 首帧全部未命中，稳态指标从第二帧开始统计
+    plain_mean, cached_mean = float(np.mean(plain_ms[1:])), float(np.mean(cached_ms[1:]))
+    print(f"画面 {WIDTH}x{HEIGHT}, {len(frames)} 帧, 每帧文本 {crops:.0f}, "
+          f"后端 {'PPOCRCpu' if args.det else 'BlobOCR'}")
+    print(f"缓存条目 {stats['entries']}, 占用 {stats['memory_bytes'] / 1024:.1f} KB, "
+          f"命中 {stats['hits']}, 未命中 {stats['misses']}, 结果不一致 {mismatched} 帧")
+    print(f"{'plain ms/frame':>15} {'cached ms/frame':>16} {'speedup':>8} {'hit rate':>9}")
+    print(f"{plain_mean:>15.2f} {cached_mean:>16.2f} {plain_mean / cached_mean:>7.1f}x "
+          f"{stats['hit_rate']:>9.1%}")
+    return 1 if mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,22 @@
+"""pytest 公共配置
+
+将 src 加入导入路径，并关闭执行历史记录（测试中不写入 SQLite 数据库）。
+连接真实 KVM 设备的手动测试脚本不参与收集。
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from utils.config import get_config_manager
+
+get_config_manager().update({'history': {'enabled': False}})
+
+# 手动测试脚本（需要 KVM 设备，直接运行）
+collect_ignore = [
+    'test_click_button.py',
+    'test_find_coordinates.py',
+    'test_keyboard.py',
+    'test_kvm_source_frame.py',
+    'test_mouse_with_screenshot.py',
+]
@@ -0,0 +1,20 @@
+"""节点执行线程池测试"""
+import asyncio
+import threading
+
+from engine.executor_pool import POOL_CPU, POOL_IO, get_executor_pools
+
+
+def test_pools_are_usable_after_shutdown():
+    pools = get_executor_pools()
+    pool = pools.get_pool(POOL_IO)
+    assert pool.submit(lambda x: x + 1, 1).result(timeout=5) == 2
+
+    pools.shutdown()
+
+    # 关闭后（如进程内重新创建 FlowRunner）再次提交时重新创建线程池
+    assert get_executor_pools() is pools
+    assert pool.submit(lambda x: x * 2, 21).result(timeout=5) == 42
+    name = asyncio.run(pools.get_pool(POOL_CPU).run(lambda: threading.current_thread().name))
+    assert name.startswith("FlowPool-cpu")
+    assert pool.get_stats()['queue_depth'] == 0
@@ -0,0 +1,157 @@
+"""条件表达式引擎测试"""
+from types import SimpleNamespace
+
+import pytest
+
+from engine.expression import ExpressionError, compile_expression, validate_expression
+
+
+def _ctx(**fields):
+    defaults = {
+        'ocr_results': [
+            {'text': '确认', 'confidence': 0.92},
+            {'text': '取消', 'confidence': 0.81},
+        ],
+        'detection_results': [{'label': 'button', 'confidence': 0.7}],
+        'variables': {'retry': '2', 'name': 'ab', 'limit': 3},
+        'loop_count': 10,
+        'ocr_target_found': True,
+    }
+    defaults.update(fields)
+    return SimpleNamespace(**defaults)
+
+
+def _eval(source, **fields):
+    return compile_expression(source).evaluate(_ctx(**fields))
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('1 + 2 * 3', 7),
+    ('(1 + 2) * 3', 9),
+    ('10 - 4 - 3', 3),
+    ('2 * 3 % 4', 2),
+    ('-2 * 3', -6),
+    ('1 + 2 == 3', True),
+    # 比较运算左结合: (1 < 2) == true
+    ('1 < 2 == true', True),
+    ('not 1 == 2', True),
+    ('true or false and false', True),
+    ('(true or false) and false', False),
+    ('!found || loop > 5', True),
+    ('1 == 1 && 2 > 3 || 4 >= 4', True),
+])
+def test_precedence(source, expected):
+    assert _eval(source) == expected
+
+
+@pytest.mark.parametrize('source, expected', [
+    ("'确认' in text(ocr)", True),
+    ("'登录' not in text(ocr)", True),
+    ("'确认' not in text(ocr)", False),
+    ("'a' not in vars.name", False),
+    ("'x' in null", False),
+    ("'x' not in null", True),
+    ("not 'x' in vars.name", True),
+])
+def test_in_and_not_in(source, expected):
+    assert _eval(source) is expected
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('${retry} + 1', 3),
+    ('vars.retry + 1 < 4', True),
+    ('vars.retry == 2', True),
+    ('vars.retry > 10', False),
+    ("vars.retry * 2", 4),
+    ("'2.5' + 1", 3.5),
+    ("vars.name + 1", 'ab1'),
+    ("'a' + 'b'", 'ab'),
+    ("'nan' + 1", 'nan1'),
+    ("vars.limit - vars.retry", 1),
+    ("num('x', 5) + 1", 6),
+    ("int('7') + 1", 8),
+])
+def test_numeric_string_coercion(source, expected):
+    result = _eval(source)
+    assert result == expected
+    assert type(result) is type(expected)
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('1 / 0', None),
+    ('5 % 0', None),
+    ('null + 1', None),
+    ("null + 'a'", 'a'),
+    ('vars.missing', None),
+    ('vars.missing > 1', False),
+    ('vars.missing == null', True),
+    ('ocr[5].text', None),
+    ('ocr[0].text', '确认'),
+    ("vars['name']", 'ab'),
+    ('-null', None),
+    ('len(null)', 0),
+    ('max(1, vars.retry, 3)', 3),
+    ('min(null)', None),
+    ('1 / 0 > 1', False),
+])
+def test_null_and_zero_division(source, expected):
+    assert _eval(source) == expected
+
+
+def test_missing_context_fields_use_defaults():
+    ctx = SimpleNamespace()
+    assert compile_expression('count(ocr) == 0 and not found and loop == 0').evaluate(ctx) is True
+    assert compile_expression('${retry} + 1').evaluate(ctx) is None
+
+
+@pytest.mark.parametrize('source', [
+    'vars._private',
+    'ocr[0].__class__',
+    'vars.__dict__',
+])
+def test_underscore_members_rejected(source):
+    with pytest.raises(ExpressionError, match='不允许访问成员'):
+        compile_expression(source)
+
+
+@pytest.mark.parametrize('source, message', [
+    ('eval("1")', '未知的函数'),
+    ('__import__("os")', '未知的函数'),
+    ('open("x")', '未知的函数'),
+    ('retry > 1', '未知的名称'),
+    ('vars.count(1)', '只能调用内置函数'),
+    ('count()', '需要 1 到 3 个参数'),
+    ('1 +', '意外的 结尾'),
+    ('(1 + 2', '缺少'),
+    ('1 2', '多余的内容'),
+    ('1 # 2', '无法识别的字符'),
+    ('2 in [1]', '意外的'),
+    ('', '表达式为空'),
+])
+def test_rejected_expressions(source, message):
+    with pytest.raises(ExpressionError, match=message):
+        compile_expression(source)
+    assert validate_expression(source) is not None
+
+
+def test_builtin_functions():
+    assert _eval("count(ocr, '确')") == 1
+    assert _eval("count(ocr, '^取', 'regex')") == 1
+    assert _eval("exists(det, 'button')") is True
+    assert _eval("exists(det, 'butt')") is False
+    assert _eval("conf(ocr)") == pytest.approx(0.92)
+    assert _eval("text(ocr)") == '确认 取消'
+    assert _eval("var('retry', 0) + 1") == 3
+    assert _eval("var('missing', 9)") == 9
+    assert _eval("round(2.567, 1)") == pytest.approx(2.6)
+    assert _eval("matches(vars.name, '^a')") is True
+
+
+def test_fields_reflect_reads():
+    assert compile_expression("count(ocr, 'x') > 0 and ${retry} < 3").fields == {'ocr_results', 'variables'}
+    assert compile_expression("found or loop > 1").fields == {'ocr_target_found', 'loop_count'}
+    assert compile_expression("1 + 1").fields == frozenset()
+
+
+def test_compile_is_cached():
+    assert compile_expression('vars.retry < 3') is compile_expression('vars.retry < 3')
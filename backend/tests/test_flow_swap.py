@@ -0,0 +1,117 @@
+"""流程热更新测试
+
+流水线模式下，第 N 轮动作阶段执行时第 N+1 轮的感知阶段已在线程池中预取；
+热更新必须在预取的感知节点线程退出后才释放 KVM 连接和模型。
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict
+
+from engine.flow_runner import FlowRunContext, FlowRunner, FlowRunState, FlowStatus
+from nodes import NODE_REGISTRY, register_node
+from nodes.base import BaseNode, NodeConfig
+
+
+class _Probe:
+    """记录感知节点是否正在执行，以及热更新提交时的状态"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.perceiving = 0
+        self.perceptions = 0
+        self.actions = 0
+        self.swap_while_perceiving = []
+
+
+probe = _Probe()
+
+
+@register_node
+class _SlowCaptureNode(BaseNode):
+    """耗时的感知节点（模拟画面采集 + 识别）"""
+
+    produces = ('test_frame',)
+    consumes = ()
+
+    @classmethod
+    def get_config(cls) -> NodeConfig:
+        return NodeConfig(type="test_slow_capture", label="测试采集", category="source",
+                          icon="", color="", description="")
+
+    def execute(self, context: Any, properties: Dict[str, Any]) -> bool:
+        with probe.lock:
+            probe.perceiving += 1
+        try:
+            time.sleep(0.3)
+            context.test_frame = time.monotonic()
+        finally:
+            with probe.lock:
+                probe.perceiving -= 1
+                probe.perceptions += 1
+        return True
+
+
+@register_node
+class _RequestSwapNode(BaseNode):
+    """动作节点：第一轮安排热更新，之后请求停止"""
+
+    side_effects = True
+    produces = ()
+    consumes = ('test_frame',)
+    state: FlowRunState = None
+
+    @classmethod
+    def get_config(cls) -> NodeConfig:
+        return NodeConfig(type="test_request_swap", label="测试动作", category="action",
+                          icon="", color="", description="")
+
+    def execute(self, context: Any, properties: Dict[str, Any]) -> bool:
+        probe.actions += 1
+        if probe.actions == 1:
+            self.state.pending_flow = _flow("v2")
+        elif probe.actions >= 3:
+            context.stop_requested = True
+        return True
+
+
+def _flow(name: str) -> Dict[str, Any]:
+    return {
+        'id': 'swap-test',
+        'name': name,
+        'settings': {'loop_mode': 'pipelined'},
+        'nodes': [
+            {'id': 'capture', 'type': 'test_slow_capture', 'properties': {}},
+            {'id': 'act', 'type': 'test_request_swap', 'properties': {}},
+        ],
+        'edges': [{'id': 'e1', 'source': 'capture', 'target': 'act'}],
+    }
+
+
+def test_hot_swap_waits_for_in_flight_perception(monkeypatch):
+    runner = FlowRunner()
+    original_swap = FlowRunner._swap_flow
+
+    async def swap_flow(self, flow_data, state):
+        with probe.lock:
+            probe.swap_while_perceiving.append(probe.perceiving)
+        return await original_swap(self, flow_data, state)
+
+    monkeypatch.setattr(FlowRunner, '_swap_flow', swap_flow)
+
+    context = FlowRunContext(flow_id='swap-test', flow_name='v1', start_time=time.time())
+    state = FlowRunState(flow_id='swap-test', flow_name='v1', status=FlowStatus.WARMING, context=context)
+    _RequestSwapNode.state = state
+    try:
+        asyncio.run(asyncio.wait_for(runner._run_flow_loop(_flow("v1"), state), timeout=10))
+    finally:
+        NODE_REGISTRY.pop('test_slow_capture', None)
+        NODE_REGISTRY.pop('test_request_swap', None)
+
+    assert state.error is None
+    assert state.swap_count == 1
+    assert state.flow_name == "v2"
+    # 热更新时上一轮已开始预取，切换前等待其线程退出
+    assert probe.swap_while_perceiving == [0]
+    assert probe.perceiving == 0
+    assert probe.actions >= 3
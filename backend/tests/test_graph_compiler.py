@@ -0,0 +1,291 @@
+"""流程图编译器测试（活跃性裁剪、裁剪融合）"""
+import copy
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from engine.graph_compiler import compile_flow, split_pipeline_stages
+from nodes import NODE_REGISTRY, register_node
+from nodes.base import BaseNode, NodeConfig
+
+
+def _node(node_id: str, node_type: str, **properties) -> Dict[str, Any]:
+    return {'id': node_id, 'type': node_type, 'label': node_id, 'properties': properties}
+
+
+def _edge(source: str, target: str, branch: Optional[str] = None) -> Dict[str, Any]:
+    edge = {'id': f"{source}-{target}", 'source': source, 'target': target}
+    if branch is not None:
+        edge['properties'] = {'branch': branch}
+    return edge
+
+
+def _flow(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {'id': 'compile-test', 'name': 'compile-test', 'nodes': nodes, 'edges': edges}
+
+
+def _compile(flow: Dict[str, Any]):
+    return compile_flow(flow, enabled=True)
+
+
+def _ids(compiled) -> List[str]:
+    return [n['id'] for n in compiled.flow['nodes']]
+
+
+def _pruned(compiled) -> Dict[str, str]:
+    return {p['node_id']: p['reason'] for p in compiled.pruned}
+
+
+def _links(compiled) -> set:
+    return {(e['source'], e['target'], (e.get('properties') or {}).get('branch'))
+            for e in compiled.flow['edges']}
+
+
+def _fixed_click(node_id: str = 'click') -> Dict[str, Any]:
+    return _node(node_id, 'mouse_action', position_mode='fixed', x=10, y=10)
+
+
+# ============ 活跃性裁剪 ============
+
+def test_detection_without_reader_is_pruned_and_edges_rewired():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('yolo', 'yolo_detection'), _fixed_click()],
+        [_edge('src', 'yolo'), _edge('yolo', 'click')],
+    )
+    compiled = _compile(flow)
+
+    assert _pruned(compiled) == {'yolo': 'unused_output'}
+    assert _ids(compiled) == ['src', 'click']
+    assert _links(compiled) == {('src', 'click', None)}
+
+
+def test_detection_read_by_condition_is_kept():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('yolo', 'yolo_detection'),
+         _node('cond', 'condition', condition_type='detection_found'), _fixed_click()],
+        [_edge('src', 'yolo'), _edge('yolo', 'cond'), _edge('cond', 'click', 'true')],
+    )
+    compiled = _compile(flow)
+
+    assert compiled.pruned == []
+    assert _ids(compiled) == ['src', 'yolo', 'cond', 'click']
+
+
+def test_click_on_ocr_match_keeps_ocr():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('ocr', 'ocr_recognition'),
+         _node('click', 'mouse_action', position_mode='ocr_match', target_text='确定')],
+        [_edge('src', 'ocr'), _edge('ocr', 'click')],
+    )
+    assert _compile(flow).pruned == []
+
+
+def test_condition_without_live_branch_is_pruned():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('ocr', 'ocr_recognition'),
+         _node('cond', 'condition', condition_type='ocr_has_result'),
+         _node('yolo', 'yolo_detection'), _fixed_click()],
+        [_edge('src', 'ocr'), _edge('ocr', 'cond'), _edge('cond', 'yolo', 'true'),
+         _edge('src', 'click')],
+    )
+    compiled = _compile(flow)
+
+    # 条件分支下游只有无人读取的检测，条件及其读取的 OCR 都不需要执行
+    assert _pruned(compiled) == {'ocr': 'unused_output', 'cond': 'unused_output', 'yolo': 'unused_output'}
+    assert _ids(compiled) == ['src', 'click']
+
+
+def test_branch_is_kept_when_pruned_node_sits_on_it():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('ocr', 'ocr_recognition'),
+         _node('cond', 'condition', condition_type='ocr_has_result'),
+         _node('yolo', 'yolo_detection'), _fixed_click()],
+        [_edge('src', 'ocr'), _edge('ocr', 'cond'), _edge('cond', 'yolo', 'false'),
+         _edge('yolo', 'click')],
+    )
+    compiled = _compile(flow)
+
+    assert _pruned(compiled) == {'yolo': 'unused_output'}
+    assert ('cond', 'click', 'false') in _links(compiled)
+
+
+def test_inactive_preprocessing_and_unknown_nodes_are_pruned():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('pre', 'preprocessing'),
+         _node('mystery', 'no_such_node'), _fixed_click()],
+        [_edge('src', 'pre'), _edge('pre', 'mystery'), _edge('mystery', 'click')],
+    )
+    compiled = _compile(flow)
+
+    assert _pruned(compiled) == {'pre': 'no_effect', 'mystery': 'unknown_type'}
+    assert _links(compiled) == {('src', 'click', None)}
+
+
+def test_active_preprocessing_before_reader_is_kept():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('pre', 'preprocessing', denoise=True),
+         _node('ocr', 'ocr_recognition'),
+         _node('click', 'mouse_action', position_mode='ocr_match', target_text='确定')],
+        [_edge('src', 'pre'), _edge('pre', 'ocr'), _edge('ocr', 'click')],
+    )
+    assert _compile(flow).pruned == []
+
+
+def test_fields_read_at_loop_start_keep_writers_later_in_the_loop():
+    # 条件位于流程起始处，读取的是上一轮末尾 OCR 写入的结果
+    flow = _flow(
+        [_node('cond', 'condition', condition_type='ocr_has_result'), _fixed_click(),
+         _node('src', 'kvm_source'), _node('ocr', 'ocr_recognition')],
+        [_edge('cond', 'click', 'true'), _edge('cond', 'src', 'false'), _edge('src', 'ocr')],
+    )
+    compiled = _compile(flow)
+
+    assert compiled.pruned == []
+
+
+def test_unreachable_nodes_are_pruned():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('cond', 'condition', condition_type='variable'),
+         _fixed_click('click'), _fixed_click('orphan')],
+        [_edge('src', 'cond'), _edge('cond', 'click', 'true'), _edge('cond', 'orphan')],
+    )
+    compiled = _compile(flow)
+
+    # 条件节点未标注分支的连线不会被执行
+    assert _pruned(compiled) == {'orphan': 'unreachable'}
+
+
+def test_side_effect_nodes_are_never_pruned():
+    flow = _flow(
+        [_node('var', 'variable', name='retry', operation='increment'),
+         _node('wait', 'wait', duration=10), _fixed_click()],
+        [_edge('var', 'wait'), _edge('wait', 'click')],
+    )
+    assert _compile(flow).pruned == []
+
+
+@register_node
+class _UndeclaredNode(BaseNode):
+    """未声明读写字段的节点（按读取全部字段、有副作用处理）"""
+
+    @classmethod
+    def get_config(cls) -> NodeConfig:
+        return NodeConfig(type="test_undeclared", label="未声明节点", category="util",
+                          icon="", color="", description="")
+
+    def execute(self, context: Any, properties: Dict[str, Any]) -> bool:
+        return True
+
+
+def test_undeclared_node_keeps_everything_upstream():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('yolo', 'yolo_detection'), _node('ocr', 'ocr_recognition'),
+         _node('custom', 'test_undeclared')],
+        [_edge('src', 'yolo'), _edge('yolo', 'ocr'), _edge('ocr', 'custom')],
+    )
+    assert _compile(flow).pruned == []
+
+
+def test_compile_does_not_modify_input_and_can_be_disabled():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('yolo', 'yolo_detection'), _fixed_click()],
+        [_edge('src', 'yolo'), _edge('yolo', 'click')],
+    )
+    original = copy.deepcopy(flow)
+
+    compiled = _compile(flow)
+    assert compiled.changed
+    assert flow == original
+
+    disabled = compile_flow(flow, enabled=False)
+    assert not disabled.changed
+    assert disabled.flow is flow
+    assert compile_flow({**flow, 'settings': {'optimize': False}}).flow['nodes'] == flow['nodes']
+
+
+# ============ 裁剪融合 ============
+
+def _crop(node_id: str, x: int, y: int, width: int, height: int, **extra) -> Dict[str, Any]:
+    return _node(node_id, 'image_crop', x=x, y=y, width=width, height=height, **extra)
+
+
+def _ocr_flow(*middle: Dict[str, Any]) -> Dict[str, Any]:
+    nodes = [_node('src', 'kvm_source'), *middle, _node('ocr', 'ocr_recognition'),
+             _node('click', 'mouse_action', position_mode='ocr_match', target_text='确定')]
+    ids = [n['id'] for n in nodes]
+    return _flow(nodes, [_edge(a, b) for a, b in zip(ids, ids[1:])])
+
+
+def _crop_box(compiled, node_id: str):
+    props = next(n for n in compiled.flow['nodes'] if n['id'] == node_id)['properties']
+    return props['x'], props['y'], props['width'], props['height']
+
+
+@pytest.mark.parametrize('outer, inner, merged', [
+    ((10, 20, 200, 100), (5, 5, 50, 30), (15, 25, 50, 30)),
+    # 内层超出外层时截断到外层边界
+    ((10, 20, 200, 100), (150, 80, 100, 100), (160, 100, 50, 20)),
+    # 长度 0 表示到画面边缘
+    ((10, 10, 0, 0), (5, 5, 20, 20), (15, 15, 20, 20)),
+    ((10, 10, 100, 100), (5, 5, 0, 0), (15, 15, 95, 95)),
+])
+def test_consecutive_crops_are_merged(outer, inner, merged):
+    compiled = _compile(_ocr_flow(_crop('outer', *outer), _crop('inner', *inner)))
+
+    assert [f['kind'] for f in compiled.fused] == ['crop_merge']
+    assert _ids(compiled) == ['src', 'inner', 'ocr', 'click']
+    assert _crop_box(compiled, 'inner') == merged
+    assert _links(compiled) == {('src', 'inner', None), ('inner', 'ocr', None), ('ocr', 'click', None)}
+
+
+def test_crops_outside_each_other_are_not_merged():
+    compiled = _compile(_ocr_flow(_crop('outer', 10, 20, 100, 100), _crop('inner', 150, 0, 10, 10)))
+
+    assert compiled.fused == []
+    assert _ids(compiled) == ['src', 'outer', 'inner', 'ocr', 'click']
+
+
+def test_crop_with_second_reader_is_not_merged():
+    flow = _ocr_flow(_crop('outer', 10, 20, 200, 100), _crop('inner', 5, 5, 50, 30))
+    flow['nodes'].append(_node('yolo', 'yolo_detection'))
+    flow['nodes'].append(_node('cond', 'condition', condition_type='detection_found'))
+    flow['nodes'].append(_fixed_click('click2'))
+    flow['edges'] += [_edge('outer', 'yolo'), _edge('yolo', 'cond'), _edge('cond', 'click2', 'true')]
+    compiled = _compile(flow)
+
+    # 外层裁剪的结果还被检测读取，不能合并
+    assert [f for f in compiled.fused if f['kind'] == 'crop_merge'] == []
+
+
+def test_crop_is_moved_before_non_resizing_preprocessing():
+    compiled = _compile(_ocr_flow(_node('pre', 'preprocessing', denoise=True), _crop('crop', 0, 0, 100, 50)))
+
+    assert [f['kind'] for f in compiled.fused] == ['crop_pushdown']
+    assert _links(compiled) == {('src', 'crop', None), ('crop', 'pre', None),
+                                ('pre', 'ocr', None), ('ocr', 'click', None)}
+
+
+def test_crop_is_not_moved_before_resizing_preprocessing():
+    compiled = _compile(_ocr_flow(_node('pre', 'preprocessing', resize=True), _crop('crop', 0, 0, 100, 50)))
+
+    assert compiled.fused == []
+
+
+# ============ 流水线阶段划分 ============
+
+def test_split_pipeline_stages():
+    flow = _flow(
+        [_node('src', 'kvm_source'), _node('ocr', 'ocr_recognition'),
+         _node('cond', 'condition', condition_type='ocr_has_result'), _fixed_click()],
+        [_edge('src', 'ocr'), _edge('ocr', 'cond'), _edge('cond', 'click', 'true')],
+    )
+    stages, reason = split_pipeline_stages(flow)
+
+    assert reason == ""
+    assert [n['id'] for n in stages.perception['nodes']] == ['src', 'ocr']
+    assert [n['id'] for n in stages.action['nodes']] == ['cond', 'click']
+    assert 'ocr_results' in stages.fields
+
+
+def teardown_module(module):
+    NODE_REGISTRY.pop('test_undeclared', None)
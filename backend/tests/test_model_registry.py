@@ -0,0 +1,61 @@
+"""全局模型注册表测试"""
+import time
+from contextlib import nullcontext
+
+import pytest
+
+from engine.flow_runner import FlowRunContext
+from engine.model_registry import get_model_registry
+from engine.result_cache import get_result_cache
+
+
+class _Model:
+    pass
+
+
+def test_restarted_flow_keeps_references_when_old_run_releases():
+    registry = get_model_registry()
+    old_run = FlowRunContext(flow_id='restart', start_time=time.time())
+    new_run = FlowRunContext(flow_id='restart', start_time=time.time())
+    assert old_run.model_owner != new_run.model_owner
+
+    model = registry.acquire('test', {'name': 'restart'}, _Model, old_run.model_owner)
+    assert registry.acquire('test', {'name': 'restart'}, _Model, new_run.model_owner) is model
+
+    # 旧运行停止后的清理晚于新运行的启动
+    assert registry.release(old_run.model_owner) == 1
+    assert registry.get_owned_models(new_run.model_owner) == [model]
+    assert not isinstance(registry.inference_lock(model), nullcontext)
+
+    registry.release(new_run.model_owner)
+    assert registry.get_owned_models(new_run.model_owner) == []
+
+
+def test_result_cache_clear_only_affects_the_given_run():
+    cache = get_result_cache()
+    cache.get('missing-key', 'restart', 'ocr', 'ocr_recognition', run_id='old')
+    cache.get('missing-key', 'restart', 'ocr', 'ocr_recognition', run_id='new')
+
+    cache.clear('restart', 'old')
+    flows = [(n['flow_id'], n['node_id']) for n in cache.get_stats()['nodes']]
+    assert flows.count(('restart', 'ocr')) == 1
+
+    cache.clear('restart')
+    flows = [(n['flow_id'], n['node_id']) for n in cache.get_stats()['nodes']]
+    assert ('restart', 'ocr') not in flows
+
+
+def test_failed_load_releases_the_load_lock():
+    registry = get_model_registry()
+    params = {'name': 'broken'}
+
+    def broken():
+        raise RuntimeError("模型文件不存在")
+
+    with pytest.raises(RuntimeError):
+        registry.acquire('test', params, broken, 'owner')
+    assert not any(key.startswith('test:') for key in registry._load_locks)
+
+    model = registry.acquire('test', params, _Model, 'owner')
+    assert registry.get_owned_models('owner') == [model]
+    registry.release('owner')
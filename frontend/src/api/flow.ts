@@ -20,7 +20,7 @@ export interface Flow {
 export interface FlowStatus {
   flow_id: string
   flow_name: string
-  status: 'stopped' | 'running' | 'paused' | 'error'
+  status: 'stopped' | 'warming' | 'running' | 'paused' | 'error'
   loop_count: number
   total_node_executions: number
   start_time: string | null